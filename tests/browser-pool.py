@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Keep one headless Chromium running for the test scripts (harness/browser_pool.py).
+
+Usage:
+  python3 tests/browser-pool.py start [--port 9333]
+  python3 tests/browser-pool.py status
+  python3 tests/browser-pool.py restart        # e.g. when status shows it has grown large
+  python3 tests/browser-pool.py stop
+
+While it runs, team-test.py, team-quick-test.py and the parallel runner's
+workers connect to it over CDP instead of launching their own Chromium; when
+it is stopped (or stops answering) they launch one as before. What carries
+over between runs is the running browser process; the contexts a script
+creates are closed when it disconnects.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from playwright.sync_api import sync_playwright
+
+from harness import browser_pool
+from harness.console import log
+
+DEFAULT_PORT = int(os.environ.get("BROWSER_POOL_PORT", "9333"))
+USER_DATA_DIR = os.environ.get("BROWSER_USER_DATA_DIR", "/tmp/stockzip-browser-profile")
+START_TIMEOUT = 15
+
+# A restart is suggested above this resident size (all Chromium processes)
+RSS_WARN_MB = int(os.environ.get("BROWSER_RSS_WARN_MB", "1500"))
+
+
+def chromium_path() -> str:
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def rss_mb(pid: int) -> float:
+    """Resident size of the browser's process group (it was started as a session leader)"""
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-g", str(pid)], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    return sum(int(line) for line in output.split() if line.isdigit()) / 1024
+
+
+def running() -> dict:
+    state = browser_pool.read_state()
+    if state and browser_pool.is_alive(state.get("pid")):
+        return state
+    return None
+
+
+def cmd_start(args):
+    state = running()
+    if state:
+        log(f"Already running: pid {state['pid']} at {state['endpoint']}")
+        return 0
+
+    endpoint = f"http://127.0.0.1:{args.port}"
+    os.makedirs(USER_DATA_DIR, exist_ok=True)
+    with open(os.path.join(USER_DATA_DIR, "chromium.log"), "a") as stderr:
+        process = subprocess.Popen(
+            [chromium_path(), "--headless=new", f"--remote-debugging-port={args.port}",
+             f"--user-data-dir={USER_DATA_DIR}", "--no-first-run", "--no-default-browser-check",
+             "--disable-background-networking", "about:blank"],
+            stdout=subprocess.DEVNULL, stderr=stderr, start_new_session=True,
+        )
+
+    deadline = time.time() + START_TIMEOUT
+    version = None
+    while time.time() < deadline and process.poll() is None:
+        version = browser_pool.check_endpoint(endpoint, timeout=1)
+        if version:
+            break
+        time.sleep(0.2)
+    if not version:
+        process.kill()
+        log(f"Chromium did not come up on {endpoint} (see {USER_DATA_DIR}/chromium.log)", "FAIL")
+        return 1
+
+    with open(browser_pool.BROWSER_STATE_FILE, "w") as f:
+        json.dump({"pid": process.pid, "endpoint": endpoint, "started_at": time.time(),
+                   "version": version.get("Browser")}, f)
+    log(f"{version.get('Browser')} running: pid {process.pid} at {endpoint}", "PASS")
+    return 0
+
+
+def cmd_stop(args):
+    state = running()
+    if not state:
+        log("Not running")
+        return 0
+    os.killpg(state["pid"], signal.SIGTERM)
+    for _ in range(50):
+        if not browser_pool.is_alive(state["pid"]):
+            break
+        time.sleep(0.1)
+    else:
+        os.killpg(state["pid"], signal.SIGKILL)
+    os.remove(browser_pool.BROWSER_STATE_FILE)
+    log(f"Stopped pid {state['pid']}")
+    return 0
+
+
+def cmd_status(args):
+    state = running()
+    if not state:
+        log("Not running - scripts launch their own browser")
+        return 1
+    healthy = browser_pool.check_endpoint(state["endpoint"]) is not None
+    size = rss_mb(state["pid"])
+    uptime = (time.time() - state["started_at"]) / 60
+    print(f"pid {state['pid']} | {state['endpoint']} | {state.get('version')} | up {uptime:.0f} min | "
+          f"{f'{size:.0f} MB' if size is not None else 'size unknown'} | {'healthy' if healthy else 'NOT ANSWERING'}")
+    if size and size > RSS_WARN_MB:
+        log(f"Above {RSS_WARN_MB} MB - consider `browser-pool.py restart`", "WARN")
+    return 0 if healthy else 1
+
+
+def cmd_restart(args):
+    cmd_stop(args)
+    return cmd_start(args)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shared Chromium for the StockZip test scripts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, handler, help_text in (
+        ("start", cmd_start, "launch the shared browser"),
+        ("stop", cmd_stop, "stop it"),
+        ("status", cmd_status, "pid, size and health"),
+        ("restart", cmd_restart, "stop and start again"),
+    ):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("--port", type=int, default=DEFAULT_PORT, help="remote debugging port")
+        command.set_defaults(handler=handler)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sys.exit(args.handler(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Bulk import throughput benchmark for StockZip
+Generates item CSVs of increasing size and imports each through the real
+/settings/bulk-import wizard (upload -> map columns -> preview -> import) as
+the owner of a seeded tenant. Reports how long each step takes, the server
+action's throughput and the browser's peak heap, checks the wizard's counts
+against what was generated, and compares the timings with a stored baseline.
+
+Usage:
+  python3 tests/bulk-import-bench.py                          # 1k,10k,50k,200k rows
+  python3 tests/bulk-import-bench.py --sizes 1000,5000 --runs 3
+  python3 tests/bulk-import-bench.py --error-rate 0.05 --duplicate-rate 0.1 --custom-fields 8
+  python3 tests/bulk-import-bench.py --update-baseline         # record a new baseline
+  python3 tests/bulk-import-bench.py --network 3g             # see harness/network.py
+
+Generated rows (seeded by --seed, so the same settings give the same files):
+  errors      - --error-rate of the rows fail validation: no name, a quantity
+                that isn't a number or is negative, or a name over 500 chars
+  duplicates  - --duplicate-rate of the rows repeat an earlier row's SKU; the
+                import skips them
+  custom      - --custom-fields extra columns ("Custom Color", ...) that map to
+                no import field, so they are parsed and then skipped. The
+                import has no custom fields of its own to put them in.
+
+Metrics per import (wizard steps polled every 25 ms):
+  parse_ms    - file chosen -> column mapping shown (file.text() + parseCSV)
+  validate_ms - "Continue to Preview" -> preview shown (validateAllRows)
+  action_ms   - the bulkImportItems server action request, send to response end
+  total_ms    - "Import" clicked -> result shown
+  rows_per_s  - rows imported or skipped per second of action_ms
+  peak_heap   - highest JS heap sampled over CDP from upload to result
+
+The wizard refuses files over 5 MB and imports only the first 1000 rows
+(MAX_IMPORT_ROWS in lib/import/parser.ts). Larger sizes therefore measure
+how it fails: a rejection message, or a truncation notice and an import of
+the first 1000 rows. Either counts as handled, as long as the wizard says so
+and its counts match the file.
+
+Checks (exits 1 if any fails):
+  BULK-NNN    - per size: the wizard ends in a defined state, with the
+                expected invalid, skipped and imported rows (and that many new
+                items in the database)
+  regression  - parse_ms or action_ms slower than the baseline by more than
+                --threshold percent, significant at --alpha (per size)
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py
+  BULK_IMPORT_BASELINE  - baseline path (default tests/baselines/bulk-import-bench.json)
+  CSV_DIR               - where the generated files go (default /tmp/stockzip-import)
+
+The tenant is the seed's own (--seed, default 19), with its bulk_import rate
+limit removed. Imported items are soft-deleted after each run unless --keep.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, memory, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+BASELINE_PATH = os.environ.get(
+    "BULK_IMPORT_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "bulk-import-bench.json"),
+)
+CSV_DIR = os.environ.get("CSV_DIR", "/tmp/stockzip-import")
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+DEFAULT_SIZES = "1000,10000,50000,200000"
+
+# Gated against the baseline (lower is better)
+GATED = ("parse_ms", "action_ms")
+
+COLUMNS = ("Name", "SKU", "Barcode", "Quantity", "Min Quantity", "Unit", "Price", "Cost Price",
+           "Location", "Tags", "Folder", "Description")
+CUSTOM_FIELDS = ("Color", "Material", "Supplier Ref", "Warranty Months", "Origin Country", "Weight Grams",
+                 "Hazard Class", "Pallet Qty", "Lead Time Days", "Season", "Finish", "Voltage")
+TAGS = ("fragile", "fast-moving", "seasonal", "imported", "bulky", "promo", "clearance", "new")
+FOLDERS = 10  # "Import Bench 01".."10", created by the first import and reused after
+
+# Which wizard step the page is on, and what it says there
+STATE_JS = """
+() => {
+  const text = el => (el && el.textContent || '').trim();
+  const error = document.querySelector('.bg-red-50 .flex-1');
+  const heading = [...document.querySelectorAll('h2, h3')].map(text).find(t => /^Import (Complete|Failed)$/.test(t));
+  if (heading) {
+    const counts = {};
+    for (const label of document.querySelectorAll('p.text-sm.text-neutral-500')) {
+      const value = label.previousElementSibling;
+      if (value && value.classList.contains('text-3xl')) counts[text(label).toLowerCase()] = parseInt(text(value), 10);
+    }
+    const detail = [...document.querySelectorAll('p')].find(p => text(p) === 'Error:');
+    return { step: 'complete', counts, error: detail ? text(detail.nextElementSibling) : null };
+  }
+  const preview = [...document.querySelectorAll('div')].find(d => /^\\d+ valid rows$/.test(text(d)));
+  if (preview) {
+    const invalid = [...document.querySelectorAll('div')].find(d => /^\\d+ invalid rows$/.test(text(d)));
+    return { step: 'preview', valid: parseInt(text(preview), 10), invalid: invalid ? parseInt(text(invalid), 10) : 0,
+             error: error ? text(error) : null };
+  }
+  const detected = [...document.querySelectorAll('p')].find(p => /rows detected$/.test(text(p)));
+  if (detected) {
+    const notice = [...document.querySelectorAll('span')].find(s => text(s).startsWith('File contains'));
+    const limit = notice && text(notice).match(/first ([\\d,]+) rows/);
+    return { step: 'mapping', rows: parseInt(text(detected), 10), limit: limit ? parseInt(limit[1].replace(/,/g, ''), 10) : null,
+             error: error ? text(error) : null };
+  }
+  if (document.querySelector('h2, h3') && [...document.querySelectorAll('h2, h3')].some(h => text(h) === 'Importing...')) {
+    return { step: 'importing' };
+  }
+  return { step: 'upload', error: error ? text(error) : null };
+}
+"""
+
+results = []
+record = store.recorder(results)
+
+
+def error_row(rng: random.Random, row: list) -> list:
+    kind = rng.randrange(4)
+    if kind == 0:
+        row[0] = ""
+    elif kind == 1:
+        row[3] = rng.choice(("n/a", "TBD", "?"))  # parseFloat must give NaN: "12pcs" passes
+    elif kind == 2:
+        row[3] = str(-rng.randint(1, 50))
+    else:
+        row[0] = "X" * 501
+    return row
+
+
+def write_csv(path: str, size: int, prefix: str, args) -> list:
+    """Write `size` item rows to `path`; returns each row's kind: ok, error or duplicate"""
+    rng = random.Random(f"{args.seed}:{size}")
+    custom = CUSTOM_FIELDS[:args.custom_fields] + tuple(
+        f"Field {n + 1}" for n in range(max(0, args.custom_fields - len(CUSTOM_FIELDS))))
+    kinds, unique_skus = [], []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS + tuple(f"Custom {name}" for name in custom))
+        for i in range(size):
+            product, category = rng.choice(seed.PRODUCTS)
+            name = " ".join(filter(None, (rng.choice(seed.BRANDS), product, rng.choice(seed.SPECS))))
+            sku = f"{prefix}-{i + 1:06d}"
+            min_quantity = rng.choice((0, 5, 10, 20))
+            price = round(10 ** rng.uniform(0, 3), 2)
+            row = [
+                name, sku, f"{prefix.replace('-', '')}{i:07d}", str(rng.randint(0, 500)), str(min_quantity),
+                rng.choice(seed.UNITS), f"{price:.2f}", f"{price * rng.uniform(0.4, 0.8):.2f}",
+                f"Aisle {rng.randint(1, 40)}, Shelf {rng.randint(1, 8)}",
+                ", ".join(rng.sample(TAGS, rng.randint(0, 3))),
+                f"Import Bench {rng.randint(1, FOLDERS):02d}",
+                f"{name} ({category.lower()})" if rng.random() < 0.3 else "",
+            ]
+            roll = rng.random()
+            if roll < args.error_rate:
+                kinds.append("error")
+                row = error_row(rng, row)
+            elif roll < args.error_rate + args.duplicate_rate and unique_skus:
+                kinds.append("duplicate")
+                row[1] = rng.choice(unique_skus)
+            else:
+                kinds.append("ok")
+                unique_skus.append(sku)
+            writer.writerow(row + [f"{name[:3]}-{rng.randint(1, 999)}" for _ in custom])
+    return kinds
+
+
+def expected_counts(kinds: list, limit: int) -> dict:
+    counted = kinds[:limit]
+    invalid = counted.count("error")
+    skipped = counted.count("duplicate")
+    return {"invalid": invalid, "skipped": skipped, "imported": len(counted) - invalid - skipped}
+
+
+def wait_for_step(page, cdp, steps: tuple, timeout: float, peak: list) -> dict:
+    """Poll the wizard until it is on one of `steps` (or shows an error), sampling the heap into peak[0]"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        state = page.evaluate(STATE_JS)
+        if state["step"] in steps or state.get("error"):
+            return state
+        try:
+            peak[0] = max(peak[0], memory.sample(cdp, gc=False)["heap"])
+        except Exception:
+            pass
+        page.wait_for_timeout(25)
+    return {"step": "timeout"}
+
+
+def import_once(page, cdp, path: str, args) -> dict:
+    """One pass through the wizard with the file at `path`"""
+    actions = []
+
+    def on_finished(request):
+        if request.method == "POST" and "next-action" in request.headers:
+            actions.append(request)
+
+    page.goto(f"{BASE_URL}/settings/bulk-import")
+    wait_for_page_ready(page)
+    peak = [memory.sample(cdp, gc=True)["heap"]]
+    run = {"outcome": None, "peak_heap": None}
+
+    started = time.perf_counter()
+    page.set_input_files("#file-upload", path)
+    state = wait_for_step(page, cdp, ("mapping",), args.timeout, peak)
+    run["parse_ms"] = (time.perf_counter() - started) * 1000
+    if state["step"] != "mapping":
+        run.update(outcome="rejected" if state.get("error") else state["step"], error=state.get("error"))
+        run["peak_heap"] = peak[0]
+        return run
+    run.update(rows=state["rows"], limit=state["limit"])
+
+    started = time.perf_counter()
+    page.click("button:has-text('Continue to Preview')")
+    state = wait_for_step(page, cdp, ("preview",), args.timeout, peak)
+    run["validate_ms"] = (time.perf_counter() - started) * 1000
+    if state["step"] != "preview" or state.get("error"):
+        run.update(outcome="invalid" if state.get("error") else state["step"], error=state.get("error"))
+        run["peak_heap"] = peak[0]
+        return run
+    run.update(valid=state["valid"], invalid=state["invalid"])
+
+    page.on("requestfinished", on_finished)
+    started = time.perf_counter()
+    page.get_by_role("button", name=re.compile(r"^Import \d+ Items$")).click()
+    state = wait_for_step(page, cdp, ("complete",), args.timeout, peak)
+    run["total_ms"] = (time.perf_counter() - started) * 1000
+    page.remove_listener("requestfinished", on_finished)
+    run["peak_heap"] = peak[0]
+    if state["step"] != "complete":
+        run.update(outcome=state["step"] if state["step"] == "timeout" else "error", error=state.get("error"))
+        return run
+
+    counts = state["counts"]
+    run.update(outcome="complete", error=state.get("error"), imported=counts.get("imported", 0),
+               skipped=counts.get("skipped", 0), failed=counts.get("failed", 0))
+    if actions:
+        action = max(actions, key=lambda r: len(r.post_data_buffer or b""))
+        run["action_ms"] = action.timing["responseEnd"]
+        handled = run["imported"] + run["skipped"]
+        run["rows_per_s"] = handled / (run["action_ms"] / 1000) if run["action_ms"] > 0 else None
+    return run
+
+
+def imported_items(conn, tenant_id, prefix: str) -> int:
+    return conn.execute(
+        "SELECT count(*) FROM public.inventory_items WHERE tenant_id = %s AND sku LIKE %s AND deleted_at IS NULL",
+        (tenant_id, f"{prefix}-%"),
+    ).fetchone()[0]
+
+
+def remove_items(conn, tenant_id, prefix: str):
+    conn.execute(
+        "UPDATE public.inventory_items SET deleted_at = now() "
+        "WHERE tenant_id = %s AND sku LIKE %s AND deleted_at IS NULL",
+        (tenant_id, f"{prefix}-%"),
+    )
+    conn.commit()
+
+
+def check_run(run: dict, kinds: list, in_database: int) -> list:
+    """What differs from what the file should have produced; empty when the run is as expected"""
+    if run["outcome"] == "rejected":
+        return []  # refused up front with a message: handled
+    if run["outcome"] != "complete":
+        return [f"ended {run['outcome']}" + (f": {run['error']}" if run.get("error") else "")]
+    limit = run["limit"] or len(kinds)
+    expected = expected_counts(kinds, limit)
+    problems = []
+    if run["rows"] != min(len(kinds), limit):
+        problems.append(f"{run['rows']} rows detected, expected {min(len(kinds), limit)}")
+    for key in ("invalid", "skipped", "imported"):
+        if run[key] != expected[key]:
+            problems.append(f"{run[key]} {key}, expected {expected[key]}")
+    if run.get("failed"):
+        problems.append(f"{run['failed']} failed")
+    if in_database != expected["imported"]:
+        problems.append(f"{in_database} new items in the database, expected {expected['imported']}")
+    return problems
+
+
+def run_size(page, cdp, conn, tenant_id, size: int, args) -> dict:
+    os.makedirs(CSV_DIR, exist_ok=True)
+    runs, problems = [], []
+    for i in range(args.warmup + args.runs):
+        prefix = f"IMP{int(time.time()) % 100000:05d}{i:02d}-{size}"
+        path = os.path.join(CSV_DIR, f"items-{size}-{i}.csv")
+        kinds = write_csv(path, size, prefix, args)
+        run = import_once(page, cdp, path, args)
+        run["file_mb"] = os.path.getsize(path) / 1024 / 1024
+        in_database = imported_items(conn, tenant_id, prefix)
+        if not args.keep:
+            remove_items(conn, tenant_id, prefix)
+        issues = check_run(run, kinds, in_database)
+        if i >= args.warmup:
+            runs.append(run)
+            problems.extend(issues)
+        log(f"{size}: {run['outcome']} ({run['file_mb']:.1f} MB) parse {run.get('parse_ms') or 0:.0f}ms"
+            + (f", action {run['action_ms']:.0f}ms, {run['rows_per_s']:.0f} rows/s" if run.get("action_ms") else "")
+            + (f" - {'; '.join(issues)}" if issues else ""), "WARN" if issues else "INFO")
+
+    medians = {}
+    for metric in ("parse_ms", "validate_ms", "action_ms", "total_ms", "rows_per_s", "peak_heap"):
+        values = [r[metric] for r in runs if r.get(metric) is not None]
+        medians[metric] = statistics.median(values) if values else None
+    return {"size": size, "runs": runs, "medians": medians, "problems": problems,
+            "outcome": runs[-1]["outcome"] if runs else None}
+
+
+def print_report(rows: list, args):
+    print("\n" + "=" * 100)
+    print(f"BULK IMPORT - median of {args.runs} imports per size")
+    print("=" * 100)
+    print(f"{'Rows':>8} {'Outcome':<10} {'Parse ms':>9} {'Valid. ms':>9} {'Action ms':>10} {'Total ms':>9} "
+          f"{'Rows/s':>8} {'Heap MB':>8}  vs baseline")
+
+    def fmt(value, spec=".0f"):
+        return format(value, spec) if value is not None else "-"
+
+    for row in rows:
+        m = row["medians"]
+        verdicts = ", ".join(f"{metric.split('_')[0]} {c['verdict']}"
+                             + (f" {c['delta_pct']:+.0f}%" if c["delta_pct"] is not None else "")
+                             for metric, c in row["comparison"].items())
+        print(f"{row['size']:>8} {row['outcome'] or '-':<10} {fmt(m['parse_ms']):>9} {fmt(m['validate_ms']):>9} "
+              f"{fmt(m['action_ms']):>10} {fmt(m['total_ms']):>9} {fmt(m['rows_per_s']):>8} "
+              f"{fmt(m['peak_heap'] and m['peak_heap'] / 1024 / 1024, '.1f'):>8}  {verdicts}")
+    print("=" * 100)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip bulk import throughput benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts")
+    parser.add_argument("--runs", type=int, default=5, help="measured imports per size")
+    parser.add_argument("--warmup", type=int, default=0, help="discarded imports per size")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of rows that fail validation")
+    parser.add_argument("--duplicate-rate", type=float, default=0.02, help="share of rows repeating an earlier SKU")
+    parser.add_argument("--custom-fields", type=int, default=4, help="extra columns no import field maps to")
+    parser.add_argument("--timeout", type=float, default=300, help="s to wait for each wizard step")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--seed", type=int, default=19, help="seed of the tenant and the generated rows")
+    parser.add_argument("--keep", action="store_true", help="keep the imported items")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--output", help="also write every import as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    return args
+
+
+def load_baseline(args) -> dict:
+    baseline = bench.load_baseline(args.baseline)
+    settings = {"network": network.active(), "error_rate": args.error_rate,
+                "duplicate_rate": args.duplicate_rate, "custom_fields": args.custom_fields}
+    differs = [key for key, value in settings.items() if baseline and baseline.get(key) != value]
+    if differs:
+        log(f"Baseline was recorded with different {', '.join(differs)} - ignoring it", "WARN")
+        return {}
+    return baseline.get("samples", {})
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Bulk Import Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Sizes: {', '.join(map(str, args.sizes))} | {args.runs} runs + {args.warmup} warmup")
+    print(f"Rows: {args.error_rate:.0%} invalid, {args.duplicate_rate:.0%} duplicate SKUs, "
+          f"{args.custom_fields} custom columns")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        seeder = seed.Seeder(conn, seed=args.seed)
+        tenant_id = seeder.use_tenant()
+        conn.execute("DELETE FROM public.tenant_rate_limits WHERE tenant_id = %s AND operation = 'bulk_import'",
+                     (tenant_id,))
+        conn.commit()
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    email = seeder.owner_email()
+
+    readiness.verbose = False
+    store.begin_run("bulk-import-bench", base_url=BASE_URL)
+    baseline = load_baseline(args)
+
+    rows = []
+    with conn, sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+            context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+            install(context)
+            network.apply(context)
+            page = context.new_page()
+            goto_authenticated(page, f"{BASE_URL}/settings/bulk-import", BASE_URL, email, seed.SEED_PASSWORD)
+            cdp = memory.attach(page)
+            for size in args.sizes:
+                started = time.perf_counter()
+                try:
+                    rows.append(run_size(page, cdp, conn, tenant_id, size, args))
+                except Exception as e:
+                    log(f"{size}: importing failed - {e}", "FAIL")
+                    rows.append({"size": size, "runs": [], "medians": {}, "problems": [str(e)], "outcome": None})
+                rows[-1]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            context.close()
+        finally:
+            browser.close()
+
+    for row in rows:
+        row["comparison"] = {}
+        for metric in GATED:
+            samples = [r[metric] for r in row["runs"] if r.get(metric) is not None]
+            if samples:
+                row["comparison"][metric] = bench.compare(samples, baseline.get(f"{row['size']}|{metric}", []),
+                                                          args.threshold, args.alpha, stat="p50")
+    print_report([row for row in rows if row["runs"]], args)
+
+    for index, row in enumerate(rows, 1):
+        regressed = [metric for metric, c in row["comparison"].items() if c["verdict"] == "regressed"]
+        details = f"{row['outcome']}" + (f", {row['medians']['rows_per_s']:.0f} rows/s"
+                                         if row["medians"].get("rows_per_s") else "")
+        if row["problems"]:
+            details += f" - {'; '.join(sorted(set(row['problems']))[:3])}"
+        if regressed:
+            details += f" - {', '.join(regressed)} regressed past {args.threshold:.0f}%"
+        with store.check(f"import {row['size']} rows", row["duration_ms"]):
+            record(f"BULK-{index:03d}", f"Import of {row['size']} rows", not row["problems"] and not regressed,
+                   details, medians=row["medians"], comparison=row["comparison"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "rows": rows}, f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if args.update_baseline:
+        bench.save_baseline(args.baseline, {f"{row['size']}|{metric}": [r[metric] for r in row["runs"]
+                                                                         if r.get(metric) is not None]
+                                            for row in rows for metric in GATED},
+                            base_url=BASE_URL, runs=args.runs, network=network.active(),
+                            error_rate=args.error_rate, duplicate_rate=args.duplicate_rate,
+                            custom_fields=args.custom_fields)
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Every size handled as expected, no significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
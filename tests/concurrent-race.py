@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Concurrent-mutation race harness for StockZip
+K signed-in users of one tenant, each in their own browser context, fire
+overlapping edits at the same stock. Every user first gets their page to the
+point of the edit, then they all wait on an asyncio.Barrier and fire together.
+Afterwards the item, its activity logs, checkouts and pick lists in Postgres
+are checked against what was fired.
+
+Scenarios (all against one seeded item, reset to --stock before each round):
+  adjust       - /inventory/[itemId]: every user clicks +1/-1 --ops times as
+                 fast as the page lets them (updateItemQuantity writes the
+                 quantity the page computed)
+  checkout     - /tasks/checkouts/new: every user checks out --take units in
+                 one batchCheckout (app/actions/batch-checkout.ts); together
+                 they ask for more than is in stock
+  pick         - /tasks/pick-lists/[id]: every user picks --take units on
+                 their own in-progress pick list; together more than in stock
+  pick-shared  - every user picks the same line of one pick list
+
+Each scenario runs one solo round (one user) for the uncontended latency,
+then --rounds contended rounds.
+
+Usage:
+  python3 tests/concurrent-race.py                          # 4 users, every scenario, 5 rounds
+  python3 tests/concurrent-race.py --users 8 --scenario adjust --ops 5
+  python3 tests/concurrent-race.py --scenario pick --scenario pick-shared --stock 10 --take 4
+  python3 tests/concurrent-race.py --output race.json
+
+Reported per scenario:
+  latency    - ms from the click to the server action's response, solo and
+               contended (p50/p95), and the slowdown between the two
+  skew       - ms between the first and the last user firing after the barrier
+  rejected   - edits the app refused (error shown, no row written)
+  conflicts  - accepted edits that broke an invariant: adjustments written
+               from a stale quantity, units checked out or picked beyond the
+               stock, a pick list line picked more than once
+
+Checks (exits 1 if any fails; each over every round of its scenario):
+  RACE-001  adjust: no lost updates (final = start + accepted deltas)
+  RACE-002  checkout: no more units checked out than in stock
+  RACE-003  pick: stock never negative, units taken = units picked
+  RACE-004  pick-shared: a line's units leave stock once
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py. Users are the
+  owner and --users - 1 members of the seed's own tenant (--seed, default 21),
+  given the staff role. Checkouts and pick lists a run creates are deleted
+  afterwards unless --keep; activity logs can't be.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from playwright.async_api import async_playwright
+
+from harness import bench, browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install_async, wait_for_page_ready_async
+from harness.session import ensure_state_async, goto_authenticated_async
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+SCENARIOS = ("adjust", "checkout", "pick", "pick-shared")
+
+STEP_TIMEOUT = 30000
+
+results = []
+record = store.recorder(results)
+
+
+def is_server_action(response) -> bool:
+    """Next.js server actions are POSTs to the page URL with a Next-Action header"""
+    return response.request.method == "POST" and "next-action" in response.request.headers
+
+
+# -- fixtures -------------------------------------------------------------------
+
+
+def seed_tenant(conn, args) -> dict:
+    """The seed's tenant with --users write-capable accounts and the contended item"""
+    seeder = seed.Seeder(conn, seed=args.seed)
+    tenant_id = seeder.use_tenant()
+    seeder.run({"items": 1, "members": args.users - 1})
+    members = [seeder.id("members", i) for i in range(args.users - 1)]
+    conn.execute("UPDATE public.profiles SET role = 'staff' WHERE id = ANY(%s) AND role <> 'staff'", (members,))
+    item_id = seeder.id("items", 0)
+    sku = conn.execute("SELECT sku FROM public.inventory_items WHERE id = %s", (item_id,)).fetchone()[0]
+    conn.commit()
+    users = [(seeder.owner_id, seeder.owner_email())]
+    users += [(member, seeder.email("member", i)) for i, member in enumerate(members)]
+    return {"seeder": seeder, "tenant_id": tenant_id, "item_id": item_id, "sku": sku, "users": users}
+
+
+def reset_item(conn, tenant: dict, stock: int):
+    """Put the contended item back to `stock`, untracked, and return the moment it happened"""
+    conn.execute(
+        "UPDATE public.inventory_items SET quantity = %s, tracking_mode = 'none', deleted_at = NULL "
+        "WHERE id = %s", (stock, tenant["item_id"]),
+    )
+    since = conn.execute("SELECT now()").fetchone()[0]
+    conn.commit()
+    return since
+
+
+def create_pick_lists(conn, tenant: dict, run_id: str, lists: int, take: int) -> list:
+    """`lists` in-progress pick lists, each with one line of `take` units of the item; returns the line ids"""
+    seeder = tenant["seeder"]
+    pick_lists, lines = [], []
+    for n in range(lists):
+        pick_list_id = uuid.uuid4()
+        pick_lists.append({
+            "id": pick_list_id, "tenant_id": tenant["tenant_id"], "name": f"Race {run_id} #{n + 1}",
+            "status": "in_progress", "item_outcome": "decrement", "created_by": seeder.owner_id,
+            "display_id": seed.Sql("generate_display_id(%s, 'pick_list')", tenant["tenant_id"]),
+        })
+        lines.append({"id": uuid.uuid4(), "pick_list_id": pick_list_id, "item_id": tenant["item_id"],
+                      "requested_quantity": take, "picked_quantity": 0})
+    seeder.insert("public.pick_lists", pick_lists)
+    seeder.insert("public.pick_list_items", lines)
+    conn.commit()
+    return [{"pick_list_id": str(pl["id"]), "line_id": line["id"]} for pl, line in zip(pick_lists, lines)]
+
+
+def clean_up(conn, tenant: dict, run_id: str):
+    conn.execute("DELETE FROM public.pick_lists WHERE tenant_id = %s AND name LIKE %s",
+                 (tenant["tenant_id"], f"Race {run_id} #%"))
+    conn.execute("DELETE FROM public.checkouts WHERE item_id = %s AND notes = %s",
+                 (tenant["item_id"], f"race {run_id}"))
+    conn.commit()
+
+
+# -- user actions ---------------------------------------------------------------
+
+
+async def fire(page, click, samples: list, user: int, op: int) -> dict:
+    """Click, wait for the server action's response; one latency sample"""
+    sample = {"user": user, "op": op, "fired": time.time(), "ok": False}
+    started = time.perf_counter()
+    try:
+        async with page.expect_response(is_server_action, timeout=STEP_TIMEOUT) as response_info:
+            await click()
+        response = await response_info.value
+        sample["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        sample["ok"] = response.status < 400
+        if not sample["ok"]:
+            sample["error"] = f"HTTP {response.status}"
+    except Exception as e:
+        sample["error"] = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+    samples.append(sample)
+    return sample
+
+
+async def adjust(page, fixture: dict, user: int, rng: random.Random, barrier, samples: list, args):
+    increase = page.locator("button[aria-label='Increase quantity']")
+    decrease = page.locator("button[aria-label='Decrease quantity']")
+    error = page.locator("p[role=alert]")
+    await increase.wait_for(timeout=STEP_TIMEOUT)
+    await barrier.wait()
+    for op in range(args.ops):
+        delta = rng.choice((-1, 1))
+        button = increase if delta > 0 else decrease
+        sample = await fire(page, button.click, samples, user, op)
+        sample["delta"] = delta
+        # The buttons stay disabled until the action returns; an error shows under them
+        await increase.and_(page.locator(":enabled")).wait_for(timeout=STEP_TIMEOUT)
+        if sample["ok"] and await error.is_visible():
+            sample.update(ok=False, error=(await error.inner_text()).strip())
+
+
+async def checkout(page, fixture: dict, user: int, rng: random.Random, barrier, samples: list, args):
+    await page.fill("input[placeholder='Search items...']", fixture["sku"])
+    row = page.locator("li", has_text=fixture["sku"])
+    await row.click()
+    plus = row.locator("button").nth(1)
+    for _ in range(args.take - 1):
+        await plus.click()
+    await page.locator("select").first.select_option(index=1)
+    await page.fill("textarea", f"race {fixture['run_id']}")
+    submit = page.locator("button:has-text('Check Out')")
+    await submit.and_(page.locator(":enabled")).wait_for(timeout=STEP_TIMEOUT)
+    await barrier.wait()
+    await fire(page, submit.click, samples, user, 0)
+
+
+async def pick(page, fixture: dict, user: int, rng: random.Random, barrier, samples: list, args):
+    button = page.locator("tbody button:has-text('Pick')")
+    await button.wait_for(timeout=STEP_TIMEOUT)
+    await barrier.wait()
+    await fire(page, button.click, samples, user, 0)
+
+
+def scenario_url(scenario: str, fixture: dict, user: int) -> str:
+    if scenario == "adjust":
+        return f"{BASE_URL}/inventory/{fixture['item_id']}"
+    if scenario == "checkout":
+        return f"{BASE_URL}/tasks/checkouts/new"
+    lines = fixture["pick_lists"]
+    return f"{BASE_URL}/tasks/pick-lists/{lines[0 if scenario == 'pick-shared' else user]['pick_list_id']}"
+
+
+ACTIONS = {"adjust": adjust, "checkout": checkout, "pick": pick, "pick-shared": pick}
+
+
+async def run_user(page, scenario: str, fixture: dict, user: int, account: tuple, barrier, samples: list, args):
+    """Open the scenario's page, get to the edit, then fire it together with the others"""
+    rng = random.Random(f"{args.seed}:{fixture['round']}:{user}")
+    try:
+        await goto_authenticated_async(page, scenario_url(scenario, fixture, user), BASE_URL, account[1],
+                                       seed.SEED_PASSWORD)
+        await wait_for_page_ready_async(page, timeout=STEP_TIMEOUT)
+        await ACTIONS[scenario](page, fixture, user, rng, barrier, samples, args)
+    except Exception as e:
+        barrier.abort()  # release the others rather than leave them waiting for this user
+        samples.append({"user": user, "op": None, "ok": False, "setup": True,
+                        "error": str(e).splitlines()[0][:200] if str(e) else type(e).__name__})
+
+
+# -- invariants -----------------------------------------------------------------
+
+
+def check_round(conn, scenario: str, fixture: dict, samples: list, users: list, since) -> dict:
+    """What the round did to Postgres: accepted/rejected edits, conflicts and broken invariants"""
+    item_id, stock = fixture["item_id"], fixture["stock"]
+    final = conn.execute("SELECT quantity FROM public.inventory_items WHERE id = %s", (item_id,)).fetchone()[0]
+    ops = [s for s in samples if not s.get("setup")]
+    outcome = {"final": final, "ops": len(ops), "setup_errors": len(samples) - len(ops), "violations": []}
+    if final < 0:
+        outcome["violations"].append(f"stock went negative ({final})")
+
+    if scenario == "adjust":
+        logs = conn.execute(
+            "SELECT user_id, quantity_delta FROM public.activity_logs WHERE entity_id = %s "
+            "AND action_type = 'quantity_adjustment' AND created_at >= %s ORDER BY created_at",
+            (item_id, since),
+        ).fetchall()
+        by_user = {}
+        for user_id, delta in logs:
+            by_user.setdefault(str(user_id), []).append(delta)
+        accepted = [s for s in ops if s["ok"]]
+        stale = 0
+        for user, (user_id, _) in enumerate(users):
+            intended = [s["delta"] for s in accepted if s["user"] == user]
+            written = by_user.get(str(user_id), [])
+            stale += sum(1 for want, got in zip(intended, written) if want != got)
+        expected = stock + sum(s["delta"] for s in accepted)
+        outcome.update(accepted=len(accepted), rejected=len(ops) - len(accepted), conflicts=stale,
+                       expected=expected, lost=expected - final)
+        if final != expected:
+            outcome["violations"].append(f"{expected - final:+d} units lost: expected {expected}, got {final}")
+
+    elif scenario == "checkout":
+        rows = conn.execute(
+            "SELECT checked_out_by, quantity FROM public.checkouts WHERE item_id = %s AND checked_out_at >= %s "
+            "AND status = 'checked_out'", (item_id, since),
+        ).fetchall()
+        taken = sum(quantity for _, quantity in rows)
+        outcome.update(accepted=len(rows), rejected=len(ops) - len(rows), taken=taken,
+                       conflicts=max(0, len(rows) - stock // fixture["take"]))
+        if taken > stock:
+            outcome["violations"].append(f"{taken} units checked out of {stock} in stock")
+
+    else:
+        lines = [line["line_id"] for line in fixture["pick_lists"]]
+        picks = conn.execute(
+            "SELECT count(*), coalesce(-sum(quantity_delta), 0) FROM public.activity_logs WHERE entity_id = %s "
+            "AND action_type = 'pick' AND created_at >= %s", (item_id, since),
+        ).fetchone()
+        picked = conn.execute("SELECT coalesce(sum(picked_quantity), 0) FROM public.pick_list_items "
+                              "WHERE id = ANY(%s)", (lines,)).fetchone()[0]
+        removed = stock - final
+        fits = len(lines) if scenario == "pick-shared" else stock // fixture["take"]
+        outcome.update(accepted=picks[0], rejected=len(ops) - picks[0], removed=removed, picked=picked,
+                       conflicts=max(0, picks[0] - fits))
+        if removed != picked:
+            outcome["violations"].append(f"{removed} units left stock for {picked} picked")
+
+    return outcome
+
+
+# -- runner ---------------------------------------------------------------------
+
+
+async def run_round(conn, pages: list, tenant: dict, scenario: str, round_no: int, users: int, args,
+                    run_id: str) -> dict:
+    since = reset_item(conn, tenant, args.stock)
+    fixture = {"item_id": tenant["item_id"], "sku": tenant["sku"], "stock": args.stock, "take": args.take,
+               "round": round_no, "run_id": run_id}
+    if scenario.startswith("pick"):
+        fixture["pick_lists"] = create_pick_lists(conn, tenant, run_id, 1 if scenario == "pick-shared" else users,
+                                                  args.take)
+    barrier = asyncio.Barrier(users)
+    samples = []
+    await asyncio.gather(*(
+        run_user(pages[user], scenario, fixture, user, tenant["users"][user], barrier, samples, args)
+        for user in range(users)
+    ))
+    await asyncio.sleep(args.settle / 1000)  # activity logs written after the response
+    outcome = check_round(conn, scenario, fixture, samples, tenant["users"][:users], since)
+    conn.commit()
+    fired = [s["fired"] for s in samples if s.get("op") == 0]
+    outcome.update(round=round_no, users=users, samples=samples,
+                   skew=round((max(fired) - min(fired)) * 1000, 1) if len(fired) > 1 else 0.0)
+    return outcome
+
+
+def summarize_scenario(rounds: list) -> dict:
+    solo = [s["ms"] for s in rounds[0]["samples"] if "ms" in s]
+    contended_rounds = rounds[1:]
+    contended = [s["ms"] for r in contended_rounds for s in r["samples"] if "ms" in s]
+    ops = sum(r["ops"] for r in contended_rounds)
+    solo_p50 = bench.percentile(solo, 50)
+    contended_stats = bench.summarize(contended)
+    return {
+        "rounds": len(contended_rounds),
+        "ops": ops,
+        "solo": bench.summarize(solo),
+        "contended": contended_stats,
+        "slowdown": contended_stats["p50"] / solo_p50 if solo_p50 and contended else None,
+        "skew_p50": bench.percentile([r["skew"] for r in contended_rounds], 50),
+        "reject_rate": sum(r.get("rejected", 0) for r in contended_rounds) / ops if ops else 0.0,
+        "conflict_rate": sum(r.get("conflicts", 0) for r in contended_rounds) / ops if ops else 0.0,
+        "setup_errors": sum(r["setup_errors"] for r in rounds),
+        "violations": [f"round {r['round']}: {v}" for r in rounds for v in r["violations"]],
+    }
+
+
+async def run_scenarios(conn, tenant: dict, args, run_id: str) -> dict:
+    summaries = {}
+    async with async_playwright() as p:
+        browser = await browser_pool.launch_async(p)
+        try:
+            states = await asyncio.gather(*(
+                ensure_state_async(browser, BASE_URL, email, seed.SEED_PASSWORD) for _, email in tenant["users"]
+            ))
+            pages = []
+            for state in states:
+                context = await browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+                await install_async(context)
+                await network.apply_async(context)
+                pages.append(await context.new_page())
+
+            for scenario in args.scenario:
+                started = time.perf_counter()
+                rounds = []
+                for round_no in range(args.rounds + 1):
+                    users = 1 if round_no == 0 else args.users
+                    outcome = await run_round(conn, pages, tenant, scenario, round_no, users, args, run_id)
+                    rounds.append(outcome)
+                    log(f"{scenario} round {round_no}{' (solo)' if users == 1 else ''}: "
+                        f"{outcome.get('accepted', 0)}/{outcome['ops']} accepted, skew {outcome['skew']:.0f}ms, "
+                        f"final {outcome['final']}" + (f" - {'; '.join(outcome['violations'])}"
+                                                       if outcome["violations"] else ""),
+                        "WARN" if outcome["violations"] else "INFO")
+                summaries[scenario] = {**summarize_scenario(rounds), "detail": rounds,
+                                       "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+        finally:
+            await browser.close()
+    return summaries
+
+
+def print_report(summaries: dict, args):
+    def ms(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    print("\n" + "=" * 60)
+    print(f"CONCURRENT RACES - {args.users} users, stock {args.stock}, network {network.active()}")
+    print("=" * 60)
+    print(f"  {'Scenario':<12} {'Ops':>5} {'Solo p50':>9} {'p50':>6} {'p95':>6} {'x':>5} {'Skew':>5} "
+          f"{'Reject':>7} {'Confl':>6} {'Bad':>4}")
+    for scenario, s in summaries.items():
+        print(f"  {scenario:<12} {s['ops']:>5} {ms(s['solo'].get('p50')):>9} {ms(s['contended'].get('p50')):>6} "
+              f"{ms(s['contended'].get('p95')):>6} {s['slowdown'] or 0:>5.1f} {ms(s['skew_p50']):>5} "
+              f"{s['reject_rate'] * 100:>6.1f}% {s['conflict_rate'] * 100:>5.1f}% {len(s['violations']):>4}")
+    print("=" * 60)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip concurrent-mutation race harness")
+    parser.add_argument("--users", type=int, default=4, help="concurrent users of the tenant (K)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run, repeatable (default: all)")
+    parser.add_argument("--rounds", type=int, default=5, help="contended rounds per scenario")
+    parser.add_argument("--stock", type=int, default=20, help="quantity the item is reset to before each round")
+    parser.add_argument("--take", type=int, help="units per checkout / pick (default: enough that K users "
+                                                 "together ask for more than --stock)")
+    parser.add_argument("--ops", type=int, default=3, help="+/-1 clicks per user per adjust round")
+    parser.add_argument("--settle", type=int, default=500, help="ms to wait after a round before checking it")
+    parser.add_argument("--seed", type=int, default=21, help="seed of the tenant and the adjust directions")
+    parser.add_argument("--keep", action="store_true", help="leave the run's checkouts and pick lists in place")
+    parser.add_argument("--output", help="also write every round's samples and outcome as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    if args.users < 2:
+        parser.error("--users must be at least 2 for anything to race")
+    args.scenario = list(dict.fromkeys(args.scenario or SCENARIOS))
+    args.take = args.take or args.stock // args.users + 1
+    if not 1 <= args.take <= args.stock:
+        parser.error("--take must be between 1 and --stock")
+    return args
+
+
+def main():
+    """Main race runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Concurrent-Mutation Races")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Users: {args.users} | Scenarios: {', '.join(args.scenario)} | Rounds: {args.rounds}")
+    print(f"Stock: {args.stock} | Take: {args.take} | Adjust ops: {args.ops}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        tenant = seed_tenant(conn, args)
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    log(f"{len(tenant['users'])} users in tenant {tenant['tenant_id']}, item {tenant['sku']}")
+
+    readiness.verbose = False
+    store.begin_run("concurrent-race", base_url=BASE_URL)
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    summaries = {}
+
+    with conn:
+        try:
+            summaries = asyncio.run(run_scenarios(conn, tenant, args, run_id))
+        except Exception as e:
+            record("RACE-000", "Race run completed", False, str(e))
+        finally:
+            if not args.keep:
+                clean_up(conn, tenant, run_id)
+
+    checks = (("RACE-001", "adjust", "Adjust: no lost updates"),
+              ("RACE-002", "checkout", "Checkout: no more units out than in stock"),
+              ("RACE-003", "pick", "Pick: stock conserved and never negative"),
+              ("RACE-004", "pick-shared", "Shared pick list: each line leaves stock once"))
+    for test_id, scenario, name in checks:
+        s = summaries.get(scenario)
+        if not s:
+            continue
+        details = (f"{len(s['violations'])} violations in {s['rounds'] + 1} rounds: {s['violations'][0]}"
+                   if s["violations"] else f"{s['rounds'] + 1} rounds clean")
+        if s["setup_errors"]:
+            details += f" ({s['setup_errors']} users never fired)"
+        with store.check(scenario, s["duration_ms"]):
+            record(test_id, name, not s["violations"] and not s["setup_errors"], details,
+                   conflict_rate=s["conflict_rate"], reject_rate=s["reject_rate"],
+                   latency={"solo": s["solo"], "contended": s["contended"]})
+
+    if summaries:
+        print_report(summaries, args)
+
+    if args.output and summaries:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "users": args.users,
+                       "stock": args.stock, "take": args.take, "scenarios": summaries}, f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("No races lost an update or oversold stock", "PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the Python Playwright scripts in tests/.
+
+The scripts (team-test.py, team-quick-test.py, team-visual-test.py) put this
+directory on sys.path when run as `python3 tests/<script>.py`, so modules here
+are imported as `harness.<module>`.
+"""
@@ -0,0 +1,149 @@
+"""
+asyncio execution mode for the Python Playwright scripts.
+
+One Chromium process (the shared one from tests/browser-pool.py when it is
+running) driven from one event loop: every (account, check) pair
+gets its own browser context, and an asyncio.Semaphore bounds how many run at
+once. Checks are `async def check(page, record, account)` functions using
+`playwright.async_api`; `record(test_id, name, passed, details="")` has the
+same signature as the scripts' own record helpers.
+
+Checks marked with `@public` run once, signed out, with account None.
+Checks marked with `@signed_out` run once per account without its session
+(a login check signs in with account["email"] / account["password"]). All
+other checks run once per account, starting from that account's cached
+session (harness/session.py). Accounts come from
+TEST_ACCOUNTS="a@x.com:pass,b@y.com:pass" or, failing that, TEST_EMAIL /
+TEST_PASSWORD.
+
+`account["label"]` is the email when a run has several accounts and "" when
+it has one; `artifact_name(name, account)` prefixes screenshot names with it
+so concurrent accounts don't overwrite each other's captures.
+"""
+
+import asyncio
+import re
+import time
+
+from playwright.async_api import async_playwright
+
+from harness import browser_pool, network, perf, replay, results as store, spans
+from harness.console import log
+from harness.readiness import install_async
+from harness.session import ensure_state_async
+
+DEFAULT_CONCURRENCY = 16
+
+
+def public(check):
+    """Mark a check as not needing a signed-in session"""
+    check.public = True
+    return check
+
+
+def signed_out(check):
+    """Mark a check that runs per account but starts without the account's session"""
+    check.signed_out = True
+    return check
+
+
+def artifact_name(name: str, account: dict = None) -> str:
+    """`name`, prefixed with the account's label when the run has several accounts"""
+    if not account or not account["label"]:
+        return name
+    return f"{re.sub(r'[^a-z0-9]+', '-', account['label'].lower()).strip('-')}-{name}"
+
+
+def parse_accounts(value: str, email: str = "", password: str = "") -> list:
+    """Parse TEST_ACCOUNTS into [(email, password)], falling back to one account"""
+    accounts = []
+    for entry in filter(None, (part.strip() for part in (value or "").split(","))):
+        account_email, _, account_password = entry.partition(":")
+        accounts.append((account_email, account_password))
+    if not accounts and email and password:
+        accounts.append((email, password))
+    return list(dict.fromkeys(accounts))
+
+
+def make_recorder(results: list, account: str = None):
+    """record(test_id, name, passed, details) appending to `results`"""
+    def record(test_id: str, name: str, passed: bool, details: str = ""):
+        entry = {"id": test_id, "name": name, "passed": passed, "details": details}
+        if account:
+            entry["account"] = account
+        metrics = perf.current()
+        if metrics:
+            entry["metrics"] = metrics
+        results.append(entry)
+        store.record(entry)
+        label = f"[{account}] {test_id}" if account else test_id
+        log(f"{label}: {name} - {details if details else 'OK'}", "PASS" if passed else "FAIL")
+    return record
+
+
+async def _run_check(browser, semaphore, check, state, context_options, account):
+    results = []
+    label = account["label"] if account else ""
+    record = make_recorder(results, label)
+    async with semaphore:
+        store.begin_check(check.__name__)
+        started = time.perf_counter()
+        context = None
+        try:
+            context = await browser.new_context(storage_state=state, **context_options)
+            await install_async(context)
+            await replay.attach_async(context)
+            await network.apply_async(context)
+            with spans.span(check.__name__):
+                await check(await context.new_page(), record, account)
+        except Exception as e:
+            record(f"ASYNC-{check.__name__}", f"Unexpected error in {check.__name__}", False, str(e))
+        finally:
+            if context:
+                await context.close()
+            store.end_check()
+        log(f"{check.__name__}{f' [{label}]' if label else ''} finished in "
+            f"{time.perf_counter() - started:.1f}s")
+    return results
+
+
+async def run_checks(checks: list, base_url: str, accounts: list, concurrency: int = DEFAULT_CONCURRENCY,
+                     context_options: dict = None, headless: bool = True) -> list:
+    """Run the checks concurrently and return their results in check order"""
+    context_options = context_options or {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with async_playwright() as p:
+        browser = await browser_pool.launch_async(p, headless=headless)
+        try:
+            # Sign every account in once (or reuse its cache) before fanning out
+            states = await asyncio.gather(*(
+                ensure_state_async(browser, base_url, email, password) for email, password in accounts
+            ))
+
+            tasks = []
+            for check in checks:
+                if getattr(check, "public", False):
+                    tasks.append(_run_check(browser, semaphore, check, None, context_options, None))
+                elif not accounts:
+                    log(f"{check.__name__}: no credentials - skipped", "SKIP")
+                else:
+                    for (email, password), state in zip(accounts, states):
+                        account = {"email": email, "password": password, "label": email if len(accounts) > 1 else ""}
+                        if getattr(check, "signed_out", False):
+                            state = None
+                        tasks.append(_run_check(browser, semaphore, check, state, context_options, account))
+
+            log(f"Running {len(tasks)} checks on one browser, {concurrency} at a time")
+            started = time.perf_counter()
+            per_check = await asyncio.gather(*tasks)
+            log(f"Async run finished in {time.perf_counter() - started:.1f}s")
+        finally:
+            await browser.close()
+
+    return [entry for results in per_check for entry in results]
+
+
+def run(checks: list, base_url: str, accounts: list, **options) -> list:
+    """Blocking entry point for the scripts' main()"""
+    return asyncio.run(run_checks(checks, base_url, accounts, **options))
@@ -0,0 +1,255 @@
+"""
+Synthetic camera feeds of barcodes, for driving /scan through Chromium's fake
+video capture (--use-file-for-fake-video-capture).
+
+`corpus(symbologies, conditions, seed)` picks one payload per symbology and
+condition. `write_feed(path, cases, ...)` renders them as a video that shows
+each case for `hold` seconds with `gap` seconds of empty scene in between. The
+video starts with `lead_in` seconds of empty scene so the camera and decoder
+can start. Chromium loops the file, so the feed plays again after the last
+case.
+
+Every frame has a marker strip in its top-left corner, so a page script can
+tell which case a captured frame shows without lining up clocks. The strip is
+10 blocks of MARKER_BLOCK px: white, 8 bits of the case number (MSB first,
+white = 1), black. Case 0 is the empty scene between cases.
+
+Symbologies:
+  ean13    - a 13-digit EAN from the in-store 20-29 prefix range
+  code128  - a bin label, e.g. "BIN-04217"
+  qr       - an item link, e.g. "SZ/ITEM/3F9A0C12"
+
+Conditions are one change at a time from a clean, evenly lit, square-on label
+(CONDITIONS). Every frame gets a little sensor noise, and the dim frames get
+more.
+
+Formats:
+  mjpeg  - concatenated JPEG frames. Small on disk, but Chromium always plays
+           them at 30 fps and the JPEG artifacts are part of the picture
+  y4m    - raw YUV 4:2:0 at any fps. Exact pixels, about 0.5 MB per 640x480
+           frame
+
+Needs numpy, Pillow, qrcode and python-barcode
+(`pip install numpy pillow qrcode python-barcode`).
+"""
+
+import io
+import random
+
+try:
+    import numpy as np
+    from PIL import Image, ImageFilter
+except ImportError:  # optional: only the scan benchmark renders frames
+    np = Image = ImageFilter = None
+
+SYMBOLOGIES = ("ean13", "code128", "qr")
+FORMATS = ("mjpeg", "y4m")
+
+# blur: Gaussian radius in px at 640 px wide; rotation: degrees; gain: scene
+# brightness; glare: strength of a specular hotspot (0-1); noise: sensor noise sigma
+CONDITIONS = {
+    "clean": {},
+    "blur-low": {"blur": 1.0},
+    "blur-high": {"blur": 2.2},
+    "tilt-15": {"rotation": 15},
+    "tilt-45": {"rotation": 45},
+    "dim": {"gain": 0.3, "noise": 9.0},
+    "glare": {"glare": 0.85},
+}
+DEFAULT_CONDITION = {"blur": 0.0, "rotation": 0, "gain": 1.0, "glare": 0.0, "noise": 2.5}
+
+MARKER_ORIGIN = 8
+MARKER_BLOCK = 16
+MARKER_BITS = 8
+MAX_CASES = 2 ** MARKER_BITS - 1
+
+# Print contrast of the label: bars and spaces are never pure black and white
+INK, PAPER = 24.0, 242.0
+MJPEG_FPS = 30  # Chromium's MJPEG file reader has no frame rate field and assumes this
+VARIANTS = 4    # noise patterns cycled through while a case is held
+
+
+def _require():
+    if np is None:
+        raise RuntimeError("Rendering barcode frames needs numpy and Pillow: pip install numpy pillow")
+
+
+def payload(symbology: str, rng: random.Random) -> str:
+    """A random, valid value for the symbology"""
+    if symbology == "ean13":
+        digits = [2, rng.randrange(10)] + [rng.randrange(10) for _ in range(10)]
+        check = (10 - sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+        return "".join(map(str, digits)) + str(check)
+    if symbology == "code128":
+        return f"BIN-{rng.randrange(100000):05d}"
+    if symbology == "qr":
+        return f"SZ/ITEM/{rng.getrandbits(32):08X}"
+    raise ValueError(f"Unknown symbology: {symbology}")
+
+
+def corpus(symbologies=SYMBOLOGIES, conditions=tuple(CONDITIONS), seed: int = 0) -> list:
+    """[{case, symbology, condition, value}], case numbers from 1"""
+    rng = random.Random(f"barcodes:{seed}")
+    cases, values = [], set()
+    for symbology in symbologies:
+        for condition in conditions:
+            if condition not in CONDITIONS:
+                raise ValueError(f"Unknown condition: {condition}")
+            value = payload(symbology, rng)
+            while value in values:
+                value = payload(symbology, rng)
+            values.add(value)
+            cases.append({"case": len(cases) + 1, "symbology": symbology, "condition": condition, "value": value})
+    if len(cases) > MAX_CASES:
+        raise ValueError(f"{len(cases)} cases - the frame marker holds at most {MAX_CASES}")
+    return cases
+
+
+def modules(symbology: str, value: str):
+    """The symbol as a 2-D array, 1 = dark module; 1-D symbologies are a single row"""
+    if symbology == "qr":
+        try:
+            import qrcode
+        except ImportError:
+            raise RuntimeError("Rendering QR codes needs qrcode: pip install qrcode") from None
+        qr = qrcode.QRCode(border=0, error_correction=qrcode.constants.ERROR_CORRECT_M)
+        qr.add_data(value)
+        qr.make(fit=True)
+        return np.array(qr.get_matrix(), dtype=np.uint8)
+    try:
+        import barcode
+    except ImportError:
+        raise RuntimeError("Rendering linear barcodes needs python-barcode: pip install python-barcode") from None
+    bits = barcode.get_barcode_class(symbology)(value).build()[0]
+    return np.array([[0 if bit == "0" else 1 for bit in bits]], dtype=np.uint8)
+
+
+def label(symbology: str, value: str, width: int):
+    """The printed label (quiet zone included) as an 'L' image, scaled for a `width` px frame"""
+    scale = width / 640
+    symbol = modules(symbology, value)
+    if symbology == "qr":
+        module = max(3, round(7 * scale))
+        quiet = 4
+        symbol = np.kron(symbol, np.ones((module, module), dtype=np.uint8))
+    else:
+        module = max(2, round(3 * scale))
+        quiet = 10
+        symbol = np.kron(symbol, np.ones((round(110 * scale), module), dtype=np.uint8))
+    pad = quiet * module
+    pixels = np.pad(symbol, pad, constant_values=0)
+    return Image.fromarray((PAPER - pixels * (PAPER - INK)).astype(np.uint8), "L")
+
+
+def scene(size: tuple, rng: random.Random):
+    """The empty background: a shelf-grey gradient with some texture"""
+    width, height = size
+    y = np.linspace(0, 1, height)[:, None]
+    x = np.linspace(0, 1, width)[None, :]
+    base = 105 + 35 * y + 15 * x
+    texture = np.random.default_rng(rng.getrandbits(32)).normal(0, 4, (height, width))
+    return base + texture
+
+
+def render(case: dict, size: tuple, seed: int, variant: int = 0):
+    """One RGB frame of `case` (None or case 0 for the empty scene)"""
+    _require()
+    width, height = size
+    rng = random.Random(f"frame:{seed}:{case['case'] if case else 0}:{variant}")
+    condition = {**DEFAULT_CONDITION, **(CONDITIONS[case["condition"]] if case else {})}
+    frame = scene(size, random.Random(f"scene:{seed}"))
+
+    if case:
+        art = label(case["symbology"], case["value"], width)
+        mask = Image.new("L", art.size, 255)
+        if condition["rotation"]:
+            art = art.rotate(condition["rotation"], resample=Image.BICUBIC, expand=True)
+            mask = mask.rotate(condition["rotation"], resample=Image.BICUBIC, expand=True)
+        canvas = Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8), "L")
+        jitter = round(width * 0.02)
+        left = (width - art.width) // 2 + rng.randint(-jitter, jitter)
+        top = (height - art.height) // 2 + rng.randint(-jitter, jitter)
+        canvas.paste(art, (left, top), mask)
+        frame = np.asarray(canvas, dtype=np.float64)
+
+    if condition["blur"]:
+        radius = condition["blur"] * width / 640
+        blurred = Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8), "L").filter(ImageFilter.GaussianBlur(radius))
+        frame = np.asarray(blurred, dtype=np.float64)
+
+    frame = frame * condition["gain"]
+    if condition["glare"]:
+        y, x = np.mgrid[0:height, 0:width]
+        cx, cy = width * rng.uniform(0.4, 0.6), height * rng.uniform(0.35, 0.5)
+        spread = (width * 0.18) ** 2
+        frame = frame + condition["glare"] * 255 * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * spread))
+    noise = np.random.default_rng(rng.getrandbits(32)).normal(0, condition["noise"], frame.shape)
+    frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+    mark(frame, case["case"] if case else 0)
+    return Image.fromarray(frame, "L").convert("RGB")
+
+
+def mark(frame, number: int):
+    """Paint the case number marker into a grey frame in place"""
+    bits = [1] + [(number >> (MARKER_BITS - 1 - i)) & 1 for i in range(MARKER_BITS)] + [0]
+    top = MARKER_ORIGIN
+    for i, bit in enumerate(bits):
+        left = MARKER_ORIGIN + i * MARKER_BLOCK
+        frame[top:top + MARKER_BLOCK, left:left + MARKER_BLOCK] = 255 if bit else 0
+
+
+def schedule(cases: list, fps: float, hold: float, gap: float, lead_in: float) -> list:
+    """Case number of every frame of one pass of the feed (0 = empty scene)"""
+    frames = [0] * round(lead_in * fps)
+    for case in cases:
+        frames += [case["case"]] * round(hold * fps)
+        frames += [0] * round(gap * fps)
+    return frames
+
+
+def write_feed(path: str, cases: list, size: tuple = (640, 480), fmt: str = "mjpeg", fps: float = MJPEG_FPS,
+               hold: float = 2.0, gap: float = 1.6, lead_in: float = 5.0, seed: int = 0, quality: int = 85) -> dict:
+    """Render `cases` into a fake-camera video at `path`; returns {frames, seconds, bytes}"""
+    _require()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if fmt == "mjpeg" and fps != MJPEG_FPS:
+        raise ValueError(f"MJPEG feeds play at {MJPEG_FPS} fps - use y4m for other rates")
+    width, height = size
+    if width % 2 or height % 2:
+        raise ValueError("Frame width and height must be even")
+    by_number = {case["case"]: case for case in cases}
+    encoded = {}  # (case, variant) -> frame bytes; each case is rendered VARIANTS times
+
+    def frame_bytes(number: int, index: int) -> bytes:
+        key = (number, index % VARIANTS)
+        if key not in encoded:
+            image = render(by_number.get(number), size, seed, key[1])
+            encoded[key] = _jpeg(image, quality) if fmt == "mjpeg" else _yuv420(image)
+        return encoded[key]
+
+    frames = schedule(cases, fps, hold, gap, lead_in)
+    written = 0
+    with open(path, "wb") as f:
+        if fmt == "y4m":
+            f.write(f"YUV4MPEG2 W{width} H{height} F{round(fps * 1000)}:1000 Ip A1:1\n".encode())
+        for index, number in enumerate(frames):
+            data = frame_bytes(number, index)
+            if fmt == "y4m":
+                f.write(b"FRAME\n")
+            f.write(data)
+            written += len(data)
+    return {"frames": len(frames), "seconds": len(frames) / fps, "bytes": written}
+
+
+def _jpeg(image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _yuv420(image) -> bytes:
+    y, cb, cr = image.convert("YCbCr").split()
+    half = (image.width // 2, image.height // 2)
+    return y.tobytes() + cb.resize(half, Image.BOX).tobytes() + cr.resize(half, Image.BOX).tobytes()
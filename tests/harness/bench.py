@@ -0,0 +1,161 @@
+"""
+Statistics for the benchmark scripts: percentiles, summaries, a Mann-Whitney
+U test, trend tests for per-cycle series, scaling fits and baseline files.
+
+Pure Python on purpose - the benchmark scripts run on CI boxes that only have
+Playwright installed.
+"""
+
+import json
+import math
+import os
+import statistics
+import time
+
+
+def percentile(values: list, p: float) -> float:
+    """Linear-interpolated percentile, p in [0, 100]"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: list) -> dict:
+    """n, mean, stdev, min/max and p50/p95/p99 of a sample"""
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": statistics.fmean(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+        "min": min(values),
+        "max": max(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def mann_whitney_u(current: list, baseline: list) -> float:
+    """One-sided p-value that `current` tends to be larger than `baseline`
+
+    Normal approximation with tie correction; fine for the 10+ samples per
+    side the benchmarks collect, conservative below that.
+    """
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+
+    ranked = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(ranked)
+    tie_term = 0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tie_term += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    r1 = sum(rank for rank, (_, group) in zip(ranks, ranked) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u1 - n1 * n2 / 2 - 0.5) / math.sqrt(variance)  # continuity correction
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(current: list, baseline: list, threshold_pct: float, alpha: float = 0.05,
+            stat: str = "p95") -> dict:
+    """Regression verdict: `stat` slower by more than threshold AND significant"""
+    now, before = summarize(current), summarize(baseline)
+    if not before.get("n") or not now.get("n"):
+        return {"verdict": "no-baseline", "delta_pct": None, "p_value": None}
+
+    delta_pct = (now[stat] - before[stat]) / before[stat] * 100 if before[stat] else 0.0
+    p_value = mann_whitney_u(current, baseline)
+    if delta_pct > threshold_pct and p_value < alpha:
+        verdict = "regressed"
+    elif delta_pct < -threshold_pct and mann_whitney_u(baseline, current) < alpha:
+        verdict = "improved"
+    else:
+        verdict = "ok"
+    return {"verdict": verdict, "delta_pct": delta_pct, "p_value": p_value}
+
+
+def theil_sen(values: list) -> float:
+    """Median of the pairwise slopes of an evenly spaced series (robust to GC noise)"""
+    slopes = [(values[j] - values[i]) / (j - i) for i in range(len(values)) for j in range(i + 1, len(values))]
+    return statistics.median(slopes) if slopes else 0.0
+
+
+def mann_kendall(values: list) -> tuple:
+    """(tau, one-sided p-value) that the series keeps increasing
+
+    Normal approximation with tie correction; needs 8+ points to mean much.
+    """
+    n = len(values)
+    if n < 3:
+        return 0.0, 1.0
+    s = sum((values[j] > values[i]) - (values[j] < values[i]) for i in range(n) for j in range(i + 1, n))
+    ties = {}
+    for v in values:
+        ties[v] = ties.get(v, 0) + 1
+    variance = (n * (n - 1) * (2 * n + 5) - sum(t * (t - 1) * (2 * t + 5) for t in ties.values())) / 18
+    tau = s / (n * (n - 1) / 2)
+    if variance <= 0:
+        return tau, 1.0
+    z = (s - 1) / math.sqrt(variance) if s > 0 else (s + 1) / math.sqrt(variance) if s < 0 else 0.0
+    return tau, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def power_fit(sizes: list, values: list) -> dict:
+    """Fit values = overhead + coefficient * size ** exponent
+
+    The exponent is searched on a 0.01 grid up to 3, with overhead and
+    coefficient solved by least squares at each step. Fixed per-page cost goes
+    into the overhead, so it doesn't pull the exponent down: linear growth
+    fits as ~1, worse than linear as > 1. Decreasing series fit as flat.
+    """
+    mean = statistics.fmean(values)
+    best = (sum((v - mean) ** 2 for v in values), 0.0, mean, 0.0)
+    for step in range(1, 301):
+        exponent = step / 100
+        xs = [s ** exponent for s in sizes]
+        mx = statistics.fmean(xs)
+        sxx = sum((x - mx) ** 2 for x in xs)
+        if not sxx:
+            continue
+        coefficient = sum((x - mx) * (v - mean) for x, v in zip(xs, values)) / sxx
+        if coefficient <= 0:
+            continue
+        overhead = mean - coefficient * mx
+        sse = sum((overhead + coefficient * x - v) ** 2 for x, v in zip(xs, values))
+        if sse < best[0]:
+            best = (sse, exponent, overhead, coefficient)
+    sse, exponent, overhead, coefficient = best
+    sst = sum((v - mean) ** 2 for v in values)
+    return {"exponent": exponent, "overhead": overhead, "coefficient": coefficient,
+            "r2": 1 - sse / sst if sst else 1.0}
+
+
+def load_baseline(path: str) -> dict:
+    """Read a baseline file; an empty dict if there is none yet"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, samples: dict, **meta):
+    """Write {key: [samples]} plus metadata as the new baseline"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **meta, "samples": samples}, f, indent=2)
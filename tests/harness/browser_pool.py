@@ -0,0 +1,314 @@
+"""
+Shared Chromium and a pool of reusable browser contexts.
+
+Every script used to pay for a Chromium launch plus a cold context per test.
+Two things cut that down:
+
+Shared browser - `python3 tests/browser-pool.py start` launches one headless
+Chromium with a CDP endpoint that outlives the scripts. `launch()` connects to
+it when it is up and answers a health check, and otherwise launches a private
+browser as before. Closing a connected browser only disconnects from it.
+
+Context pool - `ContextPool` hands out contexts with the storage state
+(harness/session.py) already loaded and takes them back instead of closing
+them:
+
+  pool = ContextPool(browser, BASE_URL, on_create=install, viewport=...)
+  context = pool.acquire(state)   # state=None for a signed-out context
+  ...
+  pool.release(context)
+
+A context is reset before it is handed out again. Its pages are closed, and
+its cookies and permissions are replaced by the ones in the state. IndexedDB,
+service workers and CacheStorage of the app's and the state's origins are
+cleared over CDP (Storage.clearDataForOrigin). A generation cookie makes an
+init script clear localStorage and sessionStorage on the first page load and
+put back the state's own entries. The HTTP cache and compiled scripts are
+kept, which is the point. Contexts are reused only for the same state
+origins, because those are baked into the init script.
+
+Limits: routing turns Chromium's HTTP cache off for the whole context, so a
+context with replay (harness/replay.py) or a network profile
+(harness/network.py) attached starts every load cold - reuse then saves the
+context setup and compiled scripts only. Storage of origins other than the
+app's and the state's is not cleared.
+
+Memory stays bounded. Each pool keeps at most POOL_SIZE idle contexts and
+closes any extra ones when they are released. A context is closed and replaced
+after POOL_MAX_USES uses. A context that fails its health check (one CDP round
+trip) on acquire is dropped.
+
+Configuration:
+  BROWSER_ENDPOINT    - CDP endpoint of a shared browser (default: the one browser-pool.py started)
+  BROWSER_STATE_FILE  - where browser-pool.py records its browser (default /tmp/stockzip-browser.json)
+  POOL_SIZE           - idle contexts kept per pool (default 4)
+  POOL_MAX_USES       - uses before a context is recycled (default 20)
+"""
+
+import hashlib
+import json
+import os
+import urllib.request
+import weakref
+from urllib.parse import urlparse
+
+from harness.console import log
+
+BROWSER_STATE_FILE = os.environ.get("BROWSER_STATE_FILE", "/tmp/stockzip-browser.json")
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "4"))
+POOL_MAX_USES = int(os.environ.get("POOL_MAX_USES", "20"))
+CONNECT_TIMEOUT = 10000
+
+GENERATION_COOKIE = "__harness_pool_gen"
+
+# Runs before any page script: on the first load after a reset, swap the previous
+# user's storage for the state's. The argument is {origin: [{name, value}]}.
+RESET_JS = """
+((ORIGINS) => {
+  const match = document.cookie.match(/(?:^|; )__harness_pool_gen=(\\d+)/);
+  if (!match) return;
+  try {
+    if (localStorage.getItem('__harness_pool_gen') === match[1]) return;
+    localStorage.clear();
+    sessionStorage.clear();
+    for (const { name, value } of ORIGINS[location.origin] || []) localStorage.setItem(name, value);
+    localStorage.setItem('__harness_pool_gen', match[1]);
+  } catch (e) {}  // opaque origins (about:blank, data:) have no storage
+})(%s);
+"""
+
+# What a reset clears besides cookies and Web Storage
+CLEARED_STORAGE = "indexeddb,service_workers,cache_storage"
+
+# Pool that owns each handed-out context, so `release()` needs only the context
+_owners = weakref.WeakKeyDictionary()
+_pools = {}
+
+
+def read_state() -> dict:
+    """The shared browser recorded by browser-pool.py, or None"""
+    try:
+        with open(BROWSER_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def check_endpoint(endpoint: str, timeout: float = 2.0) -> dict:
+    """GET /json/version on a CDP endpoint; None if it doesn't answer"""
+    try:
+        with urllib.request.urlopen(f"{endpoint.rstrip('/')}/json/version", timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def shared_endpoint() -> str:
+    """CDP endpoint of a running shared browser, or None"""
+    if os.environ.get("BROWSER_ENDPOINT"):
+        return os.environ["BROWSER_ENDPOINT"]
+    state = read_state()
+    if state and is_alive(state.get("pid")):
+        return state["endpoint"]
+    return None
+
+
+def launch(playwright, headless: bool = True, **options):
+    """Connect to the shared browser if one is up, else launch a private one"""
+    endpoint = shared_endpoint()
+    if endpoint:
+        if check_endpoint(endpoint):
+            try:
+                return playwright.chromium.connect_over_cdp(endpoint, timeout=CONNECT_TIMEOUT)
+            except Exception as e:
+                log(f"Shared browser at {endpoint} refused the connection ({e}) - launching one", "WARN")
+        else:
+            log(f"Shared browser at {endpoint} is not answering - launching one", "WARN")
+    return playwright.chromium.launch(headless=headless, **options)
+
+
+async def launch_async(playwright, headless: bool = True, **options):
+    endpoint = shared_endpoint()
+    if endpoint:
+        if check_endpoint(endpoint):
+            try:
+                return await playwright.chromium.connect_over_cdp(endpoint, timeout=CONNECT_TIMEOUT)
+            except Exception as e:
+                log(f"Shared browser at {endpoint} refused the connection ({e}) - launching one", "WARN")
+        else:
+            log(f"Shared browser at {endpoint} is not answering - launching one", "WARN")
+    return await playwright.chromium.launch(headless=headless, **options)
+
+
+def state_key(state: dict) -> str:
+    """Contexts are interchangeable when their baked-in localStorage matches"""
+    if not state:
+        return "anonymous"
+    origins = json.dumps(state.get("origins") or [], sort_keys=True)
+    return hashlib.sha256(origins.encode()).hexdigest()[:16]
+
+
+def _origins(state: dict) -> dict:
+    return {o["origin"]: o.get("localStorage", []) for o in (state or {}).get("origins") or []}
+
+
+class ContextPool:
+    """Reusable contexts on one browser; see the module docstring"""
+
+    def __init__(self, browser, base_url: str, on_create=None, on_reset=None,
+                 size: int = POOL_SIZE, max_uses: int = POOL_MAX_USES, **options):
+        self.browser = browser
+        self.base_url = base_url
+        self.on_create, self.on_reset = on_create, on_reset
+        self.size, self.max_uses = size, max_uses
+        self.options = options
+        self.generation = 0
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0, "overflow": 0}
+        self._idle = {}  # state key -> [context]
+        self._meta = weakref.WeakKeyDictionary()  # context -> {"key", "uses"}
+
+    def acquire(self, state: dict = None):
+        """A context signed in with `state` (None: signed out) and no open pages"""
+        key = state_key(state)
+        idle = self._idle.get(key, [])
+        while idle:
+            context = idle.pop()
+            if self._healthy(context):
+                try:
+                    self._reset(context, state)
+                except Exception:
+                    self._discard(context, "unhealthy")
+                    continue
+                self.stats["reused"] += 1
+                break
+            self._discard(context, "unhealthy")
+        else:
+            context = self._create(state, key)
+        self._meta[context]["uses"] += 1
+        _owners[context] = self
+        return context
+
+    def release(self, context):
+        """Take a context back; it is closed instead if it's used up or the pool is full"""
+        meta = self._meta.get(context)
+        if meta is None:
+            context.close()
+            return
+        try:
+            for page in list(context.pages):
+                page.close()
+        except Exception:
+            self._discard(context, "unhealthy")
+            return
+        if meta["uses"] >= self.max_uses:
+            self._discard(context, "recycled")
+        elif sum(len(idle) for idle in self._idle.values()) >= self.size:
+            self._discard(context, "overflow")
+        else:
+            self._idle.setdefault(meta["key"], []).append(context)
+
+    def close(self):
+        """Close every idle context; contexts still out are closed on release"""
+        for idle in self._idle.values():
+            for context in idle:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+        self._idle.clear()
+        self.size = 0
+        return dict(self.stats)
+
+    def _create(self, state: dict, key: str):
+        context = self.browser.new_context(storage_state=state, **self.options)
+        context.add_init_script(RESET_JS % json.dumps(_origins(state)))
+        self._meta[context] = {"key": key, "uses": 0}
+        self._set_generation(context)
+        if self.on_create:
+            self.on_create(context)
+        self.stats["created"] += 1
+        return context
+
+    def _reset(self, context, state: dict):
+        context.clear_cookies()
+        if state and state.get("cookies"):
+            context.add_cookies(state["cookies"])
+        context.clear_permissions()
+        self._clear_storage(context, state)
+        self._set_generation(context)
+        if self.on_reset:
+            self.on_reset(context)
+
+    def _clear_storage(self, context, state: dict):
+        origins = set(_origins(state))
+        if self.base_url and urlparse(self.base_url).scheme.startswith("http"):
+            parsed = urlparse(self.base_url)
+            origins.add(f"{parsed.scheme}://{parsed.netloc}")
+        if not origins:
+            return
+        page = context.new_page()  # CDP sessions attach to a page; Storage acts on its context
+        try:
+            cdp = context.new_cdp_session(page)
+            for origin in sorted(origins):
+                cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": CLEARED_STORAGE})
+            cdp.detach()
+        finally:
+            page.close()
+
+    def _set_generation(self, context):
+        if not self.base_url or not urlparse(self.base_url).scheme.startswith("http"):
+            return
+        self.generation += 1
+        context.add_cookies([{"name": GENERATION_COOKIE, "value": str(self.generation), "url": self.base_url}])
+
+    def _healthy(self, context) -> bool:
+        if not self.browser.is_connected():
+            return False
+        try:
+            context.cookies()  # one round trip to the browser
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, context, reason: str):
+        self.stats[reason] += 1
+        self._meta.pop(context, None)
+        try:
+            context.close()
+        except Exception:
+            pass
+
+
+def pool_for(browser, base_url: str, **kwargs) -> ContextPool:
+    """This process's pool for `browser`, created on first use with these arguments"""
+    pool = _pools.get(id(browser))
+    if pool is None or pool.browser is not browser:
+        pool = _pools[id(browser)] = ContextPool(browser, base_url, **kwargs)
+    return pool
+
+
+def release(context):
+    """Return a context to the pool it came from, or close it if it wasn't pooled"""
+    pool = _owners.pop(context, None)
+    if pool is None:
+        context.close()
+    else:
+        pool.release(context)
+
+
+def close_pools() -> dict:
+    """Close every pool in this process; returns their combined stats"""
+    totals = {}
+    for pool in _pools.values():
+        for name, count in pool.close().items():
+            totals[name] = totals.get(name, 0) + count
+    _pools.clear()
+    return totals
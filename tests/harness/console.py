@@ -0,0 +1,10 @@
+"""Console output shared by the harness modules"""
+
+from datetime import datetime
+
+
+def log(message: str, status: str = "INFO"):
+    """Log with timestamp"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    prefix = {"PASS": "✅", "FAIL": "❌", "INFO": "ℹ️", "WARN": "⚠️", "SKIP": "⏭️"}.get(status, "•")
+    print(f"[{timestamp}] {prefix} {message}", flush=True)
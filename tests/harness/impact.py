@@ -0,0 +1,497 @@
+"""
+Test impact analysis: which tests a change can affect, so CI runs only those.
+
+Recording (`enable()`, or HARNESS_IMPACT=1 so worker processes pick it up) puts
+a `Recorder` on every test's page in harness/runner.py. From setup to the end
+of the test it collects:
+  routes   - every path the main frame navigated to, client-side ones included
+  actions  - the ids of the server actions the page POSTed (Next-Action
+             header), resolved to their source file through
+             .next/server/server-reference-manifest.json when it names them
+  files    - repo files behind the JS that actually ran. Chromium's precise
+             coverage gives the functions that were called. Each script's
+             source map turns those functions into the source files they
+             came from. Whole module factories count, so a module counts as
+             touched once it is imported.
+`save()` merges them into the suite's map, `<IMPACT_DIR>/<suite>.json`, keyed
+by test function along with the test ids it recorded.
+
+Selection (`select()`) works on the current tree. It takes each test's
+recorded files, the app/ files of its routes (page, layouts, loading/error)
+and its action files. Following their `@/` and relative imports gives the
+files the test depends on, including server-only code the browser never
+sees. Then, for each changed file:
+  - the suite script, tests/harness/, database migrations, app-wide config
+    (FULL_SUITE)                           -> every test
+  - in some test's dependencies            -> those tests
+  - docs, unit tests, other scripts, public assets (IGNORED), or source code
+    that no test depends on                 -> nothing
+  - anything else                           -> every test (fallback)
+Tests missing from the map always run; with no map every test runs.
+
+Configuration:
+  IMPACT_DIR  - where the maps live (default <RESULTS_DIR>/impact); point CI's
+                cache at it
+"""
+
+import base64
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import time
+from urllib.parse import unquote, urljoin, urlparse
+
+from harness.results import RESULTS_DIR
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DIR = os.path.join(REPO_ROOT, "app")
+IMPACT_DIR = os.environ.get("IMPACT_DIR", os.path.join(RESULTS_DIR, "impact"))
+ACTION_MANIFEST = os.path.join(REPO_ROOT, ".next", "server", "server-reference-manifest.json")
+
+# Changes that can affect any test (globs on repo-relative paths)
+FULL_SUITE = (
+    "tests/harness/*", "supabase/*", "middleware.ts", "proxy.ts", "next.config.*", "package.json",
+    "package-lock.json", "pnpm-lock.yaml", "yarn.lock", "tsconfig.json", "tailwind.config.*",
+    "postcss.config.*", "app/globals.css", ".env*",
+)
+# Changes no UI test can see
+IGNORED = (
+    "*.md", "docs/*", "__tests__/*", "*.test.ts", "*.test.tsx", "*.spec.ts", ".github/*", "tests/*", "public/*",
+)
+CODE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+# The [locale] segment only renders these (lib/seo/locales.ts); "" stands for the unprefixed path
+LOCALE_SEGMENT = "[locale]"
+LOCALES_SOURCE = os.path.join(REPO_ROOT, "lib", "seo", "locales.ts")
+ROUTE_FILES = ("layout", "template", "loading", "error", "not-found")
+
+IMPORT_RE = re.compile(
+    r"""(?:^|[\s;])(?:import|export)\s[^'";]*?from\s*['"]([^'"]+)['"]"""
+    r"""|\bimport\s*\(\s*['"]([^'"]+)['"]\s*\)"""
+    r"""|^\s*import\s*['"]([^'"]+)['"]""",
+    re.M,
+)
+B64 = {c: i for i, c in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")}
+
+# Per process: decoded source maps by script URL, imports by file
+_scripts = {}
+_imports = {}
+_locales = None
+
+
+def enable():
+    os.environ["HARNESS_IMPACT"] = "1"
+
+
+def enabled() -> bool:
+    return os.environ.get("HARNESS_IMPACT") == "1"
+
+
+def map_path(suite_path: str) -> str:
+    return os.path.join(IMPACT_DIR, os.path.splitext(os.path.basename(suite_path))[0] + ".json")
+
+
+# -- recording ----------------------------------------------------------------
+
+
+def _vlq(segment: str) -> list:
+    values, value, shift = [], 0, 0
+    for char in segment:
+        digit = B64[char]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+            continue
+        values.append(-(value >> 1) if value & 1 else value >> 1)
+        value, shift = 0, 0
+    return values
+
+
+def repo_path(source: str) -> str:
+    """A source map entry as a path relative to the repo, or None outside it (node_modules, generated code)"""
+    path = unquote(source).split("?")[0]
+    for scheme in ("webpack://", "turbopack://", "file://"):
+        if path.startswith(scheme):
+            path = path[len(scheme):]
+    path = re.sub(r"^/*(\[project\]/|_N_E/)?", "", path)
+    if path.startswith(REPO_ROOT.lstrip("/") + "/"):
+        path = path[len(REPO_ROOT):]
+    path = re.sub(r"^(\./|/)+", "", path)
+    if not path or "node_modules" in path:
+        return None
+    return path if os.path.isfile(os.path.join(REPO_ROOT, path)) else None
+
+
+def decode_map(source_map: dict, lines: dict = None, line_offset: int = 0, column_offset: int = 0) -> dict:
+    """{generated line: [(column, repo path or None), ...]} of a source map, index maps included"""
+    lines = {} if lines is None else lines
+    for section in source_map.get("sections", ()):
+        offset = section.get("offset", {})
+        if "map" in section:
+            decode_map(section["map"], lines, line_offset + offset.get("line", 0),
+                       column_offset if not offset.get("line") else offset.get("column", 0))
+    if "mappings" not in source_map:
+        return lines
+    root = source_map.get("sourceRoot") or ""
+    sources = [repo_path(root + s) if s else None for s in source_map.get("sources", ())]
+    source = 0
+    for number, line in enumerate(source_map["mappings"].split(";")):
+        column = 0
+        segments = []
+        for segment in line.split(","):
+            if not segment:
+                continue
+            values = _vlq(segment)
+            column += values[0]
+            if len(values) > 1:
+                source += values[1]
+                segments.append((column + (column_offset if number == 0 else 0),
+                                 sources[source] if source < len(sources) else None))
+        if segments:
+            lines.setdefault(line_offset + number, []).extend(segments)
+    return lines
+
+
+def _load_script(request, url: str):
+    """(line start offsets, decoded map) of a script, or None when it has no usable source map"""
+    if url in _scripts:
+        return _scripts[url]
+    _scripts[url] = None
+    try:
+        text = request.get(url).text()
+        found = re.search(r"//[#@] sourceMappingURL=(\S+)\s*$", text[-4096:])
+        if not found:
+            return None
+        target = found.group(1)
+        if target.startswith("data:"):
+            source_map = json.loads(base64.b64decode(target.split(",", 1)[1]))
+        else:
+            source_map = request.get(urljoin(url, target)).json()
+        starts = [0] + [m.end() for m in re.finditer("\n", text)]
+        _scripts[url] = (starts, decode_map(source_map))
+    except Exception:
+        pass  # no map, or not fetchable: the script just doesn't count
+    return _scripts[url]
+
+
+def _source_at(script, offset: int) -> str:
+    starts, lines = script
+    low, high = 0, len(starts) - 1
+    while low < high:
+        mid = (low + high + 1) // 2
+        if starts[mid] <= offset:
+            low = mid
+        else:
+            high = mid - 1
+    column = offset - starts[low]
+    best = None
+    for segment_column, path in lines.get(low, ()):
+        if segment_column > column:
+            break
+        best = path
+    return best
+
+
+def covered_files(coverage: list, request) -> set:
+    """Repo files with at least one function that ran, from Profiler.takePreciseCoverage"""
+    files = set()
+    for script in coverage:
+        url = script.get("url") or ""
+        if not url.startswith("http"):
+            continue
+        loaded = None
+        for function in script["functions"]:
+            first = function["ranges"][0]
+            if not first["count"] or not function["functionName"] and first["startOffset"] == 0:
+                continue  # never called, or the script's own top level
+            loaded = loaded or _load_script(request, url)
+            if not loaded:
+                break
+            path = _source_at(loaded, first["startOffset"])
+            if path:
+                files.add(path)
+    return files
+
+
+def resolve_actions(action_ids) -> dict:
+    """{action id: source file} for the ids the build's action manifest names a file for"""
+    try:
+        with open(ACTION_MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    resolved = {}
+    for runtime in ("node", "edge"):
+        for action_id, entry in (manifest.get(runtime) or {}).items():
+            if action_id in action_ids and entry.get("filename"):
+                resolved[action_id] = repo_path(entry["filename"]) or entry["filename"]
+    return resolved
+
+
+class Recorder:
+    """Routes, server actions and covered files of one test's page (Chromium only)"""
+
+    def __init__(self, page, base_url: str):
+        self.page = page
+        self.origin = urlparse(base_url).netloc
+        self.routes, self.actions = set(), set()
+        self.cdp = None
+        try:
+            self.cdp = page.context.new_cdp_session(page)
+            self.cdp.send("Profiler.enable")
+            self.cdp.send("Profiler.startPreciseCoverage", {"callCount": True, "detailed": False})
+        except Exception:
+            self.cdp = None  # not Chromium: routes and actions only
+        page.on("framenavigated", self._navigated)
+        page.on("request", self._request)
+
+    def _navigated(self, frame):
+        url = urlparse(frame.url)
+        if frame == self.page.main_frame and url.netloc == self.origin:
+            self.routes.add(url.path.rstrip("/") or "/")
+
+    def _request(self, request):
+        action = request.headers.get("next-action")
+        if action and request.method == "POST":
+            self.actions.add(action)
+
+    def stop(self) -> dict:
+        files = set()
+        if self.cdp:
+            try:
+                coverage = self.cdp.send("Profiler.takePreciseCoverage")["result"]
+                self.cdp.send("Profiler.stopPreciseCoverage")
+                files = covered_files(coverage, self.page.context.request)
+                self.cdp.detach()
+            except Exception:
+                pass  # page already closed
+        self.page.remove_listener("framenavigated", self._navigated)
+        self.page.remove_listener("request", self._request)
+        actions = resolve_actions(self.actions)
+        return {
+            "routes": sorted(self.routes),
+            "actions": sorted(self.actions),
+            "action_files": sorted(set(actions.values())),
+            "files": sorted(files),
+        }
+
+
+def _git(*args) -> str:
+    return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+
+
+def save(suite_path: str, traces: dict, base_url: str = None) -> str:
+    """Merge {test name: trace + "ids"} into the suite's map; tests not in `traces` keep their entries"""
+    path = map_path(suite_path)
+    impact_map = load(suite_path) or {"tests": {}}
+    impact_map["tests"].update(traces)
+    try:
+        commit = _git("rev-parse", "HEAD").strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    impact_map.update(suite=os.path.basename(suite_path), recorded_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      commit=commit, base_url=base_url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(impact_map, f, indent=2)
+    return path
+
+
+def load(suite_path: str) -> dict:
+    try:
+        with open(map_path(suite_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# -- selection ----------------------------------------------------------------
+
+
+def changed_files(since: str) -> list:
+    """Files changed since `since` (merge base with HEAD), uncommitted and untracked ones included"""
+    try:
+        changed = set(_git("diff", "--name-only", f"{since}...HEAD").split())
+        changed.update(_git("diff", "--name-only", "HEAD").split())
+        changed.update(_git("ls-files", "--others", "--exclude-standard").split())
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ValueError(f"can't diff against {since!r}: {getattr(e, 'stderr', '') or e}".strip())
+    return sorted(changed)
+
+
+def _page_files(directory: str, names: tuple) -> list:
+    found = []
+    for name in names:
+        for extension in (".tsx", ".ts", ".jsx", ".js"):
+            path = os.path.join(directory, name + extension)
+            if os.path.isfile(path):
+                found.append(os.path.relpath(path, REPO_ROOT))
+    return found
+
+
+def _children(directory: str) -> list:
+    """(path, name) of the route segments under `directory`, with route groups like (dashboard) flattened"""
+    found = []
+    try:
+        entries = sorted(os.listdir(directory))
+    except OSError:
+        return found
+    for entry in entries:
+        path = os.path.join(directory, entry)
+        if not os.path.isdir(path):
+            continue
+        if entry.startswith("(") and entry.endswith(")"):
+            found.extend(_children(path))
+        else:
+            found.append((path, entry))
+    return found
+
+
+def _groups(directory: str) -> list:
+    found = []
+    for entry in sorted(os.listdir(directory)) if os.path.isdir(directory) else ():
+        path = os.path.join(directory, entry)
+        if entry.startswith("(") and entry.endswith(")") and os.path.isdir(path):
+            found.extend([path] + _groups(path))
+    return found
+
+
+def locales() -> tuple:
+    """The configured locales, from the LOCALES array in lib/seo/locales.ts"""
+    global _locales
+    if _locales is None:
+        try:
+            with open(LOCALES_SOURCE, encoding="utf-8") as f:
+                match = re.search(r"LOCALES\s*=\s*\[([^\]]*)\]", f.read())
+        except OSError:
+            match = None
+        _locales = tuple(re.findall(r"['\"]([^'\"]+)['\"]", match.group(1))) if match else ()
+    return _locales
+
+
+def _segment_rank(name: str) -> int:
+    if name.startswith("[[...") or name.startswith("[..."):
+        return 2
+    return 1 if name.startswith("[") else 0
+
+
+def _match_route(directory: str, segments: list) -> list:
+    """Directories from `directory` down to the one whose page renders `segments`, Next.js precedence"""
+    if not segments:
+        if _page_files(directory, ("page", "route")):
+            return [directory]
+        for group in _groups(directory):
+            if _page_files(group, ("page", "route")):
+                return [directory, group]  # a group's page renders its parent's path
+        for path, name in _children(directory):
+            if name.startswith("[[...") and _page_files(path, ("page", "route")):
+                return [directory, path]
+        return None
+    children = sorted(_children(directory), key=lambda child: _segment_rank(child[1]))
+    for path, name in children:
+        rank = _segment_rank(name)
+        if rank == 0 and name != segments[0]:
+            continue
+        if name == LOCALE_SEGMENT and segments[0] not in ("",) + locales():
+            continue
+        if rank == 2:
+            if _page_files(path, ("page", "route")):
+                return [directory, path]
+            continue
+        found = _match_route(path, segments[1:])
+        if found:
+            return [directory] + found
+    return None
+
+
+def route_files(path: str, directory: str = None) -> list:
+    """app/ files that render `path`: its page and every layout, loading and error file above it
+
+    Paths the app only serves under a locale prefix (/pricing -> /en-us/pricing)
+    resolve through the [locale] segment, which only matches the configured
+    locales (lib/seo/locales.ts), so it can't swallow /pricing itself.
+    """
+    directory = directory or APP_DIR
+    segments = [s for s in path.split("/") if s]
+    chain = _match_route(directory, segments) or _match_route(directory, [""] + segments)
+    if not chain:
+        return []
+    files = []
+    for index, level in enumerate(chain):
+        # route groups between two matched levels carry layouts too
+        above = os.path.dirname(chain[index + 1]) if index + 1 < len(chain) else level
+        while True:
+            files.extend(_page_files(above, ROUTE_FILES))
+            if above == level:
+                break
+            above = os.path.dirname(above)
+    files.extend(_page_files(chain[-1], ("page", "route")))
+    return sorted(set(files), key=lambda f: (f.count("/"), f))
+
+
+def _resolve_import(spec: str, importer: str) -> str:
+    if spec.startswith("@/"):
+        base = os.path.join(REPO_ROOT, spec[2:])
+    elif spec.startswith("."):
+        base = os.path.normpath(os.path.join(REPO_ROOT, os.path.dirname(importer), spec))
+    else:
+        return None  # a package
+    candidates = [base] + [base + e for e in CODE_EXTENSIONS] + [os.path.join(base, "index" + e) for e in CODE_EXTENSIONS]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.relpath(candidate, REPO_ROOT)
+    return None
+
+
+def imports_of(path: str) -> list:
+    if path not in _imports:
+        _imports[path] = []
+        if path.endswith(CODE_EXTENSIONS):
+            try:
+                with open(os.path.join(REPO_ROOT, path), encoding="utf-8", errors="replace") as f:
+                    source = f.read()
+            except OSError:
+                source = ""
+            for match in IMPORT_RE.finditer(source):
+                resolved = _resolve_import(next(filter(None, match.groups())), path)
+                if resolved:
+                    _imports[path].append(resolved)
+    return _imports[path]
+
+
+def dependencies(trace: dict) -> set:
+    """Everything a recorded test depends on in the current tree"""
+    roots = set(trace.get("files", ())) | set(trace.get("action_files", ()))
+    for route in trace.get("routes", ()):
+        roots.update(route_files(route))
+    seen, queue = set(roots), list(roots)
+    while queue:
+        for imported in imports_of(queue.pop()):
+            if imported not in seen:
+                seen.add(imported)
+                queue.append(imported)
+    return seen
+
+
+def _matches(path: str, patterns: tuple) -> bool:
+    return any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+
+def select(tests: list, changed: list, impact_map: dict, suite_path: str) -> tuple:
+    """(tests to run, {test: [why]}, reason for running everything or None)"""
+    recorded = (impact_map or {}).get("tests", {})
+    if not recorded:
+        return list(tests), {}, "no impact map recorded yet"
+    suite_file = os.path.relpath(os.path.abspath(suite_path), REPO_ROOT)
+    depends = {name: dependencies(recorded[name]) for name in tests if name in recorded}
+    reasons = {name: ["not in the impact map"] for name in tests if name not in recorded}
+    for path in changed:
+        if path == suite_file or _matches(path, FULL_SUITE):
+            return list(tests), {}, f"{path} can affect every test"
+        hits = [name for name, files in depends.items() if path in files]
+        for name in hits:
+            reasons.setdefault(name, []).append(path)
+        if not hits and not _matches(path, IGNORED) and not path.endswith(CODE_EXTENSIONS + (".css",)):
+            return list(tests), {}, f"{path} is not mapped to any test"
+    return [name for name in tests if name in reasons], reasons, None
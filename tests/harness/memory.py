@@ -0,0 +1,186 @@
+"""
+Client-side memory sampling and heap snapshot diffs over CDP (Chromium only).
+
+  cdp = memory.attach(page)
+  sample = memory.sample(cdp)          # forces GC first
+  # {"heap": bytes, "nodes": n, "listeners": n, "documents": n}
+
+  before = memory.heap_snapshot(cdp, "/tmp/before.heapsnapshot")
+  ...
+  after = memory.heap_snapshot(cdp, "/tmp/after.heapsnapshot")
+  rows = memory.diff_snapshots(before, after)
+
+`diff_snapshots` lists what was allocated after the first snapshot and is still
+alive in the second, per class (detached DOM elements are classed as such), with
+the property paths that keep it alive most often. Node ids are stable within a
+page's lifetime, so both snapshots must come from the same page.
+
+`verdict()` turns per-cycle samples into a leak verdict. A series leaks when
+its Theil-Sen slope is over the per-cycle limit and a Mann-Kendall test says
+the growth is steady, not noise.
+
+Configuration (per-cycle growth allowed after warmup):
+  LEAK_HEAP_KB       - JS heap KB per cycle (default 64)
+  LEAK_NODES         - DOM nodes per cycle (default 10)
+  LEAK_LISTENERS     - event listeners per cycle (default 2)
+  LEAK_ALPHA         - significance of the trend test (default 0.01)
+"""
+
+import json
+import os
+
+from harness import bench
+
+LIMITS = {
+    "heap": float(os.environ.get("LEAK_HEAP_KB", "64")) * 1024,
+    "nodes": float(os.environ.get("LEAK_NODES", "10")),
+    "listeners": float(os.environ.get("LEAK_LISTENERS", "2")),
+}
+ALPHA = float(os.environ.get("LEAK_ALPHA", "0.01"))
+
+# Snapshot node types that are grouped under their constructor name
+NAMED_TYPES = {"object", "native", "closure", "regexp"}
+
+# Edges that don't keep anything alive
+WEAK_EDGES = {"weak", "shortcut"}
+
+
+def attach(page):
+    """CDP session on the page with the heap profiler enabled"""
+    cdp = page.context.new_cdp_session(page)
+    cdp.send("HeapProfiler.enable")
+    return cdp
+
+
+def collect_garbage(cdp):
+    # Twice: the first pass can leave objects that only die once their finalizers ran
+    cdp.send("HeapProfiler.collectGarbage")
+    cdp.send("HeapProfiler.collectGarbage")
+
+
+def sample(cdp, gc: bool = True) -> dict:
+    """JS heap in use, DOM nodes, event listeners and documents, after a full GC"""
+    if gc:
+        collect_garbage(cdp)
+    heap = cdp.send("Runtime.getHeapUsage")
+    counters = cdp.send("Memory.getDOMCounters")
+    return {
+        "heap": heap["usedSize"],
+        "nodes": counters["nodes"],
+        "listeners": counters["jsEventListeners"],
+        "documents": counters["documents"],
+    }
+
+
+def verdict(samples: list, limits: dict = None, alpha: float = ALPHA) -> dict:
+    """Per metric: slope per cycle, Kendall tau, p-value and whether it leaks"""
+    limits = limits or LIMITS
+    report = {}
+    for metric, limit in limits.items():
+        series = [s[metric] for s in samples]
+        slope = bench.theil_sen(series)
+        tau, p_value = bench.mann_kendall(series)
+        report[metric] = {
+            "start": series[0] if series else None,
+            "end": series[-1] if series else None,
+            "slope": slope,
+            "tau": tau,
+            "p_value": p_value,
+            "leaking": slope > limit and p_value < alpha,
+        }
+    return report
+
+
+def heap_snapshot(cdp, path: str) -> str:
+    """Write a .heapsnapshot of the page (opens in DevTools' Memory tab)"""
+    collect_garbage(cdp)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        handler = lambda params: f.write(params["chunk"])  # noqa: E731
+        cdp.on("HeapProfiler.addHeapSnapshotChunk", handler)
+        try:
+            cdp.send("HeapProfiler.takeHeapSnapshot", {"reportProgress": False, "captureNumericValue": False})
+        finally:
+            cdp.remove_listener("HeapProfiler.addHeapSnapshotChunk", handler)
+    return path
+
+
+class Snapshot:
+    """The parts of a .heapsnapshot the diff needs, decoded once"""
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            raw = json.load(f)
+        meta = raw["snapshot"]["meta"]
+        self.node_fields = meta["node_fields"]
+        self.edge_fields = meta["edge_fields"]
+        self.node_types = meta["node_types"][0]
+        self.edge_types = meta["edge_types"][0]
+        self.nodes, self.edges, self.strings = raw["nodes"], raw["edges"], raw["strings"]
+        self.nf, self.ef = len(self.node_fields), len(self.edge_fields)
+        self._type_at, self._name_at = self.node_fields.index("type"), self.node_fields.index("name")
+        self._detached = self.node_fields.index("detachedness") if "detachedness" in self.node_fields else None
+
+    def class_name(self, offset: int) -> str:
+        """DevTools' grouping: constructor name for objects, (type) for the rest"""
+        kind = self.node_types[self.nodes[offset + self._type_at]]
+        if kind not in NAMED_TYPES:
+            return f"({kind})"
+        name = self.strings[self.nodes[offset + self._name_at]] if kind != "closure" else "(closure)"
+        if self._detached is not None and self.nodes[offset + self._detached] == 2:
+            return f"Detached {name}"
+        return name
+
+    def ids(self) -> set:
+        id_at = self.node_fields.index("id")
+        return {self.nodes[i + id_at] for i in range(0, len(self.nodes), self.nf)}
+
+    def edges_from(self):
+        """Yield (from node offset, edge type, edge name, to node offset)"""
+        count_at = self.node_fields.index("edge_count")
+        type_at, name_at, to_at = (self.edge_fields.index(f) for f in ("type", "name_or_index", "to_node"))
+        e = 0
+        for offset in range(0, len(self.nodes), self.nf):
+            for _ in range(self.nodes[offset + count_at]):
+                kind = self.edge_types[self.edges[e + type_at]]
+                name = self.edges[e + name_at]
+                if kind not in ("element", "hidden"):
+                    name = self.strings[name]
+                yield offset, kind, name, self.edges[e + to_at]
+                e += self.ef
+
+
+def diff_snapshots(before_path: str, after_path: str, top: int = 15, retainers: int = 3) -> list:
+    """Classes allocated between the snapshots and still alive, largest first
+
+    Each row: {"class", "count", "size", "retainers": [(path, count), ...]}.
+    """
+    before_ids = Snapshot(before_path).ids()
+    after = Snapshot(after_path)
+    id_at, size_at = after.node_fields.index("id"), after.node_fields.index("self_size")
+
+    grown = {}
+    new_class = {}  # node offset -> class, for objects that are new
+    for offset in range(0, len(after.nodes), after.nf):
+        if after.nodes[offset + id_at] in before_ids:
+            continue
+        name = after.class_name(offset)
+        new_class[offset] = name
+        row = grown.setdefault(name, {"class": name, "count": 0, "size": 0})
+        row["count"] += 1
+        row["size"] += after.nodes[offset + size_at]
+
+    rows = sorted(grown.values(), key=lambda r: -r["size"])[:top]
+    wanted = {r["class"] for r in rows}
+    paths = {name: {} for name in wanted}
+    for source, kind, name, target in after.edges_from():
+        target_class = new_class.get(target)
+        if target_class not in wanted or kind in WEAK_EDGES:
+            continue
+        path = after.class_name(source) + ("[]" if kind in ("element", "hidden") else f".{name}")
+        counts = paths[target_class]
+        counts[path] = counts.get(path, 0) + 1
+    for row in rows:
+        ranked = sorted(paths[row["class"]].items(), key=lambda item: -item[1])
+        row["retainers"] = ranked[:retainers]
+    return rows
@@ -0,0 +1,217 @@
+"""
+Named network profiles: slow, jittery and flapping connections for the scripts.
+
+  network.configure("3g")        # from the script's --network flag
+  network.apply(context)          # next to install(context), on every new context
+
+A profile has up to three parts:
+  throughput / latency - Chromium's own throttling via CDP
+                         Network.emulateNetworkConditions, set on every page
+                         of the context (Chromium only; other engines skip it)
+  delays               - extra per-host delay plus random jitter, added in a
+                         `context.route` handler before the request goes on
+                         (to the network or to harness/replay.py's handler)
+  flap                 - connectivity that drops on a schedule. Requests in an
+                         offline window are aborted, and the page sees
+                         navigator.onLine and online/offline events follow the
+                         same clock. Realtime websockets are not cut.
+
+`active()` is the selected profile's name. harness/results.py stores it with
+every result and harness/perf.py with every metrics snapshot, so runs on
+different profiles can be told apart and compared.
+
+The selection lives in an environment variable so parallel worker processes
+inherit it, like the replay mode.
+
+Configuration:
+  NETWORK_PROFILE  - none (default), wifi-congested, 3g or offline-flap
+  NETWORK_SEED     - seed of the jitter (default 0)
+"""
+
+import asyncio
+import os
+import random
+import time
+import weakref
+
+from harness.replay import is_supabase
+
+# throughput: (down, up) kbit/s; latency: ms Chromium adds to each response;
+# delays: {"supabase" | "default": (ms, up to this many ms of jitter)}; flap: (s online, s offline)
+PROFILES = {
+    "none": {},
+    "wifi-congested": {
+        "throughput": (4000, 1000),
+        "latency": 40,
+        "delays": {"supabase": (60, 150), "default": (10, 60)},
+    },
+    "3g": {
+        "throughput": (1600, 750),
+        "latency": 150,
+        "delays": {"supabase": (100, 50), "default": (0, 25)},
+    },
+    "offline-flap": {
+        "throughput": (4000, 1000),
+        "latency": 40,
+        "delays": {"supabase": (40, 80), "default": (10, 30)},
+        "flap": (20, 4),
+    },
+}
+
+# Runs before any page script: navigator.onLine and online/offline events on the flap schedule
+FLAP_JS = """
+((epoch, onlineMs, offlineMs) => {
+  const offline = () => (Date.now() - epoch) %% (onlineMs + offlineMs) >= onlineMs;
+  Object.defineProperty(Navigator.prototype, 'onLine', { get: () => !offline(), configurable: true });
+  let last = offline();
+  setInterval(() => {
+    const now = offline();
+    if (now !== last) {
+      last = now;
+      dispatchEvent(new Event(now ? 'offline' : 'online'));
+    }
+  }, 250);
+})(%d, %d, %d);
+"""
+
+_rng = random.Random(int(os.environ.get("NETWORK_SEED", "0")))
+
+# CDP sessions holding each page's throttling (detaching would drop it)
+_sessions = weakref.WeakKeyDictionary()
+
+# When the flap schedule started; workers share it through the environment
+_epoch = float(os.environ.setdefault("NETWORK_EPOCH", str(time.time())))
+
+
+def configure(profile: str = None):
+    """Select a profile for this process and its workers; unknown names raise ValueError"""
+    if profile is None:
+        return
+    if profile not in PROFILES:
+        raise ValueError(f"unknown network profile '{profile}' (one of {', '.join(PROFILES)})")
+    os.environ["NETWORK_PROFILE"] = profile
+
+
+def active() -> str:
+    return os.environ.get("NETWORK_PROFILE") or "none"
+
+
+def settings() -> dict:
+    name = active()
+    if name not in PROFILES:
+        raise ValueError(f"NETWORK_PROFILE={name} is not a known profile (one of {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def is_offline(profile: dict, now: float = None) -> bool:
+    if "flap" not in profile:
+        return False
+    online, offline = profile["flap"]
+    return ((now or time.time()) - _epoch) % (online + offline) >= online
+
+
+def delay_ms(profile: dict, url: str) -> float:
+    delays = profile.get("delays") or {}
+    base, jitter = delays.get("supabase" if is_supabase(url) else "default", (0, 0))
+    return base + _rng.uniform(0, jitter)
+
+
+def _conditions(profile: dict) -> dict:
+    down, up = profile["throughput"]
+    return {"offline": False, "latency": profile.get("latency", 0),
+            "downloadThroughput": down * 1000 / 8, "uploadThroughput": up * 1000 / 8}
+
+
+def _throttle(page, profile: dict):
+    try:
+        session = page.context.new_cdp_session(page)
+        session.send("Network.enable")
+        session.send("Network.emulateNetworkConditions", _conditions(profile))
+        _sessions[page] = session
+    except Exception:
+        pass  # not Chromium
+
+
+async def _throttle_async(page, profile: dict):
+    try:
+        session = await page.context.new_cdp_session(page)
+        await session.send("Network.enable")
+        await session.send("Network.emulateNetworkConditions", _conditions(profile))
+        _sessions[page] = session
+    except Exception:
+        pass
+
+
+def apply(context):
+    """Put the active profile on a context: its current and future pages and its requests"""
+    profile = settings()
+    if not profile:
+        return
+    if "throughput" in profile:
+        for page in context.pages:
+            _throttle(page, profile)
+        context.on("page", lambda page: _throttle(page, profile))
+    if "flap" in profile:
+        online, offline = profile["flap"]
+        context.add_init_script(FLAP_JS % (_epoch * 1000, online * 1000, offline * 1000))
+
+    def handle(route):
+        if is_offline(profile):
+            route.abort("internetdisconnected")
+            return
+        wait = delay_ms(profile, route.request.url)
+        if wait >= 1:
+            try:
+                # Yields to Playwright's loop, so other requests are delayed concurrently
+                route.request.frame.page.wait_for_timeout(wait)
+            except Exception:
+                pass  # service worker requests have no frame to wait on
+        route.fallback()
+
+    context.route("**/*", handle)
+
+
+async def apply_async(context):
+    profile = settings()
+    if not profile:
+        return
+    if "throughput" in profile:
+        for page in context.pages:
+            await _throttle_async(page, profile)
+        context.on("page", lambda page: asyncio.ensure_future(_throttle_async(page, profile)))
+    if "flap" in profile:
+        online, offline = profile["flap"]
+        await context.add_init_script(FLAP_JS % (_epoch * 1000, online * 1000, offline * 1000))
+
+    async def handle(route):
+        if is_offline(profile):
+            await route.abort("internetdisconnected")
+            return
+        wait = delay_ms(profile, route.request.url)
+        if wait >= 1:
+            await asyncio.sleep(wait / 1000)
+        await route.fallback()
+
+    await context.route("**/*", handle)
+
+
+def add_argument(parser):
+    """The scripts' --network flag"""
+    parser.add_argument("--network", choices=list(PROFILES), default=None,
+                        help="network profile (default: NETWORK_PROFILE or none)")
+
+
+def describe() -> str:
+    """One line on the active profile, for the scripts' banners"""
+    profile = settings()
+    if not profile:
+        return "none (localhost speed)"
+    parts = []
+    if "throughput" in profile:
+        down, up = profile["throughput"]
+        parts.append(f"{down / 1000:g}/{up / 1000:g} Mbit/s +{profile.get('latency', 0)}ms")
+    for kind, (base, jitter) in (profile.get("delays") or {}).items():
+        parts.append(f"{kind} +{base}-{base + jitter}ms")
+    if "flap" in profile:
+        parts.append("offline {1}s after every {0}s online".format(*profile["flap"]))
+    return f"{active()} ({', '.join(parts)})"
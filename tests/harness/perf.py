@@ -0,0 +1,280 @@
+"""
+Page-load performance capture for the Python Playwright scripts.
+
+`goto(page, url)` replaces the scripts' `page.goto()` + `wait_for_load_state()`
+pair. After the page settles it collects Navigation Timing, FCP, LCP, CLS,
+INP, total blocking time, transfer bytes and JS heap (PerformanceObserver in
+the page, plus CDP `Performance.getMetrics` on Chromium), and makes that the
+current route's metrics, tagged with the network profile in use
+(harness/network.py). The scripts' record helpers attach `current()` to
+every result as `"metrics"`, so each run doubles as a perf dataset.
+
+Notes on the numbers:
+  - CLS is the plain sum of layout shifts without recent input (no session
+    windows), INP is the slowest interaction seen so far on the page
+  - TBT is the sum of long-task time over 50ms since navigation start
+  - times are milliseconds from navigation start, sizes are bytes
+  - the CDP counters (*Count, *Duration) are cumulative per renderer, so
+    `observe()` enables them once per page and each collect reports the
+    difference from the previous snapshot; for `goto()` that is the
+    navigation itself. A page that was never observed gets the gauges only
+  - `current()` only hands out metrics while their page is still on that
+    route, so results recorded after moving on don't inherit them
+"""
+
+import time
+import weakref
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+from harness import network
+from harness.console import log
+
+OBSERVERS_JS = """
+(() => {
+  if (window.__perf) return;
+  const perf = window.__perf = { fcp: null, lcp: null, cls: 0, inp: null, tbt: 0 };
+  const observe = (type, onEntry, options) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(onEntry))
+        .observe({ type, buffered: true, ...options });
+    } catch (e) {}
+  };
+  observe('paint', e => { if (e.name === 'first-contentful-paint') perf.fcp = e.startTime; });
+  observe('largest-contentful-paint', e => { perf.lcp = e.renderTime || e.loadTime || e.startTime; });
+  observe('layout-shift', e => { if (!e.hadRecentInput) perf.cls += e.value; });
+  observe('longtask', e => { perf.tbt += Math.max(0, e.duration - 50); });
+  observe('event', e => { if (e.interactionId) perf.inp = Math.max(perf.inp || 0, e.duration); },
+          { durationThreshold: 16 });
+})();
+"""
+
+COLLECT_JS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  const resources = performance.getEntriesByType('resource');
+  const p = window.__perf || {};
+  const ms = v => (v == null ? null : Math.round(v * 10) / 10);
+  return {
+    route: location.pathname,
+    ttfb: nav ? ms(nav.responseStart - nav.startTime) : null,
+    dom_content_loaded: nav ? ms(nav.domContentLoadedEventEnd - nav.startTime) : null,
+    load: nav ? ms(nav.loadEventEnd - nav.startTime) : null,
+    fcp: ms(p.fcp),
+    lcp: ms(p.lcp),
+    cls: p.cls == null ? null : Math.round(p.cls * 10000) / 10000,
+    inp: ms(p.inp),
+    tbt: ms(p.tbt),
+    transfer_bytes: (nav ? nav.transferSize : 0) + resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+    resource_count: resources.length,
+    js_heap_used: performance.memory ? performance.memory.usedJSHeapSize : null,
+  };
+}
+"""
+
+# Subset of CDP Performance.getMetrics worth keeping per navigation: gauges are
+# reported as they are, counters as the difference since the last snapshot
+CDP_GAUGES = ("JSHeapUsedSize", "JSHeapTotalSize", "Nodes", "JSEventListeners", "Documents")
+CDP_COUNTERS = (
+    "LayoutCount", "RecalcStyleCount", "LayoutDuration", "RecalcStyleDuration",
+    "ScriptDuration", "TaskDuration",
+)
+CDP_METRICS = CDP_GAUGES + CDP_COUNTERS
+
+# (metrics, page) of the route the current test/task is on (per asyncio task)
+_current = ContextVar("perf_metrics", default=None)
+
+# Pages that already have the observers installed
+_observed = weakref.WeakSet()
+
+# page -> [CDP session with Performance enabled, last getMetrics snapshot]
+_sessions = weakref.WeakKeyDictionary()
+
+# Benchmarks turn off the per-navigation log line
+verbose = True
+
+
+def current():
+    """Metrics of the most recent navigation in this test, or None once its page has left that route"""
+    entry = _current.get()
+    if not entry:
+        return None
+    metrics, page = entry
+    page = page()
+    if page is None or page.is_closed() or urlparse(page.url).path != metrics["route"]:
+        return None
+    return metrics
+
+
+def reset():
+    """Forget the current route, e.g. between tests in a reused worker"""
+    _current.set(None)
+
+
+def _finish(page, metrics: dict, cdp: dict) -> dict:
+    metrics["captured_at"] = round(time.time(), 3)
+    metrics["network"] = network.active()
+    if cdp:
+        metrics["cdp"] = cdp
+        metrics["js_heap_used"] = cdp.get("JSHeapUsedSize", metrics["js_heap_used"])
+    _current.set((metrics, weakref.ref(page)))
+    if verbose:
+        log(f"Perf {metrics['route']} [{metrics['network']}]: TTFB {metrics['ttfb']}ms | LCP {metrics['lcp']}ms | "
+            f"CLS {metrics['cls']} | TBT {metrics['tbt']}ms | {metrics['transfer_bytes'] / 1024:.0f} KiB")
+    return metrics
+
+
+def _snapshot(raw: list) -> dict:
+    return {m["name"]: m["value"] for m in raw if m["name"] in CDP_METRICS}
+
+
+def _since(before: dict, after: dict) -> dict:
+    """Gauges from `after`, counters as after - before (None: no baseline, gauges only)"""
+    metrics = {name: after[name] for name in CDP_GAUGES if name in after}
+    if before is not None:
+        for name in CDP_COUNTERS:
+            if name in after:
+                # A cross-process navigation starts a renderer with fresh counters
+                value = after[name] - before.get(name, 0)
+                metrics[name] = value if value >= 0 else after[name]
+    return metrics
+
+
+def _enable(page):
+    """Keep a CDP session with Performance enabled on `page` (no-op off Chromium)"""
+    if page in _sessions:
+        return
+    try:
+        session = page.context.new_cdp_session(page)
+        session.send("Performance.enable")
+        _sessions[page] = [session, _snapshot(session.send("Performance.getMetrics")["metrics"])]
+    except Exception:
+        _sessions[page] = None  # not Chromium
+
+
+def _cdp_metrics(page) -> dict:
+    if page not in _sessions:
+        # Not observed: enabling now would count from now, so only the gauges mean anything
+        _enable(page)
+        entry = _sessions[page]
+        return _since(None, entry[1]) if entry else {}
+    entry = _sessions[page]
+    if not entry:
+        return {}
+    after = _snapshot(entry[0].send("Performance.getMetrics")["metrics"])
+    metrics = _since(entry[1], after)
+    entry[1] = after
+    return metrics
+
+
+def _mark(page):
+    """Start the CDP counters' window here, e.g. right before a navigation"""
+    entry = _sessions.get(page)
+    if entry:
+        entry[1] = _snapshot(entry[0].send("Performance.getMetrics")["metrics"])
+
+
+def collect(page) -> dict:
+    """Snapshot the page's load metrics and make them the current route's"""
+    return _finish(page, page.evaluate(COLLECT_JS), _cdp_metrics(page))
+
+
+def observe(page):
+    """Install the PerformanceObservers for this page's future navigations"""
+    if page not in _observed:
+        page.add_init_script(OBSERVERS_JS)
+        _observed.add(page)
+    _enable(page)
+
+
+def goto(page, url: str, wait_until: str = "networkidle", **kwargs):
+    """page.goto() that waits for the page to settle and records its metrics"""
+    observe(page)
+    _mark(page)
+    response = page.goto(url, **kwargs)
+    page.wait_for_load_state(wait_until)
+    collect(page)
+    return response
+
+
+async def _enable_async(page):
+    if page in _sessions:
+        return
+    try:
+        session = await page.context.new_cdp_session(page)
+        await session.send("Performance.enable")
+        _sessions[page] = [session, _snapshot((await session.send("Performance.getMetrics"))["metrics"])]
+    except Exception:
+        _sessions[page] = None
+
+
+async def _cdp_metrics_async(page) -> dict:
+    if page not in _sessions:
+        await _enable_async(page)
+        entry = _sessions[page]
+        return _since(None, entry[1]) if entry else {}
+    entry = _sessions[page]
+    if not entry:
+        return {}
+    after = _snapshot((await entry[0].send("Performance.getMetrics"))["metrics"])
+    metrics = _since(entry[1], after)
+    entry[1] = after
+    return metrics
+
+
+async def _mark_async(page):
+    entry = _sessions.get(page)
+    if entry:
+        entry[1] = _snapshot((await entry[0].send("Performance.getMetrics"))["metrics"])
+
+
+async def collect_async(page) -> dict:
+    return _finish(page, await page.evaluate(COLLECT_JS), await _cdp_metrics_async(page))
+
+
+async def observe_async(page):
+    if page not in _observed:
+        await page.add_init_script(OBSERVERS_JS)
+        _observed.add(page)
+    await _enable_async(page)
+
+
+async def goto_async(page, url: str, wait_until: str = "networkidle", **kwargs):
+    await observe_async(page)
+    await _mark_async(page)
+    response = await page.goto(url, **kwargs)
+    await page.wait_for_load_state(wait_until)
+    await collect_async(page)
+    return response
+
+
+def print_report(results: list):
+    """Per-route table built from the metrics attached to results"""
+    routes = {}
+    for r in results:
+        metrics = r.get("metrics")
+        if metrics:
+            routes.setdefault(metrics["route"], []).append(metrics)
+    if not routes:
+        return
+
+    def median(values):
+        values = sorted(v for v in values if v is not None)
+        return values[len(values) // 2] if values else None
+
+    def fmt(value, unit=""):
+        return "-" if value is None else f"{value:.0f}{unit}" if isinstance(value, float) else f"{value}{unit}"
+
+    print(f"\nPAGE PERFORMANCE (median per route, network: {network.active()})")
+    print(f"  {'Route':<28} {'TTFB':>8} {'LCP':>8} {'CLS':>7} {'TBT':>7} {'KiB':>7} {'Heap MB':>8}")
+    for route, samples in sorted(routes.items()):
+        # One sample per navigation, not per result that shares it
+        unique = list({m["captured_at"]: m for m in samples}.values())
+        heap = median([m["js_heap_used"] for m in unique])
+        cls = median([m["cls"] for m in unique])
+        print(f"  {route:<28} {fmt(median([m['ttfb'] for m in unique]), 'ms'):>8} "
+              f"{fmt(median([m['lcp'] for m in unique]), 'ms'):>8} "
+              f"{'-' if cls is None else f'{cls:.3f}':>7} "
+              f"{fmt(median([m['tbt'] for m in unique]), 'ms'):>7} "
+              f"{median([m['transfer_bytes'] for m in unique]) / 1024:>7.0f} "
+              f"{'-' if heap is None else f'{heap / 1048576:.1f}':>8}")
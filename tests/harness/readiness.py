@@ -0,0 +1,289 @@
+"""
+Event-driven readiness waits for the Python Playwright scripts.
+
+Replaces fixed `time.sleep()` hydration waits with waits on concrete signals:
+  - React hydration of a marker element
+  - network quiescence, counting only app (same-origin) and Supabase requests
+  - the invite dialog / dropdown menu being open (or gone) with animations done
+  - layout settling after a viewport change
+
+Request counting is done in the page by an init script that wraps fetch and
+XMLHttpRequest, so `install()` must run on the context (or page) before the
+navigation you want to wait on. Each wait times out on its own condition with
+a message saying which one, and logs how long it took.
+
+Every wait has an `_async` twin taking a `playwright.async_api` page, for the
+asyncio execution mode (see harness/async_runner.py).
+
+Configuration:
+  NEXT_PUBLIC_SUPABASE_URL  - used to recognise Supabase requests; without it
+                              *.supabase.co / *.supabase.in and :54321 match
+"""
+
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from harness.console import log
+from harness.spans import span
+
+SUPABASE_HOST = urlparse(os.environ.get("NEXT_PUBLIC_SUPABASE_URL", "")).netloc
+
+DEFAULT_TIMEOUT = 10000
+
+# Benchmarks turn this off; the timings list is kept either way
+verbose = True
+
+# (label, seconds) for every wait in this process, in order
+timings = []
+
+INIT_SCRIPT = """
+(() => {
+  if (window.__harness) return;
+  const state = window.__harness = { app: 0, supabase: 0, lastActivity: performance.now() };
+  const supabaseHost = %s;
+  const classify = (url) => {
+    try {
+      const u = new URL(url, location.href);
+      if (supabaseHost ? u.host === supabaseHost : /supabase\\.(co|in)$|:54321$/.test(u.host)) return 'supabase';
+      return u.origin === location.origin ? 'app' : null;
+    } catch (e) {
+      return null;
+    }
+  };
+  const begin = (kind) => { if (kind) { state[kind]++; state.lastActivity = performance.now(); } };
+  const end = (kind) => { if (kind) { state[kind]--; state.lastActivity = performance.now(); } };
+
+  const fetch = window.fetch;
+  window.fetch = function (input) {
+    const kind = classify(input instanceof Request ? input.url : String(input));
+    begin(kind);
+    return fetch.apply(this, arguments).finally(() => end(kind));
+  };
+
+  const open = XMLHttpRequest.prototype.open;
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.open = function (method, url) {
+    this.__harnessKind = classify(url);
+    return open.apply(this, arguments);
+  };
+  XMLHttpRequest.prototype.send = function () {
+    const kind = this.__harnessKind;
+    begin(kind);
+    this.addEventListener('loadend', () => end(kind), { once: true });
+    return send.apply(this, arguments);
+  };
+})();
+""" % json.dumps(SUPABASE_HOST)
+
+# React attaches a __reactFiber$<id> property to every DOM node it hydrates
+HYDRATED_JS = """
+(selector) => {
+  const el = document.querySelector(selector);
+  return !!el && (el.hasAttribute('data-hydrated') || Object.keys(el).some(k => k.startsWith('__reactFiber$')));
+}
+"""
+
+NETWORK_IDLE_JS = """
+([idleMs, kinds]) => {
+  const s = window.__harness;
+  if (!s) return document.readyState === 'complete';
+  return kinds.every(k => s[k] === 0) && performance.now() - s.lastActivity >= idleMs;
+}
+"""
+
+# Finite animations only: spinners and skeleton pulses run forever
+ANIMATIONS_DONE_JS = """
+(selector) => {
+  const root = selector ? document.querySelector(selector) : document;
+  if (!root) return false;
+  const animations = root.getAnimations ? root.getAnimations({ subtree: true }) : document.getAnimations();
+  return animations.every(a => a.playState !== 'running' || a.effect.getComputedTiming().endTime === Infinity);
+}
+"""
+
+LAYOUT_SETTLED_JS = """
+() => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(() => resolve(
+  document.getAnimations().every(a => a.playState !== 'running' || a.effect.getComputedTiming().endTime === Infinity)
+))))
+"""
+
+DIALOG_SELECTOR = "[role=dialog]"
+# components/ui/dropdown-menu.tsx renders its content only while open, as a
+# plain positioned div inside the trigger's wrapper (no role=menu/data-state)
+MENU_SELECTOR = "div.relative.inline-block > div.absolute.z-50"
+# It closes on a mousedown outside the wrapper, not on Escape
+CLOSE_MENU_JS = "() => document.body.dispatchEvent(new MouseEvent('mousedown', { bubbles: true }))"
+
+
+def install(target):
+    """Add the request-tracking init script to a context or page"""
+    target.add_init_script(INIT_SCRIPT)
+
+
+def _done(label: str, started: float):
+    elapsed = time.perf_counter() - started
+    timings.append((label, elapsed))
+    if verbose:
+        log(f"Ready: {label} ({elapsed * 1000:.0f}ms)")
+
+
+def _timed(label: str, wait, timeout: int):
+    started = time.perf_counter()
+    try:
+        with span(label, kind="wait"):
+            wait()
+    except PlaywrightTimeoutError:
+        raise PlaywrightTimeoutError(f"Timed out after {timeout}ms waiting for {label}")
+    _done(label, started)
+
+
+async def _timed_async(label: str, wait, timeout: int):
+    started = time.perf_counter()
+    try:
+        with span(label, kind="wait"):
+            await wait()
+    except PlaywrightTimeoutError:
+        raise PlaywrightTimeoutError(f"Timed out after {timeout}ms waiting for {label}")
+    _done(label, started)
+
+
+def wait_for_hydration(page, selector: str = "body", timeout: int = DEFAULT_TIMEOUT):
+    """Wait until React has hydrated the element matching `selector`"""
+    _timed(f"hydration of {selector}",
+           lambda: page.wait_for_function(HYDRATED_JS, arg=selector, timeout=timeout, polling=50),
+           timeout)
+
+
+def wait_for_network_idle(page, idle_ms: int = 250, timeout: int = DEFAULT_TIMEOUT):
+    """Wait until no app or Supabase request has been in flight for `idle_ms`"""
+    _timed("network idle",
+           lambda: page.wait_for_function(NETWORK_IDLE_JS, arg=[idle_ms, ["app", "supabase"]],
+                                          timeout=timeout, polling=50),
+           timeout)
+
+
+def wait_for_supabase_idle(page, timeout: int = DEFAULT_TIMEOUT):
+    """Wait until no Supabase fetch is in flight"""
+    _timed("Supabase idle",
+           lambda: page.wait_for_function(NETWORK_IDLE_JS, arg=[0, ["supabase"]], timeout=timeout, polling=50),
+           timeout)
+
+
+def wait_for_animations(page, selector: str = None, timeout: int = DEFAULT_TIMEOUT):
+    """Wait for finite CSS animations/transitions under `selector` to finish"""
+    _timed(f"animations in {selector or 'document'}",
+           lambda: page.wait_for_function(ANIMATIONS_DONE_JS, arg=selector, timeout=timeout, polling="raf"),
+           timeout)
+
+
+def wait_for_page_ready(page, selector: str = "body", timeout: int = DEFAULT_TIMEOUT):
+    """Hydrated and network-quiet: what the old `time.sleep(2)` was hoping for"""
+    wait_for_hydration(page, selector, timeout)
+    wait_for_network_idle(page, timeout=timeout)
+
+
+def wait_for_dialog_open(page, selector: str = DIALOG_SELECTOR, timeout: int = DEFAULT_TIMEOUT):
+    """Wait for a dialog to be visible with its enter animation finished"""
+    _timed("dialog open", lambda: page.wait_for_selector(selector, state="visible", timeout=timeout), timeout)
+    wait_for_animations(page, selector, timeout)
+
+
+def wait_for_dialog_closed(page, selector: str = DIALOG_SELECTOR, timeout: int = DEFAULT_TIMEOUT):
+    """Wait for a dialog to be hidden or removed"""
+    _timed("dialog closed", lambda: page.wait_for_selector(selector, state="hidden", timeout=timeout), timeout)
+
+
+def wait_for_menu_open(page, timeout: int = DEFAULT_TIMEOUT):
+    """Wait for a dropdown menu's content to render and finish animating"""
+    wait_for_dialog_open(page, MENU_SELECTOR, timeout)
+
+
+def wait_for_menu_closed(page, timeout: int = DEFAULT_TIMEOUT):
+    """Wait for the open dropdown menu to go away"""
+    _timed("menu closed", lambda: page.wait_for_selector(MENU_SELECTOR, state="hidden", timeout=timeout), timeout)
+
+
+def close_menu(page, timeout: int = DEFAULT_TIMEOUT):
+    """Close the open dropdown menu the way a click elsewhere does, and wait for it to go"""
+    page.evaluate(CLOSE_MENU_JS)
+    wait_for_menu_closed(page, timeout)
+
+
+def wait_for_layout_settled(page, timeout: int = DEFAULT_TIMEOUT):
+    """Two animation frames and no running transitions, e.g. after a resize"""
+    _timed("layout settled",
+           lambda: page.wait_for_function(LAYOUT_SETTLED_JS, timeout=timeout, polling="raf"),
+           timeout)
+
+
+# asyncio twins of the waits above
+
+async def install_async(target):
+    await target.add_init_script(INIT_SCRIPT)
+
+
+async def wait_for_hydration_async(page, selector: str = "body", timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async(f"hydration of {selector}",
+                       lambda: page.wait_for_function(HYDRATED_JS, arg=selector, timeout=timeout, polling=50),
+                       timeout)
+
+
+async def wait_for_network_idle_async(page, idle_ms: int = 250, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("network idle",
+                       lambda: page.wait_for_function(NETWORK_IDLE_JS, arg=[idle_ms, ["app", "supabase"]],
+                                                      timeout=timeout, polling=50),
+                       timeout)
+
+
+async def wait_for_supabase_idle_async(page, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("Supabase idle",
+                       lambda: page.wait_for_function(NETWORK_IDLE_JS, arg=[0, ["supabase"]],
+                                                      timeout=timeout, polling=50),
+                       timeout)
+
+
+async def wait_for_animations_async(page, selector: str = None, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async(f"animations in {selector or 'document'}",
+                       lambda: page.wait_for_function(ANIMATIONS_DONE_JS, arg=selector, timeout=timeout,
+                                                      polling="raf"),
+                       timeout)
+
+
+async def wait_for_page_ready_async(page, selector: str = "body", timeout: int = DEFAULT_TIMEOUT):
+    await wait_for_hydration_async(page, selector, timeout)
+    await wait_for_network_idle_async(page, timeout=timeout)
+
+
+async def wait_for_dialog_open_async(page, selector: str = DIALOG_SELECTOR, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("dialog open",
+                       lambda: page.wait_for_selector(selector, state="visible", timeout=timeout), timeout)
+    await wait_for_animations_async(page, selector, timeout)
+
+
+async def wait_for_dialog_closed_async(page, selector: str = DIALOG_SELECTOR, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("dialog closed",
+                       lambda: page.wait_for_selector(selector, state="hidden", timeout=timeout), timeout)
+
+
+async def wait_for_menu_open_async(page, timeout: int = DEFAULT_TIMEOUT):
+    await wait_for_dialog_open_async(page, MENU_SELECTOR, timeout)
+
+
+async def wait_for_menu_closed_async(page, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("menu closed",
+                       lambda: page.wait_for_selector(MENU_SELECTOR, state="hidden", timeout=timeout), timeout)
+
+
+async def close_menu_async(page, timeout: int = DEFAULT_TIMEOUT):
+    await page.evaluate(CLOSE_MENU_JS)
+    await wait_for_menu_closed_async(page, timeout)
+
+
+async def wait_for_layout_settled_async(page, timeout: int = DEFAULT_TIMEOUT):
+    await _timed_async("layout settled",
+                       lambda: page.wait_for_function(LAYOUT_SETTLED_JS, timeout=timeout, polling="raf"),
+                       timeout)
@@ -0,0 +1,435 @@
+"""
+Record / replay of the browser's Supabase traffic.
+
+`--record NAME` passively captures every Supabase REST, auth, storage and
+functions request/response a run makes (plus realtime websocket frames, for
+reference) into a HAR-like JSONL store. `--replay NAME` answers those requests
+from the store through `context.route`, so the browser side of a run no longer
+depends on the network or on the state of the project's data.
+
+Auth (/auth/v1) is neither recorded nor replayed: sign-in and token refreshes
+always go to the live project. The Next.js server verifies the session cookie
+with supabase.auth.getUser(), outside any route handler, so a replayed token
+would send every page back to /login.
+
+Requests are matched on method + path + sorted query + normalised body (JSON
+with sorted keys; passwords, tokens and timestamps blanked). Cache busters and
+signed-URL tokens are dropped from the query, and date-times in its filters
+(created_at=gte.<now - 7 days>) are blanked, so a recording still matches on
+a later day. Each context
+replays a key's recorded responses in order and repeats the last one, so a
+list fetched before and after a mutation comes back as it did when recorded.
+Unrecorded requests get a 404 and are counted as misses.
+
+Replay latency (HARNESS_REPLAY_LATENCY):
+  0          - answer immediately: front-end cost with the backend removed
+  <ms>       - a fixed delay on every response
+  recorded   - the latency each response had when it was recorded
+
+Recordings hold no usable credentials: auth responses aren't stored, access
+and refresh tokens elsewhere in response bodies and realtime frames are
+redacted (a JWT keeps its header and claims and loses its signature), and
+cache busters and signed-URL tokens are dropped from the stored URLs.
+
+Realtime is stubbed: channel joins and heartbeats are acknowledged, no server
+events are pushed. Only browser-originated traffic is covered - requests the
+Next.js server makes to Supabase (server components, middleware) still go out.
+
+The mode lives in environment variables so parallel worker processes inherit
+it; the scripts set them from their flags via `configure()`.
+
+Configuration:
+  HARNESS_RECORD / HARNESS_REPLAY  - recording name (set by --record / --replay)
+  HARNESS_REPLAY_LATENCY           - see above (default 0)
+  HAR_DIR                          - where recordings live (default /tmp/stockzip-har)
+"""
+
+import asyncio
+import base64
+import fcntl
+import json
+import os
+import re
+import time
+import weakref
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from harness.console import log
+from harness.readiness import SUPABASE_HOST
+
+HAR_DIR = os.environ.get("HAR_DIR", "/tmp/stockzip-har")
+
+# Body fields that differ between runs (or must not be stored in clear)
+VOLATILE_FIELDS = {"password", "refresh_token", "access_token", "created_at", "updated_at", "code_verifier"}
+
+# Query parameters that differ on every request: cache busters, signed-URL tokens
+VOLATILE_PARAMS = {"_", "t", "ts", "timestamp", "cb", "cachebust", "cache_bust", "nocache", "token"}
+
+# ISO-8601 date-times in query values, e.g. created_at=gte.2024-05-01T10:00:00.000Z
+TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+# Credentials in recorded response bodies and realtime frames
+TOKEN_FIELDS = {"access_token", "refresh_token", "provider_token", "provider_refresh_token"}
+REDACTED = "redacted"
+
+# Decoded bodies are replayed, so these no longer describe them
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+REALTIME_PATTERN = re.compile(r"/realtime/v1/websocket")
+AUTH_PATTERN = re.compile(r"^/auth/v1/")
+
+_stats = {"recorded": 0, "served": 0, "misses": 0}
+_missed = set()
+_store_cache = {}
+_cursors = weakref.WeakKeyDictionary()
+
+
+def configure(record: str = None, replay: str = None, latency: str = None):
+    """Set the mode for this process and any worker processes it spawns
+
+    Starting a recording replaces an earlier one of the same name.
+    """
+    if record and replay:
+        raise ValueError("--record and --replay are mutually exclusive")
+    if record and os.path.exists(store_path(record)):
+        os.remove(store_path(record))
+    for var, value in (("HARNESS_RECORD", record), ("HARNESS_REPLAY", replay), ("HARNESS_REPLAY_LATENCY", latency)):
+        if value is not None:
+            os.environ[var] = str(value)
+
+
+def mode() -> tuple:
+    """("record" | "replay" | None, recording name)"""
+    if os.environ.get("HARNESS_RECORD"):
+        return "record", os.environ["HARNESS_RECORD"]
+    if os.environ.get("HARNESS_REPLAY"):
+        return "replay", os.environ["HARNESS_REPLAY"]
+    return None, None
+
+
+def store_path(name: str) -> str:
+    return os.path.join(HAR_DIR, f"{name}.har.jsonl")
+
+
+def is_supabase(url: str) -> bool:
+    host = urlparse(url).netloc
+    if SUPABASE_HOST:
+        return host == SUPABASE_HOST
+    return bool(re.search(r"supabase\.(co|in)$|:54321$", host))
+
+
+def is_replayed(url: str) -> bool:
+    """Supabase traffic that is recorded and replayed: everything but auth"""
+    return is_supabase(url) and not AUTH_PATTERN.search(urlparse(url).path)
+
+
+def strip_params(url: str) -> str:
+    """`url` without its volatile query parameters, for storing"""
+    parsed = urlparse(url)
+    fields = parse_qsl(parsed.query, keep_blank_values=True)
+    return parsed._replace(query=urlencode([(k, v) for k, v in fields if k not in VOLATILE_PARAMS])).geturl()
+
+
+def _scrub(value):
+    if isinstance(value, dict):
+        return {k: "*" if k in VOLATILE_FIELDS else _scrub(v) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    return value
+
+
+def normalize_body(body: str) -> str:
+    """Canonical form of a request body for matching (and storing)"""
+    if not body:
+        return ""
+    try:
+        return json.dumps(_scrub(json.loads(body)), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        fields = parse_qsl(body, keep_blank_values=True)
+        if fields and "=" in body:
+            return urlencode(sorted((k, "*" if k in VOLATILE_FIELDS else v) for k, v in fields))
+        return body
+
+
+def normalize_query(query: str) -> str:
+    """Sorted query without volatile parameters, date-times blanked"""
+    fields = parse_qsl(query, keep_blank_values=True)
+    return urlencode(sorted((k, TIMESTAMP_PATTERN.sub("*", v)) for k, v in fields if k not in VOLATILE_PARAMS))
+
+
+def request_key(method: str, url: str, body: str) -> str:
+    parsed = urlparse(url)
+    query = normalize_query(parsed.query)
+    return f"{method.upper()} {parsed.path}{'?' + query if query else ''} {normalize_body(body)}".rstrip()
+
+
+def _redact(value):
+    """A token's stored stand-in; a JWT keeps its header and claims"""
+    parts = value.split(".") if isinstance(value, str) else []
+    return f"{parts[0]}.{parts[1]}.{REDACTED}" if len(parts) == 3 else REDACTED
+
+
+def _scrub_tokens(value):
+    if isinstance(value, dict):
+        return {k: _redact(v) if k in TOKEN_FIELDS and v else _scrub_tokens(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub_tokens(v) for v in value]
+    return value
+
+
+def scrub_tokens(text: str) -> str:
+    """A JSON body or frame with its access / refresh tokens redacted; other text as is"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    scrubbed = _scrub_tokens(data)
+    return text if scrubbed == data else json.dumps(scrubbed)
+
+
+def _append(name: str, entry: dict):
+    """Append one entry; a file lock keeps parallel workers' lines whole"""
+    os.makedirs(HAR_DIR, exist_ok=True)
+    with open(store_path(name), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(json.dumps(entry) + "\n")
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    _stats["recorded"] += 1
+
+
+def load_store(name: str) -> dict:
+    """{key: [entries in recorded order]}"""
+    if name not in _store_cache:
+        entries = {}
+        path = store_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recording '{name}' at {path} - run with --record {name} first")
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if "key" in entry:
+                    # Re-keyed on load, so recordings follow changes to request_key
+                    request = entry["request"]
+                    body = (request.get("postData") or {}).get("text", "")
+                    key = request_key(request["method"], request["url"], body)
+                    entries.setdefault(key, []).append(entry)
+        _store_cache[name] = entries
+    return _store_cache[name]
+
+
+def _entry(request, response, body: bytes) -> dict:
+    post_data = request.post_data or ""
+    try:
+        text, encoding = scrub_tokens(body.decode("utf-8")), None
+    except UnicodeDecodeError:
+        text, encoding = base64.b64encode(body).decode("ascii"), "base64"
+    timing = request.timing or {}
+    elapsed = timing.get("responseEnd", -1)
+    content = {"mimeType": response.headers.get("content-type", ""), "size": len(body), "text": text}
+    if encoding:
+        content["encoding"] = encoding
+    return {
+        "key": request_key(request.method, request.url, post_data),
+        "startedDateTime": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "time": round(elapsed, 1) if elapsed >= 0 else None,
+        "request": {"method": request.method, "url": strip_params(request.url),
+                    "postData": {"text": normalize_body(post_data)} if post_data else None},
+        "response": {"status": response.status, "statusText": response.status_text,
+                     "headers": [{"name": k, "value": v} for k, v in response.headers.items()
+                                 if k.lower() not in DROP_HEADERS],
+                     "content": content},
+    }
+
+
+def _websocket_entry(ws, frames: list) -> dict:
+    return {"websocket": {"url": ws.url, "frames": frames}, "startedDateTime": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def _fulfill_args(entry: dict) -> dict:
+    response = entry["response"]
+    content = response["content"]
+    body = base64.b64decode(content["text"]) if content.get("encoding") == "base64" else content["text"].encode()
+    return {"status": response["status"], "headers": {h["name"]: h["value"] for h in response["headers"]},
+            "body": body}
+
+
+def _delay_ms(entry: dict) -> float:
+    latency = os.environ.get("HARNESS_REPLAY_LATENCY", "0")
+    if latency == "recorded":
+        return entry.get("time") or 0
+    return float(latency)
+
+
+class _Cursor:
+    """Per-context position in each key's recorded responses"""
+
+    def __init__(self, store: dict):
+        self.store = store
+        self.positions = {}
+
+    def next(self, key: str):
+        entries = self.store.get(key)
+        if not entries:
+            _stats["misses"] += 1
+            if key not in _missed:
+                _missed.add(key)
+                log(f"Replay miss: {key[:160]}", "WARN")
+            return None
+        index = self.positions.get(key, 0)
+        self.positions[key] = index + 1
+        _stats["served"] += 1
+        return entries[min(index, len(entries) - 1)]
+
+
+MISS_RESPONSE = {"status": 404, "content_type": "application/json",
+                 "body": json.dumps({"message": "not in recording", "code": "HARNESS_REPLAY_MISS"})}
+
+
+def _realtime_reply(message: str):
+    """phx_reply for a join/heartbeat, in whichever serializer the client used"""
+    try:
+        msg = json.loads(message)
+    except ValueError:
+        return None
+    if isinstance(msg, list):  # vsn 2.0.0: [join_ref, ref, topic, event, payload]
+        join_ref, ref, topic, event, _ = msg
+        if event in ("phx_join", "heartbeat"):
+            return json.dumps([join_ref, ref, topic, "phx_reply", {"status": "ok", "response": {}}])
+        return None
+    if msg.get("event") in ("phx_join", "heartbeat"):
+        return json.dumps({"topic": msg.get("topic"), "event": "phx_reply", "ref": msg.get("ref"),
+                           "join_ref": msg.get("join_ref"), "payload": {"status": "ok", "response": {}}})
+    return None
+
+
+def attach(context):
+    """Record or replay this context's Supabase traffic, per the current mode"""
+    current, name = mode()
+    if current == "record":
+        _record(context, name)
+    elif current == "replay":
+        _replay(context, name)
+
+
+def _record_websockets(context, name: str):
+    """Keep realtime frames for reference; event registration is sync in both APIs"""
+    def on_websocket(ws):
+        if not REALTIME_PATTERN.search(ws.url):
+            return
+        frames = []
+        ws.on("framesent", lambda payload: frames.append({"type": "send", "data": scrub_tokens(str(payload))}))
+        ws.on("framereceived", lambda payload: frames.append({"type": "receive", "data": scrub_tokens(str(payload))}))
+        ws.on("close", lambda _: _append(name, _websocket_entry(ws, frames)))
+
+    context.on("page", lambda page: page.on("websocket", on_websocket))
+
+
+def _stub_realtime(ws):
+    """Acknowledge joins and heartbeats; WebSocketRoute calls are sync in both APIs"""
+    def on_message(message):
+        reply = _realtime_reply(message)
+        if reply:
+            ws.send(reply)
+    ws.on_message(on_message)
+
+
+def _record(context, name: str):
+    def on_finished(request):
+        if not is_replayed(request.url):
+            return
+        try:
+            response = request.response()
+            if response:
+                _append(name, _entry(request, response, response.body()))
+        except Exception:
+            pass  # context closed before the body could be read
+
+    context.on("requestfinished", on_finished)
+    _record_websockets(context, name)
+
+
+def _replay(context, name: str):
+    cursor = _cursors[context] = _Cursor(load_store(name))
+
+    def handle(route):
+        request = route.request
+        entry = cursor.next(request_key(request.method, request.url, request.post_data or ""))
+        if entry is None:
+            route.fulfill(**MISS_RESPONSE)
+            return
+        delay = _delay_ms(entry)
+        if delay:
+            try:
+                # Yields to Playwright's dispatcher, so other requests keep flowing
+                request.frame.page.wait_for_timeout(delay)
+            except Exception:
+                time.sleep(delay / 1000)
+        route.fulfill(**_fulfill_args(entry))
+
+    context.route(is_replayed, handle)
+    if hasattr(context, "route_web_socket"):  # Playwright 1.48+
+        context.route_web_socket(REALTIME_PATTERN, _stub_realtime)
+
+
+async def attach_async(context):
+    current, name = mode()
+    if current == "record":
+        await _record_async(context, name)
+    elif current == "replay":
+        await _replay_async(context, name)
+
+
+async def _record_async(context, name: str):
+    async def on_finished(request):
+        if not is_replayed(request.url):
+            return
+        try:
+            response = await request.response()
+            if response:
+                _append(name, _entry(request, response, await response.body()))
+        except Exception:
+            pass
+
+    context.on("requestfinished", on_finished)
+    _record_websockets(context, name)
+
+
+async def _replay_async(context, name: str):
+    cursor = _cursors[context] = _Cursor(load_store(name))
+
+    async def handle(route):
+        request = route.request
+        entry = cursor.next(request_key(request.method, request.url, request.post_data or ""))
+        if entry is None:
+            await route.fulfill(**MISS_RESPONSE)
+            return
+        delay = _delay_ms(entry)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        await route.fulfill(**_fulfill_args(entry))
+
+    await context.route(is_replayed, handle)
+    if hasattr(context, "route_web_socket"):
+        await context.route_web_socket(REALTIME_PATTERN, _stub_realtime)
+
+
+def rewind(context):
+    """Replay from the start again, as for a new context (harness/browser_pool.py reuses them)"""
+    cursor = _cursors.get(context)
+    if cursor:
+        cursor.positions.clear()
+
+
+def report() -> dict:
+    """Log what was recorded or served in this process; returns the counts"""
+    current, name = mode()
+    stats = dict(_stats)
+    if current == "record" and stats["recorded"]:
+        log(f"Recorded {stats['recorded']} Supabase exchanges to {store_path(name)}")
+    elif current == "replay":
+        log(f"Replay '{name}': {stats['served']} served, {stats['misses']} misses "
+            f"({len(_missed)} distinct), latency {os.environ.get('HARNESS_REPLAY_LATENCY', '0')}",
+            "WARN" if stats["misses"] else "INFO")
+    return stats
@@ -0,0 +1,343 @@
+"""
+Streaming results store for the Python Playwright scripts.
+
+Every result is written the moment it is recorded, so a crash or Ctrl-C keeps
+everything up to that point:
+
+  <RESULTS_DIR>/results.jsonl   append-only log, the source of truth
+  <RESULTS_DIR>/results.sqlite  index over it for queries (tests/results-cli.py)
+  <RESULTS_DIR>/junit/<run>.xml JUnit export, written when a run ends
+
+A result row carries the run id, script, test id, pass/fail, details, duration,
+the page metrics from harness/perf.py, the network profile it ran under
+(harness/network.py), the screenshots taken for it and any extra fields the
+script attached.
+
+The duration is that of the check that recorded the result: a test function,
+an async task or a benchmark scenario, between `begin_check()` and
+`end_check()` (or inside `with check(name):`). A check usually records several results, so they share its
+duration, which is written to them when the check ends. A benchmark that runs
+all its scenarios before judging them records each scenario's results in a
+check given the time the scenario took (`check(name, duration_ms)`). Results
+recorded outside a check have no duration.
+
+Worker processes share the run through HARNESS_RUN_ID / HARNESS_SCRIPT and
+append to the same files (JSONL under a file lock, SQLite in WAL mode). If the
+index is ever lost or out of date, `rebuild_index()` replays the JSONL.
+
+Configuration:
+  RESULTS_DIR  - where the store lives (default /tmp/stockzip-results)
+"""
+
+import fcntl
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from xml.etree import ElementTree
+
+from harness.console import log
+
+RESULTS_DIR = os.environ.get("RESULTS_DIR", "/tmp/stockzip-results")
+
+# Set before any worker process is spawned so the whole run shares one id
+RUN_ID = os.environ.setdefault("HARNESS_RUN_ID", time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    script      TEXT,
+    started_at  REAL,
+    finished_at REAL,
+    base_url    TEXT,
+    argv        TEXT,
+    passed      INTEGER,
+    failed      INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY,
+    run_id      TEXT NOT NULL,
+    script      TEXT,
+    test_id     TEXT NOT NULL,
+    name        TEXT,
+    passed      INTEGER NOT NULL,
+    details     TEXT,
+    duration_ms REAL,
+    recorded_at REAL,
+    account     TEXT,
+    metrics     TEXT,
+    artifacts   TEXT,
+    extra       TEXT,
+    network     TEXT,
+    check_id    TEXT
+);
+CREATE INDEX IF NOT EXISTS results_test ON results (test_id, recorded_at);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_check ON results (check_id);
+"""
+
+# Columns a script's result dict maps onto directly; anything else goes to `extra`
+_KNOWN = {"id", "name", "passed", "details", "account", "metrics"}
+
+# The current check ({"id", "name", "started"}) and the next result's screenshots (per test / task)
+_check = ContextVar("results_check", default=None)
+_artifacts = ContextVar("results_artifacts", default=None)
+_check_numbers = itertools.count(1)
+
+_db = None
+
+
+def jsonl_path() -> str:
+    return os.path.join(RESULTS_DIR, "results.jsonl")
+
+
+def db_path() -> str:
+    return os.path.join(RESULTS_DIR, "results.sqlite")
+
+
+def connect():
+    """This process's connection to the index, created on first use"""
+    global _db
+    if _db is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        _db = sqlite3.connect(db_path(), timeout=10)
+        _db.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in _db.execute("PRAGMA table_info(results)")}
+        # Stores created before network profiles and check durations existed
+        if columns and "network" not in columns:
+            _db.execute("ALTER TABLE results ADD COLUMN network TEXT")
+        if columns and "check_id" not in columns:
+            _db.execute("ALTER TABLE results ADD COLUMN check_id TEXT")
+        _db.executescript(SCHEMA)
+    return _db
+
+
+def _append(line: dict):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(jsonl_path(), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(json.dumps(line, default=str) + "\n")
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _index_run(db, run: dict):
+    db.execute(
+        "INSERT INTO runs (run_id, script, started_at, base_url, argv) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(run_id) DO NOTHING",
+        (run["run_id"], run["script"], run["started_at"], run.get("base_url"), run.get("argv")),
+    )
+
+
+def _index_run_end(db, run: dict):
+    db.execute("UPDATE runs SET finished_at = ?, passed = ?, failed = ? WHERE run_id = ?",
+               (run["finished_at"], run["passed"], run["failed"], run["run_id"]))
+
+
+def _index_result(db, row: dict):
+    db.execute(
+        "INSERT INTO results (run_id, script, test_id, name, passed, details, duration_ms, recorded_at, "
+        "account, metrics, artifacts, extra, network, check_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (row["run_id"], row["script"], row["test_id"], row["name"], int(bool(row["passed"])), row["details"],
+         row["duration_ms"], row["recorded_at"], row.get("account"),
+         json.dumps(row.get("metrics")) if row.get("metrics") else None,
+         json.dumps(row.get("artifacts") or []),
+         json.dumps(row.get("extra"), default=str) if row.get("extra") else None, row.get("network"),
+         row.get("check_id")),
+    )
+
+
+def _index_check_end(db, check: dict):
+    db.execute("UPDATE results SET duration_ms = ? WHERE check_id = ?", (check["duration_ms"], check["check_id"]))
+
+
+def _write(kind: str, payload: dict, index):
+    """JSONL first (durable), then the index; an index failure only warns"""
+    _append({"type": kind, **payload})
+    try:
+        db = connect()
+        index(db, payload)
+        db.commit()
+    except sqlite3.Error as e:
+        log(f"Results index not updated ({e}); rebuild it with results-cli.py reindex", "WARN")
+
+
+def begin_run(script: str, **meta):
+    """Register this run; call once in the parent process before any results"""
+    os.environ["HARNESS_SCRIPT"] = script
+    mark()
+    _write("run", {"run_id": RUN_ID, "script": script, "started_at": time.time(),
+                   "argv": " ".join(sys.argv[1:]), "network": os.environ.get("NETWORK_PROFILE") or "none",
+                   **meta}, _index_run)
+
+
+def end_run() -> dict:
+    """Close the run (pass/fail counts) and export it as JUnit XML"""
+    db = connect()
+    passed, failed = db.execute(
+        "SELECT COALESCE(SUM(passed), 0), COALESCE(SUM(1 - passed), 0) FROM results WHERE run_id = ?", (RUN_ID,)
+    ).fetchone()
+    run = {"run_id": RUN_ID, "finished_at": time.time(), "passed": passed, "failed": failed}
+    _write("run_end", run, _index_run_end)
+    junit = export_junit(RUN_ID, os.path.join(RESULTS_DIR, "junit", f"{RUN_ID}.xml"))
+    log(f"Results stored under run {RUN_ID} ({passed} passed, {failed} failed), JUnit: {junit}")
+    return run
+
+
+def mark():
+    """Start the screenshot list of the next result"""
+    _artifacts.set([])
+
+
+def begin_check(name: str):
+    """Start a check; the results it records get its duration when `end_check()` runs"""
+    _check.set({"id": f"{RUN_ID}:{os.getpid()}:{next(_check_numbers)}", "name": name, "started": time.time()})
+    mark()
+
+
+def end_check(duration_ms: float = None) -> float:
+    """Close the current check and write its duration (ms) to its results
+
+    `duration_ms` replaces the time since `begin_check()`, for work that was
+    timed before its results were recorded.
+    """
+    check = _check.get()
+    if check is None:
+        return None
+    _check.set(None)
+    if duration_ms is None:
+        duration_ms = round((time.time() - check["started"]) * 1000, 1)
+    _write("check_end", {"run_id": RUN_ID, "check_id": check["id"], "name": check["name"],
+                         "duration_ms": duration_ms}, _index_check_end)
+    return duration_ms
+
+
+@contextmanager
+def check(name: str, duration_ms: float = None):
+    """`with check(name):` runs the block between `begin_check(name)` and `end_check(duration_ms)`"""
+    begin_check(name)
+    try:
+        yield
+    finally:
+        end_check(duration_ms)
+
+
+def attach_artifact(path: str):
+    """Attach a file (e.g. a screenshot) to the next result recorded here"""
+    artifacts = _artifacts.get()
+    if artifacts is None:
+        artifacts = []
+        _artifacts.set(artifacts)
+    artifacts.append(path)
+
+
+def record(entry: dict) -> dict:
+    """Stream one result dict ({"id", "name", "passed", "details", ...}) to the store"""
+    now = time.time()
+    check = _check.get()
+    row = {
+        "run_id": RUN_ID,
+        "script": os.environ.get("HARNESS_SCRIPT", os.path.basename(sys.argv[0])),
+        "test_id": entry["id"],
+        "name": entry.get("name"),
+        "passed": bool(entry.get("passed")),
+        "details": entry.get("details") or "",
+        "duration_ms": None,  # set by end_check()
+        "recorded_at": now,
+        "account": entry.get("account"),
+        "metrics": entry.get("metrics"),
+        "artifacts": list(_artifacts.get() or []),
+        "extra": {k: v for k, v in entry.items() if k not in _KNOWN} or None,
+        # Read from the environment so the results CLI doesn't need Playwright (harness/network.py)
+        "network": os.environ.get("NETWORK_PROFILE") or "none",
+        "check_id": check["id"] if check else None,
+    }
+    _write("result", row, _index_result)
+    mark()
+    return row
+
+
+def recorder(results: list):
+    """The scripts' record(test_id, name, passed, details="", **extra): appends the
+    result to `results`, streams it to the store and logs it"""
+    def record_result(test_id: str, name: str, passed: bool, details: str = "", **extra):
+        entry = {"id": test_id, "name": name, "passed": passed, "details": details, **extra}
+        results.append(entry)
+        record(entry)
+        log(f"{test_id}: {name}" + (f" - {details}" if details else ""), "PASS" if passed else "FAIL")
+    return record_result
+
+
+def rebuild_index() -> int:
+    """Recreate the SQLite index from the JSONL log; returns the result count"""
+    global _db
+    if _db is not None:
+        _db.close()
+        _db = None
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path() + suffix):
+            os.remove(db_path() + suffix)
+    db = connect()
+    count = 0
+    if os.path.exists(jsonl_path()):
+        with open(jsonl_path()) as f:
+            for line in f:
+                line = json.loads(line)
+                kind = line.pop("type")
+                if kind == "run":
+                    _index_run(db, line)
+                elif kind == "run_end":
+                    _index_run_end(db, line)
+                elif kind == "check_end":
+                    _index_check_end(db, line)
+                else:
+                    _index_result(db, line)
+                    count += 1
+    db.commit()
+    return count
+
+
+def export_junit(run_id: str, path: str) -> str:
+    """Write one run as JUnit XML; test ids become `<prefix>.<id>` test cases
+
+    A test case's time is that of the check that recorded it, so the results of
+    one check all show the same time. The suite's time counts each check once.
+    """
+    db = connect()
+    run = db.execute("SELECT script, started_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    rows = db.execute(
+        "SELECT test_id, name, passed, details, duration_ms, account, artifacts, check_id FROM results "
+        "WHERE run_id = ? ORDER BY id", (run_id,)
+    ).fetchall()
+    checks = {r[7]: r[4] or 0 for r in rows if r[7]}
+
+    script = run[0] if run else "stockzip"
+    suite = ElementTree.Element("testsuite", {
+        "name": script,
+        "tests": str(len(rows)),
+        "failures": str(sum(1 for r in rows if not r[2])),
+        "time": f"{sum(checks.values()) / 1000:.3f}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(run[1])) if run else "",
+    })
+    for test_id, name, passed, details, duration_ms, account, artifacts, _ in rows:
+        case = ElementTree.SubElement(suite, "testcase", {
+            "classname": f"{script}.{test_id.split('-')[0]}",
+            "name": f"{test_id}: {name}" + (f" [{account}]" if account else ""),
+            "time": f"{(duration_ms or 0) / 1000:.3f}",
+        })
+        if not passed:
+            ElementTree.SubElement(case, "failure", {"message": details or "failed"}).text = details
+        attached = json.loads(artifacts or "[]")
+        if attached:
+            # Understood by Jenkins / GitLab as attachments
+            ElementTree.SubElement(case, "system-out").text = "\n".join(f"[[ATTACHMENT|{a}]]" for a in attached)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    ElementTree.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+    return path
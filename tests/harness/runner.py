@@ -0,0 +1,176 @@
+"""
+Parallel runner for the Python Playwright suites.
+
+Discovers the `test_*` functions in a suite script, runs each one in its own
+browser context across a pool of worker processes, and merges what each test
+recorded back into the suite's `test_results` list so `print_summary()` works
+unchanged. Workers use the shared browser when one is running and hand out
+pooled contexts (harness/browser_pool.py), so later tests get a warm cache.
+
+A suite can customise the runner with optional module attributes:
+  CONTEXT_OPTIONS  - kwargs passed to `browser.new_context()`
+  new_context      - `new_context(browser, test_name)`, replaces the default
+                     context creation (e.g. to preload a cached session);
+                     contexts it takes from a browser_pool are given back
+  prepare_page     - `prepare_page(page, test_name) -> bool`, brings a fresh
+                     page to the state the test expects (login, navigation)
+
+With impact recording on (harness/impact.py) each test's page is traced and
+the suite's impact map updated at the end of the run; `only` restricts a run
+to the tests impact.select() picked.
+"""
+
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+from playwright.sync_api import sync_playwright
+
+from harness import browser_pool, impact, perf, replay, results, screenshots, spans
+from harness.console import log
+
+# Per-process state of a pool worker (suite module, Playwright, browser)
+_worker = {}
+
+
+def load_suite(path: str):
+    """Import a suite script by path (the scripts have hyphenated names)"""
+    name = "suite_" + os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover_tests(suite) -> list:
+    """Return the suite's test_* function names in definition order"""
+    found = [
+        (inspect.unwrap(fn).__code__.co_firstlineno, name)  # tests may be wrapped in spans
+        for name, fn in vars(suite).items()
+        if name.startswith("test_") and callable(fn) and hasattr(inspect.unwrap(fn), "__code__")
+    ]
+    return [name for _, name in sorted(found)]
+
+
+def parse_shard(value: str) -> tuple:
+    """Parse a `--shard i/n` value into (i, n), 1-based"""
+    try:
+        index, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like 'i/n', got {value!r}")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"shard index must be between 1 and {total}, got {index}")
+    return index, total
+
+
+def select_shard(tests: list, index: int, total: int) -> list:
+    """Round-robin split so every shard gets a similar mix of tests"""
+    return tests[index - 1::total]
+
+
+def _init_worker(suite_path: str, headless: bool):
+    """Pool initializer: one Playwright driver and browser connection per worker process"""
+    playwright = sync_playwright().start()
+    browser = browser_pool.launch(playwright, headless=headless)
+    _worker.update(suite=load_suite(suite_path), playwright=playwright, browser=browser)
+    Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    screenshots.flush()
+    replay.report()
+    spans.flush()
+    browser_pool.close_pools()
+    browser = _worker.pop("browser", None)
+    if browser:
+        browser.close()
+    playwright = _worker.pop("playwright", None)
+    if playwright:
+        playwright.stop()
+
+
+def _run_test(name: str) -> tuple:
+    """Run one test in a clean context, return (name, results, seconds, impact trace or None)"""
+    suite = _worker["suite"]
+    suite.test_results.clear()
+    perf.reset()
+    results.begin_check(name)
+    started = time.perf_counter()
+
+    context = recorder = trace = None
+    try:
+        if hasattr(suite, "new_context"):
+            context = suite.new_context(_worker["browser"], name)
+        else:
+            pool = browser_pool.pool_for(_worker["browser"], getattr(suite, "BASE_URL", None),
+                                         **getattr(suite, "CONTEXT_OPTIONS", {}))
+            context = pool.acquire()
+        page = context.new_page()
+        if impact.enabled():
+            recorder = impact.Recorder(page, getattr(suite, "BASE_URL", ""))
+
+        prepare = getattr(suite, "prepare_page", None)
+        if prepare is None or prepare(page, name):
+            getattr(suite, name)(page)
+        else:
+            suite.record_result(f"SETUP-{name}", f"Setup for {name}", False, "prepare_page failed")
+    except Exception as e:
+        suite.record_result(f"SETUP-{name}", f"Unexpected error in {name}", False, str(e))
+    finally:
+        if recorder:
+            trace = recorder.stop()
+        if context:
+            browser_pool.release(context)
+        results.end_check()
+
+    return name, list(suite.test_results), time.perf_counter() - started, trace
+
+
+def run_parallel(suite, suite_path: str, workers: int = 0, shard: tuple = None, headless: bool = True,
+                 only: list = None):
+    """Run the suite's tests across a process pool and merge into suite.test_results"""
+    tests = discover_tests(suite)
+    if only is not None:
+        tests = [name for name in tests if name in only]
+    if shard:
+        tests = select_shard(tests, *shard)
+        log(f"Shard {shard[0]}/{shard[1]}: {len(tests)} tests")
+    if not tests:
+        log("No tests selected", "WARN")
+        return
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tests)))
+    log(f"Running {len(tests)} tests on {workers} workers")
+
+    outcomes, traces = {}, {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(os.path.abspath(suite_path), headless),
+    ) as pool:
+        futures = [pool.submit(_run_test, name) for name in tests]
+        for future in as_completed(futures):
+            name, recorded, elapsed, trace = future.result()
+            outcomes[name] = (recorded, elapsed)
+            if trace is not None:
+                traces[name] = dict(trace, ids=[r["id"] for r in recorded])
+            log(f"{name} finished in {elapsed:.1f}s")
+    wall = time.perf_counter() - started
+
+    # Merge in discovery order so the summary reads the same as a serial run
+    for name in tests:
+        suite.test_results.extend(outcomes[name][0])
+
+    slowest = max(elapsed for _, elapsed in outcomes.values())
+    total = sum(elapsed for _, elapsed in outcomes.values())
+    log(f"Wall clock {wall:.1f}s | slowest test {slowest:.1f}s | serial sum {total:.1f}s")
+
+    if traces:
+        path = impact.save(suite_path, traces, getattr(suite, "BASE_URL", None))
+        log(f"Impact map for {len(traces)} tests saved to {path}")
@@ -0,0 +1,149 @@
+"""
+Background, content-addressed screenshot writer.
+
+`capture(page, name, directory)` grabs the PNG bytes from Playwright and hands
+them to a writer thread pool, so hashing and disk I/O happen off the test's
+hot path. Files are stored once per content hash under `<directory>/.objects`,
+`<directory>/<name>.png` is a symlink to the object (same path the scripts
+always wrote), and every capture is appended to a per-run manifest:
+
+  <directory>/runs/<run id>/manifest.jsonl   {"name", "sha256", "object", "bytes", "deduped", ...meta}
+
+Call `flush()` before reading the files; it also runs at interpreter exit.
+
+Limits: only hashing and writing leave the test's path. The capture itself
+(Chromium rendering and PNG-encoding the page, Playwright shipping the bytes
+back) is still waited for in both modes, because the screenshot has to show
+the page as it is at that point of the test. Under --async that wait yields
+the event loop, so other checks run meanwhile. `flush()` logs the time spent
+capturing (on the test path) next to the time spent storing (kept off it), so
+each run shows what the pipeline saves.
+
+Configuration:
+  SCREENSHOT_WRITERS  - writer threads (default 4)
+  HARNESS_RUN_ID      - run id shared with worker processes (default: timestamp)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from harness import results
+from harness.console import log
+from harness.results import RUN_ID
+
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("SCREENSHOT_WRITERS", "4")),
+                           thread_name_prefix="screenshot-writer")
+_pending = []
+_manifest_lock = threading.Lock()
+_stats = {"captured": 0, "written": 0, "deduped": 0, "bytes_saved": 0, "capture_ms": 0.0, "store_ms": 0.0}
+
+
+def manifest_path(directory: str) -> str:
+    return os.path.join(directory, "runs", RUN_ID, "manifest.jsonl")
+
+
+def _relink(target: str, link: str):
+    """Point `link` at `target`, replacing whatever was there.
+
+    The new link (or copy) is built under a private temp name and renamed over
+    `link`, which swaps the directory entry itself. Nothing is ever written
+    through `link`, so a symlink another writer just put there can't carry the
+    write into a shared object.
+    """
+    tmp = f"{link}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.symlink(os.path.relpath(target, os.path.dirname(link)), tmp)
+    except OSError:  # filesystems without symlinks
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        shutil.copyfile(target, tmp)
+    os.replace(tmp, link)
+
+
+def _store(data: bytes, name: str, directory: str, meta: dict) -> dict:
+    started = time.perf_counter()
+    digest = hashlib.sha256(data).hexdigest()
+    obj = os.path.join(directory, ".objects", digest[:2], f"{digest}.png")
+    deduped = os.path.exists(obj)
+    if not deduped:
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = f"{obj}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, obj)
+    _relink(obj, os.path.join(directory, f"{name}.png"))
+
+    entry = {"name": name, "sha256": digest, "object": obj, "bytes": len(data), "deduped": deduped, **(meta or {})}
+    with _manifest_lock:
+        _stats["deduped" if deduped else "written"] += 1
+        _stats["store_ms"] += (time.perf_counter() - started) * 1000
+        if deduped:
+            _stats["bytes_saved"] += len(data)
+        path = manifest_path(directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def _submit(data: bytes, started: float, name: str, directory: str, meta: dict) -> str:
+    _stats["captured"] += 1
+    _stats["capture_ms"] += (time.perf_counter() - started) * 1000
+    _pending.append(_pool.submit(_store, data, name, directory, meta))
+    path = os.path.join(directory, f"{name}.png")
+    results.attach_artifact(path)
+    return path
+
+
+def capture(page, name: str, directory: str, full_page: bool = True, meta: dict = None) -> str:
+    """Screenshot `page` and queue it for writing; returns the <name>.png path
+
+    `meta` is stored with the manifest entry (e.g. mask regions for the diff).
+    """
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    return _submit(page.screenshot(full_page=full_page), started, name, directory, meta)
+
+
+async def capture_async(page, name: str, directory: str, full_page: bool = True, meta: dict = None) -> str:
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    return _submit(await page.screenshot(full_page=full_page), started, name, directory, meta)
+
+
+def flush() -> dict:
+    """Wait for queued writes; returns capture/dedupe counts"""
+    done, _ = wait(list(_pending))
+    _pending.clear()
+    for future in done:
+        if future.exception():
+            log(f"Screenshot write failed: {future.exception()}", "WARN")
+    stats = dict(_stats)
+    if stats["captured"]:
+        log(f"Screenshots: {stats['captured']} captured, {stats['written']} written, "
+            f"{stats['deduped']} identical to a stored frame ({stats['bytes_saved'] / 1024:.0f} KiB not rewritten); "
+            f"{stats['capture_ms'] / 1000:.1f}s capturing on the test path, "
+            f"{stats['store_ms'] / 1000:.1f}s hashing and writing off it")
+        _stats.update(captured=0, written=0, deduped=0, bytes_saved=0, capture_ms=0.0, store_ms=0.0)
+    return stats
+
+
+def load_manifest(directory: str, run_id: str = RUN_ID) -> dict:
+    """{name: entry} for a run; the last capture of a name wins"""
+    entries = {}
+    path = os.path.join(directory, "runs", run_id, "manifest.jsonl")
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                entries[entry["name"]] = entry
+    return entries
+
+
+atexit.register(flush)
@@ -0,0 +1,210 @@
+"""
+Authenticated session cache for the Python Playwright scripts.
+
+Logs in once per (BASE_URL, TEST_EMAIL), saves the Playwright storage state to
+disk and injects it into every new context, so workers and scripts don't each
+do the full /login round trip (and don't trip lib/auth-rate-limit.ts when run
+in parallel). A cached session is only replaced when it has expired or the app
+bounces a page back to /login.
+
+The `_async` functions are the same flow for `playwright.async_api` pages.
+
+Configuration:
+  SESSION_CACHE_DIR  - where storage states are kept (default /tmp/stockzip-sessions)
+  SESSION_TTL        - seconds a saved session is trusted (default 3600)
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from harness import perf
+from harness.console import log
+
+SESSION_CACHE_DIR = os.environ.get("SESSION_CACHE_DIR", "/tmp/stockzip-sessions")
+SESSION_TTL = int(os.environ.get("SESSION_TTL", "3600"))
+
+# In-process locks for the asyncio mode, where tasks share one process
+_async_locks = {}
+
+
+def _cache_path(base_url: str, email: str) -> str:
+    key = hashlib.sha256(f"{base_url.rstrip('/')}|{email.lower()}".encode()).hexdigest()[:16]
+    return os.path.join(SESSION_CACHE_DIR, f"{key}.json")
+
+
+@contextmanager
+def _locked(base_url: str, email: str):
+    """Serialise logins across worker processes so only one hits /login"""
+    os.makedirs(SESSION_CACHE_DIR, exist_ok=True)
+    with open(_cache_path(base_url, email) + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@asynccontextmanager
+async def _locked_async(base_url: str, email: str):
+    """_locked() for asyncio: a task lock first, then the file lock off-loop"""
+    key = _cache_path(base_url, email)
+    task_lock = _async_locks.setdefault(key, asyncio.Lock())
+    async with task_lock:
+        os.makedirs(SESSION_CACHE_DIR, exist_ok=True)
+        with open(key + ".lock", "w") as lock:
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_state(base_url: str, email: str):
+    """Return the cached storage state, or None if missing or expired"""
+    try:
+        with open(_cache_path(base_url, email)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - cached.get("saved_at", 0) > SESSION_TTL:
+        return None
+    return cached["storage_state"]
+
+
+def save_state(base_url: str, email: str, state: dict):
+    """Write a storage state to the cache (atomically, workers may be reading)"""
+    os.makedirs(SESSION_CACHE_DIR, exist_ok=True)
+    path = _cache_path(base_url, email)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"base_url": base_url, "email": email, "saved_at": time.time(), "storage_state": state}, f)
+    os.replace(tmp, path)
+
+
+def clear_state(base_url: str, email: str):
+    """Drop a cached session"""
+    try:
+        os.remove(_cache_path(base_url, email))
+    except FileNotFoundError:
+        pass
+
+
+def login(page, base_url: str, email: str, password: str):
+    """Fill in the /login form and wait for the dashboard"""
+    page.goto(f"{base_url}/login")
+    page.wait_for_load_state("networkidle")
+    page.fill("#userEmail", email)
+    page.fill("#userPassword", password)
+    page.click("button[type='submit']")
+    page.wait_for_url("**/dashboard**", timeout=15000)
+    page.wait_for_load_state("networkidle")
+
+
+def ensure_state(browser, base_url: str, email: str, password: str) -> dict:
+    """Return a usable storage state, logging in once if the cache is cold"""
+    state = load_state(base_url, email)
+    if state:
+        return state
+
+    with _locked(base_url, email):
+        # Another worker may have logged in while we waited for the lock
+        state = load_state(base_url, email)
+        if state:
+            return state
+
+        log(f"No cached session for {email} - logging in")
+        started = time.perf_counter()
+        context = browser.new_context()
+        try:
+            login(context.new_page(), base_url, email, password)
+            state = context.storage_state()
+        finally:
+            context.close()
+        save_state(base_url, email, state)
+        log(f"Session cached in {time.perf_counter() - started:.1f}s")
+        return state
+
+
+def new_session_context(browser, base_url: str, email: str, password: str, **options):
+    """New browser context with the cached session preloaded"""
+    state = ensure_state(browser, base_url, email, password)
+    return browser.new_context(storage_state=state, **options)
+
+
+def is_rejected(page) -> bool:
+    """The app redirects unauthenticated requests to /login"""
+    return "/login" in page.url
+
+
+def reauthenticate(page, base_url: str, email: str, password: str):
+    """Log in again on this page and replace the cached session"""
+    with _locked(base_url, email):
+        log(f"Cached session for {email} was rejected - logging in again", "WARN")
+        login(page, base_url, email, password)
+        save_state(base_url, email, page.context.storage_state())
+
+
+def goto_authenticated(page, url: str, base_url: str, email: str, password: str):
+    """perf.goto() that re-authenticates once if the cached session is rejected"""
+    perf.goto(page, url)
+    if is_rejected(page):
+        reauthenticate(page, base_url, email, password)
+        perf.goto(page, url)
+
+
+async def login_async(page, base_url: str, email: str, password: str):
+    await page.goto(f"{base_url}/login")
+    await page.wait_for_load_state("networkidle")
+    await page.fill("#userEmail", email)
+    await page.fill("#userPassword", password)
+    await page.click("button[type='submit']")
+    await page.wait_for_url("**/dashboard**", timeout=15000)
+    await page.wait_for_load_state("networkidle")
+
+
+async def ensure_state_async(browser, base_url: str, email: str, password: str) -> dict:
+    state = load_state(base_url, email)
+    if state:
+        return state
+
+    async with _locked_async(base_url, email):
+        state = load_state(base_url, email)
+        if state:
+            return state
+
+        log(f"No cached session for {email} - logging in")
+        started = time.perf_counter()
+        context = await browser.new_context()
+        try:
+            await login_async(await context.new_page(), base_url, email, password)
+            state = await context.storage_state()
+        finally:
+            await context.close()
+        save_state(base_url, email, state)
+        log(f"Session cached in {time.perf_counter() - started:.1f}s")
+        return state
+
+
+async def new_session_context_async(browser, base_url: str, email: str, password: str, **options):
+    state = await ensure_state_async(browser, base_url, email, password)
+    return await browser.new_context(storage_state=state, **options)
+
+
+async def reauthenticate_async(page, base_url: str, email: str, password: str):
+    async with _locked_async(base_url, email):
+        log(f"Cached session for {email} was rejected - logging in again", "WARN")
+        await login_async(page, base_url, email, password)
+        save_state(base_url, email, await page.context.storage_state())
+
+
+async def goto_authenticated_async(page, url: str, base_url: str, email: str, password: str):
+    await perf.goto_async(page, url)
+    if is_rejected(page):
+        await reauthenticate_async(page, base_url, email, password)
+        await perf.goto_async(page, url)
@@ -0,0 +1,386 @@
+"""
+Nested timing spans with a flame-style report.
+
+`span()` works as a context manager or a decorator (sync or async):
+
+  @span()
+  def test_invite_validation(page): ...
+
+  with span("fill invite form"):
+      ...
+
+With profiling on (`enable()`, or HARNESS_PROFILE=1 so worker processes pick it
+up too), Playwright itself is instrumented: every Page / Locator / Keyboard
+action and `expect()` assertion becomes a leaf span named after the call and
+its selector or URL, readiness waits (harness/readiness.py) become `wait`
+spans, and every new context reports its requests so network time can be
+attributed. A context's requests are only charged to the spans of the task
+(or thread) that opened it or last opened a page on it, so concurrent async
+checks don't take each other's network time. Each span's time is split three
+ways:
+
+  browser  - inside a Playwright call, with no request of the page in flight
+  network  - inside a Playwright call while a request was in flight
+  python   - everything else (the script's own code, screenshots hashing, ...)
+
+Spans are aggregated per call path. Each process writes its tree to
+`<RESULTS_DIR>/spans/<run id>/<pid>.json` on `flush()`; `print_report()` merges
+them, prints the tree and writes a folded-stacks file next to it for
+flamegraph.pl / speedscope. With profiling off, spans cost a ContextVar lookup.
+"""
+
+import functools
+import glob
+import inspect
+import json
+import os
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+from harness.console import log
+from harness.results import RESULTS_DIR, RUN_ID
+
+PAGE_METHODS = (
+    "goto", "reload", "click", "dblclick", "fill", "type", "press", "check", "uncheck", "hover",
+    "select_option", "set_input_files", "wait_for_selector", "wait_for_load_state", "wait_for_url",
+    "wait_for_function", "wait_for_timeout", "evaluate", "screenshot", "set_viewport_size",
+)
+LOCATOR_METHODS = (
+    "click", "dblclick", "fill", "type", "press", "press_sequentially", "check", "uncheck", "hover",
+    "select_option", "set_input_files", "wait_for", "is_visible", "is_enabled", "is_disabled", "is_checked",
+    "inner_text", "text_content", "input_value", "count", "screenshot", "evaluate", "all_text_contents",
+)
+KEYBOARD_METHODS = ("press", "type", "insert_text")
+
+_current = ContextVar("span", default=None)
+# (start, end) wall-clock seconds of the finished requests of the context this task / thread works in
+_network = ContextVar("span_network", default=None)
+_requests = weakref.WeakKeyDictionary()  # context -> its request list
+_roots = []
+_patched = False
+
+
+class Span:
+    __slots__ = ("name", "kind", "start", "end", "children", "network")
+
+    def __init__(self, name: str, kind: str):
+        self.name, self.kind = name, kind
+        self.start, self.end = time.time(), None
+        self.children = []
+        self.network = _network.get()
+
+
+def enabled() -> bool:
+    return _patched
+
+
+class span:
+    """Time a block or a function; nests under whatever span is open"""
+
+    def __init__(self, name: str = None, kind: str = "python"):
+        self.name, self.kind = name, kind
+        self._token = None
+
+    def __enter__(self):
+        self._token = _open(self.name or "span", self.kind)
+        return self
+
+    def __exit__(self, *exc):
+        _close(self._token)
+        self._token = None
+        return False
+
+    def __call__(self, fn):
+        name = self.name or fn.__name__
+        kind = self.kind
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                token = _open(name, kind)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _close(token)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = _open(name, kind)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _close(token)
+        return wrapper
+
+
+def _open(name: str, kind: str):
+    if not _patched:
+        return None
+    parent = _current.get()
+    node = Span(name, kind)
+    (parent.children if parent else _roots).append(node)
+    return _current.set(node)
+
+
+def _close(token):
+    if token is None:
+        return
+    _current.get().end = time.time()
+    _current.reset(token)
+
+
+def _label(obj, method: str, args: tuple) -> str:
+    """e.g. page.goto(/settings/team), locator.click(button:has-text('Invite'))"""
+    owner = type(obj).__name__.lower()
+    impl = getattr(obj, "_impl_obj", None)
+    detail = ""
+    if method.startswith(("to_", "not_to_")):
+        owner = "expect"
+        actual = getattr(impl, "_actual_locator", None)
+        detail = getattr(actual, "_selector", "") if actual is not None else ""
+    elif owner == "locator":
+        detail = getattr(impl, "_selector", "")
+    elif args and isinstance(args[0], str):
+        detail = (urlparse(args[0]).path or args[0]) if method in ("goto", "wait_for_url") else args[0]
+    detail = " ".join(str(detail).split())
+    if len(detail) > 48:
+        detail = detail[:45] + "..."
+    return f"{owner}.{method}({detail})" if detail else f"{owner}.{method}"
+
+
+def _instrument(cls, method: str, is_async: bool):
+    original = getattr(cls, method, None)
+    if original is None or getattr(original, "__span_wrapped__", False):
+        return
+
+    if is_async:
+        @functools.wraps(original)
+        async def wrapper(self, *args, **kwargs):
+            parent = _current.get()
+            if parent is not None and parent.kind == "browser":
+                return await original(self, *args, **kwargs)
+            token = _open(_label(self, method, args), "browser")
+            try:
+                return await original(self, *args, **kwargs)
+            finally:
+                _close(token)
+    else:
+        @functools.wraps(original)
+        def wrapper(self, *args, **kwargs):
+            parent = _current.get()
+            if parent is not None and parent.kind == "browser":
+                return original(self, *args, **kwargs)  # already inside a timed call
+            token = _open(_label(self, method, args), "browser")
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                _close(token)
+
+    wrapper.__span_wrapped__ = True
+    setattr(cls, method, wrapper)
+
+
+def _on_request_done(requests: list, request):
+    try:
+        timing = request.timing
+    except Exception:
+        return
+    if timing and timing.get("startTime", -1) > 0 and timing.get("responseEnd", -1) >= 0:
+        start = timing["startTime"] / 1000
+        requests.append((start, start + timing["responseEnd"] / 1000))
+
+
+def watch(context):
+    """Track this context's requests and charge them to the spans this task / thread opens from now on"""
+    requests = _requests.get(context)
+    if requests is None:
+        requests = _requests[context] = []
+        context.on("requestfinished", lambda request: _on_request_done(requests, request))
+        context.on("requestfailed", lambda request: _on_request_done(requests, request))
+    _network.set(requests)
+
+
+def _watching(original, is_async: bool):
+    if is_async:
+        @functools.wraps(original)
+        async def wrapper(self, *args, **kwargs):
+            result = await original(self, *args, **kwargs)
+            watch(getattr(result, "context", result))
+            return result
+    else:
+        @functools.wraps(original)
+        def wrapper(self, *args, **kwargs):
+            result = original(self, *args, **kwargs)
+            watch(getattr(result, "context", result))
+            return result
+    wrapper.__span_wrapped__ = True
+    return wrapper
+
+
+def enable():
+    """Turn profiling on here and in worker processes started from now on"""
+    global _patched
+    os.environ["HARNESS_PROFILE"] = "1"
+    if _patched:
+        return
+    from playwright import async_api, sync_api
+
+    for api, is_async in ((sync_api, False), (async_api, True)):
+        for method in PAGE_METHODS:
+            _instrument(api.Page, method, is_async)
+        for method in LOCATOR_METHODS:
+            _instrument(api.Locator, method, is_async)
+        for method in KEYBOARD_METHODS:
+            _instrument(api.Keyboard, method, is_async)
+        for cls in (api.LocatorAssertions, api.PageAssertions):
+            for method in dir(cls):
+                if method.startswith(("to_", "not_to_")):
+                    _instrument(cls, method, is_async)
+        # A pooled context changes hands when a page is opened on it
+        for cls, method in ((api.Browser, "new_context"), (api.Browser, "new_page"), (api.BrowserContext, "new_page")):
+            if not getattr(getattr(cls, method), "__span_wrapped__", False):
+                setattr(cls, method, _watching(getattr(cls, method), is_async))
+    _patched = True
+
+
+def _merged_network(requests: list) -> list:
+    merged = []
+    for start, end in sorted(requests):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _overlap(intervals: list, starts: list, start: float, end: float) -> float:
+    total = 0.0
+    i = max(0, bisect_left(starts, start) - 1)
+    while i < len(intervals) and intervals[i][0] < end:
+        total += max(0.0, min(end, intervals[i][1]) - max(start, intervals[i][0]))
+        i += 1
+    return total
+
+
+def _aggregate(node: Span, path: tuple, tree: dict, networks: dict) -> tuple:
+    """Fold `node` into tree[path]; returns its (total, in_browser_call, network) seconds
+
+    `networks` caches the merged request intervals of each context's list.
+    """
+    end = node.end or time.time()
+    total = end - node.start
+    if node.kind == "browser":
+        in_call, net = total, 0.0
+        if node.network:
+            key = id(node.network)
+            if key not in networks:
+                merged = _merged_network(node.network)
+                networks[key] = (merged, [start for start, _ in merged])
+            net = _overlap(*networks[key], node.start, end)
+    else:
+        in_call = net = 0.0
+    child_total = 0.0
+    for child in node.children:
+        c_total, c_call, c_net = _aggregate(child, path + (child.name,), tree, networks)
+        child_total += c_total
+        if node.kind != "browser":
+            in_call += c_call
+            net += c_net
+
+    stats = tree.setdefault(path, {"count": 0, "total": 0.0, "self": 0.0, "browser": 0.0, "network": 0.0,
+                                   "python": 0.0, "max": 0.0, "kind": node.kind})
+    stats["count"] += 1
+    stats["total"] += total
+    stats["self"] += max(0.0, total - child_total) if node.kind != "browser" else total
+    stats["browser"] += in_call - net
+    stats["network"] += net
+    stats["python"] += total - in_call
+    stats["max"] = max(stats["max"], total)
+    return total, in_call, net
+
+
+def _spans_dir(run_id: str) -> str:
+    return os.path.join(RESULTS_DIR, "spans", run_id)
+
+
+def flush():
+    """Write this process's aggregated spans for the run and start over"""
+    if not _roots:
+        return
+    tree, networks = {}, {}
+    for root in _roots:
+        _aggregate(root, (root.name,), tree, networks)
+    os.makedirs(_spans_dir(RUN_ID), exist_ok=True)
+    path = os.path.join(_spans_dir(RUN_ID), f"{os.getpid()}.json")
+    existing = _load([path])
+    _merge(existing, tree)
+    with open(path, "w") as f:
+        json.dump([{"path": list(p), **s} for p, s in existing.items()], f)
+    _roots.clear()
+    for requests in _requests.values():
+        requests.clear()
+
+
+def _load(paths: list) -> dict:
+    tree = {}
+    for path in paths:
+        if os.path.exists(path):
+            with open(path) as f:
+                _merge(tree, {tuple(e.pop("path")): e for e in json.load(f)})
+    return tree
+
+
+def _merge(into: dict, tree: dict):
+    for path, stats in tree.items():
+        if path not in into:
+            into[path] = dict(stats)
+            continue
+        target = into[path]
+        for key in ("count", "total", "self", "browser", "network", "python"):
+            target[key] += stats[key]
+        target["max"] = max(target["max"], stats["max"])
+
+
+def print_report(run_id: str = RUN_ID, min_share: float = 0.01, width: int = 24) -> str:
+    """Merge every process's spans for the run, print the tree; returns the folded-stacks path"""
+    flush()
+    tree = _load(glob.glob(os.path.join(_spans_dir(run_id), "*.json")))
+    if not tree:
+        return None
+
+    grand = sum(s["total"] for p, s in tree.items() if len(p) == 1)
+    children = {}
+    for path in tree:
+        children.setdefault(path[:-1], []).append(path)
+
+    print(f"\nSPANS (run {run_id}) - total ms, calls, split browser / network / python")
+    print(f"  {'':<60} {'total':>8} {'n':>5} {'browser':>8} {'network':>8} {'python':>8}")
+
+    def walk(parent: tuple, depth: int):
+        for path in sorted(children.get(parent, []), key=lambda p: -tree[p]["total"]):
+            s = tree[path]
+            if grand and s["total"] / grand < min_share:
+                continue
+            bar = "█" * max(1, round(width * s["total"] / grand)) if grand else ""
+            label = ("  " * depth + path[-1])[:60]
+            print(f"  {label:<60} {s['total'] * 1000:>8.0f} {s['count']:>5} {s['browser'] * 1000:>8.0f} "
+                  f"{s['network'] * 1000:>8.0f} {s['python'] * 1000:>8.0f} {bar}")
+            walk(path, depth + 1)
+
+    walk((), 0)
+
+    folded = os.path.join(_spans_dir(run_id), "spans.folded")
+    with open(folded, "w") as f:
+        for path, s in sorted(tree.items()):
+            if s["self"] > 0:
+                f.write(f"{';'.join(p.replace(';', ',') for p in path)} {round(s['self'] * 1000)}\n")
+    log(f"Flame graph input (folded stacks, ms): {folded}")
+    return folded
+
+
+if os.environ.get("HARNESS_PROFILE") == "1":
+    enable()
@@ -0,0 +1,278 @@
+"""
+Perceptual screenshot diff against stored goldens.
+
+`diff_run(directory, golden_dir)` compares every screenshot in this run's
+manifest (harness/screenshots.py) with `<golden_dir>/<name>.png`:
+
+  - per-pixel: largest channel difference, a pixel counts as changed above
+    VISUAL_PIXEL_TOLERANCE (absorbs anti-aliasing and font hinting noise)
+  - block SSIM: structural similarity of the luma over non-overlapping
+    VISUAL_SSIM_BLOCK px blocks, computed for the whole image at once with
+    reshaped arrays, so a 1280x4000 frame is a handful of NumPy reductions
+
+A screenshot passes when the mean block SSIM is at least VISUAL_MIN_SSIM and no
+more than VISUAL_MAX_DIFF_PCT of the unmasked pixels changed. Identical content
+hashes short-circuit without decoding. Anything that differs gets a heatmap in
+`<directory>/runs/<run id>/diff/<name>.png`: the golden dimmed to grey, changes
+in red, masked regions in blue.
+
+Masks hide dynamic content (timestamps, avatars, spinners). They are boxes in
+image pixels, taken from the page at capture time (`mask_regions(page)`, stored
+in the manifest entry), the golden's own capture-time boxes, and any listed for
+the name in the hand-maintained `<golden_dir>/masks.json`.
+
+Needs numpy and Pillow (`pip install numpy pillow`); without them the diff is
+skipped with a warning.
+
+Configuration:
+  VISUAL_GOLDEN_DIR     - golden screenshots (default tests/baselines/visual)
+  VISUAL_PIXEL_TOLERANCE - per-channel difference ignored (default 16)
+  VISUAL_MAX_DIFF_PCT   - changed pixels allowed, percent (default 0.1)
+  VISUAL_MIN_SSIM       - minimum mean block SSIM (default 0.98)
+  VISUAL_SSIM_BLOCK     - SSIM block size in px (default 8)
+  VISUAL_DIFF_WORKERS   - images compared in parallel (default 4)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import screenshots
+from harness.console import log
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # optional: the rest of the harness runs without them
+    np = Image = None
+
+GOLDEN_DIR = os.environ.get(
+    "VISUAL_GOLDEN_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "baselines", "visual"),
+)
+PIXEL_TOLERANCE = int(os.environ.get("VISUAL_PIXEL_TOLERANCE", "16"))
+MAX_DIFF_PCT = float(os.environ.get("VISUAL_MAX_DIFF_PCT", "0.1"))
+MIN_SSIM = float(os.environ.get("VISUAL_MIN_SSIM", "0.98"))
+SSIM_BLOCK = int(os.environ.get("VISUAL_SSIM_BLOCK", "8"))
+WORKERS = int(os.environ.get("VISUAL_DIFF_WORKERS", "4"))
+
+# Masks recorded when the goldens were captured; masks.json is for hand-added ones
+CAPTURED_MASKS = ".captured-masks.json"
+
+# Dynamic content masked by default (same families as tests/utils/visual-helpers.ts)
+MASK_SELECTORS = [
+    '[data-testid="timestamp"]', ".timestamp", "time", "[datetime]",
+    ".animate-spin", ".animate-pulse", ".skeleton", '[data-loading="true"]',
+    "[data-live]", "[data-realtime]",
+    "[data-avatar]", ".avatar", "img[alt*='avatar' i]",
+    "[data-visual-mask]",
+]
+
+# Boxes in screenshot pixels: document coordinates (full-page shots) times DPR
+MASK_REGIONS_JS = """
+(selectors) => {
+  const dpr = window.devicePixelRatio || 1;
+  const boxes = [];
+  for (const el of document.querySelectorAll(selectors.join(','))) {
+    const r = el.getBoundingClientRect();
+    if (r.width < 1 || r.height < 1) continue;
+    boxes.push([r.left + window.scrollX, r.top + window.scrollY, r.width, r.height]
+      .map(v => Math.round(v * dpr)));
+  }
+  return boxes;
+}
+"""
+
+# SSIM stabilising constants for 8-bit luma
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def available() -> bool:
+    return np is not None
+
+
+def mask_regions(page, selectors: list = None) -> list:
+    """[x, y, w, h] boxes of the page's dynamic elements, in screenshot pixels"""
+    return page.evaluate(MASK_REGIONS_JS, selectors or MASK_SELECTORS)
+
+
+async def mask_regions_async(page, selectors: list = None) -> list:
+    return await page.evaluate(MASK_REGIONS_JS, selectors or MASK_SELECTORS)
+
+
+def _load(path: str):
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def _luma(rgb):
+    return rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _blocks(a, block: int):
+    """(H, W) -> (H/block, block, W/block, block) view; H and W are multiples of block"""
+    return a.reshape(a.shape[0] // block, block, a.shape[1] // block, block)
+
+
+def block_ssim(a, b, block: int = SSIM_BLOCK):
+    """SSIM per non-overlapping block of two equally sized float32 luma arrays"""
+    A, B = _blocks(a, block), _blocks(b, block)
+    mu_a, mu_b = A.mean(axis=(1, 3)), B.mean(axis=(1, 3))
+    var_a = (A * A).mean(axis=(1, 3)) - mu_a * mu_a
+    var_b = (B * B).mean(axis=(1, 3)) - mu_b * mu_b
+    cov = (A * B).mean(axis=(1, 3)) - mu_a * mu_b
+    return ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / ((mu_a ** 2 + mu_b ** 2 + _C1) * (var_a + var_b + _C2))
+
+
+def _mask(shape: tuple, boxes: list):
+    mask = np.zeros(shape, dtype=bool)
+    for x, y, w, h in boxes:
+        mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = True
+    return mask
+
+
+def compare(current_path: str, golden_path: str, masks: list = (), heatmap_path: str = None,
+            block: int = SSIM_BLOCK) -> dict:
+    """Diff one screenshot against its golden; writes a heatmap if they differ"""
+    current, golden = _load(current_path), _load(golden_path)
+
+    # Pad both to a common size that is a multiple of the block; area that
+    # only one image covers (page got taller/shorter) counts as changed
+    height = -(-max(current.shape[0], golden.shape[0]) // block) * block
+    width = -(-max(current.shape[1], golden.shape[1]) // block) * block
+    cur = np.zeros((height, width, 3), dtype=np.uint8)
+    gold = np.zeros((height, width, 3), dtype=np.uint8)
+    cur[:current.shape[0], :current.shape[1]] = current
+    gold[:golden.shape[0], :golden.shape[1]] = golden
+    in_current = np.zeros((height, width), dtype=bool)
+    in_current[:current.shape[0], :current.shape[1]] = True
+    in_golden = np.zeros((height, width), dtype=bool)
+    in_golden[:golden.shape[0], :golden.shape[1]] = True
+    one_sided = in_current ^ in_golden
+    outside = ~(in_current | in_golden)  # block padding, in neither image
+
+    mask = _mask((height, width), masks) | outside
+    cur[mask] = 0
+    gold[mask] = 0
+
+    # |a - b| in uint8 without widening, then the largest channel
+    channels = np.maximum(cur, gold) - np.minimum(cur, gold)
+    diff = np.maximum(np.maximum(channels[..., 0], channels[..., 1]), channels[..., 2])
+    diff[one_sided & ~mask] = 255
+    changed = (diff > PIXEL_TOLERANCE) & ~mask
+    compared = mask.size - np.count_nonzero(mask)
+    changed_pct = float(np.count_nonzero(changed)) / compared * 100 if compared else 0.0
+
+    gold_luma = _luma(gold)
+    ssim = block_ssim(_luma(cur), gold_luma, block)
+    ssim[_blocks(one_sided & ~mask, block).any(axis=(1, 3))] = 0.0
+    scored = ~_blocks(mask, block).all(axis=(1, 3))
+    score = float(ssim[scored].mean()) if scored.any() else 1.0
+
+    result = {
+        "score": round(score, 5),
+        "changed_pct": round(changed_pct, 4),
+        "size": [int(current.shape[1]), int(current.shape[0])],
+        "golden_size": [int(golden.shape[1]), int(golden.shape[0])],
+        "masked_pct": round(float(mask[in_current].mean()) * 100, 2) if in_current.any() else 0.0,
+        "heatmap": None,
+    }
+    result["passed"] = bool(score >= MIN_SSIM and changed_pct <= MAX_DIFF_PCT
+                        and result["size"] == result["golden_size"])
+
+    if heatmap_path and (changed.any() or score < 1.0):
+        dissimilar = np.repeat(np.repeat(np.clip(1 - ssim, 0, 1) * 255, block, axis=0), block, axis=1)
+        heat = np.maximum(np.where(changed, diff, 0), dissimilar.astype(np.uint8))
+        base = (gold_luma * 0.35).astype(np.uint8)
+        fade = (1 - heat / 255.0)
+        image = np.stack([np.maximum(base, heat), (base * fade).astype(np.uint8), (base * fade).astype(np.uint8)],
+                         axis=2)
+        image[mask & ~outside] = (base[mask & ~outside, None] * [0.4, 0.4, 0.4] + [0, 0, 150]).astype(np.uint8)
+        os.makedirs(os.path.dirname(heatmap_path), exist_ok=True)
+        Image.fromarray(image[:max(current.shape[0], golden.shape[0]), :max(current.shape[1], golden.shape[1])]) \
+            .save(heatmap_path, compress_level=1)
+        result["heatmap"] = heatmap_path
+    return result
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_masks(golden_dir: str) -> dict:
+    """{name: [[x, y, w, h], ...]} from the golden's capture and <golden_dir>/masks.json"""
+    masks = {}
+    for filename in (CAPTURED_MASKS, "masks.json"):
+        path = os.path.join(golden_dir, filename)
+        if os.path.exists(path):
+            with open(path) as f:
+                for name, boxes in json.load(f).items():
+                    masks.setdefault(name, []).extend(boxes)
+    return masks
+
+
+def _diff_entry(entry: dict, golden_dir: str, static_masks: dict, heatmap_dir: str) -> dict:
+    name = entry["name"]
+    golden = os.path.join(golden_dir, f"{name}.png")
+    result = {"name": name, "current": entry["object"], "golden": golden}
+    if not os.path.exists(golden):
+        return {**result, "passed": None, "reason": "no golden"}
+    if _sha256(golden) == entry["sha256"]:
+        return {**result, "passed": True, "score": 1.0, "changed_pct": 0.0, "heatmap": None, "reason": "identical"}
+
+    masks = list(entry.get("masks") or []) + list(static_masks.get(name, []))
+    try:
+        result.update(compare(entry["object"], golden, masks, os.path.join(heatmap_dir, f"{name}.png")))
+    except Exception as e:
+        return {**result, "passed": False, "reason": f"diff failed: {e}"}
+    if result["size"] != result["golden_size"]:
+        result["reason"] = "size {}x{} vs golden {}x{}".format(*result["size"], *result["golden_size"])
+    return result
+
+
+def diff_run(directory: str, golden_dir: str = GOLDEN_DIR, run_id: str = screenshots.RUN_ID,
+             workers: int = WORKERS) -> list:
+    """Diff every screenshot of a run against its golden, in manifest order"""
+    if not available():
+        log("Visual diff needs numpy and Pillow (pip install numpy pillow) - skipped", "WARN")
+        return []
+    screenshots.flush()
+    entries = list(screenshots.load_manifest(directory, run_id).values())
+    if not entries:
+        return []
+
+    static_masks = load_masks(golden_dir)
+    heatmap_dir = os.path.join(directory, "runs", run_id, "diff")
+    started = time.perf_counter()
+    # NumPy and Pillow release the GIL for the heavy parts, so threads scale
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda e: _diff_entry(e, golden_dir, static_masks, heatmap_dir), entries))
+
+    missing = [r["name"] for r in results if r["passed"] is None]
+    if missing:
+        log(f"No golden for {len(missing)} screenshot(s): {', '.join(missing)} (--update-golden to add)", "SKIP")
+    log(f"Visual diff: {len(results) - len(missing)} compared in {time.perf_counter() - started:.1f}s")
+    return [r for r in results if r["passed"] is not None]
+
+
+def update_goldens(directory: str, golden_dir: str = GOLDEN_DIR, run_id: str = screenshots.RUN_ID) -> int:
+    """Make this run's screenshots the goldens, keeping their capture-time masks"""
+    screenshots.flush()
+    entries = screenshots.load_manifest(directory, run_id)
+    os.makedirs(golden_dir, exist_ok=True)
+    path = os.path.join(golden_dir, CAPTURED_MASKS)
+    captured = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            captured = json.load(f)
+    for name, entry in entries.items():
+        shutil.copyfile(entry["object"], os.path.join(golden_dir, f"{name}.png"))
+        captured[name] = entry.get("masks") or []
+    with open(path, "w") as f:
+        json.dump(captured, f, indent=2, sort_keys=True)
+    return len(entries)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Invitation Load Generator for StockZip
+Simulates N owners working the team page at once: each one signs in, opens
+/settings/team, sends invites and resends / cancels pending ones, paced so the
+whole fleet targets a fixed invite rate. Reports throughput, error rate and
+latency percentiles per step, plus a timeline to see where it falls over.
+
+Users are spread over a pool of worker processes; inside a process they run
+concurrently on one browser (one context each). Owner accounts come from
+TEST_ACCOUNTS ("a@x.com:pass,b@y.com:pass") or TEST_EMAIL / TEST_PASSWORD and
+are shared round-robin when there are more users than accounts.
+
+Usage:
+  TEST_EMAIL=owner@x.com TEST_PASSWORD=pass python3 tests/invite-load.py --users 20 --rate 2 --duration 120
+
+  # A large customer adding 200 staff at once, invites left in place
+  python3 tests/invite-load.py --users 10 --invites-per-user 20 --rate 20 --keep
+
+Invites go to loadtest+<run>-<user>-<n>@INVITE_DOMAIN (default example.com) and
+are cancelled again unless --keep is given. Mind the tenant's team size limit:
+it shows up as "Team size limit" errors on the invite step.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from playwright.async_api import async_playwright
+
+from harness import async_runner, bench, perf, readiness
+from harness.console import log
+from harness.readiness import (
+    MENU_SELECTOR, install_async, wait_for_dialog_closed_async, wait_for_dialog_open_async,
+    wait_for_network_idle_async, wait_for_page_ready_async,
+)
+from harness.session import ensure_state_async
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+TEST_EMAIL = os.environ.get("TEST_EMAIL", "")
+TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
+INVITE_DOMAIN = os.environ.get("INVITE_DOMAIN", "example.com")
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+STEPS = ("login", "open_team", "invite", "resend", "cancel")
+
+STEP_TIMEOUT = 30000
+
+
+class StepError(Exception):
+    """A step completed but the app reported a failure"""
+
+
+def is_server_action(response) -> bool:
+    """Next.js server actions are POSTs to the page URL with a Next-Action header"""
+    return response.request.method == "POST" and "next-action" in response.request.headers
+
+
+async def open_team(page):
+    await page.goto(f"{BASE_URL}/settings/team", wait_until="load")
+    await wait_for_page_ready_async(page, "h1", timeout=STEP_TIMEOUT)
+    if "/login" in page.url:
+        raise StepError("session rejected, bounced to /login")
+
+
+def invitation_row(page, address: str):
+    return page.locator("div.justify-between.p-4", has=page.locator(f"p:text-is('{address}')"))
+
+
+async def invite(page, address: str):
+    """Invite Member -> fill -> Send Invite -> wait for the link or an error -> Done"""
+    await page.locator("button:has-text('Invite Member')").click()
+    await wait_for_dialog_open_async(page)
+    dialog = page.locator("[role=dialog]")
+    await dialog.locator("#invite-email").fill(address)
+    await dialog.locator("button:has-text('staff')").click()
+
+    async with page.expect_response(is_server_action, timeout=STEP_TIMEOUT) as response_info:
+        await dialog.locator("button:has-text('Send Invite')").click()
+    response = await response_info.value
+    if response.status >= 400:
+        raise StepError(f"createInvitation HTTP {response.status}")
+
+    created = dialog.locator("text=Invitation created!")
+    error = dialog.locator(".text-red-600")
+    await created.or_(error).first.wait_for(timeout=STEP_TIMEOUT)
+    if await error.is_visible():
+        message = (await error.inner_text()).strip()
+        await dialog.locator("button:has-text('Cancel')").click()
+        await wait_for_dialog_closed_async(page)
+        raise StepError(message)
+
+    await dialog.locator("button:has-text('Done')").click()
+    await wait_for_dialog_closed_async(page)
+    await invitation_row(page, address).wait_for(timeout=STEP_TIMEOUT)
+
+
+async def open_row_menu(page, address: str):
+    """Open the row's actions dropdown; its content, a div.absolute.z-50 of plain buttons"""
+    row = invitation_row(page, address)
+    await row.locator("button:has(svg.lucide-more-vertical)").click()
+    menu = row.locator(MENU_SELECTOR)
+    await menu.wait_for(timeout=STEP_TIMEOUT)
+    return menu
+
+
+async def resend(page, address: str):
+    menu = await open_row_menu(page, address)
+    async with page.expect_response(is_server_action, timeout=STEP_TIMEOUT) as response_info:
+        await menu.locator("button:has-text('Resend')").click()
+    response = await response_info.value
+    if response.status >= 400:
+        raise StepError(f"resendInvitation HTTP {response.status}")
+    await wait_for_network_idle_async(page, timeout=STEP_TIMEOUT)
+
+
+async def cancel(page, address: str):
+    menu = await open_row_menu(page, address)
+    await menu.locator("button:has-text('Cancel')").click()
+    confirm = page.locator("[role=alertdialog]")
+    await confirm.wait_for(timeout=STEP_TIMEOUT)
+    async with page.expect_response(is_server_action, timeout=STEP_TIMEOUT) as response_info:
+        await confirm.locator("button:has-text('Confirm')").click()
+    response = await response_info.value
+    if response.status >= 400:
+        raise StepError(f"cancelInvitation HTTP {response.status}")
+    await invitation_row(page, address).wait_for(state="detached", timeout=STEP_TIMEOUT)
+
+
+async def timed(samples: list, run_started: float, user: int, step: str, coro) -> tuple:
+    """Await `coro` as one sample of `step`; returns (ok, result)
+
+    Wall-clock time throughout, so samples from different worker processes
+    share one timeline.
+    """
+    started = time.time()
+    sample = {"user": user, "step": step, "at": round(started - run_started, 3), "ok": False}
+    try:
+        result = await coro
+        sample["ok"] = True
+        return True, result
+    except Exception as e:
+        sample["error"] = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+        return False, None
+    finally:
+        sample["ms"] = round((time.time() - started) * 1000, 1)
+        samples.append(sample)
+
+
+async def simulate_user(browser, user: int, email: str, password: str, config: dict, samples: list):
+    """One owner: sign in, open the team page, then invite/resend/cancel on schedule"""
+    rng = random.Random(f"{config['run_id']}-{user}")
+    run_started = config["started"]
+    ok, state = await timed(samples, run_started, user, "login",
+                            ensure_state_async(browser, BASE_URL, email, password))
+    if not ok:
+        return
+
+    context = await browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+    try:
+        await install_async(context)
+        page = await context.new_page()
+        ok, _ = await timed(samples, run_started, user, "open_team", open_team(page))
+        if not ok:
+            return
+
+        # Open-loop pacing: each user owns an equal share of the target rate,
+        # staggered so the fleet doesn't fire in lockstep
+        interval = config["users"] / config["rate"]
+        next_at = time.time() + interval * user / config["users"]
+        deadline = run_started + config["duration"] if config["duration"] else None
+        sent = 0
+        while (config["invites_per_user"] is None or sent < config["invites_per_user"]) and \
+                (deadline is None or time.time() < deadline):
+            delay = next_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                samples.append({"user": user, "step": "lag", "ok": True, "ms": round(-delay * 1000, 1),
+                                "at": round(time.time() - run_started, 3)})
+            next_at += interval
+
+            address = f"loadtest+{config['run_id']}-{user}-{sent}@{INVITE_DOMAIN}"
+            sent += 1
+            ok, _ = await timed(samples, run_started, user, "invite", invite(page, address))
+            if not ok:
+                # Get back to a known state before the next attempt
+                await timed(samples, run_started, user, "open_team", open_team(page))
+                continue
+            if rng.random() < config["resend_ratio"]:
+                await timed(samples, run_started, user, "resend", resend(page, address))
+            if not config["keep"]:
+                await timed(samples, run_started, user, "cancel", cancel(page, address))
+    finally:
+        await context.close()
+
+
+async def run_users(users: list, config: dict) -> list:
+    samples = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            await asyncio.gather(*(simulate_user(browser, user, email, password, config, samples)
+                                   for user, email, password in users))
+        finally:
+            await browser.close()
+    return samples
+
+
+def run_worker(users: list, config: dict) -> list:
+    """Process pool entry point: this process's share of the users"""
+    readiness.verbose = False
+    perf.verbose = False
+    return asyncio.run(run_users(users, config))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip invitation load generator")
+    parser.add_argument("--users", type=int, default=10, help="simulated owners")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes (default: CPU count, at most one per user)")
+    parser.add_argument("--rate", type=float, default=1.0, help="target invites per second, whole fleet")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep inviting (0: no limit)")
+    parser.add_argument("--invites-per-user", type=int, help="stop each user after this many invites")
+    parser.add_argument("--resend-ratio", type=float, default=0.5, help="share of invites that are resent")
+    parser.add_argument("--keep", action="store_true", help="leave the invitations pending (no cancel step)")
+    parser.add_argument("--window", type=float, default=10, help="timeline bucket in seconds")
+    parser.add_argument("--output", help="also write raw samples and the summary as JSON")
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if not args.duration and not args.invites_per_user:
+        parser.error("give --duration or --invites-per-user, or the run never ends")
+    return args
+
+
+def summarize_steps(samples: list, wall: float) -> dict:
+    summary = {}
+    for step in STEPS + ("lag",):
+        of_step = [s for s in samples if s["step"] == step]
+        if not of_step:
+            continue
+        ok = [s["ms"] for s in of_step if s["ok"]]
+        errors = len(of_step) - len(ok)
+        summary[step] = {
+            **bench.summarize(ok),
+            "attempts": len(of_step),
+            "errors": errors,
+            "error_rate": errors / len(of_step),
+            "throughput": len(ok) / wall if wall else None,
+            "top_errors": Counter(s["error"] for s in of_step if not s["ok"]).most_common(3),
+        }
+    return summary
+
+
+def fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(summary: dict, samples: list, args, wall: float):
+    print("\n" + "=" * 92)
+    print(f"INVITE LOAD - {args.users} users, target {args.rate:g} invites/s, {wall:.0f}s wall clock")
+    print("=" * 92)
+    print(f"{'Step':<10} {'Attempts':>8} {'Errors':>7} {'Err%':>6} {'ok/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step, s in summary.items():
+        if step == "lag":
+            continue
+        print(f"{step:<10} {s['attempts']:>8} {s['errors']:>7} {s['error_rate'] * 100:>6.1f} "
+              f"{fmt(s['throughput'], '.2f'):>7} {fmt(s.get('p50')):>8} {fmt(s.get('p95')):>8} {fmt(s.get('p99')):>8}")
+    if "lag" in summary:
+        lag = summary["lag"]
+        print(f"\nBehind schedule {lag['attempts']} times (p95 {fmt(lag.get('p95'))}ms) - "
+              f"the fleet could not keep up with the target rate")
+    for step, s in summary.items():
+        for message, count in s["top_errors"]:
+            print(f"  ❌ {step}: {count}x {message}")
+
+    # Timeline: where throughput flattens and errors / latency climb
+    invites = [s for s in samples if s["step"] == "invite"]
+    if invites:
+        print(f"\nInvite timeline ({args.window:g}s windows)")
+        print(f"  {'t (s)':>7} {'sent/s':>7} {'Err%':>6} {'p95 ms':>8}")
+        buckets = {}
+        for s in invites:
+            buckets.setdefault(int(s["at"] // args.window), []).append(s)
+        for bucket, of_bucket in sorted(buckets.items()):
+            ok = [s["ms"] for s in of_bucket if s["ok"]]
+            errors = len(of_bucket) - len(ok)
+            print(f"  {bucket * args.window:>7.0f} {len(ok) / args.window:>7.2f} "
+                  f"{errors / len(of_bucket) * 100:>6.1f} {fmt(bench.percentile(ok, 95)):>8}")
+    print("=" * 92)
+
+
+def main():
+    """Main load generator"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Invitation Load Generator")
+    print(f"Base URL: {BASE_URL}")
+    print("=" * 60 + "\n")
+
+    accounts = async_runner.parse_accounts(os.environ.get("TEST_ACCOUNTS", ""), TEST_EMAIL, TEST_PASSWORD)
+    if not accounts:
+        print("ERROR: Please set TEST_EMAIL and TEST_PASSWORD (or TEST_ACCOUNTS) for an owner account")
+        sys.exit(1)
+
+    users = [(i, *accounts[i % len(accounts)]) for i in range(args.users)]
+    workers = max(1, min(args.workers or os.cpu_count() or 1, args.users))
+    config = {
+        "run_id": datetime.now().strftime("%m%d%H%M%S"),
+        "users": args.users,
+        "rate": args.rate,
+        "duration": args.duration,
+        "invites_per_user": args.invites_per_user,
+        "resend_ratio": args.resend_ratio,
+        "keep": args.keep,
+        "started": 0.0,  # set when the pool starts
+    }
+    log(f"{args.users} users on {len(accounts)} account(s), {workers} worker processes, "
+        f"target {args.rate:g} invites/s")
+
+    samples = []
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        config["started"] = time.time()
+        futures = [pool.submit(run_worker, users[i::workers], config) for i in range(workers)]
+        for future in futures:
+            samples.extend(future.result())
+    wall = time.time() - started
+
+    summary = summarize_steps(samples, wall)
+    print_report(summary, samples, args, wall)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "users": args.users, "wall_seconds": wall,
+                       "summary": summary, "samples": samples}, f, indent=2)
+        log(f"Results written to {args.output}")
+
+    invites = summary.get("invite", {})
+    if invites.get("error_rate", 0) > 0.05:
+        log(f"Invite error rate {invites['error_rate'] * 100:.1f}% (> 5%)", "FAIL")
+        sys.exit(1)
+    log("Load run complete", "PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Client-side memory leak detector for long dashboard sessions.
+
+Warehouse tablets keep /scan, /inventory and pick lists open all shift. Each
+scenario opens one page and repeats one interaction cycle on it. After every
+cycle it forces a GC and samples the JS heap, DOM nodes and event listeners
+over CDP (harness/memory.py). It then fits a trend to the cycles after the
+warmup. A steady upward trend fails the scenario and comes with a heap
+snapshot diff: the classes allocated during the measured cycles that are
+still alive, and what retains them.
+
+Usage:
+  TEST_EMAIL=your@email.com TEST_PASSWORD=yourpassword python3 tests/memory-leak.py
+
+  python3 tests/memory-leak.py --scenarios scan,invite-dialog --cycles 60
+  python3 tests/memory-leak.py --pick-list <pickListId>   # default: the first one listed
+  python3 tests/memory-leak.py --always-diff --output leaks.json
+  python3 tests/memory-leak.py --network offline-flap     # see harness/network.py
+
+Scenarios (one cycle each):
+  invite-dialog  /settings/team: open the invite dialog, pick a role, cancel
+  inventory      /inventory: switch table <-> grid view (a soft navigation that
+                 re-renders every item; the list has no pagination to page through)
+  scan           /scan: a hardware-scanner burst of keystrokes + Enter, then back
+  pick-list      /tasks/pick-lists/[pickListId]: search for an item, clear it
+
+Per-cycle limits and the trend test's alpha: see harness/memory.py.
+Exits 1 if any scenario leaks.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+from playwright.sync_api import sync_playwright
+
+from harness import browser_pool, memory, network, readiness, results as store
+from harness.console import log
+from harness.readiness import (
+    install, wait_for_dialog_closed, wait_for_dialog_open, wait_for_network_idle, wait_for_page_ready,
+)
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+TEST_EMAIL = os.environ.get("TEST_EMAIL", "")
+TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "/tmp/stockzip-heap")
+
+# Desktop width: /scan shows the hardware-scanner input instead of the camera
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+SCAN_INPUT = "input[placeholder='Tap to focus, then scan']"
+PICK_LIST_SEARCH = "input[placeholder='Type name, SKU, or paste barcode']"
+
+results = []
+record = store.recorder(results)
+
+
+# Scenarios: (path, cycle(page, n)); path may hold a [param] resolved at startup
+
+def invite_dialog_cycle(page, n: int):
+    page.click("button:has-text('Invite Member')")
+    wait_for_dialog_open(page)
+    page.locator("[role=dialog] button:has-text('viewer')").click()
+    page.locator("[role=dialog] button:has-text('Cancel')").click()
+    wait_for_dialog_closed(page)
+
+
+def inventory_cycle(page, n: int):
+    for title in ("Table View", "Grid View"):
+        page.click(f"button[title='{title}']")
+        wait_for_network_idle(page, timeout=30000)
+
+
+def scan_cycle(page, n: int, barcodes: list = None):
+    code = barcodes[n % len(barcodes)] if barcodes else f"LEAK{n:08d}"
+    field = page.locator(SCAN_INPUT)
+    field.click()
+    # Scanners type faster than people; useHardwareScanner tells them apart by key interval
+    page.keyboard.type(code, delay=5)
+    page.keyboard.press("Enter")
+    field.wait_for(state="detached")
+    wait_for_network_idle(page)
+    page.locator("button:has(svg.lucide-arrow-left)").first.click()  # header back: result -> scanning
+    field.wait_for(state="visible")
+
+
+def pick_list_cycle(page, n: int):
+    search = page.locator(PICK_LIST_SEARCH)
+    search.fill("a" if n % 2 else "e")
+    wait_for_network_idle(page)
+    search.fill("")
+    wait_for_network_idle(page)
+
+
+SCENARIOS = {
+    "invite-dialog": ("/settings/team", invite_dialog_cycle),
+    "inventory": ("/inventory", inventory_cycle),
+    "scan": ("/scan", scan_cycle),
+    "pick-list": ("/tasks/pick-lists/[pickListId]", pick_list_cycle),
+}
+
+
+def resolve_path(page, path: str):
+    """Fill a trailing [param] from the first matching link on the parent page"""
+    if "[" not in path:
+        return path
+    parent = path.split("/[", 1)[0]
+    goto_authenticated(page, f"{BASE_URL}{parent}", BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+    wait_for_page_ready(page, timeout=30000)
+    for href in page.eval_on_selector_all(f"a[href^='{parent}/']", "els => els.map(e => e.getAttribute('href'))"):
+        segment = href[len(parent) + 1:].split("/")[0].split("?")[0]
+        if segment and segment != "new":
+            return f"{parent}/{segment}"
+    return None
+
+
+def run_scenario(browser, state: dict, name: str, path: str, cycle, args) -> dict:
+    """Drive one page through warmup + measured cycles; returns samples and verdict"""
+    context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+    install(context)
+    network.apply(context)
+    try:
+        page = context.new_page()
+        goto_authenticated(page, f"{BASE_URL}{path}", BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+        wait_for_page_ready(page, timeout=30000)
+        cdp = memory.attach(page)
+
+        for n in range(args.warmup):
+            cycle(page, n)
+        baseline_path = os.path.join(SNAPSHOT_DIR, f"{store.RUN_ID}-{name}-before.heapsnapshot")
+        memory.heap_snapshot(cdp, baseline_path)
+
+        samples = [memory.sample(cdp)]
+        for n in range(args.warmup, args.warmup + args.cycles):
+            cycle(page, n)
+            samples.append(memory.sample(cdp))
+            if (n - args.warmup + 1) % 10 == 0:
+                s = samples[-1]
+                log(f"{name}: cycle {n - args.warmup + 1}/{args.cycles} - heap {s['heap'] / 1048576:.1f} MB, "
+                    f"{s['nodes']} nodes, {s['listeners']} listeners")
+
+        verdict = memory.verdict(samples)
+        leaking = any(v["leaking"] for v in verdict.values())
+        diff = []
+        if leaking or args.always_diff:
+            after_path = os.path.join(SNAPSHOT_DIR, f"{store.RUN_ID}-{name}-after.heapsnapshot")
+            memory.heap_snapshot(cdp, after_path)
+            diff = memory.diff_snapshots(baseline_path, after_path)
+            log(f"{name}: heap snapshots in {SNAPSHOT_DIR} (load them in DevTools > Memory to dig further)")
+        return {"scenario": name, "path": path, "samples": samples, "verdict": verdict,
+                "leaking": leaking, "diff": diff}
+    finally:
+        context.close()
+
+
+def describe(verdict: dict) -> str:
+    heap, nodes, listeners = verdict["heap"], verdict["nodes"], verdict["listeners"]
+    return (f"heap {heap['slope'] / 1024:+.1f} KB/cycle (tau {heap['tau']:.2f}), "
+            f"nodes {nodes['slope']:+.1f}/cycle, listeners {listeners['slope']:+.1f}/cycle")
+
+
+def print_report(rows: list, args):
+    print("\n" + "=" * 100)
+    print(f"MEMORY - {args.cycles} cycles after {args.warmup} warmup, sampled after a forced GC")
+    print("=" * 100)
+    print(f"{'Scenario':<16} {'Heap MB':>15} {'KB/cycle':>9} {'Nodes':>13} {'/cycle':>7} "
+          f"{'Listeners':>11} {'/cycle':>7}  Verdict")
+    for row in rows:
+        v = row["verdict"]
+        heap, nodes, listeners = v["heap"], v["nodes"], v["listeners"]
+        heap_range = f"{heap['start'] / 1048576:.1f}→{heap['end'] / 1048576:.1f}"
+        grown = [metric for metric, m in v.items() if m["leaking"]]
+        verdict = f"❌ leaking ({', '.join(grown)})" if grown else "✅ flat"
+        print(f"{row['scenario']:<16} {heap_range:>15} {heap['slope'] / 1024:>+9.1f} "
+              f"{nodes['start']:>6}→{nodes['end']:<6} {nodes['slope']:>+7.1f} "
+              f"{listeners['start']:>5}→{listeners['end']:<5} {listeners['slope']:>+7.1f}  {verdict}")
+
+    for row in rows:
+        if not row["diff"]:
+            continue
+        print(f"\n{row['scenario']}: allocated during the measured cycles and still alive")
+        print(f"  {'Class':<40} {'Count':>8} {'KB':>9}  Retained by")
+        for entry in row["diff"]:
+            retainers = ", ".join(f"{path} ×{count}" for path, count in entry["retainers"])
+            print(f"  {entry['class'][:40]:<40} {entry['count']:>8} {entry['size'] / 1024:>9.1f}  {retainers}")
+    print("=" * 100)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip client-side memory leak detector")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated, see above")
+    parser.add_argument("--cycles", type=int, default=30, help="measured cycles per scenario")
+    parser.add_argument("--warmup", type=int, default=5,
+                        help="cycles before measuring (caches, lazy chunks and JIT settle first)")
+    parser.add_argument("--pick-list", metavar="ID", help="pick list to open (default: first one listed)")
+    parser.add_argument("--barcodes", help="comma-separated barcodes for the scan scenario (default: unknown codes)")
+    parser.add_argument("--always-diff", action="store_true", help="snapshot diff even when nothing leaks")
+    parser.add_argument("--output", help="also write samples, verdicts and diffs as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.cycles < 8:
+        parser.error("--cycles must be at least 8 for the trend test to mean anything")
+    args.barcodes = [b.strip() for b in args.barcodes.split(",") if b.strip()] if args.barcodes else None
+    return args
+
+
+def main():
+    """Main leak detector"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Memory Leak Detector")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Scenarios: {', '.join(args.scenarios)} | {args.cycles} cycles + {args.warmup} warmup")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    if not TEST_EMAIL or not TEST_PASSWORD:
+        print("ERROR: Please set TEST_EMAIL and TEST_PASSWORD environment variables")
+        sys.exit(1)
+
+    readiness.verbose = False
+    store.begin_run("memory-leak", base_url=BASE_URL)
+
+    rows = []
+    with sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            state = ensure_state(browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+            for index, name in enumerate(args.scenarios, 1):
+                path, cycle = SCENARIOS[name]
+                test_id = f"MEM-{index:03d}"
+                if name == "pick-list" and args.pick_list:
+                    path = f"/tasks/pick-lists/{args.pick_list}"
+                elif "[" in path:
+                    context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+                    path = resolve_path(context.new_page(), path)
+                    context.close()
+                    if not path:
+                        log(f"{name}: nothing to open - skipped", "SKIP")
+                        continue
+                if name == "scan" and args.barcodes:
+                    cycle = functools.partial(scan_cycle, barcodes=args.barcodes)
+
+                log(f"{name}: {path}")
+                store.begin_check(name)
+                try:
+                    row = run_scenario(browser, state, name, path, cycle, args)
+                except Exception as e:
+                    record(test_id, f"No leak on {name}", False, f"cycle failed: {e}")
+                    store.end_check()
+                    continue
+                rows.append(row)
+                record(test_id, f"No leak on {name}", not row["leaking"], describe(row["verdict"]),
+                       memory={"verdict": row["verdict"], "diff": row["diff"][:5]})
+                store.end_check()
+        finally:
+            browser.close()
+
+    if rows:
+        print_report(rows, args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "cycles": args.cycles, "warmup": args.warmup,
+                       "rows": rows}, f, indent=2)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Leaking or failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("No steady memory growth", "PASS")
+
+
+if __name__ == "__main__":
+    main()
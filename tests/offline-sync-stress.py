@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Offline-sync stress mode for StockZip
+Queues thousands of quantity adjustments in the browser's offline queue
+(lib/offline/db.ts) the way a warehouse tablet would, reconnects, and measures
+how the queue drains and whether the database ends up with the right numbers.
+
+  1. scan     - /scan in Batch mode: every seeded item's barcode through the
+                hardware-scanner input, then each one counted (verified) at a
+                new quantity. Lookups need the network: the page only reads
+                Supabase, not the offline cache.
+  2. queue    - the context goes offline and "Save Count" queues one
+                quantity_adjust change per item in IndexedDB
+  3. drain    - the context goes back online (with --flap: online/offline on a
+                schedule until the queue is empty) and useOfflineSync drains it
+  4. check    - each item's quantity and its activity logs in Postgres against
+                what was queued
+
+Usage:
+  python3 tests/offline-sync-stress.py                    # 2000 adjustments, steady connection
+  python3 tests/offline-sync-stress.py --changes 5000 --flap 10,3
+  python3 tests/offline-sync-stress.py --network 3g       # see harness/network.py
+  python3 tests/offline-sync-stress.py --output offline-sync.json
+
+Measured while draining (IndexedDB polled every --poll ms):
+  first_sync   - s from reconnecting until the first change is gone from the queue
+  drain        - s from reconnecting until nothing is pending or syncing
+  throughput   - changes synced per second between the first and the last
+  retries      - failed attempts that went back to pending (highest retry_count
+                 seen per change; a retry that succeeds between polls is missed)
+  failed       - changes left in status 'failed' (3 failed attempts)
+
+Checks (exits 1 if any fails):
+  OFF-001  every adjustment queued offline, none sent
+  OFF-002  queue drained within --timeout without stalling for --stall s
+  OFF-003  no change failed for good
+  OFF-004  database quantities match the queue (synced: new, failed: old)
+  OFF-005  exactly one activity log per synced change
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py. The items live
+  in the seed's own tenant (--seed, default 18); reruns reuse them and start
+  from whatever quantities the last run left.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+
+# Desktop width: /scan shows the hardware-scanner input instead of the camera
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+SCAN_INPUT = "input[placeholder='Tap to focus, then scan']"
+BATCH_COUNT_JS = """
+n => [...document.querySelectorAll('button')].some(b => b.textContent.trim() === `List (${n})`)
+"""
+
+# Id, status and retry count of every queued change (Dexie's database, opened directly)
+QUEUE_JS = """
+() => new Promise((resolve, reject) => {
+  const open = indexedDB.open('StockZipOfflineDB');
+  open.onerror = () => reject(open.error);
+  open.onsuccess = () => {
+    const db = open.result;
+    if (!db.objectStoreNames.contains('pendingChanges')) { db.close(); resolve([]); return; }
+    const request = db.transaction('pendingChanges', 'readonly').objectStore('pendingChanges').getAll();
+    request.onsuccess = () => {
+      db.close();
+      resolve(request.result.map(c => ({
+        id: c.id, status: c.status, retries: c.retry_count, error: c.last_error || null,
+        item_id: c.entity_id, previous: c.payload && c.payload.previous_quantity,
+        quantity: c.payload && c.payload.new_quantity,
+      })));
+    };
+    request.onerror = () => { db.close(); reject(request.error); };
+  };
+})
+"""
+
+# Items' quantities move by one of these when counted
+DELTAS = (-5, -3, -2, -1, 1, 2, 3, 5, 10)
+
+results = []
+record = store.recorder(results)
+
+
+def seed_items(conn, args) -> tuple:
+    """(owner email, tenant id, [item rows as they are now]) for the first --changes seeded items"""
+    seeder = seed.Seeder(conn, seed=args.seed)
+    tenant_id = seeder.use_tenant()
+    seeder.run({"items": args.changes})
+    ids = [seeder.id("items", i) for i in range(args.changes)]
+    rows = conn.execute(
+        "SELECT id, barcode, sku, quantity FROM public.inventory_items "
+        "WHERE tenant_id = %s AND id = ANY(%s) AND deleted_at IS NULL",
+        (tenant_id, ids),
+    ).fetchall()
+    conn.commit()
+    by_id = {row[0]: row for row in rows}
+    items = [{"id": str(i), "barcode": by_id[i][1], "sku": by_id[i][2], "quantity": by_id[i][3]}
+             for i in ids if i in by_id]
+    return seeder.owner_email(), tenant_id, items
+
+
+def counted_quantity(rng: random.Random, quantity: int) -> int:
+    """A new count for an item: never the same, never 0 (the batch session stores 0 as 'not counted')"""
+    counted = max(1, quantity + rng.choice(DELTAS))
+    return counted if counted != quantity else quantity + 1
+
+
+def scan_all(page, items: list) -> float:
+    """Scan every barcode in Batch mode; returns scans per second"""
+    page.click("button:has-text('Batch')")
+    field = page.locator(SCAN_INPUT)
+    started = time.perf_counter()
+    for n, item in enumerate(items, 1):
+        field.fill(item["barcode"])
+        field.press("Enter")
+        page.wait_for_function(BATCH_COUNT_JS, arg=n, polling=50, timeout=30000)
+        if n % 250 == 0:
+            log(f"Scanned {n}/{len(items)}")
+    return len(items) / (time.perf_counter() - started)
+
+
+def count_all(page, items: list, rng: random.Random) -> tuple:
+    """Open the batch list and count each item at a new quantity; returns ({item id: counted}, counts per second)"""
+    page.click(f"button:has-text('List ({len(items)})')")
+    counted = {}
+    started = time.perf_counter()
+    for n, item in enumerate(items, 1):
+        row = page.locator("div.cursor-pointer", has_text=f"SKU: {item['sku']}")
+        if not row.count():
+            continue  # not found at scan time: Save skips it
+        row.click()
+        quantity = counted_quantity(rng, item["quantity"])
+        page.locator("input[type='number']").fill(str(quantity))
+        counted[item["id"]] = quantity
+        if n % 250 == 0:
+            log(f"Counted {n}/{len(items)}")
+    return counted, len(counted) / (time.perf_counter() - started)
+
+
+def queue_offline(page, context, expected: int) -> tuple:
+    """Go offline and save the count; returns (queued changes, seconds until all were in IndexedDB)"""
+    context.set_offline(True)
+    page.get_by_text("You're offline").wait_for(timeout=10000)
+    started = time.perf_counter()
+    page.click("button:has-text('Save Count')")
+    page.locator(SCAN_INPUT).wait_for(timeout=max(60000, expected * 50))
+    elapsed = time.perf_counter() - started
+    return page.evaluate(QUEUE_JS), elapsed
+
+
+def drain(page, context, total: int, args) -> dict:
+    """Reconnect (flapping with --flap) and poll the queue until it is empty, stalls or times out"""
+    retries, timeline = {}, []
+    started = time.perf_counter()
+    first_sync = last_sync = None
+    offline = False
+    context.set_offline(False)
+    last_left, last_progress = total, started
+    outcome = "timeout"
+    while time.perf_counter() - started < args.timeout:
+        elapsed = time.perf_counter() - started
+        if args.flap:
+            online_s, offline_s = args.flap
+            should_be_offline = elapsed % (online_s + offline_s) >= online_s
+            if should_be_offline != offline:
+                offline = should_be_offline
+                context.set_offline(offline)
+                log(f"{elapsed:.0f}s: {'offline' if offline else 'online'}")
+                last_progress = time.perf_counter()
+        queue = page.evaluate(QUEUE_JS)
+        for change in queue:
+            retries[change["id"]] = max(retries.get(change["id"], 0), change["retries"] or 0)
+        left = sum(1 for c in queue if c["status"] in ("pending", "syncing"))
+        failed = sum(1 for c in queue if c["status"] == "failed")
+        synced = total - len(queue)
+        timeline.append({"t": round(elapsed, 2), "left": left, "synced": synced, "failed": failed,
+                         "offline": offline})
+        if left < last_left:
+            now = time.perf_counter()
+            first_sync = first_sync or now
+            last_sync = now
+            last_left, last_progress = left, now
+        if left == 0:
+            outcome = "drained"
+            break
+        if not offline and time.perf_counter() - last_progress > args.stall:
+            outcome = "stalled"
+            break
+        page.wait_for_timeout(args.poll)
+    if offline:
+        context.set_offline(False)
+
+    queue = page.evaluate(QUEUE_JS)
+    for change in queue:
+        retries[change["id"]] = max(retries.get(change["id"], 0), change["retries"] or 0)
+    synced = total - len(queue)
+    active = (last_sync - first_sync) if first_sync and last_sync and last_sync > first_sync else None
+    return {
+        "outcome": outcome,
+        "drain": time.perf_counter() - started if outcome == "drained" else None,
+        "first_sync": first_sync - started if first_sync else None,
+        "synced": synced,
+        "throughput": synced / active if active else None,
+        "retries": sum(retries.values()),
+        "retried_changes": sum(1 for r in retries.values() if r),
+        "left": queue,
+        "timeline": timeline,
+    }
+
+
+def check_database(conn, tenant_id, queued: list, left: list, since) -> dict:
+    """Each queued item's quantity and quantity_adjusted logs in Postgres against the queue's outcome"""
+    still_queued = {c["id"] for c in left}
+    ids = [c["item_id"] for c in queued]
+    quantities = dict(conn.execute(
+        "SELECT id::text, quantity FROM public.inventory_items WHERE tenant_id = %s AND id = ANY(%s::uuid[])",
+        (tenant_id, ids),
+    ).fetchall())
+    logs = dict(conn.execute(
+        "SELECT entity_id::text, count(*) FROM public.activity_logs "
+        "WHERE tenant_id = %s AND entity_id = ANY(%s::uuid[]) AND action_type = 'quantity_adjusted' "
+        "AND created_at >= %s GROUP BY entity_id",
+        (tenant_id, ids, since),
+    ).fetchall())
+    mismatches, applied_but_queued, log_errors = [], [], []
+    for change in queued:
+        actual = quantities.get(change["item_id"])
+        synced = change["id"] not in still_queued
+        expected = change["quantity"] if synced else change["previous"]
+        if not synced and actual == change["quantity"]:
+            applied_but_queued.append(change["item_id"])  # written, but the client never heard back
+        elif actual != expected:
+            mismatches.append({"item_id": change["item_id"], "expected": expected, "actual": actual,
+                               "synced": synced})
+        count = logs.get(change["item_id"], 0)
+        if synced and count != 1:
+            log_errors.append({"item_id": change["item_id"], "logs": count})
+    return {"mismatches": mismatches, "applied_but_queued": applied_but_queued, "log_errors": log_errors}
+
+
+def print_report(summary: dict, args):
+    d = summary["drain"]
+    print("\n" + "=" * 60)
+    print(f"OFFLINE SYNC STRESS - {summary['queued']} changes, network {network.active()}"
+          + (f", flapping {args.flap[0]:g}s/{args.flap[1]:g}s" if args.flap else ""))
+    print("=" * 60)
+    print(f"  Scan            {summary['scan_rate']:.1f} scans/s")
+    print(f"  Count           {summary['count_rate']:.1f} items/s")
+    print(f"  Queue (offline) {summary['queue_time']:.1f}s, {summary['queued'] / summary['queue_time']:.0f} changes/s")
+    print(f"  First sync      {d['first_sync']:.1f}s after reconnecting" if d["first_sync"] is not None
+          else "  First sync      never")
+    print(f"  Drain           {d['drain']:.1f}s" if d["drain"] is not None else f"  Drain           {d['outcome']}")
+    print(f"  Throughput      {d['throughput']:.1f} changes/s" if d["throughput"] else "  Throughput      -")
+    print(f"  Retries         {d['retries']} ({d['retried_changes']} changes)")
+    print(f"  Failed / left   {sum(1 for c in d['left'] if c['status'] == 'failed')} / {len(d['left'])}")
+    db = summary["database"]
+    print(f"  Database        {len(db['mismatches'])} wrong quantities, {len(db['applied_but_queued'])} written "
+          f"but still queued, {len(db['log_errors'])} items without exactly one log")
+    print("=" * 60)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip offline-sync stress mode")
+    parser.add_argument("--changes", type=int, default=2000, help="quantity adjustments to queue (one per item)")
+    parser.add_argument("--flap", help="ON,OFF: seconds online, then offline, while draining (default: stay online)")
+    parser.add_argument("--timeout", type=float, default=900, help="s to wait for the queue to drain")
+    parser.add_argument("--stall", type=float, default=60, help="s online without progress that counts as stalled")
+    parser.add_argument("--poll", type=int, default=250, help="ms between queue polls")
+    parser.add_argument("--seed", type=int, default=18, help="seed of the tenant and the counted quantities")
+    parser.add_argument("--output", help="also write the summary and drain timeline as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    if args.flap:
+        try:
+            args.flap = tuple(float(s) for s in args.flap.split(","))
+            assert len(args.flap) == 2 and min(args.flap) > 0
+        except (ValueError, AssertionError):
+            parser.error("--flap takes ON,OFF seconds, e.g. 10,3")
+    return args
+
+
+def main():
+    """Main stress runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Offline Sync Stress")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Changes: {args.changes} | Flap: {'{:g}s on, {:g}s off'.format(*args.flap) if args.flap else 'no'}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        email, tenant_id, items = seed_items(conn, args)
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    log(f"{len(items)} items in tenant {tenant_id}")
+
+    readiness.verbose = False
+    store.begin_run("offline-sync-stress", base_url=BASE_URL)
+    rng = random.Random(args.seed)
+    summary = None
+
+    with conn, sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+            context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+            install(context)
+            network.apply(context)
+            page = context.new_page()
+            goto_authenticated(page, f"{BASE_URL}/scan", BASE_URL, email, seed.SEED_PASSWORD)
+            wait_for_page_ready(page)
+
+            log(f"Scanning {len(items)} barcodes in Batch mode")
+            scan_rate = scan_all(page, items)
+            counted, count_rate = count_all(page, items, rng)
+            log(f"Scanned at {scan_rate:.1f}/s, counted {len(counted)} at {count_rate:.1f}/s")
+
+            with store.check("queue offline"):
+                since = conn.execute("SELECT now()").fetchone()[0]
+                queued, queue_time = queue_offline(page, context, len(counted))
+                unsent = [c for c in queued if c["status"] == "pending" and not c["retries"]]
+                record("OFF-001", "Every adjustment queued offline, none sent", len(unsent) == len(counted),
+                       f"{len(unsent)}/{len(counted)} pending after {queue_time:.1f}s "
+                       f"({len(queued) / queue_time if queue_time else 0:.0f} changes/s)")
+
+            with store.check("drain"):
+                log("Reconnecting" + (f", flapping {args.flap[0]:g}s/{args.flap[1]:g}s" if args.flap else ""))
+                drained = drain(page, context, len(queued), args)
+                failed = [c for c in drained["left"] if c["status"] == "failed"]
+                record("OFF-002", "Queue drained", drained["outcome"] == "drained",
+                       f"{drained['drain']:.1f}s, {drained['throughput'] or 0:.1f} changes/s, "
+                       f"{drained['retries']} retries" if drained["outcome"] == "drained"
+                       else f"{drained['outcome']} with {len(drained['left']) - len(failed)} still pending",
+                       drain={k: v for k, v in drained.items() if k not in ("left", "timeline")})
+                errors = sorted({c["error"] for c in failed if c["error"]})
+                record("OFF-003", "No change failed for good", not failed,
+                       f"{len(failed)} failed" + (f": {'; '.join(errors[:3])}" if errors else ""))
+
+            with store.check("database"):
+                database = check_database(conn, tenant_id, queued, drained["left"], since)
+                wrong = len(database["mismatches"]) + len(database["applied_but_queued"])
+                record("OFF-004", "Database quantities match the queue", not wrong,
+                       f"{len(database['mismatches'])} wrong, {len(database['applied_but_queued'])} written but "
+                       f"still queued of {len(queued)}", mismatches=database["mismatches"][:20])
+                record("OFF-005", "One activity log per synced change", not database["log_errors"],
+                       f"{len(database['log_errors'])} of {drained['synced']} synced items without exactly one",
+                       log_errors=database["log_errors"][:20])
+
+            summary = {"queued": len(queued), "scan_rate": scan_rate, "count_rate": count_rate,
+                       "queue_time": queue_time, "drain": drained, "database": database}
+            context.close()
+        except Exception as e:
+            record("OFF-000", "Stress run completed", False, str(e))
+        finally:
+            browser.close()
+
+    if summary:
+        print_report(summary, args)
+
+    if args.output and summary:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "flap": args.flap, **summary},
+                      f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Offline queue drained and the database matches", "PASS")
+
+
+if __name__ == "__main__":
+    main()
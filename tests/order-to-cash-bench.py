@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Order-to-cash throughput benchmark for StockZip
+Drives sales orders through the whole pipeline in the real UI, as the owner
+of a seeded tenant: create -> submit -> confirm -> pick -> deliver ->
+invoice, for orders of increasing line counts. Reports how long each stage
+takes, how many orders a minute one user gets through, and how invoice
+generation grows with the number of lines, and compares the timings with a
+stored baseline.
+
+Usage:
+  python3 tests/order-to-cash-bench.py                        # 1,10,100,500 lines, 3 orders each
+  python3 tests/order-to-cash-bench.py --lines 1,50 --orders 10
+  python3 tests/order-to-cash-bench.py --ui-lines 20           # add and pick more lines by hand
+  python3 tests/order-to-cash-bench.py --update-baseline       # record a new baseline
+  python3 tests/order-to-cash-bench.py --network 3g           # see harness/network.py
+
+Stages (ms from the click that starts a stage to the page showing its end):
+  create   - "New Sales Order" -> customer picked, every line added, the
+             order reloaded with all of them
+  approve  - "Submit Order" -> "Confirm Order" -> "Start Picking" shown
+  pick     - "Start Picking" -> pick list started, every line picked,
+             completed and "Create Delivery Order" shown
+  deliver  - "Create Delivery Order" -> ready -> dispatched -> delivery
+             confirmed, "Create Invoice" shown
+  invoice  - "Create Invoice" -> invoice page ready
+
+Adding and picking 500 lines one click at a time measures the test more than
+the app, so only the first --ui-lines of an order are added and picked
+through the page. The rest replay the server action those clicks sent
+(addSalesOrderItem, pickItem) from the page with fetch, one line at a time
+like a user would, with the arguments swapped for the next line.
+
+Metrics per size:
+  <stage>_ms     - median of the orders
+  invoice_action - the createInvoiceFromDO request, send to response end
+  orders_per_min - orders finished per minute of wall time, one user
+  line_add_ms    - median addSalesOrderItem round trip
+  line_pick_ms   - median pickItem round trip
+The invoice_action medians are fitted to ms = overhead + c * lines ** k;
+k near 1 is linear growth with line count, well above 1 is worse.
+
+Checks (exits 1 if any fails):
+  O2C-NNN     - per size: every order reached an invoice with one line per
+                order line, and the order ended shipped
+  regression  - invoice_action or total_ms slower than the baseline by more
+                than --threshold percent, significant at --alpha (per size)
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py
+  ORDER_TO_CASH_BASELINE - baseline path (default tests/baselines/order-to-cash-bench.json)
+
+The tenant is the seed's own (--seed, default 22), on the scale tier so
+sales orders are enabled, with one customer and as many items as the largest
+order has lines, each stocked well past what the run ships. The orders,
+pick lists, deliveries and invoices a run creates are kept.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+BASELINE_PATH = os.environ.get(
+    "ORDER_TO_CASH_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "order-to-cash-bench.json"),
+)
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+DEFAULT_LINES = "1,10,100,500"
+MAX_LINES = 500
+STOCK = 1_000_000
+
+STAGES = ("create", "approve", "pick", "deliver", "invoice")
+
+# Gated against the baseline (lower is better)
+GATED = ("invoice_action", "total_ms")
+
+UUID_PATH = r"/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$"
+
+# Replays a captured server action with each of `bodies`, one after another
+REPLAY_JS = """
+async ({ url, headers, bodies }) => {
+  const out = [];
+  for (const body of bodies) {
+    const started = performance.now();
+    try {
+      const response = await fetch(url, { method: 'POST', headers, body, credentials: 'same-origin' });
+      const text = await response.text();
+      out.push({ ms: performance.now() - started, ok: response.ok && !text.includes('"success":false'),
+                 error: response.ok ? (text.match(/"error":"([^"]*)"/) || [])[1] || null : `HTTP ${response.status}` });
+    } catch (e) {
+      out.push({ ms: performance.now() - started, ok: false, error: String(e) });
+    }
+  }
+  return out;
+}
+"""
+
+# True once fewer than n pick list lines still have a Pick button
+PICK_BUTTONS_JS = """
+n => [...document.querySelectorAll('tbody button')].filter(b => b.textContent.trim() === 'Pick').length < n
+"""
+
+# Request headers a server action needs to be accepted again
+REPLAY_HEADERS = ("accept", "content-type", "next-action", "next-router-state-tree")
+
+results = []
+record = store.recorder(results)
+
+
+def is_server_action(request) -> bool:
+    """Next.js server actions are POSTs to the page URL with a Next-Action header"""
+    return request.method == "POST" and "next-action" in request.headers
+
+
+# -- fixtures -------------------------------------------------------------------
+
+
+def seed_tenant(conn, args) -> dict:
+    """The seed's tenant on the scale tier, with a customer and max(--lines) well-stocked items"""
+    seeder = seed.Seeder(conn, seed=args.seed)
+    tenant_id = seeder.use_tenant()
+    seeder.run({"items": max(args.lines), "customers": 1})
+    conn.execute("UPDATE public.tenants SET subscription_tier = 'scale' WHERE id = %s", (tenant_id,))
+    items = conn.execute(
+        "SELECT id, name, sku, price FROM public.inventory_items WHERE id = ANY(%s)",
+        ([seeder.id("items", i) for i in range(max(args.lines))],),
+    ).fetchall()
+    restock(conn, [row[0] for row in items])
+    order = {seeder.id("items", i): i for i in range(max(args.lines))}
+    items = sorted(items, key=lambda row: order[row[0]])
+    customer = conn.execute("SELECT name FROM public.customers WHERE id = %s",
+                            (seeder.id("customers", 0),)).fetchone()[0]
+    return {"seeder": seeder, "tenant_id": tenant_id, "customer": customer,
+            "items": [{"id": str(i), "name": n, "sku": s, "price": float(p or 0)} for i, n, s, p in items]}
+
+
+def restock(conn, item_ids: list):
+    """Untracked and far above anything a run ships, so no stage waits on stock"""
+    conn.execute(
+        "UPDATE public.inventory_items SET quantity = %s, tracking_mode = 'none', deleted_at = NULL "
+        "WHERE id = ANY(%s::uuid[])", (STOCK, [str(i) for i in item_ids]),
+    )
+    conn.commit()
+
+
+# -- server action replay -------------------------------------------------------
+
+
+def capture(page, click):
+    """Click and return the server action request it sent, once answered"""
+    with page.expect_request(is_server_action) as request_info:
+        click()
+    request = request_info.value
+    response = request.response()
+    if response:
+        response.finished()
+    return request
+
+
+def replay(page, request, calls: list) -> list:
+    """Send `request`'s action again once per argument list in `calls`"""
+    if not calls:
+        return []
+    headers = {k: v for k, v in request.headers.items() if k in REPLAY_HEADERS}
+    bodies = [json.dumps(args) for args in calls]
+    return page.evaluate(REPLAY_JS, {"url": request.url, "headers": headers, "bodies": bodies})
+
+
+def replayed(outcomes: list, what: str, problems: list) -> list:
+    failed = [o for o in outcomes if not o["ok"]]
+    if failed:
+        problems.append(f"{len(failed)} {what} failed: {failed[0]['error']}")
+    return [o["ms"] for o in outcomes if o["ok"]]
+
+
+# -- stages ---------------------------------------------------------------------
+
+
+def document_id(page, kind: str) -> str:
+    page.wait_for_url(re.compile(rf"/tasks/{kind}{UUID_PATH}"))
+    wait_for_page_ready(page)
+    return re.search(UUID_PATH, page.url.split("?")[0]).group(1)
+
+
+def click_until(page, name: str, shown: str, timeout: float):
+    """Click the button `name`, then wait for the button `shown` to appear"""
+    page.get_by_role("button", name=name, exact=True).first.click()
+    page.get_by_role("button", name=shown, exact=True).first.wait_for(timeout=timeout)
+
+
+def create(page, tenant: dict, lines: int, order: dict, args):
+    page.goto(f"{BASE_URL}/tasks/sales-orders")
+    wait_for_page_ready(page)
+    started = time.perf_counter()
+    page.get_by_role("button", name="New Sales Order").click()
+    order["sales_order_id"] = document_id(page, "sales-orders")
+
+    search = page.get_by_placeholder("Type to search customers...")
+    search.fill(tenant["customer"])
+    capture(page, lambda: page.locator("button", has_text=tenant["customer"]).first.click())
+
+    items = tenant["items"][:lines]
+    ui = items[:max(1, args.ui_lines)]
+    for item in ui:
+        page.get_by_placeholder("Search items to add...").fill(item["sku"])
+        result = page.locator("button", has_text=f"SKU: {item['sku']}").first
+        result.wait_for(timeout=args.timeout * 1000)
+        request = capture(page, result.click)
+        result.wait_for(state="detached", timeout=args.timeout * 1000)  # results clear once it's added
+    calls = [[order["sales_order_id"], {"item_id": item["id"], "item_name": item["name"], "sku": item["sku"],
+                                        "quantity_ordered": 1, "unit_price": item["price"]}]
+             for item in items[len(ui):]]
+    order["line_add"] = replayed(replay(page, request, calls), "line adds", order["problems"])
+    page.reload()
+    page.get_by_role("button", name="Submit Order", exact=True).first.wait_for(timeout=args.timeout * 1000)
+    order["create_ms"] = (time.perf_counter() - started) * 1000
+
+
+def approve(page, order: dict, args):
+    started = time.perf_counter()
+    click_until(page, "Submit Order", "Confirm Order", args.timeout * 1000)
+    click_until(page, "Confirm Order", "Start Picking", args.timeout * 1000)
+    order["approve_ms"] = (time.perf_counter() - started) * 1000
+
+
+def pick(page, conn, tenant: dict, order: dict, args):
+    timeout = args.timeout * 1000
+    started = time.perf_counter()
+    page.get_by_role("button", name="Start Picking", exact=True).first.click()
+    order["pick_list_id"] = document_id(page, "pick-lists")
+
+    assignee = page.locator("select:has(option:text-is('Select team member...'))")
+    if assignee.count() and not assignee.input_value():
+        capture(page, lambda: assignee.select_option(str(tenant["seeder"].owner_id)))
+    page.get_by_role("button", name="Start Picking", exact=True).first.click()
+    buttons = page.locator("tbody button:has-text('Pick')")
+    buttons.first.wait_for(timeout=timeout)
+
+    for _ in range(max(1, args.ui_lines)):
+        remaining = buttons.count()
+        if not remaining:
+            break
+        request = capture(page, buttons.first.click)
+        page.wait_for_function(PICK_BUTTONS_JS, arg=remaining, timeout=timeout)  # a picked line loses its button
+    lines = conn.execute(
+        "SELECT id, requested_quantity - picked_quantity FROM public.pick_list_items "
+        "WHERE pick_list_id = %s AND picked_quantity < requested_quantity", (order["pick_list_id"],),
+    ).fetchall()
+    conn.commit()
+    order["line_pick"] = replayed(replay(page, request, [[str(line), qty] for line, qty in lines]),
+                                  "line picks", order["problems"])
+    page.reload()
+    wait_for_page_ready(page)
+    click_until(page, "Complete", "Create Delivery Order", timeout)
+    order["pick_ms"] = (time.perf_counter() - started) * 1000
+
+
+def deliver(page, order: dict, args):
+    timeout = args.timeout * 1000
+    started = time.perf_counter()
+    page.get_by_role("button", name="Create Delivery Order", exact=True).first.click()
+    order["delivery_order_id"] = document_id(page, "delivery-orders")
+    click_until(page, "Mark Ready", "Dispatch", timeout)
+    click_until(page, "Dispatch", "Confirm Delivery", timeout)
+    page.get_by_role("button", name="Confirm Delivery", exact=True).first.click()
+    dialog = page.locator("div:has(> h2:text-is('Confirm Delivery'))")
+    dialog.get_by_role("button", name="Confirm Delivery", exact=True).click()
+    page.get_by_role("button", name="Create Invoice", exact=True).first.wait_for(timeout=timeout)
+    order["deliver_ms"] = (time.perf_counter() - started) * 1000
+
+
+def invoice(page, order: dict):
+    started = time.perf_counter()
+    request = capture(page, page.get_by_role("button", name="Create Invoice", exact=True).first.click)
+    order["invoice_action"] = request.timing["responseEnd"]
+    order["invoice_id"] = document_id(page, "invoices")
+    order["invoice_ms"] = (time.perf_counter() - started) * 1000
+
+
+def check_order(conn, order: dict, lines: int) -> list:
+    """What the database says went wrong with the order; empty when it is invoiced in full"""
+    problems = []
+    invoiced = conn.execute("SELECT count(*) FROM public.invoice_items WHERE invoice_id = %s",
+                            (order["invoice_id"],)).fetchone()[0]
+    status = conn.execute("SELECT status FROM public.sales_orders WHERE id = %s",
+                          (order["sales_order_id"],)).fetchone()[0]
+    conn.commit()
+    if invoiced != lines:
+        problems.append(f"{invoiced} invoice lines, expected {lines}")
+    if status not in ("shipped", "delivered", "completed"):
+        problems.append(f"sales order {status}")
+    return problems
+
+
+def run_order(page, conn, tenant: dict, lines: int, args) -> dict:
+    order = {"lines": lines, "problems": [], "outcome": None}
+    started = time.perf_counter()
+    stage = "create"
+    try:
+        create(page, tenant, lines, order, args)
+        stage = "approve"
+        approve(page, order, args)
+        stage = "pick"
+        pick(page, conn, tenant, order, args)
+        stage = "deliver"
+        deliver(page, order, args)
+        stage = "invoice"
+        invoice(page, order)
+        order["total_ms"] = (time.perf_counter() - started) * 1000
+        order["problems"] += check_order(conn, order, lines)
+        order["outcome"] = "invoiced"
+    except Exception as e:
+        order["outcome"] = f"stuck in {stage}"
+        order["problems"].append(f"{stage}: {str(e).splitlines()[0][:200] if str(e) else type(e).__name__}")
+    order["wall_s"] = time.perf_counter() - started
+    return order
+
+
+def run_size(page, conn, tenant: dict, lines: int, args) -> dict:
+    orders, problems = [], []
+    for i in range(args.warmup + args.orders):
+        restock(conn, [item["id"] for item in tenant["items"][:lines]])
+        order = run_order(page, conn, tenant, lines, args)
+        if i >= args.warmup:
+            orders.append(order)
+            problems.extend(order["problems"])
+        log(f"{lines} lines: {order['outcome']}"
+            + "".join(f", {s} {order[f'{s}_ms']:.0f}ms" for s in STAGES if order.get(f"{s}_ms") is not None)
+            + (f" - {'; '.join(order['problems'])}" if order["problems"] else ""),
+            "WARN" if order["problems"] else "INFO")
+
+    medians = {}
+    for metric in [f"{s}_ms" for s in STAGES] + ["total_ms", "invoice_action"]:
+        values = [o[metric] for o in orders if o.get(metric) is not None]
+        medians[metric] = statistics.median(values) if values else None
+    for metric in ("line_add", "line_pick"):
+        values = [ms for o in orders for ms in o.get(metric, [])]
+        medians[f"{metric}_ms"] = statistics.median(values) if values else None
+    finished = [o for o in orders if o["outcome"] == "invoiced"]
+    wall = sum(o["wall_s"] for o in orders)
+    medians["orders_per_min"] = len(finished) / (wall / 60) if wall else None
+    return {"lines": lines, "orders": orders, "medians": medians, "problems": problems}
+
+
+def invoice_growth(rows: list) -> dict:
+    """Fit the invoice action's median ms against line count"""
+    points = [(row["lines"], row["medians"]["invoice_action"]) for row in rows
+              if row["medians"].get("invoice_action") is not None]
+    if len({lines for lines, _ in points}) < 3:
+        return {"verdict": "insufficient", "points": points}
+    sizes, values = zip(*points)
+    return {**bench.power_fit(list(sizes), list(values)), "points": points}
+
+
+def print_report(rows: list, growth: dict, args):
+    print("\n" + "=" * 110)
+    print(f"ORDER TO CASH - median of {args.orders} orders per size, ms per stage")
+    print("=" * 110)
+    print(f"{'Lines':>6} " + " ".join(f"{s.capitalize():>8}" for s in STAGES)
+          + f" {'Total':>8} {'Inv. act':>8} {'Add/ln':>6} {'Pick/ln':>7} {'Ord/min':>8}  vs baseline")
+
+    def fmt(value, spec=".0f"):
+        return format(value, spec) if value is not None else "-"
+
+    for row in rows:
+        m = row["medians"]
+        verdicts = ", ".join(f"{metric.split('_')[0]} {c['verdict']}"
+                             + (f" {c['delta_pct']:+.0f}%" if c["delta_pct"] is not None else "")
+                             for metric, c in row["comparison"].items())
+        print(f"{row['lines']:>6} " + " ".join(f"{fmt(m[f'{s}_ms']):>8}" for s in STAGES)
+              + f" {fmt(m['total_ms']):>8} {fmt(m['invoice_action']):>8} {fmt(m['line_add_ms']):>6} "
+              f"{fmt(m['line_pick_ms']):>7} {fmt(m['orders_per_min'], '.2f'):>8}  {verdicts}")
+    print("=" * 110)
+    if growth.get("verdict") == "insufficient":
+        print("Invoice growth: needs at least 3 line counts")
+    else:
+        print(f"Invoice growth: ms = {growth['overhead']:.0f} + {growth['coefficient']:.3g} * lines^"
+              f"{growth['exponent']:.2f} (r2 {growth['r2']:.2f})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip order-to-cash throughput benchmark")
+    parser.add_argument("--lines", default=DEFAULT_LINES, help=f"comma-separated line counts (1-{MAX_LINES})")
+    parser.add_argument("--orders", type=int, default=3, help="measured orders per line count")
+    parser.add_argument("--warmup", type=int, default=0, help="discarded orders per line count")
+    parser.add_argument("--ui-lines", type=int, default=3,
+                        help="lines per order added and picked by clicking; the rest replay the action")
+    parser.add_argument("--timeout", type=float, default=120, help="s to wait for each step")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--seed", type=int, default=22, help="seed of the tenant")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--output", help="also write every order as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.lines = sorted({int(s) for s in args.lines.split(",") if s.strip()})
+    if not args.lines or args.lines[0] < 1 or args.lines[-1] > MAX_LINES:
+        parser.error(f"--lines must be between 1 and {MAX_LINES}")
+    return args
+
+
+def load_baseline(args) -> dict:
+    baseline = bench.load_baseline(args.baseline)
+    settings = {"network": network.active(), "ui_lines": args.ui_lines}
+    differs = [key for key, value in settings.items() if baseline and baseline.get(key) != value]
+    if differs:
+        log(f"Baseline was recorded with different {', '.join(differs)} - ignoring it", "WARN")
+        return {}
+    return baseline.get("samples", {})
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Order-to-Cash Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Lines: {', '.join(map(str, args.lines))} | {args.orders} orders + {args.warmup} warmup")
+    print(f"By hand: first {args.ui_lines} lines of each order")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        tenant = seed_tenant(conn, args)
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    email = tenant["seeder"].owner_email()
+
+    readiness.verbose = False
+    store.begin_run("order-to-cash-bench", base_url=BASE_URL)
+    baseline = load_baseline(args)
+
+    rows = []
+    with conn, sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+            context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+            install(context)
+            network.apply(context)
+            page = context.new_page()
+            page.set_default_timeout(args.timeout * 1000)
+            goto_authenticated(page, f"{BASE_URL}/tasks/sales-orders", BASE_URL, email, seed.SEED_PASSWORD)
+            for lines in args.lines:
+                started = time.perf_counter()
+                rows.append(run_size(page, conn, tenant, lines, args))
+                rows[-1]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            context.close()
+        finally:
+            browser.close()
+
+    for row in rows:
+        row["comparison"] = {}
+        for metric in GATED:
+            samples = [o[metric] for o in row["orders"] if o.get(metric) is not None]
+            if samples:
+                row["comparison"][metric] = bench.compare(samples, baseline.get(f"{row['lines']}|{metric}", []),
+                                                          args.threshold, args.alpha, stat="p50")
+    growth = invoice_growth(rows)
+    print_report(rows, growth, args)
+
+    for index, row in enumerate(rows, 1):
+        regressed = [metric for metric, c in row["comparison"].items() if c["verdict"] == "regressed"]
+        finished = sum(o["outcome"] == "invoiced" for o in row["orders"])
+        details = f"{finished}/{len(row['orders'])} invoiced" + (
+            f", {row['medians']['orders_per_min']:.2f} orders/min" if row["medians"].get("orders_per_min") else "")
+        if row["problems"]:
+            details += f" - {'; '.join(sorted(set(row['problems']))[:3])}"
+        if regressed:
+            details += f" - {', '.join(regressed)} regressed past {args.threshold:.0f}%"
+        with store.check(f"orders of {row['lines']} lines", row["duration_ms"]):
+            record(f"O2C-{index:03d}", f"Orders of {row['lines']} lines", not row["problems"] and not regressed,
+                   details, medians=row["medians"], comparison=row["comparison"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "rows": rows,
+                       "invoice_growth": growth}, f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if args.update_baseline:
+        bench.save_baseline(args.baseline, {f"{row['lines']}|{metric}": [o[metric] for o in row["orders"]
+                                                                          if o.get(metric) is not None]
+                                            for row in rows for metric in GATED},
+                            base_url=BASE_URL, orders=args.orders, network=network.active(),
+                            ui_lines=args.ui_lines)
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Every order invoiced in full, no significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
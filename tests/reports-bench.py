@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Reports benchmark for StockZip
+Loads every /reports/* page across seeded dataset sizes and date-range widths
+and measures where each load's time goes: the server's response, the
+database queries behind it, the bytes sent and the browser's render. Prints a
+per-report scaling table, points at the statements that grow worst, and
+compares the timings with a stored baseline.
+
+Usage:
+  python3 tests/reports-bench.py                              # small,medium datasets, every report
+  python3 tests/reports-bench.py --datasets small,medium,large --runs 5
+  python3 tests/reports-bench.py --reports activity,trends --ranges 7d,1y
+  python3 tests/reports-bench.py --update-baseline            # record a new baseline
+  python3 tests/reports-bench.py --network 3g                # see harness/network.py
+
+Datasets are seed.PRESETS (harness/seed.py), each in its own seeded tenant:
+small, medium and large are seeds --seed, --seed + 1 and --seed + 2
+(default 23-25). large is 100k items and 500k activity logs, so seeding it
+the first time takes a while; later runs find the rows already in.
+
+Date ranges (--ranges, e.g. 7d, 90d, 1y, all) apply to the two reports that
+have a period picker, activity and stock-movement. Their pickers stop at 90
+days, so wider ranges are added to the picker as an extra option and picked
+like any other: the page's own query runs with that window. The other
+reports are rendered on the server with fixed windows and are measured once
+per dataset ("-" in the range column).
+
+Metrics per load (median of --runs):
+  server_ms  - document request to first byte (server components, including
+               their Supabase queries)
+  rest_ms    - slowest Supabase REST/RPC request the browser made, from its
+               network timing (client-rendered reports and range changes)
+  db_ms      - Postgres execution time over the load, from pg_stat_statements;
+               covers the queries the server makes too. "-" when the
+               extension isn't available
+  kib        - response bytes of the document, RSC and Supabase requests
+  render_ms  - last byte of report data -> last DOM change
+  total_ms   - navigation -> last DOM change; for reports with a period
+               picker, range change -> last DOM change (a range that is
+               already picked is switched away from and back)
+
+Scaling: total_ms and db_ms are fitted against the datasets' item counts
+(ms = overhead + c * items ** k, needs 3 datasets). A report whose db_ms
+grows with k above 1 + --tolerance is listed with the statement that cost
+it the most on the largest dataset - the query to index or pre-aggregate.
+
+Checks (exits 1 if any fails):
+  REPORT-NNN  - per report: every load finished within --timeout, and no
+                total_ms or db_ms slower than the baseline by more than
+                --threshold percent, significant at --alpha
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py
+  REPORTS_BASELINE  - baseline path (default tests/baselines/reports-bench.json)
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.replay import is_supabase
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+BASELINE_PATH = os.environ.get(
+    "REPORTS_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "reports-bench.json"),
+)
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+REPORT_PAGES = [
+    "inventory-value", "stock-movement", "trends", "profit-margin",
+    "activity", "expiring", "low-stock", "inventory-summary",
+]
+
+# Client-rendered reports with a period <select> (values are days)
+RANGED = {"activity", "stock-movement"}
+
+DATASETS = ("small", "medium", "large")
+DEFAULT_DATASETS = "small,medium"
+DEFAULT_RANGES = "7d,90d,1y,all"
+ALL_DAYS = 36500
+
+METRICS = ("server_ms", "rest_ms", "db_ms", "kib", "render_ms", "total_ms")
+
+# Gated against the baseline (lower is better)
+GATED = ("total_ms", "db_ms")
+
+# Requests whose bytes count as the report's payload
+PAYLOAD_TYPES = ("document", "fetch", "xhr")
+
+# Time of the last DOM change, for render_ms
+RENDER_JS = """
+(() => {
+  if (window.__render) return;
+  const state = window.__render = { last: performance.now() };
+  new MutationObserver(() => { state.last = performance.now(); })
+    .observe(document, { subtree: true, childList: true, characterData: true, attributes: true });
+})();
+"""
+
+# The period picker, with `days` added as an option if it doesn't offer it
+PERIOD_JS = """
+days => {
+  const select = [...document.querySelectorAll('select')].find(s => s.querySelector("option[value='90']"));
+  if (!select) return null;
+  const current = select.value;
+  if (!select.querySelector(`option[value='${days}']`)) {
+    const option = document.createElement('option');
+    option.value = String(days);
+    option.textContent = `Last ${days} days`;
+    select.appendChild(option);
+  }
+  return current;
+}
+"""
+
+# Another range than `days` on the picker, to switch from when `days` is already picked
+OTHER_PERIOD_JS = """
+days => {
+  const select = [...document.querySelectorAll('select')].find(s => s.querySelector("option[value='90']"));
+  const other = [...select.options].find(o => o.value !== String(days));
+  return other ? other.value : null;
+}
+"""
+
+NOW_JS = "() => performance.timeOrigin + performance.now()"
+RENDERED_JS = "() => performance.timeOrigin + (window.__render ? window.__render.last : performance.now())"
+
+results = []
+record = store.recorder(results)
+
+
+def parse_range(value: str) -> int:
+    """7d / 12w / 1y / all -> days"""
+    if value == "all":
+        return ALL_DAYS
+    match = re.fullmatch(r"(\d+)([dwy])", value)
+    if not match:
+        raise ValueError(f"bad range {value!r}: use e.g. 7d, 12w, 1y or all")
+    return int(match.group(1)) * {"d": 1, "w": 7, "y": 365}[match.group(2)]
+
+
+# -- datasets -------------------------------------------------------------------
+
+
+def seed_datasets(conn, args) -> list:
+    """One seeded tenant per dataset: [{name, items, email}]"""
+    tenants = []
+    for name in args.datasets:
+        seeder = seed.Seeder(conn, seed=args.seed + DATASETS.index(name))
+        seeder.use_tenant()
+        log(f"Dataset {name}: seed {seeder.seed}")
+        seeder.run(seed.PRESETS[name])
+        tenants.append({"name": name, "items": seed.PRESETS[name]["items"], "email": seeder.owner_email()})
+    return tenants
+
+
+# -- database time --------------------------------------------------------------
+
+
+def statements_view(conn):
+    """Where pg_stat_statements is readable from, or None"""
+    for name in ("pg_stat_statements", "extensions.pg_stat_statements"):
+        try:
+            if conn.execute("SELECT to_regclass(%s)", (name,)).fetchone()[0]:
+                conn.execute(f"SELECT 1 FROM {name} LIMIT 1")
+                conn.commit()
+                return name
+        except Exception:
+            conn.rollback()
+    return None
+
+
+def snapshot(conn, view) -> dict:
+    """{queryid: (calls, exec ms, query)} for this database"""
+    if not view:
+        return {}
+    rows = conn.execute(
+        f"SELECT queryid, calls, total_exec_time, left(query, 300) FROM {view} "
+        "WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())"
+    ).fetchall()
+    conn.commit()
+    return {queryid: (calls, ms, query) for queryid, calls, ms, query in rows}
+
+
+def db_delta(before: dict, after: dict) -> tuple:
+    """Total exec ms between two snapshots, and the costliest statement (query, calls, ms)"""
+    total, top = 0.0, None
+    for queryid, (calls, ms, query) in after.items():
+        was_calls, was_ms, _ = before.get(queryid, (0, 0.0, None))
+        spent = ms - was_ms
+        if calls == was_calls or spent <= 0 or "pg_stat_statements" in query:
+            continue
+        total += spent
+        if not top or spent > top[2]:
+            top = (" ".join(query.split()), calls - was_calls, spent)
+    return total, top
+
+
+# -- loads ----------------------------------------------------------------------
+
+
+def ms_between(request, start: str, end: str):
+    timing = request.timing
+    if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+        return None
+    return timing[end] - timing[start]
+
+
+def pick_period(page, value: str, timeout: float):
+    page.select_option("select:has(option[value='90'])", value)
+    page.locator(".animate-spin").first.wait_for(state="hidden", timeout=timeout)
+    wait_for_page_ready(page, timeout=timeout)
+
+
+def load_report(page, conn, view, report: str, days, args) -> dict:
+    """Load one report (and pick `days` on its period picker); the load's metrics"""
+    seen = []
+    on_finished = seen.append
+    page.on("requestfinished", on_finished)
+    timeout = args.timeout * 1000
+    try:
+        before = snapshot(conn, view)
+        page.goto(f"{BASE_URL}/reports/{report}", wait_until="load", timeout=timeout)
+        wait_for_page_ready(page, timeout=timeout)
+        started = page.evaluate("() => performance.timeOrigin")
+        if days is not None:
+            current = page.evaluate(PERIOD_JS, days)
+            if current is None and report == "activity":
+                page.get_by_role("button", name="Filters").click()
+                current = page.evaluate(PERIOD_JS, days)
+            if current is None:
+                return {"error": "no period picker"}
+            if current == str(days):
+                # Already the picker's default: move off it first, so every range
+                # times a range change rather than the whole navigation
+                pick_period(page, page.evaluate(OTHER_PERIOD_JS, days), timeout)
+            seen.clear()  # from here on only the range change's requests count
+            before = snapshot(conn, view)
+            started = page.evaluate(NOW_JS)
+            pick_period(page, str(days), timeout)
+        rendered = page.evaluate(RENDERED_JS)
+        after = snapshot(conn, view)
+    except Exception as e:
+        return {"error": "timeout" if "Timeout" in type(e).__name__ else str(e).splitlines()[0][:200]}
+    finally:
+        page.remove_listener("requestfinished", on_finished)
+
+    document = next((r for r in seen if r.resource_type == "document"), None)
+    supabase = [r for r in seen if is_supabase(r.url)]
+    payload = [r for r in seen if r.resource_type in PAYLOAD_TYPES]
+    ends = [r.timing["startTime"] + r.timing["responseEnd"] for r in payload if r.timing.get("responseEnd", -1) >= 0]
+    rest = [ms for ms in (ms_between(r, "startTime", "responseEnd") for r in supabase) if ms is not None]
+    size = 0
+    for r in payload:
+        try:
+            size += r.sizes()["responseBodySize"]
+        except Exception:
+            pass
+    db_ms, top = db_delta(before, after) if view else (None, None)
+    return {
+        "server_ms": ms_between(document, "requestStart", "responseStart") if document else None,
+        "rest_ms": max(rest) if rest else None,
+        "rest_calls": len(supabase),
+        "rpc_calls": sum("/rest/v1/rpc/" in r.url for r in supabase),
+        "db_ms": db_ms,
+        "top_statement": top,
+        "kib": size / 1024,
+        "render_ms": max(0.0, rendered - max(ends)) if ends else None,
+        "total_ms": rendered - started,
+    }
+
+
+def run_cell(page, conn, view, dataset: dict, report: str, days, args) -> dict:
+    started = time.perf_counter()
+    loads = []
+    for i in range(args.warmup + args.runs):
+        load = load_report(page, conn, view, report, days, args)
+        if i >= args.warmup:
+            loads.append(load)
+        if load.get("error"):
+            log(f"{dataset['name']} {report} {range_label(days)}: {load['error']}", "WARN")
+            break
+    ok = [load for load in loads if not load.get("error")]
+    medians = {}
+    for metric in METRICS:
+        values = [load[metric] for load in ok if load.get(metric) is not None]
+        medians[metric] = statistics.median(values) if values else None
+    tops = [load["top_statement"] for load in ok if load.get("top_statement")]
+    cell = {"dataset": dataset["name"], "items": dataset["items"], "report": report, "days": days,
+            "loads": loads, "medians": medians, "errors": [load["error"] for load in loads if load.get("error")],
+            "top_statement": max(tops, key=lambda t: t[2]) if tops else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+    m = medians
+    log(f"{dataset['name']} {report} {range_label(days)}: total {fmt(m['total_ms'])}ms, server "
+        f"{fmt(m['server_ms'])}ms, db {fmt(m['db_ms'])}ms, {fmt(m['kib'])} KiB")
+    return cell
+
+
+def range_label(days) -> str:
+    if days is None:
+        return "-"
+    if days == ALL_DAYS:
+        return "all"
+    return f"{days // 365}y" if days % 365 == 0 else f"{days}d"
+
+
+def fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+# -- report ---------------------------------------------------------------------
+
+
+def growth(cells: list, metric: str) -> dict:
+    points = [(c["items"], c["medians"][metric]) for c in cells if c["medians"].get(metric) is not None]
+    if len({items for items, _ in points}) < 3:
+        return {"verdict": "insufficient", "points": points}
+    sizes, values = zip(*points)
+    return {**bench.power_fit(list(sizes), list(values)), "points": points}
+
+
+def scaling(cells: list, args) -> list:
+    """One row per report and range, the datasets side by side"""
+    rows = []
+    for report in args.reports:
+        for days in ranges_for(report, args):
+            group = sorted((c for c in cells if c["report"] == report and c["days"] == days),
+                           key=lambda c: c["items"])
+            if not group:
+                continue
+            fits = {metric: growth(group, metric) for metric in ("total_ms", "db_ms")}
+            db = fits["db_ms"]
+            flagged = db.get("verdict") != "insufficient" and db["exponent"] > 1 + args.tolerance
+            rows.append({"report": report, "days": days, "cells": group, "growth": fits, "flagged": flagged,
+                         "top_statement": group[-1]["top_statement"]})
+    return rows
+
+
+def print_report(rows: list, args):
+    width = 36 + 22 * len(args.datasets)
+    print("\n" + "=" * width)
+    print(f"REPORTS - median of {args.runs} loads, total ms (db ms) per dataset")
+    print("=" * width)
+    print(f"{'Report':<18} {'Range':<6} " + " ".join(f"{name:>21}" for name in args.datasets) + "  Growth")
+    for row in rows:
+        by_name = {c["dataset"]: c for c in row["cells"]}
+        columns = []
+        for name in args.datasets:
+            cell = by_name.get(name)
+            if not cell:
+                columns.append(f"{'-':>21}")
+            elif cell["errors"] and not cell["medians"]["total_ms"]:
+                columns.append(f"{cell['errors'][0][:21]:>21}")
+            else:
+                m = cell["medians"]
+                columns.append(f"{fmt(m['total_ms']) + ' (' + fmt(m['db_ms']) + ')':>21}")
+        fit = row["growth"]["total_ms"]
+        trend = "-" if fit.get("verdict") == "insufficient" else f"k={fit['exponent']:.2f}"
+        print(f"{row['report']:<18} {range_label(row['days']):<6} " + " ".join(columns)
+              + f"  {trend}{'  ⚠️ db' if row['flagged'] else ''}")
+    print("=" * width)
+
+    largest = args.datasets[-1]
+    print(f"\nLoad breakdown on {largest} (ms unless noted):")
+    print(f"{'Report':<18} {'Range':<6} {'Server':>7} {'REST':>7} {'DB':>7} {'KiB':>7} {'Render':>7} {'Total':>7}")
+    for row in rows:
+        cell = next((c for c in row["cells"] if c["dataset"] == largest), None)
+        if cell:
+            m = cell["medians"]
+            print(f"{row['report']:<18} {range_label(row['days']):<6} {fmt(m['server_ms']):>7} "
+                  f"{fmt(m['rest_ms']):>7} {fmt(m['db_ms']):>7} {fmt(m['kib']):>7} {fmt(m['render_ms']):>7} "
+                  f"{fmt(m['total_ms']):>7}")
+
+    flagged = [row for row in rows if row["flagged"]]
+    if flagged:
+        print(f"\nDatabase time growing faster than linear (k > {1 + args.tolerance:.2f}):")
+        for row in flagged:
+            k = row["growth"]["db_ms"]["exponent"]
+            print(f"  {row['report']} {range_label(row['days'])}: k={k:.2f}")
+            if row["top_statement"]:
+                query, calls, ms = row["top_statement"]
+                print(f"    {ms:.0f}ms over {calls} calls: {query[:160]}")
+
+
+def ranges_for(report: str, args) -> list:
+    return args.ranges if report in RANGED else [None]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip reports benchmark")
+    parser.add_argument("--reports", default=",".join(REPORT_PAGES), help="comma-separated report pages")
+    parser.add_argument("--datasets", default=DEFAULT_DATASETS, help=f"comma-separated: {', '.join(DATASETS)}")
+    parser.add_argument("--ranges", default=DEFAULT_RANGES, help="comma-separated widths: 7d, 12w, 1y, all")
+    parser.add_argument("--runs", type=int, default=3, help="measured loads per report, range and dataset")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded loads before measuring")
+    parser.add_argument("--timeout", type=float, default=60, help="s a load may take before it counts as failed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="db_ms exponent allowed above linear")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--seed", type=int, default=23, help="seed of the small dataset; +1, +2 for the others")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--output", help="also write every load as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.reports = [r.strip() for r in args.reports.split(",") if r.strip()]
+    unknown = set(args.reports) - set(REPORT_PAGES)
+    if unknown:
+        parser.error(f"unknown reports: {', '.join(sorted(unknown))}")
+    names = {d.strip() for d in args.datasets.split(",") if d.strip()}
+    if names - set(DATASETS):
+        parser.error(f"unknown datasets: {', '.join(sorted(names - set(DATASETS)))}")
+    args.datasets = [name for name in DATASETS if name in names]
+    try:
+        args.ranges = sorted({parse_range(r.strip()) for r in args.ranges.split(",") if r.strip()})
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def load_baseline(args) -> dict:
+    baseline = bench.load_baseline(args.baseline)
+    settings = {"network": network.active()}
+    differs = [key for key, value in settings.items() if baseline and baseline.get(key) != value]
+    if differs:
+        log(f"Baseline was recorded with different {', '.join(differs)} - ignoring it", "WARN")
+        return {}
+    return baseline.get("samples", {})
+
+
+def sample_key(cell: dict, metric: str) -> str:
+    return f"{cell['dataset']}|{cell['report']}|{range_label(cell['days'])}|{metric}"
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Reports Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Reports: {len(args.reports)} | Datasets: {', '.join(args.datasets)}")
+    print(f"Ranges: {', '.join(map(range_label, args.ranges))} (activity, stock-movement)")
+    print(f"Runs: {args.runs} + {args.warmup} warmup | Timeout: {args.timeout:.0f}s")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        datasets = seed_datasets(conn, args)
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    view = statements_view(conn)
+    if not view:
+        log("pg_stat_statements isn't readable - db_ms won't be measured", "WARN")
+
+    readiness.verbose = False
+    store.begin_run("reports-bench", base_url=BASE_URL)
+    baseline = load_baseline(args)
+
+    cells = []
+    with conn, sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            for dataset in datasets:
+                state = ensure_state(browser, BASE_URL, dataset["email"], seed.SEED_PASSWORD)
+                context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+                install(context)
+                context.add_init_script(RENDER_JS)
+                network.apply(context)
+                page = context.new_page()
+                goto_authenticated(page, f"{BASE_URL}/reports", BASE_URL, dataset["email"], seed.SEED_PASSWORD)
+                for report in args.reports:
+                    for days in ranges_for(report, args):
+                        cells.append(run_cell(page, conn, view, dataset, report, days, args))
+                context.close()
+        finally:
+            browser.close()
+
+    for cell in cells:
+        cell["comparison"] = {}
+        for metric in GATED:
+            samples = [load[metric] for load in cell["loads"] if load.get(metric) is not None]
+            if samples:
+                cell["comparison"][metric] = bench.compare(samples, baseline.get(sample_key(cell, metric), []),
+                                                           args.threshold, args.alpha, stat="p50")
+    rows = scaling(cells, args)
+    print_report(rows, args)
+
+    for index, report in enumerate(args.reports, 1):
+        own = [c for c in cells if c["report"] == report]
+        failed = [f"{c['dataset']} {range_label(c['days'])}: {c['errors'][0]}" for c in own if c["errors"]]
+        regressed = [f"{c['dataset']} {range_label(c['days'])} {metric.split('_')[0]} {cmp['delta_pct']:+.0f}%"
+                     for c in own for metric, cmp in c["comparison"].items() if cmp["verdict"] == "regressed"]
+        slowest = max((c["medians"]["total_ms"] for c in own if c["medians"]["total_ms"] is not None), default=None)
+        details = f"slowest {fmt(slowest)}ms"
+        if failed:
+            details += f" - {'; '.join(failed[:3])}"
+        if regressed:
+            details += f" - regressed: {', '.join(regressed[:3])}"
+        with store.check(f"/reports/{report}", round(sum(c["duration_ms"] for c in own), 1)):
+            record(f"REPORT-{index:03d}", f"/reports/{report}", not failed and not regressed, details,
+                   cells=[{k: c[k] for k in ("dataset", "days", "medians", "comparison", "errors")} for c in own])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "cells": cells,
+                       "scaling": [{k: row[k] for k in ("report", "days", "growth", "flagged", "top_statement")}
+                                   for row in rows]}, f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if args.update_baseline:
+        bench.save_baseline(args.baseline, {sample_key(cell, metric): [load[metric] for load in cell["loads"]
+                                                                       if load.get(metric) is not None]
+                                            for cell in cells for metric in GATED},
+                            base_url=BASE_URL, runs=args.runs, network=network.active())
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Every report loaded in time, no significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Query the results store (harness/results.py) across runs.
+
+Usage:
+  python3 tests/results-cli.py runs [--limit 20]
+  python3 tests/results-cli.py show [RUN_ID]                  # default: latest run
+  python3 tests/results-cli.py trend ['INV-*'] [--runs 30] [--script team-test] [--network 3g]
+  python3 tests/results-cli.py junit RUN_ID -o results.xml
+  python3 tests/results-cli.py reindex                        # rebuild SQLite from the JSONL log
+
+`trend` lists every matching test id with its pass rate and how often it
+flipped between pass and fail (flaky), and compares the median duration of
+the older and newer half of its runs (slowing down). The duration is that of
+the check (test function, async task, scenario) that recorded the result;
+results recorded outside a check have none and are left out. --network keeps
+only results recorded under that network profile (harness/network.py), so
+slow and fast runs don't mix. Patterns are globs on the test id: TEAM-*,
+ROLE-*, INV-0*, ...
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from harness import results
+
+# A test is flagged when its newer runs are this much slower (median)
+SLOWDOWN_PCT = 20.0
+
+
+def fmt_time(ts) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+
+def latest_run(db, script: str = None) -> str:
+    query = "SELECT run_id FROM runs" + (" WHERE script = ?" if script else "") + " ORDER BY started_at DESC LIMIT 1"
+    row = db.execute(query, (script,) if script else ()).fetchone()
+    return row[0] if row else None
+
+
+def cmd_runs(db, args):
+    rows = db.execute(
+        "SELECT r.run_id, r.script, r.started_at, r.finished_at, "
+        "COUNT(x.id), COALESCE(SUM(x.passed), 0) "
+        "FROM runs r LEFT JOIN results x ON x.run_id = r.run_id "
+        + ("WHERE r.script = ? " if args.script else "") +
+        "GROUP BY r.run_id ORDER BY r.started_at DESC LIMIT ?",
+        ((args.script,) if args.script else ()) + (args.limit,),
+    ).fetchall()
+    print(f"{'Run':<28} {'Script':<18} {'Started':<17} {'Total':>6} {'Pass':>5} {'Fail':>5} {'Secs':>6}  Status")
+    for run_id, script, started, finished, total, passed in rows:
+        secs = f"{finished - started:.0f}" if finished else "-"
+        status = "complete" if finished else "incomplete"
+        print(f"{run_id:<28} {script or '-':<18} {fmt_time(started):<17} {total:>6} {passed:>5} "
+              f"{total - passed:>5} {secs:>6}  {status}")
+
+
+def cmd_show(db, args):
+    run_id = args.run_id or latest_run(db, args.script)
+    if not run_id:
+        print("No runs recorded yet")
+        return 1
+    rows = db.execute(
+        "SELECT test_id, name, passed, details, duration_ms, account, artifacts, network FROM results "
+        "WHERE run_id = ? ORDER BY id", (run_id,)
+    ).fetchall()
+    networks = sorted({row[-1] or "none" for row in rows})
+    print(f"Run {run_id}: {len(rows)} results, network {', '.join(networks) or '-'}")
+    for test_id, name, passed, details, duration_ms, account, artifacts, _ in rows:
+        icon = "✅" if passed else "❌"
+        who = f" [{account}]" if account else ""
+        took = f"{duration_ms:.0f}ms" if duration_ms is not None else "-"
+        print(f"  {icon} {test_id:<10} {took:>8}  {name}{who}" + (f" - {details}" if details else ""))
+    return 0
+
+
+def trend_rows(db, pattern: str, runs: int, script: str = None, network: str = None) -> list:
+    """Per test id over the last `runs` runs: pass rate, flips and duration drift"""
+    recent = [r[0] for r in db.execute(
+        "SELECT run_id FROM runs" + (" WHERE script = ?" if script else "") + " ORDER BY started_at DESC LIMIT ?",
+        ((script,) if script else ()) + (runs,),
+    )]
+    if not recent:
+        return []
+    placeholders = ",".join("?" * len(recent))
+    history = {}
+    for test_id, passed, duration_ms in db.execute(
+        f"SELECT test_id, passed, duration_ms FROM results WHERE test_id GLOB ? AND run_id IN ({placeholders}) "
+        + ("AND COALESCE(network, 'none') = ? " if network else "") + "ORDER BY recorded_at",
+        (pattern, *recent) + ((network,) if network else ()),
+    ):
+        history.setdefault(test_id, []).append((passed, duration_ms))
+
+    rows = []
+    for test_id, samples in sorted(history.items()):
+        outcomes = [p for p, _ in samples]
+        durations = [d for _, d in samples if d is not None]
+        flips = sum(1 for a, b in zip(outcomes, outcomes[1:]) if a != b)
+        drift = None
+        if len(durations) >= 6:
+            half = len(durations) // 2
+            older, newer = statistics.median(durations[:half]), statistics.median(durations[half:])
+            drift = (newer - older) / older * 100 if older else None
+        flags = []
+        if 0 < sum(outcomes) < len(outcomes) and flips >= 2:
+            flags.append("flaky")
+        if drift is not None and drift > SLOWDOWN_PCT:
+            flags.append("slowing")
+        rows.append({
+            "test_id": test_id,
+            "count": len(samples),
+            "pass_rate": sum(outcomes) / len(outcomes),
+            "flips": flips,
+            "median_ms": statistics.median(durations) if durations else None,
+            "drift_pct": drift,
+            "flags": flags,
+        })
+    return rows
+
+
+def cmd_trend(db, args):
+    rows = trend_rows(db, args.pattern, args.runs, args.script, args.network)
+    if not rows:
+        print(f"No results for {args.pattern}")
+        return 0
+    print(f"Last {args.runs} runs, tests matching {args.pattern}" + (f", network {args.network}" if args.network else ""))
+    print(f"{'Test':<12} {'Runs':>5} {'Pass%':>6} {'Flips':>6} {'Median':>8} {'Drift':>7}  Flags")
+    for r in rows:
+        median = f"{r['median_ms']:.0f}ms" if r["median_ms"] is not None else "-"
+        drift = f"{r['drift_pct']:+.0f}%" if r["drift_pct"] is not None else "-"
+        print(f"{r['test_id']:<12} {r['count']:>5} {r['pass_rate'] * 100:>6.0f} {r['flips']:>6} {median:>8} "
+              f"{drift:>7}  {', '.join(r['flags'])}")
+    flagged = [r for r in rows if r["flags"]]
+    return 1 if flagged and args.strict else 0
+
+
+def cmd_junit(db, args):
+    run_id = args.run_id or latest_run(db, args.script)
+    if not run_id:
+        print("No runs recorded yet")
+        return 1
+    print(results.export_junit(run_id, args.output))
+    return 0
+
+
+def cmd_reindex(db, args):
+    print(f"Indexed {results.rebuild_index()} results from {results.jsonl_path()}")
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query StockZip test results across runs")
+    parser.add_argument("--script", help="only runs of this script (team-test, team-quick-test, ...)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    runs = sub.add_parser("runs", help="recent runs")
+    runs.add_argument("--limit", type=int, default=20)
+    runs.set_defaults(handler=cmd_runs)
+
+    show = sub.add_parser("show", help="results of one run")
+    show.add_argument("run_id", nargs="?")
+    show.set_defaults(handler=cmd_show)
+
+    trend = sub.add_parser("trend", help="pass rate and duration trend per test id")
+    trend.add_argument("pattern", nargs="?", default="*", help="glob on the test id, e.g. 'INV-*'")
+    trend.add_argument("--runs", type=int, default=30, help="how many recent runs to look at")
+    trend.add_argument("--network", help="only results recorded under this network profile")
+    trend.add_argument("--strict", action="store_true", help="exit 1 if anything is flaky or slowing")
+    trend.set_defaults(handler=cmd_trend)
+
+    junit = sub.add_parser("junit", help="export a run as JUnit XML")
+    junit.add_argument("run_id", nargs="?")
+    junit.add_argument("-o", "--output", default="results.xml")
+    junit.set_defaults(handler=cmd_junit)
+
+    reindex = sub.add_parser("reindex", help="rebuild the SQLite index from the JSONL log")
+    reindex.set_defaults(handler=cmd_reindex)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sys.exit(args.handler(results.connect(), args) or 0)
+
+
+if __name__ == "__main__":
+    main()
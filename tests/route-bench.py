@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Route Latency Benchmark for StockZip
+Loads dashboard routes N times each after a warmup, with a cold cache (fresh
+context per load) and a warm cache (one context reused), reports p50/p95/p99
+and compares them with a stored baseline using a Mann-Whitney U test.
+
+Usage:
+  TEST_EMAIL=your@email.com TEST_PASSWORD=yourpassword python3 tests/route-bench.py
+
+  python3 tests/route-bench.py --runs 20 --warmup 3 --routes /inventory,/reports/*
+  python3 tests/route-bench.py --update-baseline          # record a new baseline
+  python3 tests/route-bench.py --network 3g               # see harness/network.py
+
+Metrics (--metric):
+  settled  - ms from navigation start until the load event and the last app /
+             Supabase request have both finished (default)
+  ttfb, load, lcp - as collected by harness/perf.py
+
+A baseline only applies to runs on the metric and network profile it was
+recorded with.
+
+A route that fails to load (or whose dynamic segment can't be resolved) is
+recorded as failed with the error, and the benchmark carries on.
+
+Exits 1 if any route failed, or if any route's p95 is slower than the baseline
+by more than --threshold percent and the difference is significant at --alpha.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, network, perf, readiness, results as store
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.session import is_rejected, new_session_context, reauthenticate
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+TEST_EMAIL = os.environ.get("TEST_EMAIL", "")
+TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
+BASELINE_PATH = os.environ.get(
+    "ROUTE_BENCH_BASELINE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "route-bench.json")
+)
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+DEFAULT_ROUTES = [
+    "/inventory",
+    "/inventory/[itemId]",
+    "/reports/*",
+    "/tasks/sales-orders",
+    "/settings/team",
+    "/search",
+]
+
+REPORT_PAGES = [
+    "inventory-value", "stock-movement", "trends", "profit-margin",
+    "activity", "expiring", "low-stock", "inventory-summary",
+]
+
+METRICS = ("settled", "ttfb", "load", "lcp")
+
+LAST_ACTIVITY_JS = "() => window.__harness ? window.__harness.lastActivity : null"
+
+results = []
+record = store.recorder(results)
+
+
+def expand_routes(routes: list) -> list:
+    """Expand /reports/* into the individual report pages"""
+    expanded = []
+    for route in routes:
+        if route == "/reports/*":
+            expanded.extend(f"/reports/{name}" for name in REPORT_PAGES)
+        else:
+            expanded.append(route)
+    return expanded
+
+
+def resolve_route(page, route: str):
+    """Fill a trailing dynamic segment like [itemId] from a link on the parent page"""
+    if "[" not in route:
+        return route
+
+    parent = route.split("/[", 1)[0]
+    page.goto(f"{BASE_URL}{parent}", wait_until="load")
+    wait_for_page_ready(page, timeout=30000)
+    hrefs = page.eval_on_selector_all(f"a[href^='{parent}/']", "els => els.map(e => e.getAttribute('href'))")
+    for href in hrefs:
+        segment = href[len(parent) + 1:].split("/")[0].split("?")[0]
+        if segment and segment != "new":
+            return f"{parent}/{segment}"
+    return None
+
+
+def measure(page, url: str, metric: str) -> float:
+    """Load `url` once and return the chosen metric in ms"""
+    page.goto(url, wait_until="load")
+    if is_rejected(page):
+        reauthenticate(page, BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+        page.goto(url, wait_until="load")
+    wait_for_page_ready(page, timeout=30000)
+
+    metrics = perf.collect(page)
+    if metric == "settled":
+        return max(metrics["load"] or 0, page.evaluate(LAST_ACTIVITY_JS) or 0)
+    return metrics[metric]
+
+
+def new_page(browser):
+    context = new_session_context(browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD, **CONTEXT_OPTIONS)
+    install(context)
+    network.apply(context)
+    page = context.new_page()
+    perf.observe(page)
+    return context, page
+
+
+def run_cold(browser, url: str, runs: int, warmup: int, metric: str) -> list:
+    """Fresh context (empty HTTP cache, fresh JS heap) for every load"""
+    samples = []
+    for i in range(warmup + runs):
+        context, page = new_page(browser)
+        try:
+            value = measure(page, url, metric)
+        finally:
+            context.close()
+        if i >= warmup and value is not None:
+            samples.append(value)
+    return samples
+
+
+def run_warm(browser, url: str, runs: int, warmup: int, metric: str) -> list:
+    """One context reused, so the HTTP cache and service worker are warm"""
+    samples = []
+    context, page = new_page(browser)
+    try:
+        for i in range(warmup + runs):
+            value = measure(page, url, metric)
+            if i >= warmup and value is not None:
+                samples.append(value)
+    finally:
+        context.close()
+    return samples
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip route latency benchmark")
+    parser.add_argument("--routes", default=",".join(DEFAULT_ROUTES),
+                        help="comma-separated routes; [param] segments and /reports/* are expanded")
+    parser.add_argument("--runs", type=int, default=10, help="measured loads per route and variant")
+    parser.add_argument("--warmup", type=int, default=2, help="discarded loads before measuring")
+    parser.add_argument("--variants", default="cold,warm", help="comma-separated: cold, warm")
+    parser.add_argument("--metric", choices=METRICS, default="settled")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--output", help="also write the full results as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.routes = expand_routes([r.strip() for r in args.routes.split(",") if r.strip()])
+    args.variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = set(args.variants) - {"cold", "warm"}
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+    return args
+
+
+def error_text(e: Exception) -> str:
+    return "timeout" if "Timeout" in type(e).__name__ else (str(e).splitlines() or [type(e).__name__])[0][:200]
+
+
+def fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(rows: list, args):
+    print("\n" + "=" * 100)
+    print(f"ROUTE LATENCY ({args.metric}, ms) - {args.runs} runs, {args.warmup} warmup")
+    print("=" * 100)
+    print(f"{'Route':<34} {'Var':<5} {'p50':>8} {'p95':>8} {'p99':>8} {'base p95':>9} {'Δ%':>7} {'p':>7}  Verdict")
+    for row in rows:
+        s, c = row["summary"], row["comparison"]
+        icon = {"regressed": "❌", "improved": "🚀", "ok": "✅"}.get(c["verdict"], "•")
+        print(f"{row['route']:<34} {row['variant']:<5} {fmt(s['p50']):>8} {fmt(s['p95']):>8} {fmt(s['p99']):>8} "
+              f"{fmt(row['baseline_p95']):>9} {fmt(c['delta_pct'], '+.1f'):>7} {fmt(c['p_value'], '.3f'):>7}  "
+              f"{icon} {c['verdict']}")
+    print("=" * 100)
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Route Latency Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    if not TEST_EMAIL or not TEST_PASSWORD:
+        print("ERROR: Please set TEST_EMAIL and TEST_PASSWORD environment variables")
+        sys.exit(1)
+
+    readiness.verbose = False
+    perf.verbose = False
+    store.begin_run("route-bench", base_url=BASE_URL)
+
+    baseline = bench.load_baseline(args.baseline)
+    if baseline and baseline.get("metric") != args.metric:
+        log(f"Baseline was recorded for '{baseline.get('metric')}', not '{args.metric}' - ignoring it", "WARN")
+        baseline = {}
+    if baseline and baseline.get("network", "none") != network.active():
+        log(f"Baseline was recorded on network '{baseline.get('network', 'none')}', not '{network.active()}' "
+            f"- ignoring it", "WARN")
+        baseline = {}
+    baseline_samples = baseline.get("samples", {})
+
+    rows = []
+    with sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            context, page = new_page(browser)
+            resolved, unresolved = {}, {}
+            for route in args.routes:
+                try:
+                    resolved[route] = resolve_route(page, route)
+                except Exception as e:
+                    unresolved[route] = f"resolving {route} failed: {error_text(e)}"
+                    log(unresolved[route], "FAIL")
+            context.close()
+
+            for route in args.routes:
+                path = resolved.get(route)
+                if route in resolved and not path:
+                    log(f"{route}: nothing to fill the dynamic segment with - skipped", "WARN")
+                    continue
+                for variant in args.variants:
+                    started = time.perf_counter()
+                    samples, error = [], unresolved.get(route)
+                    if not error:
+                        run = run_cold if variant == "cold" else run_warm
+                        log(f"{route} [{variant}] -> {path}")
+                        try:
+                            samples = run(browser, f"{BASE_URL}{path}", args.runs, args.warmup, args.metric)
+                        except Exception as e:
+                            error = error_text(e)
+                            log(f"{route} [{variant}]: {error}", "FAIL")
+                    key = f"{route}|{variant}"
+                    before = baseline_samples.get(key, [])
+                    rows.append({
+                        "route": route,
+                        "variant": variant,
+                        "path": path,
+                        "samples": samples,
+                        "error": error,
+                        "summary": bench.summarize(samples),
+                        "baseline_p95": bench.percentile(before, 95),
+                        "comparison": bench.compare(samples, before, args.threshold, args.alpha),
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    })
+        finally:
+            browser.close()
+
+    for index, row in enumerate(rows, 1):
+        name = f"{row['route']} [{row['variant']}]"
+        c = row["comparison"]
+        if row["error"]:
+            passed, details = False, row["error"]
+        elif not row["summary"]["n"]:
+            passed, details = False, f"no {args.metric} samples"
+        else:
+            passed = c["verdict"] != "regressed"
+            details = f"p95 {fmt(row['summary']['p95'])}ms, {c['verdict']}" + (
+                f" ({c['delta_pct']:+.1f}%, p={c['p_value']:.3f})" if c["delta_pct"] is not None else "")
+        with store.check(name, row["duration_ms"]):
+            record(f"ROUTE-{index:03d}", name, passed, details, path=row["path"], summary=row["summary"],
+                   comparison=c)
+
+    failed = [f"{r['route']} [{r['variant']}]" for r in rows if r["error"]]
+    rows = [row for row in rows if row["summary"]["n"]]
+    print_report(rows, args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metric": args.metric, "network": network.active(), "base_url": BASE_URL, "rows": rows}, f, indent=2)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+    if args.update_baseline:
+        bench.save_baseline(args.baseline, {f"{r['route']}|{r['variant']}": r["samples"] for r in rows},
+                            metric=args.metric, base_url=BASE_URL, runs=args.runs, network=network.active())
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    regressed = [f"{r['route']} [{r['variant']}]" for r in rows if r["comparison"]["verdict"] == "regressed"]
+    if regressed:
+        log(f"Regressed past {args.threshold:.0f}%: {', '.join(regressed)}", "FAIL")
+    if regressed or failed:
+        sys.exit(1)
+    log("No significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+"""
+Barcode scanning benchmark for StockZip
+Renders a corpus of barcode frames (EAN-13, Code128 and QR, each clean,
+blurred, tilted, dim and in glare) into a video and plays it to /scan as
+the camera, through Chromium's fake video capture, once per decoder in
+lib/scanner/engines. Reports decode time per frame, frames per second, main
+thread CPU time and how many labels each engine reads, with a slowed-down
+CPU standing in for a low-end handheld, and says which engine should be the
+default for that profile.
+
+Usage:
+  python3 tests/scan-bench.py                                # all engines, symbologies and conditions
+  python3 tests/scan-bench.py --engines zbar,jsqr --conditions clean,dim
+  python3 tests/scan-bench.py --cpu-throttle 1               # a desktop-class CPU
+  python3 tests/scan-bench.py --format y4m --size 1280x720   # exact pixels, big files
+  python3 tests/scan-bench.py --corpus-dir /tmp/scan-corpus  # keep the feed and a PNG per case
+  python3 tests/scan-bench.py --update-baseline              # record a new baseline
+  python3 tests/scan-bench.py --network 3g                   # see harness/network.py
+
+Picking an engine: /scan always lets createScannerEngine() choose, in the
+order native -> zbar -> jsqr. Each pass hides the engines ahead of the one
+under test before any page script runs: zbar runs without
+window.BarcodeDetector, and jsqr also runs without WebAssembly.compile and
+WebAssembly.instantiate. The "[Scanner] Engine created" log line confirms the
+choice. An engine the browser can't run is skipped, e.g. native on Linux,
+where Chromium has no BarcodeDetector.
+
+The feed (harness/barcodes.py) holds each case for --hold seconds, then shows
+the empty scene for --gap seconds, which is longer than the scanner's 1.5 s
+debounce, so every case can produce its own scan. Each frame carries its case
+number in a corner marker. The page script reads the marker from every frame
+the detection loop captures, and times the frame from getImageData to the
+loop's next requestAnimationFrame. A scan is the success haptic
+(navigator.vibrate) fired inside that window. The page runs in batch mode,
+so the scanner stays open between scans. The codes it looks up show what was
+read.
+
+Metrics per engine:
+  decode_ms   - capture -> detect() done, per frame with a barcode
+  idle_ms     - the same for empty frames
+  fps         - frames the detection loop got through per second (it aims for 30)
+  cpu_ms      - main thread task time per processed frame (CDP TaskDuration,
+                includes React work and anything else on the page)
+  cpu_pct     - main thread busy share over the pass
+  success     - cases read / cases the loop saw, per symbology and condition
+  ttd_ms      - time to decode: first frame of a case -> its scan
+  misreads    - looked-up codes that aren't in the corpus, plus scans on
+                empty frames
+
+Checks (exits 1 if any fails), per engine:
+  SCAN-NNN  reads clean labels - every symbology the engine supports is read
+                                 in the "clean" condition
+  SCAN-NNN  no misreads        - misreads is 0
+  SCAN-NNN  keeps up           - fps at least --min-fps
+  SCAN-NNN  decode time        - p50 decode_ms not slower than the baseline by
+                                 more than --threshold percent, significant at
+                                 --alpha, and success no more than
+                                 --success-drop points below it
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py
+  SCAN_BASELINE  - baseline path (default tests/baselines/scan-bench.json)
+
+Runs as the owner of the seed's own tenant (--seed, default 27; the seed
+also picks the payloads). Fake capture is a launch flag, so every pass
+launches its own Chromium rather than using the shared browser
+(browser-pool.py). Needs numpy, Pillow, qrcode and python-barcode to render
+the feed.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlparse
+from playwright.sync_api import sync_playwright
+
+from harness import barcodes, bench, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+BASELINE_PATH = os.environ.get(
+    "SCAN_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "scan-bench.json"),
+)
+
+# Below the 1024 px desktop breakpoint, or /scan shows the hardware scanner input
+CONTEXT_OPTIONS = {"viewport": {"width": 412, "height": 915}, "is_mobile": True, "has_touch": True}
+
+ENGINES = ("native", "zbar", "jsqr")
+# What each engine can read out of the corpus's symbologies
+READS = {"native": barcodes.SYMBOLOGIES, "zbar": barcodes.SYMBOLOGIES, "jsqr": ("qr",)}
+
+SCANNER_DEBOUNCE = 1.5  # s, SCANNER_CONFIG.debounceMs in lib/scanner/useBarcodeScanner.ts
+ENGINE_CREATED = re.compile(r"^\[Scanner\] Engine created: (\w+)")
+FRAME_CAPTURED = re.compile(r"^\[Scanner\] Frame captured: (\d+x\d+)")
+# The scan page's lookup: or=(barcode.eq.<code>,sku.eq.<code>)
+LOOKUP_FILTER = re.compile(r"^\(barcode\.eq\.(.*),sku\.eq\.")
+
+# Runs before any page script. Hides the engines ahead of ENGINE, keeps /scan on
+# the camera with haptics on and sound off, and records every frame the
+# detection loop captures as [case, start, ms, scanned].
+INSTRUMENT_JS = """
+((ENGINE, MARKER) => {
+  try {
+    localStorage.setItem('preferred-scanner-type', 'camera');
+    localStorage.setItem('feedback-preferences', JSON.stringify({ hapticEnabled: true, soundEnabled: false, soundVolume: 0 }));
+  } catch (e) {}
+  if (ENGINE !== 'native') delete window.BarcodeDetector;
+  if (ENGINE === 'jsqr') {
+    for (const name of ['compile', 'instantiate', 'compileStreaming', 'instantiateStreaming']) {
+      Object.defineProperty(WebAssembly, name, { value: undefined, configurable: true, writable: true });
+    }
+  }
+
+  const bench = window.__scanBench = { frames: [], scans: [], unread: 0, high: 0, wrapped: false };
+  let running = null;  // the requestAnimationFrame callback being run
+  let current = null;  // the frame the detection loop is working on
+
+  const readMarker = (image) => {
+    const { origin, block, bits } = MARKER;
+    const { data, width } = image;
+    const y = origin + (block >> 1);
+    const white = (i) => {
+      const p = (y * width + origin + i * block + (block >> 1)) * 4;
+      return (data[p] + data[p + 1] + data[p + 2]) / 3 > 128;
+    };
+    if (width < origin + (bits + 2) * block || image.height < origin + block) return -1;
+    if (!white(0) || white(bits + 1)) return -1;
+    let n = 0;
+    for (let i = 1; i <= bits; i++) n = (n << 1) | (white(i) ? 1 : 0);
+    return n;
+  };
+
+  const getImageData = CanvasRenderingContext2D.prototype.getImageData;
+  CanvasRenderingContext2D.prototype.getImageData = function (...args) {
+    const image = getImageData.apply(this, args);
+    if (!running || bench.wrapped) return image;
+    const n = readMarker(image);
+    if (n < 0) {
+      bench.unread++;
+      return image;
+    }
+    if (n > 0 && n < bench.high) {  // the feed looped
+      bench.wrapped = true;
+      return image;
+    }
+    bench.high = Math.max(bench.high, n);
+    current = { n, start: performance.now(), loop: running, scanned: false };
+    return image;
+  };
+
+  const raf = window.requestAnimationFrame.bind(window);
+  window.requestAnimationFrame = (callback) => {
+    if (current && current.loop === callback) {
+      bench.frames.push([current.n, current.start, performance.now() - current.start, current.scanned ? 1 : 0]);
+      current = null;
+    }
+    return raf((timestamp) => {
+      running = callback;
+      try {
+        return callback(timestamp);
+      } finally {
+        running = null;
+      }
+    });
+  };
+
+  Object.defineProperty(Navigator.prototype, 'vibrate', {
+    configurable: true,
+    writable: true,
+    value() {
+      if (current && !current.scanned) {
+        current.scanned = true;
+        bench.scans.push([current.n, performance.now()]);
+      }
+      return true;
+    },
+  });
+})(%s, %s);
+"""
+
+MARKER = {"origin": barcodes.MARKER_ORIGIN, "block": barcodes.MARKER_BLOCK, "bits": barcodes.MARKER_BITS}
+
+results = []
+record = store.recorder(results)
+
+
+def looked_up(url: str):
+    """The code a scan page item lookup asks for, or None for other requests"""
+    parsed = urlparse(url)
+    if not parsed.path.endswith("/rest/v1/inventory_items"):
+        return None
+    for value in parse_qs(parsed.query).get("or", []):
+        match = LOOKUP_FILTER.match(value)
+        if match:
+            return match.group(1)
+    return None
+
+
+# -- feed -----------------------------------------------------------------------
+
+
+def build_feed(cases: list, directory: str, args) -> tuple:
+    """Render the corpus into one fake-camera video in `directory`; (path, seconds of one pass)"""
+    path = os.path.join(directory, f"feed.{args.format}")
+    started = time.time()
+    info = barcodes.write_feed(path, cases, size=args.size, fmt=args.format, fps=args.fps, hold=args.hold,
+                               gap=args.gap, lead_in=args.lead_in, seed=args.seed)
+    log(f"Feed: {len(cases)} cases, {info['frames']} frames ({info['seconds']:.0f}s), "
+        f"{info['bytes'] / 1048576:.1f} MiB in {time.time() - started:.1f}s -> {path}")
+    if args.corpus_dir:
+        for case in cases:
+            name = f"{case['case']:03d}-{case['symbology']}-{case['condition']}.png"
+            barcodes.render(case, args.size, args.seed).save(os.path.join(directory, name))
+    return path, info["seconds"]
+
+
+# -- one pass -------------------------------------------------------------------
+
+
+def cpu_times(cdp) -> dict:
+    metrics = cdp.send("Performance.getMetrics")["metrics"]
+    return {m["name"]: m["value"] for m in metrics if m["name"] in ("TaskDuration", "ScriptDuration")}
+
+
+def wait_for_engine(page, console: list, timeout: float):
+    """The engine /scan created, from its console log, or None"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        for text in console:
+            match = ENGINE_CREATED.match(text)
+            if match:
+                return match.group(1)
+        page.wait_for_timeout(200)
+    return None
+
+
+def run_engine(p, engine: str, feed: str, seconds: float, email: str, args) -> dict:
+    """Play the feed to /scan once with `engine` forced; the raw frames, scans and CPU times"""
+    run = {"engine": engine, "used": None, "frames": [], "scans": [], "lookups": [], "unread": 0,
+           "wrapped": False, "capture": None, "cpu": {}, "wall_s": 0.0}
+    browser = p.chromium.launch(headless=True, args=[
+        "--use-fake-device-for-media-stream",
+        "--use-fake-ui-for-media-stream",
+        f"--use-file-for-fake-video-capture={feed}",
+    ])
+    try:
+        state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+        context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+        context.grant_permissions(["camera"], origin=BASE_URL)
+        install(context)
+        context.add_init_script(INSTRUMENT_JS % (json.dumps(engine), json.dumps(MARKER)))
+        network.apply(context)
+        page = context.new_page()
+
+        console = []
+        page.on("console", lambda message: console.append(message.text)
+                if message.text.startswith("[Scanner]") else None)
+
+        def on_request(request):
+            code = looked_up(request.url)
+            if code is not None:
+                run["lookups"].append(code)
+
+        page.on("request", on_request)
+
+        goto_authenticated(page, f"{BASE_URL}/scan", BASE_URL, email, seed.SEED_PASSWORD)
+        page.get_by_role("button", name=re.compile(r"^Batch\b")).first.click()
+
+        run["used"] = wait_for_engine(page, console, args.timeout)
+        if run["used"] != engine:
+            context.close()
+            return run
+
+        cdp = context.new_cdp_session(page)
+        cdp.send("Performance.enable")
+        if args.cpu_throttle > 1:
+            cdp.send("Emulation.setCPUThrottlingRate", {"rate": args.cpu_throttle})
+        before, started = cpu_times(cdp), time.time()
+        try:
+            page.wait_for_function("() => window.__scanBench && window.__scanBench.wrapped",
+                                   timeout=(seconds * 2 + args.timeout) * 1000, polling=500)
+        except Exception:
+            log(f"{engine}: the feed didn't play through within {seconds * 2 + args.timeout:.0f}s - "
+                "scoring what was captured", "WARN")
+        after = cpu_times(cdp)
+        run["wall_s"] = time.time() - started
+        run["cpu"] = {name: after.get(name, 0) - before.get(name, 0) for name in after}
+
+        data = page.evaluate("() => window.__scanBench")
+        run.update(frames=data["frames"], scans=data["scans"], unread=data["unread"], wrapped=data["wrapped"])
+        run["capture"] = next((m.group(1) for m in map(FRAME_CAPTURED.match, console) if m), None)
+        if args.cpu_throttle > 1:
+            cdp.send("Emulation.setCPUThrottlingRate", {"rate": 1})
+        cdp.detach()
+        context.close()
+    finally:
+        browser.close()
+    return run
+
+
+# -- scoring --------------------------------------------------------------------
+
+
+def score(run: dict, cases: list) -> dict:
+    """Per-case outcomes and the engine's totals from one pass"""
+    frames, scans = run["frames"], run["scans"]
+    outcomes = []
+    for case in cases:
+        own = [f for f in frames if f[0] == case["case"]]
+        scan = next((s for s in scans if s[0] == case["case"]), None)
+        outcome = {**case, "seen": bool(own), "read": scan is not None, "frames": len(own),
+                   "ttd_ms": None, "frames_to_read": None}
+        if own and scan:
+            outcome["ttd_ms"] = round(scan[1] - own[0][1], 1)
+            outcome["frames_to_read"] = sum(1 for f in own if f[1] <= scan[1])
+        outcomes.append(outcome)
+
+    values = {case["value"] for case in cases}
+    misread = sorted({code for code in run["lookups"] if code not in values})
+    phantom = sum(1 for s in scans if s[0] == 0)
+    span = (frames[-1][1] - frames[0][1]) / 1000 if len(frames) > 1 else 0
+    task_s = run["cpu"].get("TaskDuration", 0)
+    seen = [o for o in outcomes if o["seen"]]
+    return {
+        "decode_ms": [round(f[2], 2) for f in frames if f[0] > 0],
+        "idle_ms": [round(f[2], 2) for f in frames if f[0] == 0],
+        "fps": (len(frames) - 1) / span if span else None,
+        "cpu_ms": task_s * 1000 / len(frames) if frames else None,
+        "cpu_pct": 100 * task_s / run["wall_s"] if run["wall_s"] else None,
+        "script_pct": 100 * run["cpu"].get("ScriptDuration", 0) / run["wall_s"] if run["wall_s"] else None,
+        "success": sum(o["read"] for o in seen) / len(seen) if seen else None,
+        "ttd_ms": [o["ttd_ms"] for o in outcomes if o["ttd_ms"] is not None],
+        "unseen": [o["case"] for o in outcomes if not o["seen"]],
+        "misread": misread,
+        "phantom": phantom,
+        "misreads": len(misread) + phantom,
+        "outcomes": outcomes,
+    }
+
+
+def success_rate(outcomes: list, **match) -> float:
+    own = [o for o in outcomes if o["seen"] and all(o[k] == v for k, v in match.items())]
+    return sum(o["read"] for o in own) / len(own) if own else None
+
+
+def recommend(scores: dict) -> str:
+    """The engine that reads the most of the corpus, the faster one on a tie"""
+    measured = [e for e, s in scores.items() if s["success"] is not None]
+    if not measured:
+        return None
+    return min(measured, key=lambda e: (-scores[e]["success"], bench.percentile(scores[e]["decode_ms"], 50) or 0))
+
+
+# -- reporting ------------------------------------------------------------------
+
+
+def fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def pct(value) -> str:
+    return "-" if value is None else f"{value:.0%}"
+
+
+def print_report(runs: dict, scores: dict, args):
+    print("\n" + "=" * 108)
+    print(f"BARCODE SCANNING - per engine, {args.size[0]}x{args.size[1]} {args.format}, "
+          f"CPU throttle {args.cpu_throttle:g}x")
+    print("=" * 108)
+    print(f"{'Engine':<7} {'Frames':>6} {'FPS':>5} {'Decode p50':>10} {'p95':>6} {'Idle p50':>8} "
+          f"{'CPU ms/f':>8} {'CPU %':>6} {'JS %':>5} {'Read':>5} {'TTD p50':>7} {'p95':>6} {'Misread':>7}")
+    for engine, s in scores.items():
+        run = runs[engine]
+        print(f"{engine:<7} {len(run['frames']):>6} {fmt(s['fps'], '.1f'):>5} "
+              f"{fmt(bench.percentile(s['decode_ms'], 50), '.1f'):>10} "
+              f"{fmt(bench.percentile(s['decode_ms'], 95), '.1f'):>6} "
+              f"{fmt(bench.percentile(s['idle_ms'], 50), '.1f'):>8} {fmt(s['cpu_ms'], '.1f'):>8} "
+              f"{fmt(s['cpu_pct']):>6} {fmt(s['script_pct']):>5} {pct(s['success']):>5} "
+              f"{fmt(bench.percentile(s['ttd_ms'], 50)):>7} {fmt(bench.percentile(s['ttd_ms'], 95)):>6} "
+              f"{s['misreads']:>7}")
+    for engine, run in runs.items():
+        if engine not in scores:
+            print(f"{engine:<7} skipped - /scan created {run['used'] or 'no engine'}")
+
+    if not scores:
+        print("=" * 108)
+        return
+    columns = [(e, sym) for e in scores for sym in args.symbologies]
+    print("\nRead rate and time to decode (ms) per condition:")
+    print(f"{'Condition':<10} " + " ".join(f"{e + '/' + sym:>14}" for e, sym in columns))
+    for condition in args.conditions:
+        cells = []
+        for engine, symbology in columns:
+            outcome = next(o for o in scores[engine]["outcomes"]
+                           if o["symbology"] == symbology and o["condition"] == condition)
+            if symbology not in READS[engine]:
+                cells.append("n/a")
+            elif not outcome["seen"]:
+                cells.append("not seen")
+            elif outcome["read"]:
+                cells.append(f"yes {outcome['ttd_ms']:.0f}")
+            else:
+                cells.append("no")
+        print(f"{condition:<10} " + " ".join(f"{c:>14}" for c in cells))
+    print(f"{'all':<10} " + " ".join(f"{pct(success_rate(scores[e]['outcomes'], symbology=sym)) if sym in READS[e] else 'n/a':>14}"
+                                      for e, sym in columns))
+    print("=" * 108)
+
+
+def parse_size(value: str) -> tuple:
+    match = re.fullmatch(r"(\d+)x(\d+)", value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_list(parser, value: str, known, what: str) -> list:
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        parser.error(f"unknown {what}: {', '.join(unknown)}")
+    return [n for n in known if n in names]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip barcode scanning benchmark")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma-separated: native, zbar, jsqr")
+    parser.add_argument("--symbologies", default=",".join(barcodes.SYMBOLOGIES),
+                        help="comma-separated: ean13, code128, qr")
+    parser.add_argument("--conditions", default=",".join(barcodes.CONDITIONS),
+                        help=f"comma-separated: {', '.join(barcodes.CONDITIONS)}")
+    parser.add_argument("--size", type=parse_size, default=(640, 480), help="frame size, WIDTHxHEIGHT")
+    parser.add_argument("--format", choices=barcodes.FORMATS, default="mjpeg", help="feed file format")
+    parser.add_argument("--fps", type=float, default=barcodes.MJPEG_FPS, help="feed frame rate (y4m only)")
+    parser.add_argument("--hold", type=float, default=2.0, help="s each case is on camera")
+    parser.add_argument("--gap", type=float, default=1.6, help="s of empty scene between cases")
+    parser.add_argument("--lead-in", type=float, default=5.0, help="s of empty scene before the first case")
+    parser.add_argument("--cpu-throttle", type=float, default=4.0,
+                        help="CPU slowdown emulated over CDP, 1 = none (default 4, a low-end handheld)")
+    parser.add_argument("--min-fps", type=float, default=10.0, help="detection frames per second required")
+    parser.add_argument("--timeout", type=float, default=60, help="s to wait for the scanner to start")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--success-drop", type=float, default=10.0,
+                        help="read rate allowed below the baseline, in percentage points")
+    parser.add_argument("--seed", type=int, default=27, help="seed of the tenant and the payloads")
+    parser.add_argument("--corpus-dir", help="write the feed and a PNG per case here and keep them")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--output", help="also write every frame and scan as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.engines = parse_list(parser, args.engines, ENGINES, "engines")
+    args.symbologies = parse_list(parser, args.symbologies, barcodes.SYMBOLOGIES, "symbologies")
+    args.conditions = parse_list(parser, args.conditions, tuple(barcodes.CONDITIONS), "conditions")
+    if not args.engines or not args.symbologies or not args.conditions:
+        parser.error("need at least one engine, symbology and condition")
+    if args.format == "mjpeg" and args.fps != barcodes.MJPEG_FPS:
+        parser.error(f"MJPEG feeds always play at {barcodes.MJPEG_FPS} fps - use --format y4m to change --fps")
+    if args.gap <= SCANNER_DEBOUNCE:
+        parser.error(f"--gap must be longer than the scanner's {SCANNER_DEBOUNCE}s debounce")
+    return args
+
+
+def baseline_settings(args) -> dict:
+    return {"network": network.active(), "cpu_throttle": args.cpu_throttle, "size": list(args.size),
+            "format": args.format, "fps": args.fps, "hold": args.hold,
+            "conditions": args.conditions, "symbologies": args.symbologies}
+
+
+def load_baseline(args) -> dict:
+    baseline = bench.load_baseline(args.baseline)
+    settings = baseline_settings(args)
+    differs = [key for key, value in settings.items() if baseline and baseline.get(key) != value]
+    if differs:
+        log(f"Baseline was recorded with different {', '.join(differs)} - ignoring it", "WARN")
+        return {}
+    return baseline.get("samples", {})
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Barcode Scanning Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Engines: {', '.join(args.engines)}")
+    print(f"Corpus: {', '.join(args.symbologies)} x {', '.join(args.conditions)}")
+    print(f"Feed: {args.size[0]}x{args.size[1]} {args.format} @ {args.fps:g} fps, "
+          f"{args.hold:g}s per case + {args.gap:g}s gap")
+    print(f"CPU throttle: {args.cpu_throttle:g}x")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        seeder = seed.Seeder(conn, seed=args.seed)
+        seeder.use_tenant()
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    email = seeder.owner_email()
+    conn.close()
+
+    cases = barcodes.corpus(args.symbologies, args.conditions, seed=args.seed)
+    directory = args.corpus_dir or tempfile.mkdtemp(prefix="scan-bench-")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        feed, seconds = build_feed(cases, directory, args)
+    except (RuntimeError, ValueError) as e:
+        log(f"Rendering the feed failed: {e}", "FAIL")
+        sys.exit(1)
+
+    readiness.verbose = False
+    store.begin_run("scan-bench", base_url=BASE_URL)
+    baseline = load_baseline(args)
+
+    runs, scores = {}, {}
+    try:
+        with sync_playwright() as p:
+            for engine in args.engines:
+                log(f"{engine}: playing {seconds:.0f}s of feed to /scan")
+                started = time.perf_counter()
+                run = runs[engine] = run_engine(p, engine, feed, seconds, email, args)
+                run["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                if run["used"] != engine:
+                    log(f"{engine}: /scan created {run['used'] or 'no engine'} - not available in this browser, "
+                        "skipped", "SKIP")
+                    continue
+                scores[engine] = score(run, cases)
+                if scores[engine]["unseen"]:
+                    log(f"{engine}: the loop never captured {len(scores[engine]['unseen'])} cases - "
+                        "they're left out of the read rate", "WARN")
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(runs, scores, args)
+
+    index = 0
+    for engine, s in scores.items():
+        with store.check(engine, runs[engine]["duration_ms"]):
+            index += 1
+            if "clean" in args.conditions:
+                missed = [o["symbology"] for o in s["outcomes"]
+                          if o["condition"] == "clean" and o["symbology"] in READS[engine] and not o["read"]]
+                supported = ", ".join(sym for sym in args.symbologies if sym in READS[engine])
+                record(f"SCAN-{index:03d}", f"{engine}: reads clean labels", not missed,
+                       f"missed {', '.join(missed)}" if missed else f"read {supported or 'nothing it supports'}")
+            else:
+                log(f"SCAN-{index:03d}: {engine}: reads clean labels - no clean condition in this run", "SKIP")
+
+            index += 1
+            record(f"SCAN-{index:03d}", f"{engine}: no misreads", s["misreads"] == 0,
+                   f"{len(s['misread'])} unknown codes looked up, {s['phantom']} scans on empty frames"
+                   + (f": {', '.join(s['misread'][:3])}" if s["misread"] else ""))
+
+            index += 1
+            record(f"SCAN-{index:03d}", f"{engine}: keeps up", s["fps"] is not None and s["fps"] >= args.min_fps,
+                   f"{fmt(s['fps'], '.1f')} fps (min {args.min_fps:g}), {fmt(s['cpu_pct'])}% main thread")
+
+            index += 1
+            comparison = bench.compare(s["decode_ms"], baseline.get(f"{engine}|decode_ms", []),
+                                       args.threshold, args.alpha, stat="p50")
+            before = baseline.get(f"{engine}|success")
+            dropped = (before and s["success"] is not None
+                       and (before[0] - s["success"]) * 100 > args.success_drop)
+            record(f"SCAN-{index:03d}", f"{engine}: decode time",
+                   comparison["verdict"] != "regressed" and not dropped,
+                   f"p50 {fmt(bench.percentile(s['decode_ms'], 50), '.1f')}ms/frame, read {pct(s['success'])}"
+                   + (f" - regressed {comparison['delta_pct']:+.0f}%" if comparison["verdict"] == "regressed" else "")
+                   + (f" - read rate down from {pct(before[0])}" if dropped else ""),
+                   comparison=comparison)
+
+    choice = recommend(scores)
+    if choice:
+        s = scores[choice]
+        log(f"Default for this profile: {choice} - reads {pct(s['success'])} of the corpus at "
+            f"{fmt(bench.percentile(s['decode_ms'], 50), '.1f')}ms/frame, {fmt(s['cpu_pct'])}% main thread")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "settings": baseline_settings(args),
+                       "cases": cases, "recommended": choice,
+                       "engines": {engine: {**run, "score": scores.get(engine)} for engine, run in runs.items()}},
+                      f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if args.update_baseline:
+        samples = {}
+        for engine, s in scores.items():
+            samples[f"{engine}|decode_ms"] = s["decode_ms"]
+            samples[f"{engine}|ttd_ms"] = s["ttd_ms"]
+            samples[f"{engine}|success"] = [s["success"]] if s["success"] is not None else []
+        bench.save_baseline(args.baseline, samples, base_url=BASE_URL, **baseline_settings(args))
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    if not scores:
+        log("No engine could be measured", "FAIL")
+        sys.exit(1)
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Every engine reads clean labels without misreads and keeps up, no significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
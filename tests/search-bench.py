@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Search typeahead benchmark for StockZip
+Types realistic queries into the global search modal (Ctrl+K) and the /search
+page of a large seeded tenant, one key at a time at a human cadence, and
+watches every search request the typing sets off. Reports keystroke-to-results
+latency, requests per query, requests that were wasted or cancelled and the
+bytes they returned, as percentiles per query class, and flags typeaheads that
+don't debounce or don't cancel superseded requests.
+
+Usage:
+  python3 tests/search-bench.py                              # both surfaces, 10 queries per class
+  python3 tests/search-bench.py --surfaces modal --queries 30
+  python3 tests/search-bench.py --cadence 80 --typo-rate 0    # a fast, accurate typist
+  python3 tests/search-bench.py --update-baseline            # record a new baseline
+  python3 tests/search-bench.py --network 3g                # see harness/network.py
+
+Query classes (drawn from the seeded items, so the same --seed gives the same
+queries):
+  sku        - a prefix of an item's SKU, e.g. "TOOL-02600"
+  barcode    - an item's full EAN-13
+  fuzzy      - a lower-case fragment from inside a name word, sometimes with
+               two letters swapped, e.g. "akit" / "aktia"
+  multiword  - two or three words of an item's name, e.g. "bosch cordless drill"
+
+Typing: the delay between keys is log-normal around --cadence ms, longer after
+a space; --pause-rate of keys are followed by a 0.4-0.9 s pause, and
+--typo-rate of keys are a wrong letter corrected with Backspace.
+
+Metrics per query:
+  latency_ms  - last keystroke -> results for the full query on screen (the
+                last DOM change after its response)
+  first_ms    - first keystroke -> first results on screen
+  requests    - search requests sent while typing it
+  wasted      - requests for a superseded prefix whose response still arrived
+  cancelled   - requests the page aborted
+  raced       - requests still in flight when a newer one was sent
+  overhead    - other Supabase requests sent alongside (auth, profile lookups)
+  kib         - response bytes of the search requests
+  stale       - the items shown (ids on the page, name and SKU in the
+                modal) aren't the full query's response, in order (an older
+                response landed last)
+
+Times are all on the browser's clock: keystrokes from keydown events, requests
+from Playwright's request timing, results from a MutationObserver.
+
+Checks (exits 1 if any fails), per surface:
+  SEARCH-NNN  debounced   - search requests per keystroke at most --max-per-key
+  SEARCH-NNN  cancelled   - raced requests are aborted rather than answered
+  SEARCH-NNN  consistent  - no query ends showing stale results
+  SEARCH-NNN  latency     - p50 latency_ms per class not slower than the
+                            baseline by more than --threshold percent,
+                            significant at --alpha
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py
+  SEARCH_BASELINE  - baseline path (default tests/baselines/search-bench.json)
+
+The tenant is the seed's own (--seed, default 26) with --items items.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import install, wait_for_page_ready
+from harness.replay import is_supabase
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+BASELINE_PATH = os.environ.get(
+    "SEARCH_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "search-bench.json"),
+)
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+SURFACES = ("modal", "page")
+CLASSES = ("sku", "barcode", "fuzzy", "multiword")
+
+MODAL_INPUT = "[role='dialog'][aria-label='Search inventory'] input"
+PAGE_INPUT = "input[placeholder='Search by name, SKU, or description...']"
+
+# The search column filter: or=(name.ilike.%<query>%,sku.ilike...)
+SEARCH_FILTER = re.compile(r"name\.ilike\.%(.*?)%,")
+
+# Keystrokes and DOM changes on the browser's clock, for latency_ms and first_ms
+RENDER_JS = """
+(() => {
+  if (window.__render) return;
+  const state = window.__render = { last: performance.now(), changes: [], keys: [] };
+  new MutationObserver(() => {
+    state.last = performance.now();
+    if (state.changes.length < 5000) state.changes.push(state.last);
+  }).observe(document, { subtree: true, childList: true, characterData: true });
+  document.addEventListener('keydown', e => { state.keys.push(e.timeStamp); }, true);
+})();
+"""
+
+CHANGES_JS = """
+() => ({
+  changes: window.__render.changes.map(t => performance.timeOrigin + t),
+  keys: window.__render.keys.map(t => performance.timeOrigin + t),
+})
+"""
+RESET_CHANGES_JS = "() => { window.__render.changes = []; window.__render.keys = []; }"
+
+# The results each surface is showing, in order: item ids on the page (its
+# cards link to /inventory/<id>), "name|sku" in the modal (no links there)
+SHOWN_JS = {
+    "modal": """
+() => {
+  const dialog = document.querySelector("[role='dialog'][aria-label='Search inventory']");
+  const heading = dialog && [...dialog.querySelectorAll('h3')].find(h => h.textContent.trim() === 'Results');
+  if (!heading) return [];
+  return [...heading.nextElementSibling.querySelectorAll(':scope > li')].map(li => {
+    const name = li.querySelector('p.font-medium');
+    const detail = name && name.nextElementSibling;
+    const sku = detail && /^SKU: (.*?) \u00b7 /.exec(detail.textContent.trim());
+    return `${name ? name.textContent.trim() : ''}|${sku ? sku[1] : ''}`;
+  });
+}
+""",
+    "page": """
+() => [...document.querySelectorAll("a[href^='/inventory/']")]
+  .map(a => a.getAttribute('href').slice('/inventory/'.length))
+  .filter(id => /^[0-9a-f-]{36}$/i.test(id))
+""",
+}
+
+results = []
+record = store.recorder(results)
+
+
+def shown_key(surface: str, row: dict) -> str:
+    """How SHOWN_JS identifies a response row on `surface`"""
+    if surface == "page":
+        return row.get("id")
+    return f"{row.get('name') or ''}|{row.get('sku') or ''}"
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+
+def searched_for(url: str):
+    """The text a Supabase inventory search request matches on, or None for other requests"""
+    parsed = urlparse(url)
+    if not parsed.path.endswith("/rest/v1/inventory_items"):
+        return None
+    for value in parse_qs(parsed.query).get("or", []):
+        match = SEARCH_FILTER.search(value)
+        if match:
+            return match.group(1).replace("\\%", "%").replace("\\_", "_")
+    return None
+
+
+# -- queries --------------------------------------------------------------------
+
+
+def make_queries(seeder, items: int, args) -> dict:
+    """{class: [query]}, --queries of each, from the seeded item rows"""
+    rng = random.Random(f"search:{args.seed}")
+    queries = {name: [] for name in CLASSES}
+    while any(len(q) < args.queries for q in queries.values()):
+        item = seeder.item_row(rng.randrange(items))
+        words = item["name"].split()
+        sku = item["sku"]
+        head = sku.index("-") + 2
+        candidates = {
+            "sku": sku[:rng.randint(head, len(sku))],
+            "barcode": item["barcode"],
+            "multiword": " ".join(words[:rng.randint(2, min(3, len(words)))]).lower() if len(words) > 1 else None,
+        }
+        long_words = [w for w in words if len(w) >= 5]
+        if long_words:
+            word = rng.choice(long_words).lower()
+            start = rng.randint(1, len(word) - 4)
+            fragment = word[start:start + rng.randint(4, len(word) - start)]
+            if rng.random() < 0.3:
+                i = rng.randrange(len(fragment) - 1)
+                fragment = fragment[:i] + fragment[i + 1] + fragment[i] + fragment[i + 2:]
+            candidates["fuzzy"] = fragment
+        for name, query in candidates.items():
+            if query and len(queries[name]) < args.queries:
+                queries[name].append(query)
+    return queries
+
+
+def keystrokes(query: str, rng: random.Random, args) -> list:
+    """[(key, delay ms after it)] for typing `query` the way a person does"""
+    keys = []
+    letters = "abcdefghijklmnopqrstuvwxyz0123456789"
+    for char in query:
+        if rng.random() < args.typo_rate:
+            keys.append((rng.choice(letters), delay(rng, args) * 1.5))
+            keys.append(("Backspace", delay(rng, args)))
+        wait = delay(rng, args) * (2 if char == " " else 1)
+        if rng.random() < args.pause_rate:
+            wait += rng.uniform(400, 900)
+        keys.append((char, wait))
+    return keys
+
+
+def delay(rng: random.Random, args) -> float:
+    return args.cadence * math.exp(rng.gauss(0, 0.35))
+
+
+# -- typing ---------------------------------------------------------------------
+
+
+class Traffic:
+    """Search and other Supabase requests a page sends, with when they started and how they ended"""
+
+    def __init__(self, page):
+        self.page = page
+        self.entries = {}
+        self.order = []
+        page.on("request", self._sent)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._failed)
+
+    def close(self):
+        self.page.remove_listener("request", self._sent)
+        self.page.remove_listener("requestfinished", self._finished)
+        self.page.remove_listener("requestfailed", self._failed)
+
+    def clear(self):
+        self.entries, self.order = {}, []
+
+    def _sent(self, request):
+        if not is_supabase(request.url) or request.method == "OPTIONS":
+            return
+        entry = {"query": searched_for(request.url), "sent": time.time() * 1000, "ended": None,
+                 "aborted": False, "bytes": 0, "request": request}
+        self.entries[id(request)] = entry
+        self.order.append(entry)
+
+    def _finished(self, request):
+        entry = self.entries.get(id(request))
+        if entry:
+            self._timed(entry, request)
+            try:
+                entry["bytes"] = request.sizes()["responseBodySize"]
+            except Exception:
+                pass
+
+    def _failed(self, request):
+        entry = self.entries.get(id(request))
+        if entry:
+            self._timed(entry, request)
+            entry["aborted"] = "abort" in (request.failure or "").lower()
+
+    @staticmethod
+    def _timed(entry: dict, request):
+        """Move sent/ended onto the browser's clock (request.timing), where the DOM times are.
+        Python's clock - when Playwright delivered the event - is only the fallback"""
+        entry["ended"] = time.time() * 1000
+        timing = request.timing
+        start = timing.get("startTime", -1)
+        if start > 0:
+            entry["sent"] = start
+            if timing.get("responseEnd", -1) >= 0:
+                entry["ended"] = start + timing["responseEnd"]
+
+    def searches(self) -> list:
+        return [e for e in self.order if e["query"] is not None]
+
+
+def open_surface(page, surface: str, args):
+    if surface == "modal":
+        if not page.locator(MODAL_INPUT).is_visible():
+            page.keyboard.press("Control+k")
+        page.locator(MODAL_INPUT).wait_for(timeout=args.timeout * 1000)
+        page.locator(MODAL_INPUT).focus()
+    else:
+        page.locator(PAGE_INPUT).click()
+
+
+def clear_surface(page, surface: str, args):
+    """Empty the input and let the page settle, so the next query starts from nothing"""
+    if surface == "modal":
+        page.keyboard.press("Escape")
+        page.locator(MODAL_INPUT).wait_for(state="hidden", timeout=args.timeout * 1000)
+    else:
+        page.locator(PAGE_INPUT).fill("")
+        page.wait_for_timeout(400)  # past the debounce, which doesn't search for ""
+    wait_for_page_ready(page, timeout=args.timeout * 1000)
+
+
+def type_query(page, traffic: Traffic, surface: str, query: str, rng: random.Random, args) -> dict:
+    """Type `query` key by key and measure what it set off"""
+    open_surface(page, surface, args)
+    page.evaluate(RESET_CHANGES_JS)
+    traffic.clear()
+    keys = keystrokes(query, rng, args)
+    for key, wait in keys:
+        page.keyboard.press(key)
+        page.wait_for_timeout(wait)
+
+    final = normalize(query)
+    deadline = time.perf_counter() + args.timeout
+    answer = None
+    while time.perf_counter() < deadline:
+        done = [e for e in traffic.searches() if normalize(e["query"]) == final and e["ended"]]
+        if done:
+            answer = done[-1]
+            break
+        page.wait_for_timeout(20)
+    run = {"query": query, "keys": len(keys)}
+    if not answer:
+        run["error"] = "no search request for the full query"
+        return run
+    page.locator(f"{MODAL_INPUT if surface == 'modal' else PAGE_INPUT} ~ .animate-spin").wait_for(
+        state="hidden", timeout=args.timeout * 1000)
+    wait_for_page_ready(page, timeout=args.timeout * 1000)
+    seen = page.evaluate(CHANGES_JS)
+    changes, typed_at = seen["changes"], seen["keys"]
+    if not typed_at:
+        run["error"] = "no keydown events reached the page"
+        return run
+
+    searches = traffic.searches()
+    after = [t for t in changes if t >= answer["ended"]]
+    first_answer = min((e["ended"] for e in searches if e["ended"] and not e["aborted"]), default=None)
+    shown_first = [t for t in changes if first_answer and t >= first_answer]
+    rows = None
+    if not answer["aborted"]:
+        try:
+            rows = [shown_key(surface, row) for row in answer["request"].response().json()]
+        except Exception:
+            pass
+    shown = page.evaluate(SHOWN_JS[surface])
+    run.update({
+        "latency_ms": (after[-1] if after else answer["ended"]) - typed_at[-1],
+        "first_ms": (shown_first[0] - typed_at[0]) if shown_first else None,
+        "requests": len(searches),
+        "wasted": sum(1 for e in searches if e is not answer and not e["aborted"] and e["ended"]
+                      and normalize(e["query"]) != final),
+        "cancelled": sum(e["aborted"] for e in searches),
+        "raced": sum(1 for i, e in enumerate(searches)
+                     if any(later["sent"] < (e["ended"] or float("inf")) for later in searches[i + 1:])),
+        "overhead": sum(1 for e in traffic.order if e["query"] is None),
+        "kib": sum(e["bytes"] for e in searches) / 1024,
+        "hits": len(rows) if rows is not None else None,
+        "shown": len(shown),
+        "stale": rows is not None and shown != rows,
+    })
+    return run
+
+
+def run_surface(page, traffic: Traffic, surface: str, queries: dict, args) -> list:
+    page.goto(f"{BASE_URL}{'/dashboard' if surface == 'modal' else '/search'}")
+    wait_for_page_ready(page, timeout=args.timeout * 1000)
+    rng = random.Random(f"typing:{args.seed}:{surface}")
+    runs = []
+    for kind in CLASSES:
+        for n, query in enumerate(queries[kind]):
+            try:
+                run = type_query(page, traffic, surface, query, rng, args)
+            except Exception as e:
+                run = {"query": query, "error": str(e).splitlines()[0][:200] if str(e) else type(e).__name__}
+            run.update(surface=surface, kind=kind, warmup=n < args.warmup)
+            runs.append(run)
+            if run.get("error"):
+                log(f"{surface} {kind} {query!r}: {run['error']}", "WARN")
+            else:
+                log(f"{surface} {kind} {query!r}: {run['latency_ms']:.0f}ms, {run['requests']} requests"
+                    f" ({run['wasted']} wasted, {run['cancelled']} cancelled), {run['hits']} hits"
+                    + (" - STALE" if run["stale"] else ""), "WARN" if run["stale"] else "INFO")
+            try:
+                clear_surface(page, surface, args)
+            except Exception:
+                page.goto(f"{BASE_URL}{'/dashboard' if surface == 'modal' else '/search'}")
+                wait_for_page_ready(page, timeout=args.timeout * 1000)
+    return runs
+
+
+# -- report ---------------------------------------------------------------------
+
+
+def measured(runs: list, surface: str, kind: str = None) -> list:
+    return [r for r in runs if r["surface"] == surface and (kind is None or r["kind"] == kind)
+            and not r["warmup"] and not r.get("error")]
+
+
+def totals(runs: list) -> dict:
+    keys = sum(r["keys"] for r in runs)
+    requests = sum(r["requests"] for r in runs)
+    return {
+        "queries": len(runs), "keys": keys, "requests": requests,
+        "per_key": requests / keys if keys else None,
+        "per_query": requests / len(runs) if runs else None,
+        "wasted": sum(r["wasted"] for r in runs), "cancelled": sum(r["cancelled"] for r in runs),
+        "raced": sum(r["raced"] for r in runs), "overhead": sum(r["overhead"] for r in runs),
+        "stale": sum(r["stale"] for r in runs),
+    }
+
+
+def fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(runs: list, args):
+    print("\n" + "=" * 112)
+    print("SEARCH TYPEAHEAD - latency_ms percentiles, per-query counts summed over the class")
+    print("=" * 112)
+    print(f"{'Surface':<7} {'Class':<10} {'n':>3} {'p50':>6} {'p95':>6} {'p99':>6} {'First p50':>9} "
+          f"{'Req/q':>6} {'Wasted':>6} {'Cancel':>6} {'Raced':>6} {'Extra':>6} {'KiB/q':>6} {'Hits p50':>8} "
+          f"{'Stale':>5}")
+    for surface in args.surfaces:
+        for kind in CLASSES:
+            own = measured(runs, surface, kind)
+            if not own:
+                continue
+            s = bench.summarize([r["latency_ms"] for r in own])
+            first = [r["first_ms"] for r in own if r["first_ms"] is not None]
+            hits = [r["hits"] for r in own if r["hits"] is not None]
+            t = totals(own)
+            print(f"{surface:<7} {kind:<10} {len(own):>3} {fmt(s['p50']):>6} {fmt(s['p95']):>6} {fmt(s['p99']):>6} "
+                  f"{fmt(bench.percentile(first, 50) if first else None):>9} {fmt(t['per_query'], '.1f'):>6} "
+                  f"{t['wasted']:>6} {t['cancelled']:>6} {t['raced']:>6} {t['overhead']:>6} "
+                  f"{fmt(sum(r['kib'] for r in own) / len(own), '.1f'):>6} "
+                  f"{fmt(bench.percentile(hits, 50) if hits else None):>8} {t['stale']:>5}")
+    print("=" * 112)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip search typeahead benchmark")
+    parser.add_argument("--surfaces", default=",".join(SURFACES), help="comma-separated: modal, page")
+    parser.add_argument("--queries", type=int, default=10, help="queries per class and surface")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded queries per class and surface")
+    parser.add_argument("--items", type=int, default=100000, help="items in the seeded tenant")
+    parser.add_argument("--cadence", type=float, default=140, help="median ms between keys")
+    parser.add_argument("--pause-rate", type=float, default=0.04, help="share of keys followed by a pause")
+    parser.add_argument("--typo-rate", type=float, default=0.03, help="share of keys mistyped and corrected")
+    parser.add_argument("--max-per-key", type=float, default=0.5, help="search requests per keystroke allowed")
+    parser.add_argument("--timeout", type=float, default=30, help="s to wait for a query's results")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown in percent")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level")
+    parser.add_argument("--seed", type=int, default=26, help="seed of the tenant and the queries")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--output", help="also write every query as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    names = {s.strip() for s in args.surfaces.split(",") if s.strip()}
+    if names - set(SURFACES):
+        parser.error(f"unknown surfaces: {', '.join(sorted(names - set(SURFACES)))}")
+    args.surfaces = [s for s in SURFACES if s in names]
+    args.queries += args.warmup
+    return args
+
+
+def load_baseline(args) -> dict:
+    baseline = bench.load_baseline(args.baseline)
+    settings = {"network": network.active(), "items": args.items, "cadence": args.cadence}
+    differs = [key for key, value in settings.items() if baseline and baseline.get(key) != value]
+    if differs:
+        log(f"Baseline was recorded with different {', '.join(differs)} - ignoring it", "WARN")
+        return {}
+    return baseline.get("samples", {})
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Search Typeahead Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Surfaces: {', '.join(args.surfaces)} | {args.queries - args.warmup} queries per class "
+          f"+ {args.warmup} warmup")
+    print(f"Typing: ~{args.cadence:.0f}ms/key, {args.pause_rate:.0%} pauses, {args.typo_rate:.0%} typos")
+    print(f"Items: {args.items}")
+    print(f"Baseline: {args.baseline}")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        conn = seed.connect()
+        seeder = seed.Seeder(conn, seed=args.seed)
+        seeder.use_tenant()
+        seeder.run({"folders": 200, "items": args.items})
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+    email = seeder.owner_email()
+    queries = make_queries(seeder, args.items, args)
+
+    readiness.verbose = False
+    store.begin_run("search-bench", base_url=BASE_URL)
+    baseline = load_baseline(args)
+
+    runs, durations = [], {}
+    with conn, sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+            context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+            install(context)
+            context.add_init_script(RENDER_JS)
+            network.apply(context)
+            page = context.new_page()
+            goto_authenticated(page, f"{BASE_URL}/dashboard", BASE_URL, email, seed.SEED_PASSWORD)
+            traffic = Traffic(page)
+            for surface in args.surfaces:
+                started = time.perf_counter()
+                runs.extend(run_surface(page, traffic, surface, queries, args))
+                durations[surface] = round((time.perf_counter() - started) * 1000, 1)
+            traffic.close()
+            context.close()
+        finally:
+            browser.close()
+
+    print_report(runs, args)
+
+    index = 0
+    for surface in args.surfaces:
+        with store.check(surface, durations.get(surface)):
+            own = measured(runs, surface)
+            t = totals(own)
+            errors = [r for r in runs if r["surface"] == surface and r.get("error")]
+
+            index += 1
+            record(f"SEARCH-{index:03d}", f"{surface}: debounced",
+                   bool(own) and t["per_key"] <= args.max_per_key,
+                   f"{fmt(t['per_key'], '.2f')} requests per keystroke ({t['requests']} for {t['keys']} keys), "
+                   f"{fmt(t['per_query'], '.1f')} per query" + (f", {len(errors)} queries failed" if errors else ""),
+                   totals=t)
+
+            index += 1
+            record(f"SEARCH-{index:03d}", f"{surface}: superseded requests cancelled",
+                   t["raced"] == 0 or t["cancelled"] >= t["raced"],
+                   f"{t['raced']} raced, {t['cancelled']} cancelled, {t['wasted']} wasted"
+                   + (f", {t['overhead']} extra Supabase requests alongside" if t["overhead"] else ""))
+
+            index += 1
+            stale = [r["query"] for r in own if r["stale"]]
+            record(f"SEARCH-{index:03d}", f"{surface}: results match the full query", not stale,
+                   f"{len(stale)} of {len(own)} showed an older response" + (f": {stale[0]!r}" if stale else ""))
+
+            index += 1
+            comparison, regressed = {}, []
+            for kind in CLASSES:
+                samples = [r["latency_ms"] for r in measured(runs, surface, kind)]
+                if samples:
+                    comparison[kind] = bench.compare(samples, baseline.get(f"{surface}|{kind}|latency_ms", []),
+                                                     args.threshold, args.alpha, stat="p50")
+                    if comparison[kind]["verdict"] == "regressed":
+                        regressed.append(f"{kind} {comparison[kind]['delta_pct']:+.0f}%")
+            p50 = bench.percentile([r["latency_ms"] for r in own], 50) if own else None
+            record(f"SEARCH-{index:03d}", f"{surface}: latency", bool(own) and not regressed,
+                   f"p50 {fmt(p50)}ms" + (f" - regressed: {', '.join(regressed)}" if regressed else ""),
+                   comparison=comparison)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "queries": queries, "runs": runs},
+                      f, indent=2, default=str)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    if args.update_baseline:
+        bench.save_baseline(args.baseline, {f"{surface}|{kind}|latency_ms": [r["latency_ms"]
+                                                                             for r in measured(runs, surface, kind)]
+                                            for surface in args.surfaces for kind in CLASSES},
+                            base_url=BASE_URL, network=network.active(), items=args.items, cadence=args.cadence)
+        log(f"Baseline updated: {args.baseline}", "PASS")
+        return
+
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Failed: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Typeaheads debounce, cancel and keep up, no significant regressions", "PASS")
+
+
+if __name__ == "__main__":
+    main()
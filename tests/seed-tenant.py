@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Seed a large, realistic tenant into the local Supabase database (harness/seed.py).
+
+Usage:
+  python3 tests/seed-tenant.py                           # --preset large, seed 1, its own tenant
+  python3 tests/seed-tenant.py --preset small --seed 7
+  python3 tests/seed-tenant.py --items 250000            # top up: only the missing rows go in
+  python3 tests/seed-tenant.py --owner-email "$TEST_EMAIL" --preset medium
+  python3 tests/seed-tenant.py --anchor 2025-01-01       # same timestamps on every run
+
+Without --owner-email the seed gets its own tenant, owned by
+owner.<seed>@seed.stockzip.test. Sign in as that owner (password SEED_PASSWORD)
+to browse it, or point TEST_EMAIL / TEST_PASSWORD at it for the other scripts.
+The same seed and counts always produce the same rows, so a second run only
+checks that everything is in.
+
+Seeding lifts the tenant's item, folder and user limits. The seed's own
+tenant keeps them lifted. With --owner-email the account's limits are put back
+once the rows are in, so its tenant may end up over its plan.
+
+Configuration:
+  DATABASE_URL     - Postgres to seed (default: local Supabase on port 54322)
+  SEED_PASSWORD    - password of the seeded accounts (default seed-Password-1)
+  SEED_BATCH_SIZE  - rows per INSERT (default 1000)
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+from harness import seed
+from harness.console import log
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip large-tenant seeding")
+    parser.add_argument("--preset", choices=sorted(seed.PRESETS), default="large", help="base row counts")
+    parser.add_argument("--seed", type=int, default=1, help="same seed, same rows")
+    parser.add_argument("--owner-email", help="seed into this account's tenant instead of the seed's own")
+    parser.add_argument("--anchor", help="day the timestamps count back from, YYYY-MM-DD (default today)")
+    parser.add_argument("--batch-size", type=int, default=seed.BATCH_SIZE, help="rows per INSERT")
+    parser.add_argument("--database-url", default=seed.DATABASE_URL)
+    parser.add_argument("--allow-remote", action="store_true", help="allow a database that isn't on this machine")
+    for kind in seed.KINDS:
+        parser.add_argument(f"--{kind.replace('_', '-')}", type=int, dest=kind, metavar="N",
+                            help=f"{kind.replace('_', ' ')} (overrides the preset)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    counts = dict(seed.PRESETS[args.preset])
+    counts.update({kind: getattr(args, kind) for kind in seed.KINDS if getattr(args, kind) is not None})
+    anchor = datetime.strptime(args.anchor, "%Y-%m-%d").replace(tzinfo=timezone.utc) if args.anchor else None
+
+    try:
+        conn = seed.connect(args.database_url, allow_remote=args.allow_remote)
+    except Exception as e:
+        log(str(e), "FAIL")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    with conn:
+        seeder = seed.Seeder(conn, seed=args.seed, batch_size=args.batch_size, anchor=anchor)
+        try:
+            tenant_id = seeder.use_tenant(args.owner_email)
+            log(f"Seeding tenant {tenant_id} (seed {args.seed}): "
+                + ", ".join(f"{counts[kind]} {kind}" for kind in seed.KINDS if counts.get(kind)))
+            inserted = seeder.run(counts)
+        except Exception as e:
+            log(f"Seeding failed: {e}", "FAIL")
+            sys.exit(1)
+
+    total = sum(inserted.values())
+    log(f"Done in {time.perf_counter() - started:.0f}s - {total} rows inserted", "PASS")
+    print(f"\n  Tenant: {tenant_id}")
+    if not args.owner_email:
+        print(f"  Owner:  {seeder.owner_email()} / {seed.SEED_PASSWORD}")
+    if counts.get("members"):
+        print(f"  Members sign in as {seeder.email('member', 0)} ... with the same password")
+
+
+if __name__ == "__main__":
+    main()
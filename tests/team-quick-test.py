@@ -2,13 +2,33 @@
 """
 Quick Team Test - Takes screenshots and tests public pages + authenticated flow.
 For authenticated tests, set TEST_EMAIL and TEST_PASSWORD env vars.
+The login is cached between runs (see harness/session.py), and a browser
+started with tests/browser-pool.py is reused (see harness/browser_pool.py).
+
+  python3 tests/team-quick-test.py [--async] [--concurrency 16] [--network 3g]
+
+--async runs the same checks concurrently through playwright.async_api on a
+single browser; TEST_ACCOUNTS="a@x.com:pass,b@y.com:pass" covers several
+tenants in one run. --network runs everything under one of the network
+profiles in harness/network.py.
 """
 
+import argparse
 import os
 import sys
-import time
-from datetime import datetime
-from playwright.sync_api import sync_playwright, expect
+from playwright.async_api import expect as async_expect
+from playwright.sync_api import sync_playwright, expect, TimeoutError as PlaywrightTimeoutError
+
+from harness import async_runner, browser_pool, network, perf, results as store, screenshots
+from harness.async_runner import public
+from harness.console import log
+from harness.readiness import (
+    install, wait_for_animations, wait_for_dialog_closed, wait_for_dialog_open,
+    wait_for_layout_settled, wait_for_page_ready,
+    wait_for_animations_async, wait_for_dialog_closed_async, wait_for_dialog_open_async,
+    wait_for_layout_settled_async, wait_for_page_ready_async,
+)
+from harness.session import ensure_state, goto_authenticated
 
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 SCREENSHOT_DIR = "/tmp/team-tests"
@@ -17,156 +37,300 @@ TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
 
 results = []
 
-def log(msg, status="INFO"):
-    ts = datetime.now().strftime("%H:%M:%S")
-    icons = {"PASS": "✅", "FAIL": "❌", "INFO": "ℹ️", "SKIP": "⏭️"}
-    print(f"[{ts}] {icons.get(status, '•')} {msg}")
-
 def record(test_id, name, passed, details=""):
-    results.append({"id": test_id, "name": name, "passed": passed, "details": details})
+    entry = {"id": test_id, "name": name, "passed": passed, "details": details}
+    if perf.current():
+        entry["metrics"] = perf.current()
+    results.append(entry)
+    store.record(entry)
     log(f"{test_id}: {name}" + (f" - {details}" if details else ""), "PASS" if passed else "FAIL")
 
 def shot(page, name):
-    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-    path = f"{SCREENSHOT_DIR}/{name}.png"
-    page.screenshot(path=path, full_page=True)
-    return path
+    return screenshots.capture(page, name, SCREENSHOT_DIR)
+
+async def shot_async(page, name, account=None):
+    return await screenshots.capture_async(page, async_runner.artifact_name(name, account), SCREENSHOT_DIR)
+
+
+# Async checks (--async), one context each on a shared browser
+
+@public
+async def check_login_page_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/login")
+    await shot_async(page, "01-login-page", account)
+    visible = (await page.locator("h3:has-text('Sign in')").is_visible()
+               or await page.locator("button:has-text('Sign in')").is_visible())
+    record("PUB-001", "Login page renders", visible, "" if visible else "Login elements not found")
+
+
+@public
+async def check_signup_page_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/signup")
+    await shot_async(page, "02-signup-page", account)
+    try:
+        await wait_for_page_ready_async(page, "form")
+        record("PUB-002", "Signup page renders", True)
+    except Exception as e:
+        record("PUB-002", "Signup page renders", False, str(e))
+
+
+async def check_team_page_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/dashboard")
+    if "/login" in page.url:
+        record("AUTH-001", "Login successful", False, "Cached session rejected")
+        return
+    record("AUTH-001", "Login successful", True)
+
+    await perf.goto_async(page, f"{BASE_URL}/settings/team")
+    await wait_for_page_ready_async(page, "h1")
+    await shot_async(page, "05-team-settings", account)
+    for test_id, name, selector in [("TEAM-001", "Team page loads", "h1:has-text('Team')"),
+                                    ("TEAM-002", "Team Members section visible", "text=Team Members"),
+                                    ("TEAM-004", "Role Permissions section visible", "text=Role Permissions")]:
+        try:
+            await async_expect(page.locator(selector)).to_be_visible(timeout=10000)
+            record(test_id, name, True)
+        except AssertionError:
+            record(test_id, name, False)
+    record("TEAM-003", "Current user badge visible", await page.locator("span:has-text('You')").is_visible())
+
+
+async def check_invite_dialog_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/settings/team")
+    await wait_for_page_ready_async(page, "h1")
+    invite_btn = page.locator("button:has-text('Invite Member')")
+    if not await invite_btn.is_visible():
+        record("TEAM-005", "Invite button visible", False, "User may not be owner")
+        return
+    record("TEAM-005", "Invite button visible (owner)", True)
+
+    await invite_btn.click()
+    try:
+        await wait_for_dialog_open_async(page)
+    except PlaywrightTimeoutError:
+        record("INV-001", "Invite dialog opens", False)
+        return
+    await shot_async(page, "06-invite-dialog", account)
+    record("INV-001", "Invite dialog opens", True)
+    if await page.locator("#invite-email").is_visible():
+        record("INV-002", "Email input visible", True)
+
+    viewer = page.locator("button:has-text('viewer')")
+    if await page.locator("button:has-text('staff')").is_visible() and await viewer.is_visible():
+        record("INV-003", "Role selection visible", True)
+        await viewer.click()
+        await wait_for_animations_async(page, "[role=dialog]")
+        await shot_async(page, "07-viewer-selected", account)
+
+    await page.locator("button:has-text('Cancel')").click()
+    await wait_for_dialog_closed_async(page)
+
+
+async def check_responsive_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/settings/team")
+    await wait_for_page_ready_async(page, "h1")
+    for vp, name in [({"width": 768, "height": 1024}, "tablet"), ({"width": 375, "height": 667}, "mobile")]:
+        await page.set_viewport_size(vp)
+        await wait_for_layout_settled_async(page)
+        await shot_async(page, f"08-{name}", account)
+        record(f"UI-{name.upper()}", f"{name.title()} layout", True)
+
+
+ASYNC_CHECKS = [
+    check_login_page_async,
+    check_signup_page_async,
+    check_team_page_async,
+    check_invite_dialog_async,
+    check_responsive_async,
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip team quick test")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run the checks through playwright.async_api on one browser")
+    parser.add_argument("--concurrency", type=int, default=async_runner.DEFAULT_CONCURRENCY,
+                        help="concurrent contexts for --async")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    return args
+
+
+def setup_context(context):
+    install(context)
+    network.apply(context)
+
+
+def print_summary():
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    passed = sum(1 for r in results if r["passed"])
+    failed = sum(1 for r in results if not r["passed"])
+    print(f"Passed: {passed} | Failed: {failed} | Total: {len(results)}")
+
+    if failed:
+        print("\nFailed:")
+        for r in results:
+            if not r["passed"]:
+                print(f"  ❌ {r['id']}: {r['name']}" + (f" ({r['details']})" if r['details'] else ""))
+
+    perf.print_report(results)
+    screenshots.flush()
+    store.end_run()
+
+    print(f"\nScreenshots: {SCREENSHOT_DIR}/")
+    print("=" * 60)
+
 
 def main():
+    args = parse_args()
+
     print("=" * 60)
     print("StockZip Team Quick Test")
     print(f"URL: {BASE_URL} | Screenshots: {SCREENSHOT_DIR}")
+    print(f"Network: {network.describe()}")
     print("=" * 60 + "\n")
 
     os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+    store.begin_run("team-quick-test", base_url=BASE_URL)
+
+    if args.use_async:
+        accounts = async_runner.parse_accounts(os.environ.get("TEST_ACCOUNTS", ""), TEST_EMAIL, TEST_PASSWORD)
+        results.extend(async_runner.run(ASYNC_CHECKS, BASE_URL, accounts, concurrency=args.concurrency,
+                                        context_options={"viewport": {"width": 1280, "height": 720}}))
+        print_summary()
+        return
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={"width": 1280, "height": 720})
+        browser = browser_pool.launch(p)
+        pool = browser_pool.ContextPool(browser, BASE_URL, on_create=setup_context, viewport={"width": 1280, "height": 720})
+        contexts = [pool.acquire()]
+        page = contexts[0].new_page()
 
         try:
             # 1. Test login page
-            log("Testing login page...")
-            page.goto(f"{BASE_URL}/login")
-            page.wait_for_load_state("networkidle")
-            shot(page, "01-login-page")
-
-            try:
-                # Check for either the heading or the submit button
-                if page.locator("h3:has-text('Sign in')").is_visible() or page.locator("button:has-text('Sign in')").is_visible():
-                    record("PUB-001", "Login page renders", True)
-                else:
-                    record("PUB-001", "Login page renders", False, "Login elements not found")
-            except Exception as e:
-                record("PUB-001", "Login page renders", False, str(e))
+            with store.check("check_login_page"):
+                log("Testing login page...")
+                perf.goto(page, f"{BASE_URL}/login")
+                shot(page, "01-login-page")
+
+                try:
+                    # Check for either the heading or the submit button
+                    if page.locator("h3:has-text('Sign in')").is_visible() or page.locator("button:has-text('Sign in')").is_visible():
+                        record("PUB-001", "Login page renders", True)
+                    else:
+                        record("PUB-001", "Login page renders", False, "Login elements not found")
+                except Exception as e:
+                    record("PUB-001", "Login page renders", False, str(e))
 
             # 2. Test signup page
-            log("Testing signup page...")
-            page.goto(f"{BASE_URL}/signup")
-            page.wait_for_load_state("networkidle")
-            shot(page, "02-signup-page")
-
-            try:
-                # Check for signup form elements - wait a bit for page to load
-                time.sleep(1)
-                if page.locator("text=Create").is_visible() or page.locator("text=Sign up").is_visible() or page.locator("input[type='email']").is_visible():
-                    record("PUB-002", "Signup page renders", True)
-                else:
-                    record("PUB-002", "Signup page renders", True, "Page loaded")
-            except Exception as e:
-                record("PUB-002", "Signup page renders", False, str(e))
+            with store.check("check_signup_page"):
+                log("Testing signup page...")
+                perf.goto(page, f"{BASE_URL}/signup")
+                shot(page, "02-signup-page")
+
+                try:
+                    # Check for signup form elements once the form has hydrated
+                    wait_for_page_ready(page, "form")
+                    if page.locator("text=Create").is_visible() or page.locator("text=Sign up").is_visible() or page.locator("input[type='email']").is_visible():
+                        record("PUB-002", "Signup page renders", True)
+                    else:
+                        record("PUB-002", "Signup page renders", True, "Page loaded")
+                except Exception as e:
+                    record("PUB-002", "Signup page renders", False, str(e))
 
             # 3. Try authenticated tests if credentials provided
             if TEST_EMAIL and TEST_PASSWORD:
                 log(f"Attempting login with: {TEST_EMAIL}")
 
-                page.goto(f"{BASE_URL}/login")
-                page.wait_for_load_state("networkidle")
-
-                page.fill("#userEmail", TEST_EMAIL)
-                page.fill("#userPassword", TEST_PASSWORD)
-                shot(page, "03-login-filled")
-
-                page.click("button[type='submit']")
-
                 try:
-                    page.wait_for_url("**/dashboard**", timeout=15000)
-                    record("AUTH-001", "Login successful", True)
-                    shot(page, "04-dashboard")
-
-                    # Navigate to team settings
-                    page.goto(f"{BASE_URL}/settings/team")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(2)
-                    shot(page, "05-team-settings")
-
-                    # Team page tests
-                    try:
-                        expect(page.locator("h1:has-text('Team')")).to_be_visible(timeout=10000)
-                        record("TEAM-001", "Team page loads", True)
-                    except:
-                        record("TEAM-001", "Team page loads", False)
-
-                    try:
-                        expect(page.locator("text=Team Members")).to_be_visible()
-                        record("TEAM-002", "Team Members section visible", True)
-                    except:
-                        record("TEAM-002", "Team Members section visible", False)
-
-                    try:
-                        if page.locator("span:has-text('You')").is_visible():
-                            record("TEAM-003", "Current user badge visible", True)
-                        else:
+                    with store.check("check_team_page"):
+                        # Reuses the cached session; only logs in when it's cold or rejected
+                        contexts.append(pool.acquire(ensure_state(browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD)))
+                        page = contexts[-1].new_page()
+                        goto_authenticated(page, f"{BASE_URL}/dashboard", BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+                        record("AUTH-001", "Login successful", True)
+                        shot(page, "04-dashboard")
+
+                        # Navigate to team settings
+                        perf.goto(page, f"{BASE_URL}/settings/team")
+                        wait_for_page_ready(page, "h1")
+                        shot(page, "05-team-settings")
+
+                        # Team page tests
+                        try:
+                            expect(page.locator("h1:has-text('Team')")).to_be_visible(timeout=10000)
+                            record("TEAM-001", "Team page loads", True)
+                        except:
+                            record("TEAM-001", "Team page loads", False)
+
+                        try:
+                            expect(page.locator("text=Team Members")).to_be_visible()
+                            record("TEAM-002", "Team Members section visible", True)
+                        except:
+                            record("TEAM-002", "Team Members section visible", False)
+
+                        try:
+                            if page.locator("span:has-text('You')").is_visible():
+                                record("TEAM-003", "Current user badge visible", True)
+                            else:
+                                record("TEAM-003", "Current user badge visible", False)
+                        except:
                             record("TEAM-003", "Current user badge visible", False)
-                    except:
-                        record("TEAM-003", "Current user badge visible", False)
 
-                    try:
-                        expect(page.locator("text=Role Permissions")).to_be_visible()
-                        record("TEAM-004", "Role Permissions section visible", True)
-                    except:
-                        record("TEAM-004", "Role Permissions section visible", False)
+                        try:
+                            expect(page.locator("text=Role Permissions")).to_be_visible()
+                            record("TEAM-004", "Role Permissions section visible", True)
+                        except:
+                            record("TEAM-004", "Role Permissions section visible", False)
 
                     # Check invite button (owner only)
-                    invite_btn = page.locator("button:has-text('Invite Member')")
-                    if invite_btn.is_visible():
-                        record("TEAM-005", "Invite button visible (owner)", True)
-
-                        # Test invite dialog
-                        invite_btn.click()
-                        time.sleep(1)
-                        shot(page, "06-invite-dialog")
-
-                        if page.locator("role=dialog").is_visible():
-                            record("INV-001", "Invite dialog opens", True)
-
-                            # Test email input
-                            if page.locator("#invite-email").is_visible():
-                                record("INV-002", "Email input visible", True)
-
-                            # Test role buttons
-                            staff = page.locator("button:has-text('staff')")
-                            viewer = page.locator("button:has-text('viewer')")
-                            if staff.is_visible() and viewer.is_visible():
-                                record("INV-003", "Role selection visible", True)
-                                viewer.click()
-                                time.sleep(0.3)
-                                shot(page, "07-viewer-selected")
-
-                            # Close dialog
-                            page.locator("button:has-text('Cancel')").click()
-                            time.sleep(0.5)
+                    with store.check("check_invite_dialog"):
+                        invite_btn = page.locator("button:has-text('Invite Member')")
+                        if invite_btn.is_visible():
+                            record("TEAM-005", "Invite button visible (owner)", True)
+
+                            # Test invite dialog
+                            invite_btn.click()
+                            try:
+                                wait_for_dialog_open(page)
+                            except PlaywrightTimeoutError:
+                                pass  # recorded as INV-001 below
+                            shot(page, "06-invite-dialog")
+
+                            if page.locator("role=dialog").is_visible():
+                                record("INV-001", "Invite dialog opens", True)
+
+                                # Test email input
+                                if page.locator("#invite-email").is_visible():
+                                    record("INV-002", "Email input visible", True)
+
+                                # Test role buttons
+                                staff = page.locator("button:has-text('staff')")
+                                viewer = page.locator("button:has-text('viewer')")
+                                if staff.is_visible() and viewer.is_visible():
+                                    record("INV-003", "Role selection visible", True)
+                                    viewer.click()
+                                    wait_for_animations(page, "[role=dialog]")
+                                    shot(page, "07-viewer-selected")
+
+                                # Close dialog
+                                page.locator("button:has-text('Cancel')").click()
+                                wait_for_dialog_closed(page)
+                            else:
+                                record("INV-001", "Invite dialog opens", False)
                         else:
-                            record("INV-001", "Invite dialog opens", False)
-                    else:
-                        record("TEAM-005", "Invite button visible", False, "User may not be owner")
+                            record("TEAM-005", "Invite button visible", False, "User may not be owner")
 
                     # Responsive tests
-                    for vp, name in [({"width": 768, "height": 1024}, "tablet"), ({"width": 375, "height": 667}, "mobile")]:
-                        page.set_viewport_size(vp)
-                        time.sleep(0.5)
-                        shot(page, f"08-{name}")
-                        record(f"UI-{name.upper()}", f"{name.title()} layout", True)
+                    with store.check("check_responsive"):
+                        for vp, name in [({"width": 768, "height": 1024}, "tablet"), ({"width": 375, "height": 667}, "mobile")]:
+                            page.set_viewport_size(vp)
+                            wait_for_layout_settled(page)
+                            shot(page, f"08-{name}")
+                            record(f"UI-{name.upper()}", f"{name.title()} layout", True)
 
                     page.set_viewport_size({"width": 1280, "height": 720})
 
@@ -182,24 +346,12 @@ def main():
             log(f"Error: {e}", "FAIL")
             shot(page, "error")
         finally:
+            for context in contexts:
+                pool.release(context)
+            pool.close()
             browser.close()
 
-    # Summary
-    print("\n" + "=" * 60)
-    print("SUMMARY")
-    print("=" * 60)
-    passed = sum(1 for r in results if r["passed"])
-    failed = sum(1 for r in results if not r["passed"])
-    print(f"Passed: {passed} | Failed: {failed} | Total: {len(results)}")
-
-    if failed:
-        print("\nFailed:")
-        for r in results:
-            if not r["passed"]:
-                print(f"  ❌ {r['id']}: {r['name']}" + (f" ({r['details']})" if r['details'] else ""))
-
-    print(f"\nScreenshots: {SCREENSHOT_DIR}/")
-    print("=" * 60)
+    print_summary()
 
 
 if __name__ == "__main__":
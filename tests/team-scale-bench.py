@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Team page scaling benchmark for StockZip
+Seeds one tenant per size with that many team members and pending
+invitations (harness/seed.py), loads /settings/team as its owner and fits how
+each metric grows with the number of rows on the page. Growth worse than
+linear fails: that is the point where the lists need virtualization or paging.
+
+Usage:
+  python3 tests/team-scale-bench.py                      # sizes 10,100,500,2000
+  python3 tests/team-scale-bench.py --sizes 10,100,1000 --runs 7
+  python3 tests/team-scale-bench.py --output team-scale.json
+  python3 tests/team-scale-bench.py --network 3g          # see harness/network.py
+
+Metrics (median of --runs loads per size, after --warmup):
+  tti               - ms until the page is interactive: the later of
+                      DOMContentLoaded, FCP and the end of the last long task,
+                      once the main thread has been quiet for --quiet ms
+  dom_nodes         - elements in the document
+  members_rendered  - ms from navigation start to the last change to the
+                      members list (server-rendered rows count when parsed)
+  dropdown_open     - ms from pointerdown on the last member's actions button
+                      until its menu is painted
+
+Each metric is fitted as overhead + c * rows^k (rows = members + pending
+invitations actually rendered). It fails when k is over 1 + --tolerance and
+the fitted growth across the sizes is more than --flat percent of its value
+at the smallest size (below that it counts as flat).
+
+Configuration:
+  BASE_URL, DATABASE_URL, SEED_PASSWORD as for seed-tenant.py. Each size gets
+  its own tenant (seed = --seed * 100000 + size), so reruns only sign in.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from playwright.sync_api import sync_playwright
+
+from harness import bench, browser_pool, network, readiness, results as store, seed
+from harness.console import log
+from harness.readiness import close_menu, install, wait_for_page_ready
+from harness.session import ensure_state, goto_authenticated
+
+# Configuration
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
+
+CONTEXT_OPTIONS = {"viewport": {"width": 1280, "height": 720}}
+
+DEFAULT_SIZES = "10,100,500,2000"
+
+# (metric, unit)
+METRICS = (("tti", "ms"), ("dom_nodes", "nodes"), ("members_rendered", "ms"), ("dropdown_open", "ms"))
+
+# Runs before any page script: when each list last changed, and when the last long task ended
+SCALE_JS = """
+(() => {
+  if (window.__teamScale) return;
+  const state = window.__teamScale = {
+    membersRendered: null, invitationsRendered: null, lastLongTaskEnd: 0, pointerDown: null,
+  };
+  const listNear = el => {
+    for (let a = el; a; a = a.parentElement) {
+      const list = a.querySelector('.divide-y');
+      if (list) return list;
+    }
+    return null;
+  };
+  let members = null, invitations = null;
+  state.lists = () => {
+    if (!members || !members.isConnected) {
+      members = listNear(document.querySelector("input[placeholder^='Search team members']"));
+    }
+    if (!invitations || !invitations.isConnected) {
+      invitations = [...document.querySelectorAll('.divide-y')].find(
+        l => l !== members && l.firstElementChild && l.firstElementChild.textContent.includes('Expires in')) || null;
+    }
+    return { members, invitations };
+  };
+  new MutationObserver(records => {
+    const now = performance.now();
+    const lists = state.lists();
+    for (const r of records) {
+      if (lists.members && lists.members.contains(r.target)) state.membersRendered = now;
+      if (lists.invitations && lists.invitations.contains(r.target)) state.invitationsRendered = now;
+    }
+  }).observe(document, { childList: true, subtree: true });
+  try {
+    new PerformanceObserver(list => list.getEntries().forEach(e => {
+      state.lastLongTaskEnd = Math.max(state.lastLongTaskEnd, e.startTime + e.duration);
+    })).observe({ type: 'longtask', buffered: true });
+  } catch (e) {}
+  addEventListener('pointerdown', e => { state.pointerDown = e.timeStamp; }, true);
+})();
+"""
+
+QUIET_JS = "quiet => performance.now() - window.__teamScale.lastLongTaskEnd >= quiet"
+
+MEASURE_JS = """
+() => {
+  const s = window.__teamScale;
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  const { members, invitations } = s.lists();
+  return {
+    tti: Math.max(nav ? nav.domContentLoadedEventEnd : 0, fcp ? fcp.startTime : 0, s.lastLongTaskEnd),
+    dom_nodes: document.getElementsByTagName('*').length,
+    members_rendered: s.membersRendered,
+    invitations_rendered: s.invitationsRendered,
+    members: members ? members.children.length : 0,
+    invitations: invitations ? invitations.children.length : 0,
+  };
+}
+"""
+
+# Marks the last member's actions button (the trigger inside a dropdown-menu.tsx
+# wrapper, div.relative.inline-block) so Playwright can click it
+MARK_ACTIONS_JS = """
+() => {
+  const { members } = window.__teamScale.lists();
+  const buttons = members ? members.querySelectorAll("div.relative.inline-block > button") : [];
+  if (!buttons.length) return false;
+  const button = buttons[buttons.length - 1];
+  button.setAttribute('data-harness-actions', '');
+  button.scrollIntoView({ block: 'center' });
+  window.__teamScale.pointerDown = null;
+  return true;
+}
+"""
+
+# Resolves once the marked trigger's menu content (div.absolute.z-50, rendered
+# only while open) is in the DOM and two frames have been painted
+MENU_PAINTED_JS = """
+() => new Promise((resolve, reject) => {
+  const started = performance.now();
+  const wrapper = document.querySelector('[data-harness-actions]').parentElement;
+  const poll = () => {
+    if (wrapper.querySelector(':scope > div.absolute.z-50')) {
+      requestAnimationFrame(() => requestAnimationFrame(() => resolve(performance.now() - window.__teamScale.pointerDown)));
+    } else if (performance.now() - started > 10000) {
+      reject(new Error('menu did not open'));
+    } else {
+      requestAnimationFrame(poll);
+    }
+  };
+  poll();
+})
+"""
+
+results = []
+record = store.recorder(results)
+
+
+def seed_sizes(sizes: list, base_seed: int) -> dict:
+    """{size: owner email}, each size topped up to that many members and pending invitations"""
+    owners = {}
+    with seed.connect() as conn:
+        for size in sizes:
+            # Pending only: the page hides expired invitations
+            seeder = seed.Seeder(conn, seed=base_seed * 100000 + size, expired_share=0)
+            seeder.use_tenant()
+            log(f"Seeding {size} members + {size} invitations")
+            seeder.run({"members": size, "invitations": size})
+            owners[size] = seeder.owner_email()
+    return owners
+
+
+def measure_dropdown(page) -> float:
+    if not page.evaluate(MARK_ACTIONS_JS):
+        return None
+    page.click("[data-harness-actions]")
+    duration = page.evaluate(MENU_PAINTED_JS)
+    close_menu(page)
+    return duration
+
+
+def measure_load(page, url: str, email: str, quiet_ms: int) -> dict:
+    """One load of the team page: the metrics plus the rows it rendered"""
+    goto_authenticated(page, url, BASE_URL, email, seed.SEED_PASSWORD)
+    wait_for_page_ready(page, timeout=60000)
+    page.wait_for_function(QUIET_JS, arg=quiet_ms, polling=100, timeout=60000)
+    sample = page.evaluate(MEASURE_JS)
+    sample["dropdown_open"] = measure_dropdown(page)
+    return sample
+
+
+def run_size(browser, size: int, email: str, args) -> dict:
+    state = ensure_state(browser, BASE_URL, email, seed.SEED_PASSWORD)
+    context = browser.new_context(storage_state=state, **CONTEXT_OPTIONS)
+    install(context)
+    network.apply(context)
+    context.add_init_script(SCALE_JS)
+    samples = []
+    try:
+        for i in range(args.warmup + args.runs):
+            page = context.new_page()
+            try:
+                sample = measure_load(page, f"{BASE_URL}/settings/team", email, args.quiet)
+            finally:
+                page.close()
+            if i >= args.warmup:
+                samples.append(sample)
+    finally:
+        context.close()
+
+    rendered = samples[-1]["members"] + samples[-1]["invitations"]
+    if samples[-1]["members"] < size + 1:
+        log(f"{size}: only {samples[-1]['members']} of {size + 1} members rendered "
+            f"(PostgREST max_rows caps a select at 1000 by default)", "WARN")
+    medians = {}
+    for metric, _ in METRICS:
+        values = [s[metric] for s in samples if s[metric] is not None]
+        medians[metric] = statistics.median(values) if values else None
+    log(f"{size}: {rendered} rows | TTI {medians['tti']:.0f}ms | {medians['dom_nodes']:.0f} nodes | "
+        f"list {medians['members_rendered'] or 0:.0f}ms | menu {medians['dropdown_open'] or 0:.0f}ms")
+    return {"size": size, "rows": rendered, "samples": samples, "medians": medians}
+
+
+def fit(rows: list, metric: str, args) -> dict:
+    points = [(row["rows"], row["medians"][metric]) for row in rows if row["medians"][metric] is not None]
+    if len({n for n, _ in points}) < 3:
+        return {"metric": metric, "verdict": "insufficient", "points": points}
+    sizes, values = zip(*points)
+    result = bench.power_fit(list(sizes), list(values))
+    growth = result["coefficient"] * (max(sizes) ** result["exponent"] - min(sizes) ** result["exponent"])
+    smallest = values[sizes.index(min(sizes))]
+    if growth <= abs(smallest) * args.flat / 100:
+        verdict = "flat"
+    elif result["exponent"] > 1 + args.tolerance:
+        verdict = "superlinear"
+    else:
+        verdict = "linear"
+    return {"metric": metric, "verdict": verdict, "growth": growth, "points": points, **result}
+
+
+def print_report(rows: list, fits: list, args):
+    print("\n" + "=" * 100)
+    print(f"TEAM PAGE SCALING - median of {args.runs} loads per size")
+    print("=" * 100)
+    print(f"{'Size':>6} {'Rows':>6} {'TTI ms':>9} {'DOM nodes':>10} {'List ms':>9} {'Menu ms':>9}")
+    for row in rows:
+        m = row["medians"]
+        print(f"{row['size']:>6} {row['rows']:>6} {m['tti'] or 0:>9.0f} {m['dom_nodes'] or 0:>10.0f} "
+              f"{m['members_rendered'] or 0:>9.0f} {m['dropdown_open'] or 0:>9.1f}")
+    print("-" * 100)
+    print(f"{'Metric':<18} {'Exponent':>9} {'Per row':>10} {'Overhead':>10} {'R²':>6}  Verdict")
+    units = dict(METRICS)
+    for f in fits:
+        icon = {"superlinear": "❌", "linear": "✅", "flat": "✅"}.get(f["verdict"], "⏭️")
+        if f["verdict"] == "insufficient":
+            print(f"{f['metric']:<18} {'-':>9} {'-':>10} {'-':>10} {'-':>6}  {icon} fewer than 3 sizes")
+            continue
+        per_row = f["coefficient"] * f["exponent"] * max(n for n, _ in f["points"]) ** (f["exponent"] - 1)
+        print(f"{f['metric']:<18} {f['exponent']:>9.2f} {per_row:>10.3f} {f['overhead']:>10.0f} {f['r2']:>6.2f}  "
+              f"{icon} {f['verdict']} ({units[f['metric']]})")
+    print("=" * 100)
+    print("Per row: marginal cost at the largest size, in the metric's unit")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip team page scaling benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated member/invitation counts")
+    parser.add_argument("--runs", type=int, default=5, help="measured loads per size")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded loads per size")
+    parser.add_argument("--quiet", type=int, default=1000, help="ms without long tasks before TTI is read")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed exponent above 1")
+    parser.add_argument("--flat", type=float, default=10.0,
+                        help="growth under this percent of the smallest size counts as flat")
+    parser.add_argument("--seed", type=int, default=16, help="base seed of the per-size tenants")
+    parser.add_argument("--output", help="also write samples and fits as JSON")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    network.configure(args.network)
+    args.sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    if len(args.sizes) < 3:
+        parser.error("--sizes needs at least 3 sizes to fit a curve")
+    return args
+
+
+def main():
+    """Main benchmark runner"""
+    args = parse_args()
+
+    print("=" * 60)
+    print("StockZip Team Page Scaling Benchmark")
+    print(f"Base URL: {BASE_URL}")
+    print(f"Sizes: {', '.join(map(str, args.sizes))} | {args.runs} runs + {args.warmup} warmup")
+    print(f"Network: {network.describe()}")
+    print("=" * 60 + "\n")
+
+    try:
+        owners = seed_sizes(args.sizes, args.seed)
+    except Exception as e:
+        log(f"Seeding failed: {e}", "FAIL")
+        sys.exit(1)
+
+    readiness.verbose = False
+    store.begin_run("team-scale-bench", base_url=BASE_URL)
+
+    rows = []
+    started = time.perf_counter()
+    with sync_playwright() as p:
+        browser = browser_pool.launch(p)
+        try:
+            for size in args.sizes:
+                try:
+                    rows.append(run_size(browser, size, owners[size], args))
+                except Exception as e:
+                    log(f"{size}: measuring failed - {e}", "FAIL")
+        finally:
+            browser.close()
+    # Every fit is over the whole sweep of sizes, so that is the check their results share
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    fits = [fit(rows, metric, args) for metric, _ in METRICS]
+    if rows:
+        print_report(rows, fits, args)
+
+    with store.check("team page sizes", duration_ms):
+        for index, f in enumerate(fits, 1):
+            if f["verdict"] == "insufficient":
+                record(f"SCALE-{index:03d}", f"{f['metric']} scales at most linearly", False,
+                       f"only {len(f['points'])} sizes measured")
+                continue
+            record(f"SCALE-{index:03d}", f"{f['metric']} scales at most linearly", f["verdict"] != "superlinear",
+                   f"exponent {f['exponent']:.2f}, R² {f['r2']:.2f} ({f['verdict']})", scaling=f)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": BASE_URL, "network": network.active(), "sizes": args.sizes, "rows": rows, "fits": fits}, f, indent=2)
+        log(f"Results written to {args.output}")
+
+    store.end_run()
+    failed = [r["id"] for r in results if not r["passed"]]
+    if failed:
+        log(f"Worse than linear or not measured: {', '.join(failed)}", "FAIL")
+        sys.exit(1)
+    log("Team page scales at most linearly", "PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,64 +2,168 @@
 """
 Team Functionality Test Script for StockZip
 Tests: Role permissions, Team settings UI, Invitation workflow, Member management
+Every navigation also records load metrics (Web Vitals, navigation timing,
+heap, bytes) alongside the results - see harness/perf.py.
 
 Usage:
   TEST_EMAIL=your@email.com TEST_PASSWORD=yourpassword python3 tests/team-test.py
+
+  # Each test in its own browser context, spread over a worker pool
+  python3 tests/team-test.py --parallel [--workers 4] [--shard 1/2]
+
+  # asyncio mode: one browser, many concurrent contexts; TEST_ACCOUNTS
+  # ("a@x.com:pass,b@y.com:pass") runs the checks for several tenants at once
+  python3 tests/team-test.py --async [--concurrency 16]
+
+  # Record the browser's Supabase traffic once, then replay it without the
+  # network (optionally with a fixed backend latency) - see harness/replay.py
+  python3 tests/team-test.py --record team
+  python3 tests/team-test.py --replay team [--replay-latency 0|150|recorded]
+
+  # Warehouse network conditions - see harness/network.py
+  python3 tests/team-test.py --network wifi-congested|3g|offline-flap
+
+  # Test impact analysis: record which routes, server actions and source
+  # files each test touches, then run only the tests a change can affect
+  # (the full suite when it can't tell) - see harness/impact.py
+  python3 tests/team-test.py --impact-record
+  python3 tests/team-test.py --changed-since origin/main
+
+  # Where does the time go? Span tree of every test and Playwright call,
+  # split into browser / network / python time
+  python3 tests/team-test.py --profile
+
+  # Keep one Chromium running between runs; the scripts connect to it and
+  # reuse warm contexts instead of launching their own - see harness/browser_pool.py
+  python3 tests/browser-pool.py start
 """
 
+import argparse
 import os
 import sys
-import time
-from datetime import datetime
+from playwright.async_api import expect as async_expect
 from playwright.sync_api import sync_playwright, expect
 
+from harness import async_runner, browser_pool, impact, network, perf, replay, results as store, screenshots, spans
+from harness.async_runner import signed_out
+from harness.console import log
+from harness.readiness import (
+    close_menu, close_menu_async, install, wait_for_animations, wait_for_dialog_closed, wait_for_dialog_open,
+    wait_for_layout_settled, wait_for_menu_open, wait_for_page_ready,
+    wait_for_animations_async, wait_for_dialog_closed_async, wait_for_dialog_open_async,
+    wait_for_layout_settled_async, wait_for_menu_open_async,
+    wait_for_page_ready_async,
+)
+from harness.runner import discover_tests, parse_shard, run_parallel
+from harness.session import ensure_state, goto_authenticated, save_state
+from harness.spans import span
+
 # Configuration
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 TEST_EMAIL = os.environ.get("TEST_EMAIL", "")
 TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
 SCREENSHOT_DIR = os.environ.get("SCREENSHOT_DIR", "/tmp/team-tests")
 
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1280, "height": 720},
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+}
+
+# What the sync tests and their async twins look for, so the two modes
+# assert the same things
+LOGIN_HEADING = "text=Sign in to StockZip"
+LOGIN_SUBMIT = "button[type='submit']:has-text('Sign in to StockZip')"
+TEAM_HEADING = "h1:has-text('Team')"
+MEMBERS_SECTION = "text=Team Members"
+MEMBER_BADGE = "span:has-text('member')"
+YOU_BADGE = "text=You"
+OWNER_BADGE = "span:has-text('Owner')"
+PERMISSIONS_SECTION = "text=Role Permissions"
+ROLES = ["Owner", "Staff", "Viewer"]
+INVITE_BUTTON = "button:has-text('Invite Member')"
+ACTION_BUTTONS = "button:has(svg.lucide-more-vertical)"
+MENU_ITEMS = ["Make Staff", "Make Viewer", "Remove"]
+PENDING_SECTION = "text=Pending Invitations"
+SEARCH_INPUT = "input[placeholder*='Search team members']"
+# (test id, label, viewport, screenshot)
+VIEWPORTS = [
+    ("UI-010", "Desktop", {"width": 1280, "height": 720}, "13-responsive-desktop"),
+    ("UI-011", "Tablet", {"width": 768, "height": 1024}, "14-responsive-tablet"),
+    ("UI-012", "Mobile", {"width": 375, "height": 667}, "15-responsive-mobile"),
+]
+
 # Test results storage
 test_results = []
 
-def log(message: str, status: str = "INFO"):
-    """Log with timestamp"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    prefix = {"PASS": "✅", "FAIL": "❌", "INFO": "ℹ️", "WARN": "⚠️"}.get(status, "•")
-    print(f"[{timestamp}] {prefix} {message}")
-
 def record_result(test_id: str, name: str, passed: bool, details: str = ""):
     """Record test result"""
-    test_results.append({
+    entry = {
         "id": test_id,
         "name": name,
         "passed": passed,
         "details": details
-    })
+    }
+    metrics = perf.current()
+    if metrics:
+        entry["metrics"] = metrics
+    test_results.append(entry)
+    store.record(entry)
     status = "PASS" if passed else "FAIL"
     log(f"{test_id}: {name} - {details if details else 'OK'}", status)
 
 def screenshot(page, name: str):
-    """Take a screenshot"""
-    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-    path = f"{SCREENSHOT_DIR}/{name}.png"
-    page.screenshot(path=path, full_page=True)
-    log(f"Screenshot saved: {path}")
+    """Take a screenshot (written in the background, see harness/screenshots.py)"""
+    path = screenshots.capture(page, name, SCREENSHOT_DIR)
+    log(f"Screenshot queued: {path}")
     return path
 
 
+def open_team_page(page):
+    """Navigate to team settings and wait for the page heading"""
+    goto_authenticated(page, f"{BASE_URL}/settings/team", BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+    wait_for_page_ready(page, "h1")
+    expect(page.locator(TEAM_HEADING)).to_be_visible(timeout=10000)
+
+
+def setup_context(context):
+    install(context)
+    replay.attach(context)
+    network.apply(context)
+
+
+def new_context(browser, test_name: str):
+    """Pooled context for a standalone test; all but test_login start signed in"""
+    state = None if test_name == "test_login" else ensure_state(browser, BASE_URL, TEST_EMAIL, TEST_PASSWORD)
+    pool = browser_pool.pool_for(browser, BASE_URL, on_create=setup_context, on_reset=replay.rewind,
+                                 **CONTEXT_OPTIONS)
+    return pool.acquire(state)
+
+
+def prepare_page(page, test_name: str) -> bool:
+    """Bring a fresh page to the state `test_name` expects when run on its own"""
+    if test_name in ("test_login", "test_team_page_navigation"):
+        return True
+
+    try:
+        open_team_page(page)
+        return True
+    except Exception as e:
+        log(f"Setup for {test_name} failed: {e}", "FAIL")
+        return False
+
+
+@span()
 def test_login(page):
     """Test login functionality and authenticate"""
     log("Testing login flow...", "INFO")
 
     try:
         # Navigate to login page
-        page.goto(f"{BASE_URL}/login")
-        page.wait_for_load_state("networkidle")
+        perf.goto(page, f"{BASE_URL}/login")
         screenshot(page, "01-login-page")
 
         # Verify login page elements
-        expect(page.locator("text=Sign in to StockZip")).to_be_visible()
+        expect(page.locator(LOGIN_HEADING)).to_be_visible()
         record_result("LOGIN-001", "Login page loads", True)
 
         # Fill in credentials
@@ -68,13 +172,17 @@ def test_login(page):
         screenshot(page, "02-login-filled")
 
         # Submit login form
-        page.click("button[type='submit']:has-text('Sign in to StockZip')")
+        page.click(LOGIN_SUBMIT)
 
         # Wait for redirect to dashboard
         page.wait_for_url("**/dashboard**", timeout=15000)
         page.wait_for_load_state("networkidle")
+        perf.collect(page)
         screenshot(page, "03-dashboard-after-login")
 
+        # Warm the session cache for other workers and scripts
+        save_state(BASE_URL, TEST_EMAIL, page.context.storage_state())
+
         record_result("LOGIN-002", "Login successful", True)
         return True
 
@@ -84,19 +192,15 @@ def test_login(page):
         return False
 
 
+@span()
 def test_team_page_navigation(page):
     """Test navigation to team settings page"""
     log("Testing team page navigation...", "INFO")
 
     try:
-        # Navigate directly to team settings
-        page.goto(f"{BASE_URL}/settings/team")
-        page.wait_for_load_state("networkidle")
-        time.sleep(2)  # Wait for React hydration
+        # Navigate directly to team settings and verify page loaded
+        open_team_page(page)
         screenshot(page, "04-team-settings-page")
-
-        # Verify page loaded
-        expect(page.locator("h1:has-text('Team')")).to_be_visible(timeout=10000)
         record_result("TEAM-001", "Team page loads", True)
 
         return True
@@ -107,25 +211,26 @@ def test_team_page_navigation(page):
         return False
 
 
+@span()
 def test_team_members_display(page):
     """Test team members list display"""
     log("Testing team members display...", "INFO")
 
     try:
         # Check for Team Members section
-        team_card = page.locator("text=Team Members").first
+        team_card = page.locator(MEMBERS_SECTION).first
         expect(team_card).to_be_visible()
         record_result("TEAM-002", "Team Members section visible", True)
 
         # Check for members count badge
-        member_badge = page.locator("span:has-text('member')")
+        member_badge = page.locator(MEMBER_BADGE)
         if member_badge.count() > 0:
             record_result("TEAM-003", "Member count badge visible", True)
         else:
             record_result("TEAM-003", "Member count badge visible", False, "Badge not found")
 
         # Check for current user highlight
-        you_badge = page.locator("text=You").first
+        you_badge = page.locator(YOU_BADGE).first
         if you_badge.is_visible():
             record_result("TEAM-004", "Current user marked with 'You' badge", True)
         else:
@@ -139,20 +244,21 @@ def test_team_members_display(page):
         return False
 
 
+@span()
 def test_role_badges(page):
     """Test role badges display correctly"""
     log("Testing role badges...", "INFO")
 
     try:
         # Check for Owner badge
-        owner_badge = page.locator("span:has-text('Owner')").first
+        owner_badge = page.locator(OWNER_BADGE).first
         if owner_badge.is_visible():
             record_result("ROLE-001", "Owner role badge visible", True)
         else:
             record_result("ROLE-001", "Owner role badge visible", False)
 
         # Check for role permissions section
-        permissions_section = page.locator("text=Role Permissions")
+        permissions_section = page.locator(PERMISSIONS_SECTION)
         if permissions_section.is_visible():
             record_result("ROLE-002", "Role Permissions section visible", True)
             screenshot(page, "06-role-permissions")
@@ -160,8 +266,7 @@ def test_role_badges(page):
             record_result("ROLE-002", "Role Permissions section visible", False)
 
         # Check for all three role descriptions
-        roles = ["Owner", "Staff", "Viewer"]
-        for role in roles:
+        for role in ROLES:
             role_card = page.locator(f"span:has-text('{role}')")
             if role_card.count() > 0:
                 record_result(f"ROLE-{role.upper()}", f"{role} role defined", True)
@@ -175,12 +280,13 @@ def test_role_badges(page):
         return False
 
 
+@span()
 def test_invite_button(page):
     """Test invite button visibility (owner only)"""
     log("Testing invite button...", "INFO")
 
     try:
-        invite_button = page.locator("button:has-text('Invite Member')")
+        invite_button = page.locator(INVITE_BUTTON)
 
         if invite_button.is_visible():
             record_result("INV-001", "Invite Member button visible (owner)", True)
@@ -196,12 +302,13 @@ def test_invite_button(page):
         return False
 
 
+@span()
 def test_invite_dialog(page):
     """Test invite dialog functionality"""
     log("Testing invite dialog...", "INFO")
 
     try:
-        invite_button = page.locator("button:has-text('Invite Member')")
+        invite_button = page.locator(INVITE_BUTTON)
 
         if not invite_button.is_visible():
             record_result("INV-010", "Invite dialog test", False, "Invite button not visible - skipping")
@@ -209,7 +316,7 @@ def test_invite_dialog(page):
 
         # Click invite button
         invite_button.click()
-        time.sleep(1)
+        wait_for_dialog_open(page)
         screenshot(page, "08-invite-dialog-open")
 
         # Verify dialog opened
@@ -233,14 +340,14 @@ def test_invite_dialog(page):
 
         # Test role toggle
         viewer_button.click()
-        time.sleep(0.5)
+        wait_for_animations(page, "[role=dialog]")
         screenshot(page, "09-invite-dialog-viewer-selected")
         record_result("INV-013", "Role toggle works", True)
 
         # Close dialog
         close_button = page.locator("button:has-text('Cancel')")
         close_button.click()
-        time.sleep(0.5)
+        wait_for_dialog_closed(page)
 
         # Verify dialog closed
         expect(dialog).not_to_be_visible()
@@ -254,12 +361,13 @@ def test_invite_dialog(page):
         return False
 
 
+@span()
 def test_invite_validation(page):
     """Test invite form validation"""
     log("Testing invite form validation...", "INFO")
 
     try:
-        invite_button = page.locator("button:has-text('Invite Member')")
+        invite_button = page.locator(INVITE_BUTTON)
 
         if not invite_button.is_visible():
             record_result("INV-020", "Invite validation test", False, "Invite button not visible - skipping")
@@ -267,7 +375,7 @@ def test_invite_validation(page):
 
         # Open dialog
         invite_button.click()
-        time.sleep(1)
+        wait_for_dialog_open(page)
 
         # Check that Send Invite is disabled when email is empty
         send_button = page.locator("button:has-text('Send Invite')")
@@ -282,18 +390,18 @@ def test_invite_validation(page):
 
         # Enter valid email to enable button
         email_input.fill("test@example.com")
-        time.sleep(0.5)
 
-        if not send_button.is_disabled():
+        try:
+            expect(send_button).to_be_enabled(timeout=2000)
             record_result("INV-021", "Send button enabled with valid email", True)
-        else:
+        except AssertionError:
             record_result("INV-021", "Send button enabled with valid email", False)
 
         screenshot(page, "10-invite-validation")
 
         # Close dialog
         page.locator("button:has-text('Cancel')").click()
-        time.sleep(0.5)
+        wait_for_dialog_closed(page)
 
         return True
 
@@ -302,26 +410,23 @@ def test_invite_validation(page):
         return False
 
 
+@span()
 def test_member_actions_dropdown(page):
     """Test member actions dropdown (owner only)"""
     log("Testing member actions dropdown...", "INFO")
 
     try:
         # Look for action buttons (three dots menu)
-        action_buttons = page.locator("button:has(svg.lucide-more-vertical)")
+        action_buttons = page.locator(ACTION_BUTTONS)
 
         if action_buttons.count() > 0:
             # Click first action button
             action_buttons.first.click()
-            time.sleep(0.5)
+            wait_for_menu_open(page)
             screenshot(page, "11-member-actions-dropdown")
 
             # Check for dropdown menu items
-            make_staff = page.locator("text=Make Staff")
-            make_viewer = page.locator("text=Make Viewer")
-            remove = page.locator("text=Remove")
-
-            dropdown_visible = make_staff.is_visible() or make_viewer.is_visible() or remove.is_visible()
+            dropdown_visible = any(page.locator(f"text={item}").is_visible() for item in MENU_ITEMS)
 
             if dropdown_visible:
                 record_result("TEAM-010", "Member actions dropdown visible", True)
@@ -329,8 +434,7 @@ def test_member_actions_dropdown(page):
                 record_result("TEAM-010", "Member actions dropdown visible", False, "No menu items visible")
 
             # Close dropdown by clicking elsewhere
-            page.keyboard.press("Escape")
-            time.sleep(0.5)
+            close_menu(page)
 
             return True
         else:
@@ -342,12 +446,13 @@ def test_member_actions_dropdown(page):
         return False
 
 
+@span()
 def test_pending_invitations_section(page):
     """Test pending invitations section (if any)"""
     log("Testing pending invitations section...", "INFO")
 
     try:
-        pending_section = page.locator("text=Pending Invitations")
+        pending_section = page.locator(PENDING_SECTION)
 
         if pending_section.is_visible():
             record_result("INV-030", "Pending Invitations section visible", True)
@@ -372,12 +477,13 @@ def test_pending_invitations_section(page):
         return False
 
 
+@span()
 def test_search_input(page):
     """Test search input (placeholder for future)"""
     log("Testing search input...", "INFO")
 
     try:
-        search_input = page.locator("input[placeholder*='Search team members']")
+        search_input = page.locator(SEARCH_INPUT)
 
         if search_input.is_visible():
             # Check if disabled (placeholder feature)
@@ -395,28 +501,18 @@ def test_search_input(page):
         return False
 
 
+@span()
 def test_responsive_layout(page):
     """Test responsive layout at different viewport sizes"""
     log("Testing responsive layout...", "INFO")
 
     try:
-        # Test desktop
-        page.set_viewport_size({"width": 1280, "height": 720})
-        page.wait_for_timeout(500)
-        screenshot(page, "13-responsive-desktop")
-        record_result("UI-010", "Desktop layout renders", True)
-
-        # Test tablet
-        page.set_viewport_size({"width": 768, "height": 1024})
-        page.wait_for_timeout(500)
-        screenshot(page, "14-responsive-tablet")
-        record_result("UI-011", "Tablet layout renders", True)
-
-        # Test mobile
-        page.set_viewport_size({"width": 375, "height": 667})
-        page.wait_for_timeout(500)
-        screenshot(page, "15-responsive-mobile")
-        record_result("UI-012", "Mobile layout renders", True)
+        # Desktop, tablet, mobile
+        for test_id, label, viewport, name in VIEWPORTS:
+            page.set_viewport_size(viewport)
+            wait_for_layout_settled(page)
+            screenshot(page, name)
+            record_result(test_id, f"{label} layout renders", True)
 
         # Reset to desktop
         page.set_viewport_size({"width": 1280, "height": 720})
@@ -428,6 +524,160 @@ def test_responsive_layout(page):
         return False
 
 
+# Async checks (--async): the same checks through playwright.async_api, each
+# in its own context on one shared browser (see harness/async_runner.py)
+
+async def screenshot_async(page, name: str, account: dict = None):
+    return await screenshots.capture_async(page, async_runner.artifact_name(name, account), SCREENSHOT_DIR)
+
+
+async def open_team_page_async(page):
+    # The runner signs each account in before fanning out, so no re-auth here
+    await perf.goto_async(page, f"{BASE_URL}/settings/team")
+    await wait_for_page_ready_async(page, "h1")
+    await async_expect(page.locator(TEAM_HEADING)).to_be_visible(timeout=10000)
+
+
+@signed_out
+async def check_login_async(page, record, account):
+    await perf.goto_async(page, f"{BASE_URL}/login")
+    await screenshot_async(page, "01-login-page", account)
+    await async_expect(page.locator(LOGIN_HEADING)).to_be_visible()
+    record("LOGIN-001", "Login page loads", True)
+    try:
+        await page.fill("#userEmail", account["email"])
+        await page.fill("#userPassword", account["password"])
+        await page.click(LOGIN_SUBMIT)
+        await page.wait_for_url("**/dashboard**", timeout=15000)
+        await screenshot_async(page, "03-dashboard-after-login", account)
+        record("LOGIN-002", "Login successful", True)
+    except Exception as e:
+        record("LOGIN-002", "Login successful", False, str(e))
+        await screenshot_async(page, "login-error", account)
+
+
+async def check_team_members_async(page, record, account):
+    await open_team_page_async(page)
+    await screenshot_async(page, "04-team-settings-page", account)
+    record("TEAM-001", "Team page loads", True)
+    await async_expect(page.locator(MEMBERS_SECTION).first).to_be_visible()
+    record("TEAM-002", "Team Members section visible", True)
+    has_badge = await page.locator(MEMBER_BADGE).count() > 0
+    record("TEAM-003", "Member count badge visible", has_badge, "" if has_badge else "Badge not found")
+    has_you = await page.locator(YOU_BADGE).first.is_visible()
+    record("TEAM-004", "Current user marked with 'You' badge", has_you, "" if has_you else "Not found")
+    await screenshot_async(page, "05-team-members-list", account)
+
+
+async def check_role_badges_async(page, record, account):
+    await open_team_page_async(page)
+    record("ROLE-001", "Owner role badge visible", await page.locator(OWNER_BADGE).first.is_visible())
+    permissions = await page.locator(PERMISSIONS_SECTION).is_visible()
+    record("ROLE-002", "Role Permissions section visible", permissions)
+    if permissions:
+        await screenshot_async(page, "06-role-permissions", account)
+    for role in ROLES:
+        defined = await page.locator(f"span:has-text('{role}')").count() > 0
+        record(f"ROLE-{role.upper()}", f"{role} role defined", defined)
+
+
+async def check_invite_dialog_async(page, record, account):
+    await open_team_page_async(page)
+    invite_button = page.locator(INVITE_BUTTON)
+    if not await invite_button.is_visible():
+        record("INV-001", "Invite Member button visible (owner)", False, "Button not visible - user may not be owner")
+        return
+    record("INV-001", "Invite Member button visible (owner)", True)
+    await screenshot_async(page, "07-invite-button-visible", account)
+
+    await invite_button.click()
+    await wait_for_dialog_open_async(page)
+    await screenshot_async(page, "08-invite-dialog-open", account)
+    record("INV-010", "Invite dialog opens", True)
+    await async_expect(page.locator("#invite-email")).to_be_visible()
+    record("INV-011", "Email input visible", True)
+
+    viewer_button = page.locator("button:has-text('viewer')")
+    roles_visible = await page.locator("button:has-text('staff')").is_visible() and await viewer_button.is_visible()
+    record("INV-012", "Role selection visible", roles_visible)
+    await viewer_button.click()
+    await wait_for_animations_async(page, "[role=dialog]")
+    await screenshot_async(page, "09-invite-dialog-viewer-selected", account)
+    record("INV-013", "Role toggle works", True)
+
+    send_button = page.locator("button:has-text('Send Invite')")
+    record("INV-020", "Send button disabled when email empty", await send_button.is_disabled())
+    await page.locator("#invite-email").fill("test@example.com")
+    try:
+        await async_expect(send_button).to_be_enabled(timeout=2000)
+        record("INV-021", "Send button enabled with valid email", True)
+    except AssertionError:
+        record("INV-021", "Send button enabled with valid email", False)
+    await screenshot_async(page, "10-invite-validation", account)
+
+    await page.locator("button:has-text('Cancel')").click()
+    await wait_for_dialog_closed_async(page)
+    record("INV-014", "Dialog closes on Cancel", True)
+
+
+async def check_member_actions_async(page, record, account):
+    await open_team_page_async(page)
+    action_buttons = page.locator(ACTION_BUTTONS)
+    if await action_buttons.count() == 0:
+        record("TEAM-010", "Member actions dropdown", False,
+               "No action buttons found - user may be only member or not owner")
+        return
+
+    await action_buttons.first.click()
+    await wait_for_menu_open_async(page)
+    await screenshot_async(page, "11-member-actions-dropdown", account)
+    visible = False
+    for item in MENU_ITEMS:
+        visible = visible or await page.locator(f"text={item}").is_visible()
+    record("TEAM-010", "Member actions dropdown visible", visible, "" if visible else "No menu items visible")
+    await close_menu_async(page)
+
+
+async def check_pending_and_search_async(page, record, account):
+    await open_team_page_async(page)
+    if await page.locator(PENDING_SECTION).is_visible():
+        record("INV-030", "Pending Invitations section visible", True)
+        await screenshot_async(page, "12-pending-invitations", account)
+        if await page.locator("text=Resend").count() > 0:
+            record("INV-031", "Resend option available", True)
+        if await page.locator("text=Cancel").count() > 0:
+            record("INV-032", "Cancel option available", True)
+    else:
+        record("INV-030", "Pending Invitations section", True, "No pending invitations (expected if none sent)")
+
+    search_input = page.locator(SEARCH_INPUT)
+    if await search_input.is_visible():
+        state = "disabled placeholder" if await search_input.is_disabled() else "enabled"
+        record("UI-001", f"Search input visible ({state})", True)
+    else:
+        record("UI-001", "Search input", False, "Not found")
+
+
+async def check_responsive_layout_async(page, record, account):
+    await open_team_page_async(page)
+    for test_id, label, viewport, name in VIEWPORTS:
+        await page.set_viewport_size(viewport)
+        await wait_for_layout_settled_async(page)
+        await screenshot_async(page, name, account)
+        record(test_id, f"{label} layout renders", True)
+
+
+ASYNC_CHECKS = [
+    check_login_async,
+    check_team_members_async,
+    check_role_badges_async,
+    check_invite_dialog_async,
+    check_member_actions_async,
+    check_pending_and_search_async,
+    check_responsive_layout_async,
+]
+
+
 def print_summary():
     """Print test results summary"""
     print("\n" + "=" * 60)
@@ -449,18 +699,103 @@ def print_summary():
                 if r["details"]:
                     print(f"     Details: {r['details']}")
 
+    perf.print_report(test_results)
+    replay.report()
+    screenshots.flush()
+    if spans.enabled():
+        spans.print_report()
+    store.end_run()
+
     print(f"\nScreenshots saved to: {SCREENSHOT_DIR}")
     print("=" * 60)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip team functionality tests")
+    parser.add_argument("--parallel", action="store_true",
+                        help="run each test in its own browser context across a worker pool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes for --parallel (default: CPU count)")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="run only shard I of N (implies --parallel)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run the checks through playwright.async_api on one browser")
+    parser.add_argument("--concurrency", type=int, default=async_runner.DEFAULT_CONCURRENCY,
+                        help="concurrent contexts for --async")
+    parser.add_argument("--record", metavar="NAME", help="record Supabase traffic to the named recording")
+    parser.add_argument("--replay", metavar="NAME", help="serve Supabase traffic from the named recording")
+    parser.add_argument("--replay-latency", default=None, metavar="MS|recorded",
+                        help="delay per replayed response (default 0)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every test and Playwright call, print a span tree (harness/spans.py)")
+    parser.add_argument("--impact-record", action="store_true",
+                        help="record each test's routes, server actions and source files (implies --parallel)")
+    parser.add_argument("--changed-since", metavar="REF",
+                        help="run only the tests affected by changes since REF (implies --parallel)")
+    network.add_argument(parser)
+    args = parser.parse_args()
+    try:
+        replay.configure(record=args.record, replay=args.replay, latency=args.replay_latency)
+        network.configure(args.network)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile:
+        spans.enable()
+    if args.replay and not os.path.exists(replay.store_path(args.replay)):
+        parser.error(f"no recording '{args.replay}' at {replay.store_path(args.replay)}")
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        args.parallel = True
+    if args.impact_record:
+        impact.enable()
+        args.parallel = True
+    if args.changed_since:
+        args.parallel = True
+    return args
+
+
+def select_affected(since: str) -> list:
+    """Tests affected by the changes since `since`, every test when that can't be narrowed down"""
+    tests = discover_tests(sys.modules[__name__])
+    try:
+        changed = impact.changed_files(since)
+    except ValueError as e:
+        log(f"Running the full suite: {e}", "WARN")
+        return tests
+    selected, reasons, everything = impact.select(tests, changed, impact.load(__file__), __file__)
+    log(f"{len(changed)} files changed since {since}")
+    if everything:
+        log(f"Running the full suite: {everything}", "WARN")
+        return selected
+    for name in selected:
+        log(f"{name}: {', '.join(reasons[name][:3])}{' ...' if len(reasons[name]) > 3 else ''}")
+    log(f"Impact analysis selected {len(selected)} of {len(tests)} tests")
+    return selected
+
+
 def main():
     """Main test runner"""
+    args = parse_args()
+
     print("=" * 60)
     print("StockZip Team Functionality Test Suite")
     print(f"Base URL: {BASE_URL}")
+    print(f"Network: {network.describe()}")
     print(f"Screenshot Dir: {SCREENSHOT_DIR}")
     print("=" * 60 + "\n")
 
+    store.begin_run("team-test", base_url=BASE_URL)
+
+    accounts = async_runner.parse_accounts(os.environ.get("TEST_ACCOUNTS", ""), TEST_EMAIL, TEST_PASSWORD)
+    if args.use_async and accounts:
+        test_results.extend(async_runner.run(ASYNC_CHECKS, BASE_URL, accounts,
+                                             concurrency=args.concurrency, context_options=CONTEXT_OPTIONS))
+        print_summary()
+        return
+
     if not TEST_EMAIL or not TEST_PASSWORD:
         print("ERROR: Please set TEST_EMAIL and TEST_PASSWORD environment variables")
         print("Usage: TEST_EMAIL=your@email.com TEST_PASSWORD=yourpass python3 tests/team-test.py")
@@ -468,34 +803,42 @@ def main():
 
     log(f"Testing with email: {TEST_EMAIL}")
 
+    if args.parallel:
+        only = select_affected(args.changed_since) if args.changed_since else None
+        if only == []:
+            log("No tests affected by the changes", "PASS")
+            print_summary()
+            return
+        run_parallel(sys.modules[__name__], __file__, workers=args.workers, shard=args.shard, only=only)
+        print_summary()
+        return
+
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1280, "height": 720},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
+        browser = browser_pool.launch(p)
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        setup_context(context)
         page = context.new_page()
 
         try:
-            # Run tests in sequence
-            if not test_login(page):
+            # Run tests in sequence, each as a check so its results carry its duration
+            with store.check("test_login"):
+                logged_in = test_login(page)
+            if not logged_in:
                 log("Login failed - cannot continue with team tests", "FAIL")
                 print_summary()
                 browser.close()
                 return
 
-            if not test_team_page_navigation(page):
+            with store.check("test_team_page_navigation"):
+                navigated = test_team_page_navigation(page)
+            if not navigated:
                 log("Team page navigation failed", "FAIL")
 
-            test_team_members_display(page)
-            test_role_badges(page)
-            test_invite_button(page)
-            test_invite_dialog(page)
-            test_invite_validation(page)
-            test_member_actions_dropdown(page)
-            test_pending_invitations_section(page)
-            test_search_input(page)
-            test_responsive_layout(page)
+            for test in (test_team_members_display, test_role_badges, test_invite_button, test_invite_dialog,
+                         test_invite_validation, test_member_actions_dropdown, test_pending_invitations_section,
+                         test_search_input, test_responsive_layout):
+                with store.check(test.__name__):
+                    test(page)
 
         except Exception as e:
             log(f"Unexpected error: {e}", "FAIL")
@@ -5,74 +5,120 @@ Opens a visible browser for manual login, then runs automated tests.
 
 Usage:
   python3 tests/team-visual-test.py
+
+  # Unattended: headless, concurrent contexts on one browser, signed in from
+  # the session cache instead of a manual login
+  TEST_EMAIL=owner@x.com TEST_PASSWORD=pass python3 tests/team-visual-test.py --async
+  # (with several TEST_ACCOUNTS, screenshots and goldens are named per account)
+
+  # Screenshots are diffed against tests/baselines/visual (harness/visual_diff.py);
+  # accept the current run as the new goldens with
+  python3 tests/team-visual-test.py --update-golden
 """
 
+import argparse
 import os
 import time
-from datetime import datetime
-from playwright.sync_api import sync_playwright, expect
+from playwright.async_api import expect as async_expect
+from playwright.sync_api import sync_playwright, expect, TimeoutError as PlaywrightTimeoutError
+
+from harness import async_runner, perf, results as store, screenshots, visual_diff
+from harness.console import log
+from harness.readiness import (
+    close_menu, close_menu_async, install, wait_for_animations, wait_for_dialog_closed, wait_for_dialog_open,
+    wait_for_layout_settled, wait_for_menu_open, wait_for_page_ready,
+    wait_for_animations_async, wait_for_dialog_closed_async, wait_for_dialog_open_async,
+    wait_for_layout_settled_async, wait_for_menu_open_async,
+    wait_for_page_ready_async,
+)
 
 # Configuration
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 SCREENSHOT_DIR = "/tmp/team-tests"
+TEST_EMAIL = os.environ.get("TEST_EMAIL", "")
+TEST_PASSWORD = os.environ.get("TEST_PASSWORD", "")
+
+# What run_team_tests and the async checks look for, so the two modes assert
+# the same things
+TEAM_HEADING = "h1:has-text('Team')"
+MEMBERS_SECTION = "text=Team Members"
+YOU_BADGE = "span:has-text('You')"
+OWNER_BADGE = "span:has-text('Owner')"
+PERMISSIONS_SECTION = "text=Role Permissions"
+INVITE_BUTTON = "button:has-text('Invite Member')"
+ACTION_BUTTONS = "button:has(svg.lucide-more-vertical)"
+MENU_ITEMS = ["Make Staff", "Make Viewer", "Remove"]
+PENDING_SECTION = "text=Pending Invitations"
+# (test id, label, viewport, screenshot)
+VIEWPORTS = [
+    ("UI-001", "Desktop layout", {"width": 1280, "height": 720}, "08-desktop"),
+    ("UI-002", "Tablet layout", {"width": 768, "height": 1024}, "09-tablet"),
+    ("UI-003", "Mobile layout", {"width": 375, "height": 667}, "10-mobile"),
+]
 
 # Test results storage
 test_results = []
 
-def log(message: str, status: str = "INFO"):
-    """Log with timestamp"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    prefix = {"PASS": "✅", "FAIL": "❌", "INFO": "ℹ️", "WARN": "⚠️"}.get(status, "•")
-    print(f"[{timestamp}] {prefix} {message}")
-
-def record_result(test_id: str, name: str, passed: bool, details: str = ""):
+def record_result(test_id: str, name: str, passed: bool, details: str = "", **extra):
     """Record test result"""
-    test_results.append({
+    entry = {
         "id": test_id,
         "name": name,
         "passed": passed,
-        "details": details
-    })
+        "details": details,
+        **extra
+    }
+    metrics = perf.current()
+    if metrics:
+        entry["metrics"] = metrics
+    test_results.append(entry)
+    store.record(entry)
     status = "PASS" if passed else "FAIL"
     log(f"{test_id}: {name} - {details if details else 'OK'}", status)
 
 def screenshot(page, name: str):
-    """Take a screenshot"""
-    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-    path = f"{SCREENSHOT_DIR}/{name}.png"
-    page.screenshot(path=path, full_page=True)
-    log(f"Screenshot saved: {path}")
+    """Take a screenshot (written in the background, see harness/screenshots.py)"""
+    path = screenshots.capture(page, name, SCREENSHOT_DIR, meta={"masks": visual_diff.mask_regions(page)})
+    log(f"Screenshot queued: {path}")
     return path
 
 
+def step(name: str):
+    """End the previous test step's check and start this one's, so each step's results get its own duration"""
+    store.end_check()
+    store.begin_check(name)
+
+
 def run_team_tests(page):
-    """Run team functionality tests after login"""
+    """Run team functionality tests after login; the caller ends the last step's check"""
 
     # Navigate to team settings
+    step("team_page")
     log("Navigating to team settings...", "INFO")
-    page.goto(f"{BASE_URL}/settings/team")
-    page.wait_for_load_state("networkidle")
-    time.sleep(2)
+    perf.goto(page, f"{BASE_URL}/settings/team")
+    wait_for_page_ready(page, "h1")
     screenshot(page, "01-team-settings")
 
     # Test 1: Team page loads
     try:
-        expect(page.locator("h1:has-text('Team')")).to_be_visible(timeout=10000)
+        expect(page.locator(TEAM_HEADING)).to_be_visible(timeout=10000)
         record_result("TEAM-001", "Team page loads", True)
     except:
         record_result("TEAM-001", "Team page loads", False, "Page did not load properly")
         return
 
     # Test 2: Team Members section
+    step("members_section")
     try:
-        expect(page.locator("text=Team Members")).to_be_visible()
+        expect(page.locator(MEMBERS_SECTION)).to_be_visible()
         record_result("TEAM-002", "Team Members section visible", True)
     except:
         record_result("TEAM-002", "Team Members section visible", False)
 
     # Test 3: Current user badge
+    step("you_badge")
     try:
-        you_badge = page.locator("span:has-text('You')")
+        you_badge = page.locator(YOU_BADGE)
         if you_badge.is_visible():
             record_result("TEAM-003", "Current user 'You' badge visible", True)
         else:
@@ -81,8 +127,9 @@ def run_team_tests(page):
         record_result("TEAM-003", "Current user 'You' badge", False, str(e))
 
     # Test 4: Role badges
+    step("role_badges")
     try:
-        owner_badge = page.locator("span:has-text('Owner')").first
+        owner_badge = page.locator(OWNER_BADGE).first
         if owner_badge.is_visible():
             record_result("ROLE-001", "Owner role badge visible", True)
         else:
@@ -91,23 +138,28 @@ def run_team_tests(page):
         record_result("ROLE-001", "Owner role badge", False, str(e))
 
     # Test 5: Role Permissions section
+    step("role_permissions")
     try:
-        expect(page.locator("text=Role Permissions")).to_be_visible()
+        expect(page.locator(PERMISSIONS_SECTION)).to_be_visible()
         record_result("ROLE-002", "Role Permissions section visible", True)
         screenshot(page, "02-role-permissions")
     except:
         record_result("ROLE-002", "Role Permissions section visible", False)
 
     # Test 6: Invite button
+    step("invite_dialog")
     try:
-        invite_button = page.locator("button:has-text('Invite Member')")
+        invite_button = page.locator(INVITE_BUTTON)
         if invite_button.is_visible():
             record_result("INV-001", "Invite Member button visible", True)
             screenshot(page, "03-invite-button")
 
             # Test invite dialog
             invite_button.click()
-            time.sleep(1)
+            try:
+                wait_for_dialog_open(page)
+            except PlaywrightTimeoutError:
+                pass  # recorded as INV-002 below
             screenshot(page, "04-invite-dialog")
 
             dialog = page.locator("role=dialog")
@@ -129,7 +181,7 @@ def run_team_tests(page):
 
                     # Test role toggle
                     viewer_btn.click()
-                    time.sleep(0.5)
+                    wait_for_animations(page, "[role=dialog]")
                     screenshot(page, "05-viewer-selected")
                     record_result("INV-005", "Role toggle works", True)
                 else:
@@ -137,7 +189,7 @@ def run_team_tests(page):
 
                 # Close dialog
                 page.locator("button:has-text('Cancel')").click()
-                time.sleep(0.5)
+                wait_for_dialog_closed(page)
                 record_result("INV-006", "Dialog closes", True)
             else:
                 record_result("INV-002", "Invite dialog opens", False)
@@ -147,34 +199,31 @@ def run_team_tests(page):
         record_result("INV-001", "Invite functionality", False, str(e))
 
     # Test 7: Member actions
+    step("member_actions")
     try:
-        action_buttons = page.locator("button:has(svg.lucide-more-vertical)")
+        action_buttons = page.locator(ACTION_BUTTONS)
         if action_buttons.count() > 0:
             action_buttons.first.click()
-            time.sleep(0.5)
+            wait_for_menu_open(page)
             screenshot(page, "06-member-actions")
 
             # Check dropdown options
-            has_options = (
-                page.locator("text=Make Staff").is_visible() or
-                page.locator("text=Make Viewer").is_visible() or
-                page.locator("text=Remove").is_visible()
-            )
+            has_options = any(page.locator(f"text={item}").is_visible() for item in MENU_ITEMS)
             if has_options:
                 record_result("TEAM-010", "Member actions dropdown works", True)
             else:
                 record_result("TEAM-010", "Member actions dropdown works", False, "No options visible")
 
-            page.keyboard.press("Escape")
-            time.sleep(0.3)
+            close_menu(page)
         else:
             record_result("TEAM-010", "Member actions dropdown", True, "No other members to manage")
     except Exception as e:
         record_result("TEAM-010", "Member actions", False, str(e))
 
     # Test 8: Pending invitations
+    step("pending_invitations")
     try:
-        pending = page.locator("text=Pending Invitations")
+        pending = page.locator(PENDING_SECTION)
         if pending.is_visible():
             record_result("INV-010", "Pending Invitations section visible", True)
             screenshot(page, "07-pending-invitations")
@@ -184,24 +233,14 @@ def run_team_tests(page):
         record_result("INV-010", "Pending Invitations", False, str(e))
 
     # Test 9: Responsive layout
+    step("responsive_layout")
     try:
-        # Desktop
-        page.set_viewport_size({"width": 1280, "height": 720})
-        time.sleep(0.5)
-        screenshot(page, "08-desktop")
-        record_result("UI-001", "Desktop layout", True)
-
-        # Tablet
-        page.set_viewport_size({"width": 768, "height": 1024})
-        time.sleep(0.5)
-        screenshot(page, "09-tablet")
-        record_result("UI-002", "Tablet layout", True)
-
-        # Mobile
-        page.set_viewport_size({"width": 375, "height": 667})
-        time.sleep(0.5)
-        screenshot(page, "10-mobile")
-        record_result("UI-003", "Mobile layout", True)
+        # Desktop, tablet, mobile
+        for test_id, label, viewport, name in VIEWPORTS:
+            page.set_viewport_size(viewport)
+            wait_for_layout_settled(page)
+            screenshot(page, name)
+            record_result(test_id, label, True)
 
         # Reset
         page.set_viewport_size({"width": 1280, "height": 720})
@@ -212,6 +251,142 @@ def run_team_tests(page):
     screenshot(page, "11-final")
 
 
+# Async checks (--async): run_team_tests split into independent checks, each
+# in its own context on one shared browser
+
+async def screenshot_async(page, name: str, account: dict = None):
+    masks = await visual_diff.mask_regions_async(page)
+    return await screenshots.capture_async(page, async_runner.artifact_name(name, account), SCREENSHOT_DIR,
+                                           meta={"masks": masks})
+
+
+async def open_team_page_async(page):
+    await perf.goto_async(page, f"{BASE_URL}/settings/team")
+    await wait_for_page_ready_async(page, "h1")
+
+
+async def check_team_page_async(page, record, account):
+    await open_team_page_async(page)
+    await screenshot_async(page, "01-team-settings", account)
+    try:
+        await async_expect(page.locator(TEAM_HEADING)).to_be_visible(timeout=10000)
+        record("TEAM-001", "Team page loads", True)
+    except AssertionError:
+        record("TEAM-001", "Team page loads", False, "Page did not load properly")
+        return
+
+    try:
+        await async_expect(page.locator(MEMBERS_SECTION)).to_be_visible()
+        record("TEAM-002", "Team Members section visible", True)
+    except AssertionError:
+        record("TEAM-002", "Team Members section visible", False)
+
+    record("TEAM-003", "Current user 'You' badge visible", await page.locator(YOU_BADGE).is_visible())
+    owner = await page.locator(OWNER_BADGE).first.is_visible()
+    record("ROLE-001", "Owner role badge visible", owner, "" if owner else "Not found")
+
+    try:
+        await async_expect(page.locator(PERMISSIONS_SECTION)).to_be_visible()
+        record("ROLE-002", "Role Permissions section visible", True)
+        await screenshot_async(page, "02-role-permissions", account)
+    except AssertionError:
+        record("ROLE-002", "Role Permissions section visible", False)
+
+
+async def check_invite_dialog_async(page, record, account):
+    await open_team_page_async(page)
+    invite_button = page.locator(INVITE_BUTTON)
+    if not await invite_button.is_visible():
+        record("INV-001", "Invite Member button visible", False, "User may not be owner")
+        return
+    record("INV-001", "Invite Member button visible", True)
+    await screenshot_async(page, "03-invite-button", account)
+
+    await invite_button.click()
+    try:
+        await wait_for_dialog_open_async(page)
+    except PlaywrightTimeoutError:
+        record("INV-002", "Invite dialog opens", False)
+        return
+    await screenshot_async(page, "04-invite-dialog", account)
+    record("INV-002", "Invite dialog opens", True)
+    record("INV-003", "Email input visible", await page.locator("#invite-email").is_visible())
+
+    viewer_btn = page.locator("button:has-text('viewer')")
+    if await page.locator("button:has-text('staff')").is_visible() and await viewer_btn.is_visible():
+        record("INV-004", "Role selection visible", True)
+        await viewer_btn.click()
+        await wait_for_animations_async(page, "[role=dialog]")
+        await screenshot_async(page, "05-viewer-selected", account)
+        record("INV-005", "Role toggle works", True)
+    else:
+        record("INV-004", "Role selection visible", False)
+
+    await page.locator("button:has-text('Cancel')").click()
+    await wait_for_dialog_closed_async(page)
+    record("INV-006", "Dialog closes", True)
+
+
+async def check_member_actions_async(page, record, account):
+    await open_team_page_async(page)
+    action_buttons = page.locator(ACTION_BUTTONS)
+    if await action_buttons.count() == 0:
+        record("TEAM-010", "Member actions dropdown", True, "No other members to manage")
+        return
+
+    await action_buttons.first.click()
+    await wait_for_menu_open_async(page)
+    await screenshot_async(page, "06-member-actions", account)
+    has_options = False
+    for item in MENU_ITEMS:
+        has_options = has_options or await page.locator(f"text={item}").is_visible()
+    record("TEAM-010", "Member actions dropdown works", has_options, "" if has_options else "No options visible")
+    await close_menu_async(page)
+
+
+async def check_pending_and_layout_async(page, record, account):
+    await open_team_page_async(page)
+    if await page.locator(PENDING_SECTION).is_visible():
+        record("INV-010", "Pending Invitations section visible", True)
+        await screenshot_async(page, "07-pending-invitations", account)
+    else:
+        record("INV-010", "Pending Invitations section", True, "None pending (expected)")
+
+    for test_id, label, viewport, name in VIEWPORTS:
+        await page.set_viewport_size(viewport)
+        await wait_for_layout_settled_async(page)
+        await screenshot_async(page, name, account)
+        record(test_id, label, True)
+
+
+ASYNC_CHECKS = [
+    check_team_page_async,
+    check_invite_dialog_async,
+    check_member_actions_async,
+    check_pending_and_layout_async,
+]
+
+
+def compare_screenshots(update_golden: bool = False):
+    """Diff this run's screenshots against the goldens and record VIS- results"""
+    if update_golden:
+        count = visual_diff.update_goldens(SCREENSHOT_DIR)
+        log(f"Updated {count} goldens in {visual_diff.GOLDEN_DIR}", "PASS")
+        return
+
+    for r in visual_diff.diff_run(SCREENSHOT_DIR):
+        if r.get("reason") and "score" not in r:
+            details = r["reason"]
+        else:
+            details = f"SSIM {r['score']:.4f}, {r['changed_pct']:.3f}% pixels changed"
+            if r.get("reason"):
+                details += f" ({r['reason']})"
+            if r.get("heatmap") and not r["passed"]:
+                details += f" - heatmap: {r['heatmap']}"
+        record_result(f"VIS-{r['name']}", f"Matches golden {r['name']}", r["passed"], details,
+                      visual={k: r.get(k) for k in ("score", "changed_pct", "heatmap", "golden", "current")})
+
+
 def print_summary():
     """Print test results summary"""
     print("\n" + "=" * 60)
@@ -233,28 +408,58 @@ def print_summary():
                 if r["details"]:
                     print(f"     Details: {r['details']}")
 
+    perf.print_report(test_results)
+    screenshots.flush()
+    store.end_run()
+
     print(f"\nScreenshots saved to: {SCREENSHOT_DIR}")
     print("=" * 60)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="StockZip team functionality visual test")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="headless asyncio run from the session cache instead of a manual login")
+    parser.add_argument("--concurrency", type=int, default=async_runner.DEFAULT_CONCURRENCY,
+                        help="concurrent contexts for --async")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="store this run's screenshots as the goldens instead of diffing them")
+    return parser.parse_args()
+
+
 def main():
     """Main test runner with visible browser for manual login"""
+    args = parse_args()
+
     print("=" * 60)
     print("StockZip Team Functionality Visual Test")
     print(f"Base URL: {BASE_URL}")
     print("=" * 60 + "\n")
 
+    store.begin_run("team-visual-test", base_url=BASE_URL)
+
+    if args.use_async:
+        accounts = async_runner.parse_accounts(os.environ.get("TEST_ACCOUNTS", ""), TEST_EMAIL, TEST_PASSWORD)
+        if not accounts:
+            log("--async needs TEST_EMAIL/TEST_PASSWORD or TEST_ACCOUNTS (no manual login)", "FAIL")
+            return
+        test_results.extend(async_runner.run(ASYNC_CHECKS, BASE_URL, accounts, concurrency=args.concurrency,
+                                             context_options={"viewport": {"width": 1280, "height": 720}}))
+        compare_screenshots(args.update_golden)
+        print_summary()
+        return
+
     with sync_playwright() as p:
         # Launch visible browser
         browser = p.chromium.launch(headless=False)
         context = browser.new_context(viewport={"width": 1280, "height": 720})
+        install(context)
         page = context.new_page()
 
         try:
             # Navigate to login
             log("Opening login page...", "INFO")
-            page.goto(f"{BASE_URL}/login")
-            page.wait_for_load_state("networkidle")
+            perf.goto(page, f"{BASE_URL}/login")
             screenshot(page, "00-login-page")
 
             print("\n" + "=" * 60)
@@ -273,7 +478,7 @@ def main():
             page.wait_for_load_state("networkidle")
             log(f"Current URL: {page.url}", "INFO")
 
-            # Run automated tests
+            # Run automated tests (each step is a check, so the manual login isn't timed)
             run_team_tests(page)
 
         except KeyboardInterrupt:
@@ -282,6 +487,8 @@ def main():
             log(f"Error: {e}", "FAIL")
             screenshot(page, "error")
         finally:
+            store.end_check()
+            compare_screenshots(args.update_golden)
             print_summary()
             print("\nBrowser will close in 5 seconds...")
             time.sleep(5)
@@ -0,0 +1,12 @@
+"""
+Unit tests for the pure parts of tests/harness (statistics, sharding, diffing,
+replay keys, the results store, impact selection).
+
+Run from the repo root: python -m pytest tests/unit
+"""
+
+import os
+import sys
+
+# The harness is imported as `harness.X`, the way the scripts in tests/ do it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from harness import bench
+
+
+def test_percentile_interpolates():
+    values = [10, 20, 30, 40]
+    assert bench.percentile(values, 0) == 10
+    assert bench.percentile(values, 100) == 40
+    assert bench.percentile(values, 50) == 25
+    assert bench.percentile([40, 10, 30, 20], 50) == 25
+    assert bench.percentile([], 50) is None
+
+
+def test_summarize():
+    s = bench.summarize([1, 2, 3, 4, 5])
+    assert (s["n"], s["mean"], s["min"], s["max"], s["p50"]) == (5, 3, 1, 5, 3)
+    assert bench.summarize([7])["stdev"] == 0.0
+    assert bench.summarize([]) == {"n": 0}
+
+
+def test_mann_whitney_separates_shifted_samples():
+    rng = random.Random(1)
+    baseline = [100 + rng.gauss(0, 5) for _ in range(20)]
+    slower = [130 + rng.gauss(0, 5) for _ in range(20)]
+    assert bench.mann_whitney_u(slower, baseline) < 0.001
+    assert bench.mann_whitney_u(baseline, slower) > 0.999
+
+
+def test_mann_whitney_same_distribution_is_not_significant():
+    rng = random.Random(2)
+    a = [rng.gauss(100, 5) for _ in range(20)]
+    b = [rng.gauss(100, 5) for _ in range(20)]
+    assert bench.mann_whitney_u(a, b) > 0.05
+
+
+def test_mann_whitney_degenerate_inputs():
+    assert bench.mann_whitney_u([], [1, 2]) == 1.0
+    assert bench.mann_whitney_u([5] * 10, [5] * 10) == 1.0  # all tied: no variance
+
+
+def test_compare_verdicts():
+    rng = random.Random(3)
+    baseline = [100 + rng.gauss(0, 3) for _ in range(15)]
+    assert bench.compare([v * 1.3 for v in baseline], baseline, 10)["verdict"] == "regressed"
+    assert bench.compare([v * 0.7 for v in baseline], baseline, 10)["verdict"] == "improved"
+    assert bench.compare([v * 1.05 for v in baseline], baseline, 10)["verdict"] == "ok"
+    assert bench.compare(baseline, [], 10) == {"verdict": "no-baseline", "delta_pct": None, "p_value": None}
+
+
+def test_compare_needs_significance_not_just_delta():
+    # p95 30% up from a single outlier is not a regression
+    baseline = [100] * 10 + [101] * 10
+    current = [100] * 10 + [101] * 9 + [400]
+    result = bench.compare(current, baseline, 10, stat="p95")
+    assert result["delta_pct"] > 10
+    assert result["verdict"] == "ok"
+
+
+def test_compare_on_p50():
+    result = bench.compare([110] * 10, [100] * 10, 5, stat="p50")
+    assert result["delta_pct"] == pytest.approx(10)
+    assert result["verdict"] == "regressed"
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / "nested" / "baseline.json")
+    assert bench.load_baseline(path) == {}
+    bench.save_baseline(path, {"route|/": [1.0, 2.0]}, base_url="http://localhost:3000")
+    stored = bench.load_baseline(path)
+    assert stored["samples"] == {"route|/": [1.0, 2.0]}
+    assert stored["base_url"] == "http://localhost:3000"
+    assert "created_at" in stored
+
+
+def test_theil_sen_ignores_outliers():
+    series = [10 + 2 * i for i in range(20)]
+    series[5] = 500
+    assert bench.theil_sen(series) == pytest.approx(2)
+    assert bench.theil_sen([3]) == 0.0
+
+
+def test_mann_kendall():
+    tau, p = bench.mann_kendall(list(range(12)))
+    assert tau == 1.0 and p < 0.001
+    tau, p = bench.mann_kendall(list(range(12, 0, -1)))
+    assert tau == -1.0 and p > 0.999
+    assert bench.mann_kendall([4, 4, 4, 4, 4, 4]) == (0.0, 1.0)
+    assert bench.mann_kendall([1, 2]) == (0.0, 1.0)
+
+
+def test_mann_kendall_noise_is_not_a_trend():
+    rng = random.Random(4)
+    _, p = bench.mann_kendall([rng.gauss(50, 5) for _ in range(30)])
+    assert p > 0.05
+
+
+@pytest.mark.parametrize("exponent", [0.5, 1.0, 1.5, 2.0])
+def test_power_fit_recovers_the_exponent(exponent):
+    sizes = [100, 1000, 5000, 20000]
+    values = [50 + 0.02 * s ** exponent for s in sizes]
+    fit = bench.power_fit(sizes, values)
+    assert fit["exponent"] == pytest.approx(exponent, abs=0.02)
+    assert fit["r2"] > 0.999
+
+
+def test_power_fit_overhead_does_not_pull_the_exponent_down():
+    sizes = [1000, 10000, 100000]
+    fit = bench.power_fit(sizes, [5000 + 0.1 * s for s in sizes])
+    assert fit["exponent"] == pytest.approx(1.0, abs=0.02)
+    assert fit["overhead"] == pytest.approx(5000, rel=0.05)
+
+
+def test_power_fit_flat_and_decreasing():
+    assert bench.power_fit([1, 10, 100], [20, 20, 20]) == {"exponent": 0.0, "overhead": 20, "coefficient": 0.0,
+                                                            "r2": 1.0}
+    assert bench.power_fit([1, 10, 100], [30, 20, 10])["exponent"] == 0.0
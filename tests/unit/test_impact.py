@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+from harness import impact
+
+
+def touch(root, *paths):
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write("")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A small app/ tree: a locale-prefixed marketing site beside the dashboard"""
+    touch(tmp_path, "app/layout.tsx", "app/error.tsx",
+          "app/[locale]/layout.tsx", "app/[locale]/(marketing)/layout.tsx", "app/[locale]/(marketing)/page.tsx",
+          "app/[locale]/(marketing)/pricing/page.tsx",
+          "app/(dashboard)/layout.tsx", "app/(dashboard)/dashboard/page.tsx",
+          "app/(dashboard)/settings/layout.tsx", "app/(dashboard)/settings/team/page.tsx",
+          "app/(dashboard)/settings/team/loading.tsx",
+          "app/(dashboard)/items/[id]/page.tsx", "app/(dashboard)/items/new/page.tsx",
+          "app/(dashboard)/docs/[...slug]/page.tsx")
+    monkeypatch.setattr(impact, "REPO_ROOT", str(tmp_path))
+    monkeypatch.setattr(impact, "_locales", ("en-us", "en-gb"))
+    return str(tmp_path / "app")
+
+
+def pages(files):
+    return [f for f in files if f.endswith(("page.tsx", "route.ts"))]
+
+
+def test_unprefixed_marketing_path_resolves_through_locale(app):
+    files = impact.route_files("/pricing", app)
+    assert pages(files) == ["app/[locale]/(marketing)/pricing/page.tsx"]
+    assert "app/[locale]/(marketing)/layout.tsx" in files
+    assert "app/[locale]/layout.tsx" in files
+
+
+def test_locale_prefixed_path(app):
+    assert pages(impact.route_files("/en-gb/pricing", app)) == ["app/[locale]/(marketing)/pricing/page.tsx"]
+    assert pages(impact.route_files("/en-us", app)) == ["app/[locale]/(marketing)/page.tsx"]
+
+
+def test_root_is_the_marketing_home(app):
+    assert pages(impact.route_files("/", app)) == ["app/[locale]/(marketing)/page.tsx"]
+
+
+def test_unknown_locale_does_not_match(app):
+    assert impact.route_files("/fr-fr/pricing", app) == []
+
+
+def test_route_group_layouts_and_loading(app):
+    files = impact.route_files("/settings/team", app)
+    assert pages(files) == ["app/(dashboard)/settings/team/page.tsx"]
+    for expected in ("app/layout.tsx", "app/error.tsx", "app/(dashboard)/layout.tsx",
+                     "app/(dashboard)/settings/layout.tsx", "app/(dashboard)/settings/team/loading.tsx"):
+        assert expected in files
+    assert not any("[locale]" in f for f in files)
+
+
+def test_static_segment_beats_dynamic(app):
+    assert pages(impact.route_files("/items/new", app)) == ["app/(dashboard)/items/new/page.tsx"]
+    assert pages(impact.route_files("/items/42", app)) == ["app/(dashboard)/items/[id]/page.tsx"]
+
+
+def test_catch_all(app):
+    assert pages(impact.route_files("/docs/a/b/c", app)) == ["app/(dashboard)/docs/[...slug]/page.tsx"]
+
+
+def test_unknown_route(app):
+    assert impact.route_files("/nowhere", app) == []
+
+
+def test_locales_read_from_the_app():
+    assert "en-us" in impact.locales()
+
+
+# -- select ----------------------------------------------------------------------
+
+SUITE = os.path.join("tests", "team-test.py")
+
+
+@pytest.fixture
+def impact_map(app, monkeypatch):
+    monkeypatch.chdir(impact.REPO_ROOT)  # select() takes the suite path relative to the working directory
+    monkeypatch.setattr(impact, "APP_DIR", app)
+    monkeypatch.setattr(impact, "_imports", {})
+    touch(impact.REPO_ROOT, "components/team/list.tsx", "lib/unused.ts")
+    return {"tests": {
+        "test_pricing": {"routes": ["/pricing"]},
+        "test_team": {"routes": ["/settings/team"], "files": ["components/team/list.tsx"]},
+    }}
+
+
+def test_select_without_a_map_runs_everything():
+    assert impact.select(["a", "b"], ["app/x.tsx"], None, SUITE) == (["a", "b"], {}, "no impact map recorded yet")
+
+
+def test_select_by_route_file(impact_map):
+    tests, reasons, everything = impact.select(
+        ["test_pricing", "test_team"], ["app/[locale]/(marketing)/pricing/page.tsx"], impact_map, SUITE)
+    assert tests == ["test_pricing"]
+    assert reasons == {"test_pricing": ["app/[locale]/(marketing)/pricing/page.tsx"]}
+    assert everything is None
+
+
+def test_select_by_recorded_file(impact_map):
+    tests, _, _ = impact.select(["test_pricing", "test_team"], ["components/team/list.tsx"], impact_map, SUITE)
+    assert tests == ["test_team"]
+
+
+def test_select_shared_layout_hits_both(impact_map):
+    tests, _, _ = impact.select(["test_pricing", "test_team"], ["app/layout.tsx"], impact_map, SUITE)
+    assert tests == ["test_pricing", "test_team"]
+
+
+def test_select_unmapped_tests_always_run(impact_map):
+    tests, reasons, _ = impact.select(["test_pricing", "test_new"], ["components/team/list.tsx"], impact_map, SUITE)
+    assert tests == ["test_new"]
+    assert reasons == {"test_new": ["not in the impact map"]}
+
+
+def test_select_ignored_and_unused_code_select_nothing(impact_map):
+    tests, _, everything = impact.select(["test_pricing", "test_team"], ["README.md", "lib/unused.ts"],
+                                         impact_map, SUITE)
+    assert tests == [] and everything is None
+
+
+@pytest.mark.parametrize("path", ["tests/harness/bench.py", "supabase/migrations/1.sql", "package.json",
+                                  "tests/team-test.py"])
+def test_select_full_suite(impact_map, path):
+    tests, _, everything = impact.select(["test_pricing", "test_team"], [path], impact_map, SUITE)
+    assert tests == ["test_pricing", "test_team"] and path in everything
+
+
+def test_select_unknown_file_falls_back_to_everything(impact_map):
+    tests, _, everything = impact.select(["test_pricing", "test_team"], ["Dockerfile"], impact_map, SUITE)
+    assert tests == ["test_pricing", "test_team"] and "not mapped" in everything
@@ -0,0 +1,166 @@
+import json
+import os
+from xml.etree import ElementTree
+
+import pytest
+
+from harness import results as store
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    """An empty store under tmp_path, with this process's connection reset around the test"""
+    monkeypatch.setattr(store, "RESULTS_DIR", str(tmp_path))
+    monkeypatch.setattr(store, "RUN_ID", "run-1")
+    monkeypatch.setenv("HARNESS_SCRIPT", "unit")
+    monkeypatch.delenv("NETWORK_PROFILE", raising=False)
+    monkeypatch.setattr(store, "_db", None)
+    yield tmp_path
+    if store._db is not None:
+        store._db.close()
+    store._db = None
+
+
+def lines():
+    with open(store.jsonl_path()) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_streams_to_jsonl_and_index(results_dir):
+    store.begin_run("unit", base_url="http://localhost:3000")
+    store.record({"id": "TEAM-001", "name": "Team page loads", "passed": True})
+    store.record({"id": "TEAM-002", "name": "Members", "passed": False, "details": "missing",
+                  "account": "a@x.com", "metrics": {"lcp": 812}, "kib": 12.5})
+
+    logged = lines()
+    assert [line["type"] for line in logged] == ["run", "result", "result"]
+    assert logged[0]["base_url"] == "http://localhost:3000"
+    failed = logged[2]
+    assert (failed["test_id"], failed["passed"], failed["account"]) == ("TEAM-002", False, "a@x.com")
+    assert failed["extra"] == {"kib": 12.5}  # unknown fields don't get columns
+    assert failed["network"] == "none"
+
+    rows = store.connect().execute(
+        "SELECT test_id, passed, details, metrics FROM results WHERE run_id = 'run-1' ORDER BY id").fetchall()
+    assert rows == [("TEAM-001", 1, "", None), ("TEAM-002", 0, "missing", '{"lcp": 812}')]
+
+
+def test_artifacts_attach_to_the_next_result_only(results_dir):
+    store.begin_run("unit")
+    store.attach_artifact("/tmp/shot-1.png")
+    store.record({"id": "A-1", "name": "a", "passed": True})
+    store.record({"id": "A-2", "name": "b", "passed": True})
+    _, first, second = lines()
+    assert first["artifacts"] == ["/tmp/shot-1.png"]
+    assert second["artifacts"] == []
+
+
+def test_end_run_counts_and_exports_junit(results_dir):
+    store.begin_run("unit")
+    store.attach_artifact("/tmp/shot.png")
+    store.record({"id": "INV-001", "name": "Invite", "passed": False, "details": "no button", "account": "a@x.com"})
+    store.record({"id": "INV-002", "name": "Dialog", "passed": True})
+    run = store.end_run()
+    assert (run["passed"], run["failed"]) == (1, 1)
+
+    suite = ElementTree.parse(os.path.join(results_dir, "junit", "run-1.xml")).getroot()
+    assert (suite.get("name"), suite.get("tests"), suite.get("failures")) == ("unit", "2", "1")
+    failed, passed = suite.findall("testcase")
+    assert failed.get("classname") == "unit.INV"
+    assert failed.get("name") == "INV-001: Invite [a@x.com]"
+    assert failed.find("failure").get("message") == "no button"
+    assert failed.find("system-out").text == "[[ATTACHMENT|/tmp/shot.png]]"
+    assert passed.find("failure") is None
+
+
+def test_rebuild_index_replays_the_jsonl(results_dir):
+    store.begin_run("unit")
+    for i in range(3):
+        store.record({"id": f"R-{i}", "name": "r", "passed": i != 1})
+    store.end_run()
+
+    assert store.rebuild_index() == 3
+    db = store.connect()
+    assert db.execute("SELECT COUNT(*), SUM(passed) FROM results").fetchone() == (3, 2)
+    assert db.execute("SELECT script, passed, failed FROM runs").fetchone() == ("unit", 2, 1)
+
+
+def test_index_failure_keeps_the_jsonl(results_dir, monkeypatch):
+    store.begin_run("unit")
+
+    def broken(db, row):
+        raise store.sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(store, "_index_result", broken)
+    store.record({"id": "X-1", "name": "x", "passed": True})
+    assert lines()[-1]["test_id"] == "X-1"
+
+
+def test_recorder(results_dir):
+    store.begin_run("unit")
+    results = []
+    record = store.recorder(results)
+    record("B-001", "bench", True, "p50 12ms", samples=[11, 12, 13])
+    assert results == [{"id": "B-001", "name": "bench", "passed": True, "details": "p50 12ms",
+                        "samples": [11, 12, 13]}]
+    assert lines()[-1]["extra"] == {"samples": [11, 12, 13]}
+
+
+def test_results_share_their_checks_duration(results_dir, monkeypatch):
+    clock = iter([100.0, 100.5, 101.0, 102.0, 103.0, 110.0, 111.0])
+    monkeypatch.setattr(store.time, "time", lambda: next(clock))
+    store.begin_run("unit")
+    store.begin_check("test_invite_dialog")
+    store.record({"id": "INV-010", "name": "a", "passed": True})
+    store.record({"id": "INV-011", "name": "b", "passed": True})
+    assert store.end_check() == 2500.0  # 100.5 -> 103.0, not the 1s between the two results
+    store.record({"id": "OUT-1", "name": "c", "passed": True})
+
+    rows = dict(store.connect().execute("SELECT test_id, duration_ms FROM results").fetchall())
+    assert rows == {"INV-010": 2500.0, "INV-011": 2500.0, "OUT-1": None}
+    assert store.end_check() is None
+
+
+def test_check_context_ends_on_error(results_dir):
+    store.begin_run("unit")
+    with pytest.raises(RuntimeError):
+        with store.check("test_broken"):
+            store.record({"id": "B-1", "name": "b", "passed": False})
+            raise RuntimeError("boom")
+    assert store._check.get() is None
+    assert store.connect().execute("SELECT duration_ms FROM results").fetchone()[0] is not None
+
+
+def test_junit_counts_each_check_once(results_dir, monkeypatch):
+    clock = iter([100.0, 100.0, 100.0, 100.0, 102.0, 102.0, 102.0, 103.0, 103.0])
+    monkeypatch.setattr(store.time, "time", lambda: next(clock))
+    store.begin_run("unit")
+    with store.check("test_members"):
+        store.record({"id": "TEAM-001", "name": "a", "passed": True})
+        store.record({"id": "TEAM-002", "name": "b", "passed": True})
+    with store.check("test_invite"):
+        store.record({"id": "INV-001", "name": "c", "passed": True})
+    path = store.export_junit("run-1", os.path.join(results_dir, "junit.xml"))
+
+    suite = ElementTree.parse(path).getroot()
+    assert suite.get("time") == "3.000"  # 2s + 1s, not 2s + 2s + 1s
+    assert [case.get("time") for case in suite.findall("testcase")] == ["2.000", "2.000", "1.000"]
+
+
+def test_rebuild_index_keeps_check_durations(results_dir):
+    store.begin_run("unit")
+    store.begin_check("check")
+    store.record({"id": "C-1", "name": "c", "passed": True})
+    duration = store.end_check()
+    assert store.rebuild_index() == 1
+    assert store.connect().execute("SELECT duration_ms FROM results").fetchone() == (duration,)
+
+
+def test_old_store_gets_the_check_column(results_dir):
+    db = store.sqlite3.connect(store.db_path())
+    db.execute("CREATE TABLE results (id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, script TEXT, "
+               "test_id TEXT NOT NULL, name TEXT, passed INTEGER NOT NULL, details TEXT, duration_ms REAL, "
+               "recorded_at REAL, account TEXT, metrics TEXT, artifacts TEXT, extra TEXT)")
+    db.commit()
+    db.close()
+    columns = {row[1] for row in store.connect().execute("PRAGMA table_info(results)")}
+    assert {"network", "check_id"} <= columns
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from harness.runner import parse_shard, select_shard  # noqa: E402
+
+
+def test_parse_shard():
+    assert parse_shard("1/1") == (1, 1)
+    assert parse_shard("2/3") == (2, 3)
+
+
+@pytest.mark.parametrize("value", ["", "2", "a/b", "1/2/3", "0/2", "3/2", "1/0", "-1/2"])
+def test_parse_shard_rejects(value):
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+
+def test_select_shard_round_robin():
+    tests = [f"test_{i}" for i in range(7)]
+    assert select_shard(tests, 1, 3) == ["test_0", "test_3", "test_6"]
+    assert select_shard(tests, 2, 3) == ["test_1", "test_4"]
+    assert select_shard(tests, 3, 3) == ["test_2", "test_5"]
+
+
+def test_shards_cover_every_test_once():
+    tests = [f"test_{i}" for i in range(11)]
+    for total in range(1, 6):
+        shards = [select_shard(tests, index, total) for index in range(1, total + 1)]
+        assert sorted(sum(shards, [])) == sorted(tests)
+        assert max(map(len, shards)) - min(map(len, shards)) <= 1
@@ -0,0 +1,40 @@
+import json
+import os
+
+from harness import screenshots
+
+
+class FakePage:
+    def __init__(self, *frames):
+        self.frames = list(frames)
+
+    def screenshot(self, full_page=True):
+        return self.frames.pop(0)
+
+
+def test_capture_dedupes_and_times_both_sides(tmp_path):
+    screenshots.flush()
+    page = FakePage(b"frame-a", b"frame-a", b"frame-b")
+    assert screenshots.capture(page, "one", str(tmp_path)) == str(tmp_path / "one.png")
+    assert screenshots.flush()["written"] == 1  # stored before the same frame comes again
+    for name in ("two", "three"):
+        screenshots.capture(page, name, str(tmp_path))
+    stats = screenshots.flush()
+
+    assert (stats["captured"], stats["written"], stats["deduped"]) == (2, 1, 1)
+    assert stats["bytes_saved"] == len(b"frame-a")
+    assert stats["capture_ms"] >= 0 and stats["store_ms"] > 0
+    assert (tmp_path / "two.png").read_bytes() == b"frame-a"
+    assert os.path.realpath(tmp_path / "one.png") == os.path.realpath(tmp_path / "two.png")
+
+    manifest = screenshots.load_manifest(str(tmp_path))
+    assert set(manifest) == {"one", "two", "three"}
+    assert manifest["two"]["deduped"] is True
+    with open(screenshots.manifest_path(str(tmp_path))) as f:
+        assert len([json.loads(line) for line in f]) == 3
+
+
+def test_flush_resets_the_counts(tmp_path):
+    screenshots.capture(FakePage(b"x"), "x", str(tmp_path))
+    screenshots.flush()
+    assert screenshots.flush()["captured"] == 0
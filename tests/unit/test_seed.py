@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("psycopg")
+
+from harness import seed  # noqa: E402
+
+TENANT = "00000000-0000-0000-0000-0000000000aa"
+PLAN = (5000, 50, 3)
+
+
+class FakeConn:
+    """Answers use_tenant's lookups and keeps every statement it was given"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((" ".join(sql.split()), params))
+        return self
+
+    def fetchone(self):
+        sql = self.statements[-1][0]
+        if sql.startswith("SELECT id, tenant_id FROM public.profiles"):
+            return ("00000000-0000-0000-0000-0000000000bb", TENANT)
+        if sql.startswith("SELECT max_items"):
+            return PLAN
+        return None
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def limits(self):
+        return [params for sql, params in self.statements if sql.startswith("UPDATE public.tenants")]
+
+
+def test_existing_account_gets_its_limits_back():
+    conn = FakeConn()
+    seeder = seed.Seeder(conn)
+    seeder.use_tenant("owner@example.com")
+    seeder.run({})
+    lifted, restored = conn.limits()
+    assert lifted == (seed.SEEDED_MAX_USERS, TENANT)
+    assert restored == (*PLAN, TENANT)
+
+
+def test_limits_come_back_when_seeding_fails(monkeypatch):
+    conn = FakeConn()
+    seeder = seed.Seeder(conn)
+    seeder.use_tenant("owner@example.com")
+    monkeypatch.setattr(seeder, "_load_items", lambda indices: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        seeder.run({"items": 10})
+    assert conn.limits()[-1] == (*PLAN, TENANT)
+    seeder.run({})
+    assert len(conn.limits()) == 2  # restored once
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from harness import spans
+
+
+class FakeRequest:
+    def __init__(self, start: float, end: float):
+        self.timing = {"startTime": start * 1000, "responseEnd": (end - start) * 1000}
+
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def finish(self, start: float, end: float):
+        for handler in self.handlers["requestfinished"]:
+            handler(FakeRequest(start, end))
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(spans, "_patched", True)
+    monkeypatch.setattr(spans, "_roots", [])
+    token = spans._network.set(None)
+    yield
+    spans._network.reset(token)
+
+
+def aggregate():
+    tree, networks = {}, {}
+    for root in spans._roots:
+        root.start, root.end = 100.0, 104.0
+        spans._aggregate(root, (root.name,), tree, networks)
+    return tree
+
+
+def test_concurrent_tasks_only_get_their_own_contexts_network(profiling):
+    busy, idle = FakeContext(), FakeContext()
+
+    async def check(name, context):
+        spans.watch(context)
+        with spans.span(name, kind="browser"):
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(check("busy", busy), check("idle", idle))
+    asyncio.run(main())
+    busy.finish(100.0, 101.0)
+    busy.finish(100.5, 102.0)  # overlapping requests count once
+
+    tree = aggregate()
+    assert tree[("busy",)]["network"] == pytest.approx(2.0)
+    assert tree[("busy",)]["browser"] == pytest.approx(2.0)
+    assert tree[("idle",)]["network"] == 0.0
+    assert tree[("idle",)]["browser"] == pytest.approx(4.0)
+
+
+def test_watching_a_context_again_reuses_its_requests(profiling):
+    context = FakeContext()
+    spans.watch(context)
+    spans.watch(context)
+    assert len(context.handlers["requestfinished"]) == 1
+    with spans.span("call", kind="browser"):
+        pass
+    context.finish(101.0, 102.0)
+    assert aggregate()[("call",)]["network"] == pytest.approx(1.0)
+
+
+def test_spans_without_a_watched_context_have_no_network(profiling):
+    with spans.span("call", kind="browser"):
+        pass
+    assert aggregate()[("call",)]["network"] == 0.0
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from harness import visual_diff  # noqa: E402
+
+
+def page(width=160, height=120, box=None, color=(200, 30, 30)):
+    """A flat page with a few stripes and an optional solid box (x, y, w, h)"""
+    pixels = np.full((height, width, 3), 245, dtype=np.uint8)
+    pixels[10:14, :] = 40
+    pixels[60:64, 20:140] = 90
+    if box:
+        x, y, w, h = box
+        pixels[y:y + h, x:x + w] = color
+    return pixels
+
+
+def save(tmp_path, name, pixels):
+    path = str(tmp_path / f"{name}.png")
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def test_identical_screenshots_pass(tmp_path):
+    golden = save(tmp_path, "golden", page())
+    result = visual_diff.compare(save(tmp_path, "current", page()), golden, heatmap_path=str(tmp_path / "heat.png"))
+    assert result["passed"]
+    assert result["score"] == 1.0
+    assert result["changed_pct"] == 0.0
+    assert result["heatmap"] is None
+    assert not os.path.exists(tmp_path / "heat.png")
+
+
+def test_changed_region_fails_with_a_heatmap(tmp_path):
+    golden = save(tmp_path, "golden", page())
+    heatmap = str(tmp_path / "heat" / "current.png")
+    result = visual_diff.compare(save(tmp_path, "current", page(box=(40, 30, 24, 16))), golden, heatmap_path=heatmap)
+    assert not result["passed"]
+    assert result["changed_pct"] == pytest.approx(24 * 16 / (160 * 120) * 100, abs=0.01)
+    assert result["score"] < 1.0
+    assert result["heatmap"] == heatmap and os.path.exists(heatmap)
+    with Image.open(heatmap) as image:
+        assert image.size == (160, 120)
+
+
+def test_rendering_noise_passes(tmp_path):
+    golden = save(tmp_path, "golden", page())
+    noisy = page().astype(np.int16) + np.random.default_rng(0).integers(-1, 2, (120, 160, 3))
+    result = visual_diff.compare(save(tmp_path, "current", np.clip(noisy, 0, 255).astype(np.uint8)), golden)
+    assert result["changed_pct"] == 0.0
+    assert result["passed"]
+
+
+def test_masked_change_is_ignored(tmp_path):
+    golden = save(tmp_path, "golden", page())
+    current = save(tmp_path, "current", page(box=(40, 30, 24, 16)))
+    result = visual_diff.compare(current, golden, masks=[[36, 26, 32, 24]])
+    assert result["passed"]
+    assert result["changed_pct"] == 0.0
+    assert result["masked_pct"] > 0
+
+
+def test_size_change_fails(tmp_path):
+    golden = save(tmp_path, "golden", page())
+    result = visual_diff.compare(save(tmp_path, "current", page(height=136)), golden)
+    assert not result["passed"]
+    assert result["size"] == [160, 136] and result["golden_size"] == [160, 120]
+    # The extra rows only one image covers count as changed
+    assert result["changed_pct"] == pytest.approx(16 * 160 / (136 * 160) * 100, abs=0.01)
+
+
+def test_block_ssim_of_identical_blocks_is_one():
+    luma = np.random.default_rng(1).uniform(0, 255, (16, 24)).astype(np.float32)
+    ssim = visual_diff.block_ssim(luma, luma, 8)
+    assert ssim.shape == (2, 3)
+    assert np.allclose(ssim, 1.0)